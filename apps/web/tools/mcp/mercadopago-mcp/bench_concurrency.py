@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmarks for the safety primitives.
+
+Drives TransferRateLimiter, IdempotencyStore and OrderProcessingLock from
+both daemons with thousands of in-flight coroutines and large key sets, and
+reports per case:
+
+- ops/s and per-operation p50/p99 latency
+- contention on the primitive's internal asyncio.Lock (share of acquires that
+  had to wait, total wait time) and, for OrderProcessingLock, collisions
+- memory: traced allocation of the preloaded structure and process peak RSS
+- violations of the primitive's guarantee under load (must always be 0)
+
+A class shared by both daemons (p2p_core, p2p_rate_limiter, p2p_idempotency)
+runs once and is reported as "v3+ecuador". Results can be appended to a JSON-lines file and compared
+with the previous run to spot regressions.
+
+Run with: python bench_concurrency.py [--coroutines 1000,10000,100000] [--keys 10000,100000,1000000]
+          [--ops 100000] [--only lock,idempotency,limiter] [--persisted] [--save results.jsonl] [--compare results.jsonl]
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from bench_security_classes import preload
+from p2p_tracing import percentile
+
+DAEMONS = {'v3': 'p2p_daemon_v3', 'ecuador': 'p2p_daemon_ecuador'}
+PRIMITIVES = {
+    'lock': 'OrderProcessingLock',
+    'idempotency': 'IdempotencyStore',
+    'limiter': 'TransferRateLimiter',
+}
+
+UNLIMITED = 10 ** 9
+
+
+class CountingLock(asyncio.Lock):
+    """asyncio.Lock that counts acquires that had to wait, and for how long."""
+
+    def __init__(self):
+        super().__init__()
+        self.acquires = 0
+        self.contended = 0
+        self.wait = 0.0
+
+    async def acquire(self):
+        self.acquires += 1
+        if not self.locked():
+            return await super().acquire()
+        self.contended += 1
+        start = time.perf_counter()
+        try:
+            return await super().acquire()
+        finally:
+            self.wait += time.perf_counter() - start
+
+
+def primitive_classes(names: List[str]) -> Dict[str, Dict[type, List[str]]]:
+    """{primitive: {class: [daemons using it]}} so a shared class runs once."""
+    modules = {daemon: importlib.import_module(module) for daemon, module in DAEMONS.items()}
+    found: Dict[str, Dict[type, List[str]]] = {}
+    for name in names:
+        classes: Dict[type, List[str]] = {}
+        for daemon, module in modules.items():
+            classes.setdefault(getattr(module, PRIMITIVES[name]), []).append(daemon)
+        found[name] = classes
+    return found
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def traced_mb(build: Callable):
+    """Call build() under tracemalloc; returns (result, MB still allocated)."""
+    tracemalloc.start()
+    try:
+        result = build()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current / 1024 / 1024
+
+
+async def drive(coroutines: int, ops: int, op: Callable) -> Dict:
+    """`coroutines` tasks each awaiting op(task, i) `ops` times; timed per op unless op returns its own time."""
+    samples: List[float] = []
+
+    async def worker(task: int):
+        for i in range(ops):
+            start = time.perf_counter()
+            took = await op(task, i)
+            samples.append(time.perf_counter() - start if took is None else took)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(task) for task in range(coroutines)])
+    elapsed = time.perf_counter() - start
+    samples.sort()
+    return {
+        'ops': len(samples),
+        'seconds': round(elapsed, 3),
+        'ops_per_sec': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'p50_us': round(percentile(samples, 50) * 1e6, 1),
+        'p99_us': round(percentile(samples, 99) * 1e6, 1),
+    }
+
+
+def result(daemons: List[str], primitive: str, case: str, coroutines: int, keys: int,
+           run: Dict, lock: CountingLock, setup_mb: float, violations: int, **extra) -> Dict:
+    return {
+        'daemon': '+'.join(daemons),
+        'primitive': primitive,
+        'case': case,
+        'coroutines': coroutines,
+        'keys': keys,
+        **run,
+        'contended_pct': round(100 * lock.contended / lock.acquires, 1) if lock.acquires else 0.0,
+        'lock_wait_ms': round(lock.wait * 1e3, 1),
+        'setup_mb': round(setup_mb, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'violations': violations,
+        **extra,
+    }
+
+
+# ==============================================================================
+# ORDER PROCESSING LOCK
+# ==============================================================================
+
+async def bench_lock(cls: type, daemons: List[str], coroutines: int, keys: int, ops: int) -> Dict:
+    """About four coroutines per order id, each holding it across a yield; `keys` ids already held."""
+    def build():
+        lock = cls()
+        lock._processing.update(f"held_{i}" for i in range(keys))
+        return lock
+
+    lock, setup_mb = traced_mb(build)
+    lock._lock = CountingLock()
+    hot = max(1, coroutines // 4)
+    holders, state = set(), {'collisions': 0, 'violations': 0}
+
+    async def op(task: int, i: int) -> float:
+        order_id = f"order_{(task + i) % hot}"
+        start = time.perf_counter()
+        if not await lock.acquire(order_id):
+            state['collisions'] += 1
+            return time.perf_counter() - start
+        took = time.perf_counter() - start
+        if order_id in holders:
+            state['violations'] += 1  # Two workers on one order
+        holders.add(order_id)
+        await asyncio.sleep(0)  # Held while other coroutines run (not timed)
+        holders.discard(order_id)
+        start = time.perf_counter()
+        await lock.release(order_id)
+        return took + time.perf_counter() - start
+
+    run = await drive(coroutines, ops, op)
+    return result(daemons, 'lock', 'acquire/release', coroutines, keys, run, lock._lock, setup_mb,
+                  state['violations'], collisions=state['collisions'])
+
+
+# ==============================================================================
+# IDEMPOTENCY STORE
+# ==============================================================================
+
+async def bench_idempotency(cls: type, daemons: List[str], coroutines: int, keys: int, ops: int,
+                            path: Optional[str] = None) -> Dict:
+    """Pairs of coroutines race for each new key; every other call hits a live key."""
+    def build():
+        store = cls(ttl_hours=24, path=path)
+        preload(store, keys)
+        return store
+
+    store, setup_mb = traced_mb(build)
+    store._lock = CountingLock()
+    grants: Dict[str, int] = {}
+
+    async def op(task: int, i: int):
+        if i % 2:
+            await store.check_and_set(f"live_{(task * ops + i) % keys if keys else 0}")
+            return
+        key = f"new_{task // 2}_{i}"
+        grants.setdefault(key, 0)
+        if await store.check_and_set(key):
+            grants[key] += 1
+
+    try:
+        run = await drive(coroutines, ops, op)
+    finally:
+        store.close()
+    violations = sum(1 for count in grants.values() if count != 1)
+    return result(daemons, 'idempotency', 'sqlite' if path else 'memory', coroutines, keys, run,
+                  store._lock, setup_mb, violations)
+
+
+# ==============================================================================
+# TRANSFER RATE LIMITER
+# ==============================================================================
+
+async def bench_limiter(cls: type, daemons: List[str], coroutines: int, keys: int, ops: int,
+                        mode: str = 'window', path: Optional[str] = None) -> Dict:
+    """reserve + commit/cancel with no effective limit; `keys` transfers already in the hour window."""
+    def build():
+        limiter = cls(max_per_minute=UNLIMITED, max_per_hour=UNLIMITED, max_daily_amount=float('inf'),
+                      mode=mode, burst=UNLIMITED, path=path)
+        now = time.time()
+        limiter._hour_window = [now - i * (3000 / keys) for i in range(keys)] if keys else []
+        return limiter
+
+    limiter, setup_mb = traced_mb(build)
+    limiter._lock = CountingLock()
+    state = {'denied': 0}
+
+    async def op(task: int, i: int):
+        ok, _ = await limiter.reserve(1.0)
+        if not ok:
+            state['denied'] += 1
+        elif i % 2:
+            await limiter.commit(1.0)
+        else:
+            await limiter.cancel(1.0)
+
+    run = await drive(coroutines, ops, op)
+
+    # Guarantee: simultaneous reserves never overshoot the limit
+    limited = cls(max_per_minute=5, max_per_hour=100, max_daily_amount=1000.0, mode=mode)
+    granted = sum(1 for ok, _ in await asyncio.gather(*[limited.reserve(1.0) for _ in range(coroutines)])
+                  if ok)
+    violations = state['denied'] + max(0, granted - 5)
+    return result(daemons, 'limiter', f"{mode}, persisted" if path else mode, coroutines, keys, run,
+                  limiter._lock, setup_mb, violations)
+
+
+# ==============================================================================
+# RUN
+# ==============================================================================
+
+async def run(args) -> List[Dict]:
+    classes = primitive_classes(args.only)
+    results = []
+
+    def done(row: Dict):
+        results.append(row)
+        print(format_row(row), flush=True)
+
+    print(format_header())
+    for coroutines in args.coroutines:
+        ops = max(1, args.ops // coroutines)
+        for keys in args.keys:
+            for cls, daemons in classes.get('lock', {}).items():
+                done(await bench_lock(cls, daemons, coroutines, keys, ops))
+            for cls, daemons in classes.get('idempotency', {}).items():
+                done(await bench_idempotency(cls, daemons, coroutines, keys, ops))
+                if args.persisted:
+                    with tempfile.TemporaryDirectory() as tmp:
+                        done(await bench_idempotency(cls, daemons, coroutines, keys, ops,
+                                                     path=os.path.join(tmp, "idempotency.db")))
+            for cls, daemons in classes.get('limiter', {}).items():
+                for mode in ('window', 'token_bucket'):
+                    done(await bench_limiter(cls, daemons, coroutines, keys, ops, mode=mode))
+        for cls, daemons in classes.get('limiter', {}).items() if args.persisted else ():
+            # Persisted state is rewritten on every commit: a real-sized window, not `keys`
+            with tempfile.TemporaryDirectory() as tmp:
+                done(await bench_limiter(cls, daemons, coroutines, 0, ops,
+                                         path=os.path.join(tmp, "rate_limit.json")))
+    return results
+
+
+def case_key(row: Dict) -> tuple:
+    return (row['daemon'], row['primitive'], row['case'], row['coroutines'], row['keys'])
+
+
+def format_header() -> str:
+    return (f"{'daemon':<11}{'primitive':<12}{'case':<19}{'coros':>7}{'keys':>9}{'ops/s':>11}"
+            f"{'p50 us':>9}{'p99 us':>11}{'cont%':>7}{'wait ms':>11}{'setup MB':>10}{'rss MB':>8}  viol")
+
+
+def format_row(row: Dict) -> str:
+    return (f"{row['daemon']:<11}{row['primitive']:<12}{row['case']:<19}{row['coroutines']:>7}"
+            f"{row['keys']:>9}{row['ops_per_sec']:>11,.0f}{row['p50_us']:>9,.1f}{row['p99_us']:>11,.1f}"
+            f"{row['contended_pct']:>7.1f}{row['lock_wait_ms']:>11,.0f}{row['setup_mb']:>10.1f}"
+            f"{row['peak_rss_mb']:>8.0f}  {row['violations']}")
+
+
+def load_previous(path: str) -> Optional[Dict]:
+    """Last run saved in a results file, if any."""
+    if not os.path.exists(path):
+        return None
+    previous = None
+    with open(path) as f:
+        for line in f:
+            try:
+                previous = json.loads(line)
+            except ValueError:
+                continue
+    return previous
+
+
+def compare(results: List[Dict], previous: Dict, threshold: float) -> List[str]:
+    """ops/s change per case against a previous run; regressions past `threshold`% marked."""
+    before = {case_key(row): row for row in previous.get('results', [])}
+    lines = [f"Compared with {previous.get('commit') or '?'} at "
+             f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(previous.get('time', 0)))}:"]
+    for row in results:
+        old = before.get(case_key(row))
+        if not old or not old['ops_per_sec']:
+            continue
+        change = 100 * (row['ops_per_sec'] - old['ops_per_sec']) / old['ops_per_sec']
+        mark = '  REGRESSION' if change <= -threshold or row['violations'] > old['violations'] else ''
+        lines.append(f"  {' '.join(str(v) for v in case_key(row)):<60} {old['ops_per_sec']:>12,.0f} → "
+                     f"{row['ops_per_sec']:>12,.0f} ops/s ({change:+.1f}%){mark}")
+    return lines
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def save(path: str, args, results: List[Dict]):
+    record = {
+        'time': time.time(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'args': {'coroutines': args.coroutines, 'keys': args.keys, 'ops': args.ops,
+                 'persisted': args.persisted},
+        'results': results,
+    }
+    with open(path, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def int_list(value: str) -> List[int]:
+    return [int(v.replace('_', '')) for v in value.split(',') if v]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrency benchmarks of the P2P daemon safety primitives")
+    parser.add_argument("--coroutines", type=int_list, default=[1000, 10_000, 100_000],
+                        help="Comma-separated in-flight coroutine counts")
+    parser.add_argument("--keys", type=int_list, default=[10_000, 100_000, 1_000_000],
+                        help="Comma-separated preloaded key counts (held orders, live keys, hour window)")
+    parser.add_argument("--ops", type=int, default=100_000, help="Operations per case (at least one per coroutine)")
+    parser.add_argument("--only", type=lambda v: v.split(','), default=list(PRIMITIVES),
+                        help=f"Comma-separated subset of {','.join(PRIMITIVES)}")
+    parser.add_argument("--persisted", action='store_true',
+                        help="Also run the disk-backed cases (SQLite idempotency, persisted limiter); slow")
+    parser.add_argument("--save", help="Append this run to a JSON-lines results file")
+    parser.add_argument("--compare", help="Compare with the last run in a results file")
+    parser.add_argument("--threshold", type=float, default=10, help="ops/s drop (%%) flagged as a regression")
+    args = parser.parse_args()
+    unknown = set(args.only) - set(PRIMITIVES)
+    if unknown:
+        parser.error(f"unknown primitive(s): {', '.join(sorted(unknown))}")
+
+    previous = load_previous(args.compare) if args.compare else None
+    results = asyncio.run(run(args))
+    if previous:
+        print()
+        print('\n'.join(compare(results, previous, args.threshold)))
+    if args.save:
+        save(args.save, args, results)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Soak benchmark: a daemon against the local simulator.
+
+Runs P2PDaemon (ARS / MercadoPago) or P2PDaemonEcuador (USD / Produbanco)
+with a real headless browser against p2p_simulator.py for a fixed time and
+reports throughput, order latency as the counterparty sees it, per-stage
+latency from the daemon's traces and memory of the daemon plus its browser.
+
+Run with: python bench_daemon.py [--daemon v3|ecuador] [--minutes 60] [--rate 6] [--sell-ratio 0.5]
+
+Requires a Playwright browser (`playwright install chromium`).
+"""
+
+import argparse
+import asyncio
+import copy
+import importlib
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from p2p_simulator import P2PSimulator
+from p2p_tracing import format_report, read_spans, summarize
+
+DAEMONS = {
+    # name: (module, class, base config, fiat)
+    'v3': ('p2p_daemon_v3', 'P2PDaemon', 'p2p_config.json', 'ARS'),
+    'ecuador': ('p2p_daemon_ecuador', 'P2PDaemonEcuador', 'p2p_config_ecuador.json', 'USD'),
+}
+
+UNLIMITED = 10 ** 9
+
+
+# ==============================================================================
+# CONFIG
+# ==============================================================================
+
+def bench_config(base: Dict, simulator: P2PSimulator, workdir: str, poll_interval: float) -> Dict:
+    """Base daemon config pointed at the simulator, with throwaway state and no limits."""
+    config = copy.deepcopy(base)
+    endpoints = simulator.endpoints()
+    config['endpoints'] = {'binance': endpoints['binance'], 'mercadopago': endpoints['mercadopago']}
+    config.setdefault('produbanco', {})['login_url'] = endpoints['produbanco']
+
+    config['dry_run'] = False  # The simulator is the counterparty; nothing leaves the machine
+    config['headless'] = True
+    config['notifications'] = {'sound': False, 'desktop': False}
+    config['poll_interval_seconds'] = poll_interval
+    config['metrics'] = {'enabled': True, 'host': '127.0.0.1', 'port': 0}
+    config['tracing'] = {'enabled': True, 'file': os.path.join(workdir, 'traces.jsonl')}
+    for key, name in (('browser_profile', 'profile'), ('log_file', 'daemon.log'),
+                      ('state_file', 'state.json'), ('idempotency_file', 'idempotency.db'),
+                      ('rate_limit_file', 'rate_limit.json')):
+        config[key] = os.path.join(workdir, name)
+
+    # Safety limits would cap throughput, not measure it
+    safety = config.setdefault('safety', {})
+    safety.update({
+        'max_transfers_per_minute': UNLIMITED,
+        'max_transfers_per_hour': UNLIMITED,
+        'max_daily_transfer_ars': UNLIMITED,
+        'max_daily_volume_usd': UNLIMITED,
+        'pause_on_error_count': UNLIMITED,
+    })
+    return config
+
+
+# ==============================================================================
+# MEMORY
+# ==============================================================================
+
+def _proc_rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _children(pid: int) -> List[int]:
+    """All descendants of pid (browser, renderers, GPU process...)."""
+    parents: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        parents.setdefault(ppid, []).append(int(entry))
+    found, stack = [], [pid]
+    while stack:
+        for child in parents.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def memory_mb() -> Tuple[float, float]:
+    """(this process, its child processes) resident memory in MB."""
+    pid = os.getpid()
+    if not os.path.isdir('/proc'):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 0.0
+    own = _proc_rss_kb(pid)
+    children = sum(_proc_rss_kb(child) for child in _children(pid))
+    return own / 1024, children / 1024
+
+
+async def sample_memory(samples: List[Tuple[float, float, float]], interval: float):
+    while True:
+        samples.append((time.time(), *memory_mb()))
+        await asyncio.sleep(interval)
+
+
+def growth_per_hour(samples: List[Tuple[float, float, float]], column: int) -> float:
+    """Least-squares slope of a memory column, in MB/hour."""
+    if len(samples) < 2:
+        return 0.0
+    xs = [s[0] for s in samples]
+    ys = [s[column] for s in samples]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    var = sum((x - mean_x) ** 2 for x in xs)
+    if not var:
+        return 0.0
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var
+    return slope * 3600
+
+
+# ==============================================================================
+# RUN
+# ==============================================================================
+
+async def run(args) -> Dict:
+    module_name, class_name, base_path, fiat = DAEMONS[args.daemon]
+    module = importlib.import_module(module_name)
+    with open(args.config or base_path) as f:
+        base = json.load(f)
+
+    simulator = P2PSimulator(port=args.port, rate_per_minute=args.rate, sell_ratio=args.sell_ratio,
+                             fiat=fiat, seed=args.seed)
+    await simulator.start()
+    samples: List[Tuple[float, float, float]] = []
+    with tempfile.TemporaryDirectory(prefix='p2p_bench_') as workdir:
+        config = bench_config(base, simulator, workdir, args.poll)
+        config_path = os.path.join(workdir, 'config.json')
+        with open(config_path, 'w') as f:
+            json.dump(config, f)
+
+        daemon = getattr(module, class_name)(config_path)
+        sampler = asyncio.create_task(sample_memory(samples, args.sample_seconds))
+        start = time.time()
+        try:
+            async with daemon:
+                task = asyncio.create_task(daemon.run())
+                done, _ = await asyncio.wait({task}, timeout=args.minutes * 60)
+                if task in done:
+                    task.result()  # Surface a crash instead of reporting a short run
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        finally:
+            elapsed = time.time() - start
+            sampler.cancel()
+            await simulator.stop()
+
+        stages = summarize(read_spans([config['tracing']['file']]), slowest=5) \
+            if os.path.exists(config['tracing']['file']) else {'stages': [], 'slowest': []}
+
+    sim = simulator.summary()
+    completed = sim['paid'] + sim['released']
+    warm = [s for s in samples if s[0] - start >= args.warmup_seconds] or samples
+    return {
+        'daemon': args.daemon,
+        'minutes': round(elapsed / 60, 2),
+        'rate_per_minute': args.rate,
+        'orders_per_minute': round(completed / (elapsed / 60), 2) if elapsed else 0.0,
+        'simulator': sim,
+        'memory_mb': {
+            # "start" is the first sample after warm-up (browser and pages open)
+            'daemon_start': round(warm[0][1], 1) if warm else 0.0,
+            'daemon_max': round(max(s[1] for s in samples), 1) if samples else 0.0,
+            'browser_start': round(warm[0][2], 1) if warm else 0.0,
+            'browser_max': round(max(s[2] for s in samples), 1) if samples else 0.0,
+            'daemon_growth_per_hour': round(growth_per_hour(warm, 1), 1),
+            'browser_growth_per_hour': round(growth_per_hour(warm, 2), 1),
+        },
+        'stages': stages,
+    }
+
+
+def format_result(result: Dict) -> str:
+    sim = result['simulator']
+    lines = [
+        f"{result['daemon']}: {result['minutes']} min at {result['rate_per_minute']}/min offered",
+        f"  orders: created={sim['created']} paid={sim['paid']} released={sim['released']} "
+        f"pending={sim['pending']} expired={sim['expired']}",
+        f"  throughput: {result['orders_per_minute']} orders/min",
+    ]
+    for side, row in sim['latency'].items():
+        lines.append(f"  {side:<5} latency  n={row['count']:<5} p50={row['p50']:7.2f}s  p95={row['p95']:7.2f}s"
+                     f"  p99={row['p99']:7.2f}s  max={row['max']:7.2f}s")
+    memory = result['memory_mb']
+    lines.append(f"  memory: daemon {memory['daemon_start']}→{memory['daemon_max']} MB "
+                 f"({memory['daemon_growth_per_hour']:+} MB/h), browser {memory['browser_start']}→"
+                 f"{memory['browser_max']} MB ({memory['browser_growth_per_hour']:+} MB/h)")
+    violations = {k: sim[k] for k in ('released_unpaid', 'duplicate_transfers', 'unknown_transfers',
+                                      'amount_mismatches', 'paid_without_transfer') if sim[k]}
+    lines.append(f"  safety: {violations or 'ok'}")
+    if result['stages']['stages']:
+        lines.append("")
+        lines.append(format_report(result['stages']))
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Soak benchmark of a P2P daemon against the local simulator")
+    parser.add_argument("--daemon", choices=sorted(DAEMONS), default='v3')
+    parser.add_argument("--config", help="Base config (defaults to the daemon's own)")
+    parser.add_argument("--minutes", type=float, default=60, help="Soak duration")
+    parser.add_argument("--rate", type=float, default=6, help="Offered orders per minute")
+    parser.add_argument("--sell-ratio", type=float, default=0.5, help="Share of SELL orders")
+    parser.add_argument("--poll", type=float, default=5, help="Daemon poll_interval_seconds")
+    parser.add_argument("--port", type=int, default=0, help="Simulator port (0 = any free port)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--sample-seconds", type=float, default=10, help="Memory sampling interval")
+    parser.add_argument("--warmup-seconds", type=float, default=120, help="Ignored for memory growth")
+    parser.add_argument("--json", action='store_true', help="Print the result as JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    else:
+        print(format_result(result))
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for P2P Daemon security classes.
+
+Run with: python bench_security_classes.py [--keys 100000] [--checks 2000] [--workers 200]
+"""
+
+import argparse
+import asyncio
+import heapq
+import os
+import statistics
+import tempfile
+import time
+
+from p2p_daemon_ecuador import IdempotencyStore, TransferRateLimiter
+
+
+def report(name: str, samples):
+    samples = sorted(samples)
+    n = len(samples)
+    p50 = samples[n // 2] * 1e6
+    p99 = samples[min(n - 1, int(n * 0.99))] * 1e6
+    mean = statistics.mean(samples) * 1e6
+    print(f"  {name:<40} n={n:<6} mean={mean:8.1f}us  p50={p50:8.1f}us  p99={p99:8.1f}us")
+
+
+# ==============================================================================
+# IDEMPOTENCY STORE
+# ==============================================================================
+
+def preload(store: IdempotencyStore, keys: int):
+    """Fill the store with live keys without going through check_and_set."""
+    now = time.time()
+    rows = [(f"live_{i}", now - (i % 3600)) for i in range(keys)]
+    for key, ts in rows:
+        store._keys[key] = ts
+        store._expiry.append((ts, key))
+    heapq.heapify(store._expiry)
+    if store._db:
+        store._db.execute("BEGIN")
+        store._db.executemany("INSERT OR REPLACE INTO idempotency_keys (key, ts) VALUES (?, ?)", rows)
+        store._db.execute("COMMIT")
+
+
+async def bench_check(store: IdempotencyStore, checks: int):
+    new, dup = [], []
+    for i in range(checks):
+        start = time.perf_counter()
+        await store.check_and_set(f"new_{i}")
+        new.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await store.check_and_set(f"live_{i}")
+        dup.append(time.perf_counter() - start)
+    return new, dup
+
+
+async def bench_idempotency(keys: int, checks: int):
+    print(f"IdempotencyStore: check_and_set with {keys} live keys")
+
+    store = IdempotencyStore(ttl_hours=24)
+    preload(store, keys)
+    new, dup = await bench_check(store, checks)
+    report("memory, new key", new)
+    report("memory, duplicate key", dup)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "idempotency.db")
+        store = IdempotencyStore(ttl_hours=24, path=path)
+        preload(store, keys)
+        store.close()
+
+        start = time.perf_counter()
+        store = IdempotencyStore(ttl_hours=24, path=path)
+        print(f"  restore {len(store)} keys from SQLite: {(time.perf_counter() - start) * 1e3:.0f}ms")
+
+        new, dup = await bench_check(store, checks)
+        report("sqlite, new key (durable write)", new)
+        report("sqlite, duplicate key", dup)
+        store.close()
+
+
+# ==============================================================================
+# TRANSFER RATE LIMITER
+# ==============================================================================
+
+async def bench_limiter(limiter: TransferRateLimiter, workers: int, ops: int):
+    """`workers` coroutines each doing reserve + commit/cancel `ops` times."""
+    samples = []
+    allowed = 0
+
+    async def worker(worker_id: int):
+        nonlocal allowed
+        for i in range(ops):
+            start = time.perf_counter()
+            ok, _ = await limiter.reserve(1.0)
+            if ok:
+                allowed += 1
+                if i % 2:
+                    await limiter.commit(1.0)
+                else:
+                    await limiter.cancel(1.0)
+            samples.append(time.perf_counter() - start)
+            await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(i) for i in range(workers)])
+    elapsed = time.perf_counter() - start
+    return samples, allowed, elapsed
+
+
+async def bench_rate_limiter(workers: int, checks: int):
+    ops = max(1, checks // 100)
+    print(f"TransferRateLimiter: {workers} concurrent workers x {ops} reserve/commit")
+
+    for mode in ('window', 'token_bucket'):
+        limiter = TransferRateLimiter(max_per_minute=10**9, max_per_hour=10**9,
+                                      max_daily_amount=float('inf'), mode=mode, burst=10**9)
+        now = time.time()
+        limiter._hour_window = [now - i * 0.1 for i in range(30000)]  # Busy hour
+        samples, allowed, elapsed = await bench_limiter(limiter, workers, ops)
+        report(f"{mode}, memory", samples)
+        print(f"  {'':<40} {len(samples) / elapsed:,.0f} ops/s, {allowed} allowed")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        limiter = TransferRateLimiter(max_per_minute=10**9, max_per_hour=10**9,
+                                      max_daily_amount=float('inf'),
+                                      path=os.path.join(tmp, "rate_limit.json"))
+        samples, allowed, elapsed = await bench_limiter(limiter, workers, ops)
+        report("window, persisted", samples)
+        print(f"  {'':<40} {len(samples) / elapsed:,.0f} ops/s, {allowed} allowed")
+
+    # Correctness under contention: limits must never be overshot
+    limiter = TransferRateLimiter(max_per_minute=5, max_per_hour=100, max_daily_amount=1000.0)
+    results = await asyncio.gather(*[limiter.reserve(1.0) for _ in range(workers)])
+    granted = sum(1 for ok, _ in results if ok)
+    print(f"  {workers} simultaneous reserves with 5/min limit: {granted} granted")
+
+
+async def main(args):
+    await bench_idempotency(args.keys, args.checks)
+    print()
+    await bench_rate_limiter(args.workers, args.checks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark P2P daemon security classes")
+    parser.add_argument("--keys", type=int, default=100_000, help="Live keys preloaded in the store")
+    parser.add_argument("--checks", type=int, default=2000, help="check_and_set calls per case")
+    parser.add_argument("--workers", type=int, default=200, help="Concurrent rate limiter clients")
+    asyncio.run(main(parser.parse_args()))
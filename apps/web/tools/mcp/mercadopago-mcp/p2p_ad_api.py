@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Binance Ad API (HTTP fast path)
+===============================
+
+Updates ad prices by posting to Binance's private P2P endpoints directly,
+using the login of the persistent Playwright context instead of driving the
+ad editor in a page.
+
+- Cookies are exported from the browser context and replayed as request
+  headers on the shared aiohttp session, together with the headers the web
+  app derives from them (`csrftoken` = md5 of the `cr00` cookie, `bnc-uuid`)
+- On an auth failure (401/403 or an unsuccessful body) the cookies are
+  re-exported once and the request is retried
+- After `max_failures` consecutive failures the fast path backs off for
+  `cooldown` seconds, so callers go straight to their UI fallback
+- The Binance `advNo` of an ad is taken from config (`adv_no`) or resolved
+  once from the list of our own ads
+
+Usage:
+    api = BinanceAdAPI(http_session, browser_context, log=self.log)
+    if not await api.update_price('sell', 'USDT', 'ARS', 1250.5):
+        ...  # fall back to the UI flow
+"""
+
+import asyncio
+import hashlib
+import time
+from typing import Optional, Dict, List, Callable
+
+import aiohttp
+
+BINANCE_P2P_URL = 'https://p2p.binance.com'
+ADV_LIST_PATH = '/bapi/c2c/v2/private/c2c/adv/list-by-page'
+ADV_UPDATE_PATH = '/bapi/c2c/v3/private/c2c/adv/update'
+
+
+class AdAPIError(Exception):
+    """A private endpoint call failed."""
+
+    def __init__(self, message: str, auth: bool = False):
+        super().__init__(message)
+        self.auth = auth  # True if re-exporting cookies may help
+
+
+class BinanceAdAPI:
+    """Price updates over HTTP with the browser's authenticated session."""
+
+    def __init__(self, session: aiohttp.ClientSession, context=None,
+                 base_url: str = BINANCE_P2P_URL, list_path: str = ADV_LIST_PATH,
+                 update_path: str = ADV_UPDATE_PATH, max_failures: int = 3,
+                 cooldown: float = 600, log: Callable = None):
+        self.session = session
+        self.context = context
+        self.base_url = base_url.rstrip('/')
+        self.list_path = list_path
+        self.update_path = update_path
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self._log = log
+        self._headers: Optional[Dict[str, str]] = None
+        self._adv_nos: Dict[tuple, str] = {}
+        self._failures = 0
+        self._disabled_until = 0.0
+        self.stats = {'updates': 0, 'failures': 0, 'syncs': 0}
+
+    def log(self, msg: str, level: str = "DEBUG"):
+        if self._log:
+            self._log(msg, level)
+
+    @property
+    def available(self) -> bool:
+        return time.time() >= self._disabled_until
+
+    # --------------------------------------------------------------------------
+    # Session export
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def headers_from_cookies(cookies: List[Dict]) -> Optional[Dict[str, str]]:
+        """Build request headers from Playwright cookies. None if not logged in."""
+        jar = {c['name']: c['value'] for c in cookies}
+        if 'p20t' not in jar:  # Binance session cookie
+            return None
+        headers = {
+            'Cookie': '; '.join(f"{name}={value}" for name, value in jar.items()),
+            'clienttype': 'web',
+            'lang': 'en',
+        }
+        if 'cr00' in jar:
+            headers['csrftoken'] = hashlib.md5(jar['cr00'].encode()).hexdigest()
+        if 'bnc-uuid' in jar:
+            headers['bnc-uuid'] = jar['bnc-uuid']
+        return headers
+
+    async def sync_from_context(self) -> bool:
+        """Export cookies from the browser context. False if there is no session."""
+        if self.context is None:
+            return False
+        try:
+            cookies = await self.context.cookies(self.base_url)
+        except Exception as e:
+            self.log(f"Ad API: cookie export failed: {e}", "WARN")
+            return False
+        self._headers = self.headers_from_cookies(cookies)
+        self.stats['syncs'] += 1
+        return self._headers is not None
+
+    # --------------------------------------------------------------------------
+    # Requests
+    # --------------------------------------------------------------------------
+
+    async def _post_once(self, path: str, payload: Dict) -> Dict:
+        async with self.session.post(self.base_url + path, json=payload,
+                                     headers=self._headers) as response:
+            if response.status in (401, 403):
+                raise AdAPIError(f"HTTP {response.status}", auth=True)
+            if response.status != 200:
+                raise AdAPIError(f"HTTP {response.status}")
+            data = await response.json(content_type=None)
+        if not isinstance(data, dict) or not data.get('success'):
+            code = data.get('code') if isinstance(data, dict) else None
+            message = data.get('message') if isinstance(data, dict) else data
+            # Expired sessions come back as 200 with an error code
+            raise AdAPIError(f"code={code} message={message}", auth=True)
+        return data
+
+    async def _post(self, path: str, payload: Dict) -> Dict:
+        """POST with the exported session; re-export cookies once on auth errors."""
+        if self._headers is None and not await self.sync_from_context():
+            raise AdAPIError("no Binance session in browser context")
+        try:
+            return await self._post_once(path, payload)
+        except AdAPIError as e:
+            if not e.auth or not await self.sync_from_context():
+                raise
+            self.log(f"Ad API: {e}, retrying with fresh cookies", "DEBUG")
+            return await self._post_once(path, payload)
+
+    async def resolve_adv_no(self, ad_type: str, asset: str, fiat: str) -> Optional[str]:
+        """Find the advNo of our ad for this side/asset/fiat."""
+        key = (ad_type.upper(), asset, fiat)
+        if key in self._adv_nos:
+            return self._adv_nos[key]
+        data = await self._post(self.list_path, {'page': 1, 'rows': 20})
+        for adv in data.get('data') or []:
+            found = (str(adv.get('tradeType', '')).upper(), adv.get('asset'), adv.get('fiatUnit'))
+            if adv.get('advNo'):
+                self._adv_nos.setdefault(found, str(adv['advNo']))
+        return self._adv_nos.get(key)
+
+    async def update_price(self, ad_type: str, asset: str, fiat: str, price: float,
+                           adv_no: str = None, decimals: int = 2) -> bool:
+        """Set the price of one ad. False on any failure (caller falls back to UI)."""
+        if not self.available:
+            return False
+        start = time.perf_counter()
+        try:
+            adv_no = adv_no or await self.resolve_adv_no(ad_type, asset, fiat)
+            if not adv_no:
+                raise AdAPIError(f"no {ad_type.upper()} {asset}/{fiat} ad found")
+            await self._post(self.update_path, {'advNo': adv_no, 'price': f"{price:.{decimals}f}"})
+        except (AdAPIError, aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            self.stats['failures'] += 1
+            self._failures += 1
+            self.log(f"Ad API: price update failed: {e}", "WARN")
+            if self._failures >= self.max_failures:
+                self._disabled_until = time.time() + self.cooldown
+                self._failures = 0
+                self.log(f"Ad API: {self.max_failures} failures in a row, "
+                         f"using UI for {self.cooldown:.0f}s", "WARN")
+            return False
+
+        self._failures = 0
+        self.stats['updates'] += 1
+        self.log(f"Ad API: {adv_no} price → {price:.{decimals}f} "
+                 f"in {(time.perf_counter() - start) * 1000:.0f}ms", "DEBUG")
+        return True
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+MercadoPago Bank Adapter
+========================
+
+Pays BUY orders and verifies SELL payments through MercadoPago (Argentina)
+for P2PEngine:
+
+- Transfers by CBU/CVU/alias on the web UI (React amount field set in one
+  call and read back before continuing, QR confirmation waited for)
+- Incoming payments from the activities XHR (MPActivityFeed); the activity
+  rows are scraped only when the feed is unavailable
+
+Usage:
+    class P2PDaemon(P2PEngine):
+        def create_bank(self):
+            return MercadoPagoBank(self)
+"""
+
+import re
+import time
+from typing import Dict, List, Optional
+
+from playwright.async_api import Page
+
+from p2p_core import BankAdapter
+from p2p_js_actions import MP_PAYMENT_DETAILS
+from p2p_metrics import Stopwatch
+from p2p_mp_activity import MPActivityFeed, activities_api_pattern
+from p2p_payment_matcher import IncomingPayment
+
+MP_URL = 'https://www.mercadopago.com.ar'
+
+
+def parse_amount_field(text: str) -> Optional[int]:
+    """Whole pesos shown by the amount input ('$ 150.000', '150000', '150.000,00')."""
+    text = re.sub(r'[.,]\d{1,2}$', '', (text or '').strip())  # Drop cents
+    digits = re.sub(r'\D', '', text)
+    return int(digits) if digits else None
+
+
+class MercadoPagoBank(BankAdapter):
+    """MercadoPago transfers (UI) and incoming payments (activity feed + DOM fallback)."""
+
+    name = 'mercadopago'
+    title = 'Mercadopago'
+    site = 'mp'
+    country = 'AR'
+    payment_details = MP_PAYMENT_DETAILS
+    verify_config_key = 'verify_mp_payment'
+
+    def __init__(self, engine):
+        super().__init__(engine)
+        self.url = MP_URL
+        self.activity_feed: Optional[MPActivityFeed] = None
+
+    def configure(self, config: Dict) -> Dict[str, str]:
+        self.url = config.get('endpoints', {}).get('mercadopago', MP_URL).rstrip('/')
+        return {'mp': self.url} if self.url != MP_URL else {}
+
+    @property
+    def home_url(self) -> str:
+        return f"{self.url}/home"
+
+    async def start_browser(self):
+        # Payment verification from the activities XHR instead of scraping rows
+        activity_config = self.engine.config.get('activity_feed', {})
+        if activity_config.get('enabled', True):
+            self.activity_feed = MPActivityFeed(
+                self.engine.browser,
+                lease_page=lambda timeout=None: self.engine._lease_page(self.site, timeout),
+                log=self.log,
+                url_pattern=activities_api_pattern(self.url),
+                activities_url=f"{self.url}/activities",
+                bootstrap_timeout=activity_config.get('bootstrap_timeout_seconds', 20),
+                max_pages=activity_config.get('max_pages', 5),
+                max_entries=activity_config.get('max_entries', 2000),
+                lease_timeout=activity_config.get('lease_timeout_seconds', 5)
+            )
+            await self.activity_feed.attach()
+
+    def components(self) -> Dict:
+        return {'activity_feed': self.activity_feed}
+
+    # ==========================================================================
+    # TRANSFERS
+    # ==========================================================================
+
+    def destination(self, details: Dict) -> Optional[str]:
+        return details.get('alias') or details.get('cvu')
+
+    def transfer_amount(self, amount: float) -> int:
+        return int(amount)
+
+    async def set_amount_react(self, page: Page, amount: int) -> bool:
+        """
+        Set amount in one call through React's internal onChange handler.
+
+        True only if the input then shows `amount` (read back from the DOM).
+        """
+        if not await self.engine.js.call(page, 'setReactValue', '#amount-field-input', str(amount)):
+            self.log("  Amount input or its React handler not found", "ERROR")
+            return False
+        try:
+            shown = await page.input_value('#amount-field-input')
+        except Exception as e:
+            self.log(f"  Could not read back the amount: {e}", "ERROR")
+            return False
+        if parse_amount_field(shown) != amount:
+            self.log(f"  Amount field shows {shown!r}, expected {amount}", "ERROR")
+            return False
+        return True
+
+    async def transfer(self, page: Page, destination: str, amount: float, details: Dict,
+                       watch: Stopwatch) -> bool:
+        """Transfer on the MercadoPago UI, waiting for the QR confirmation if asked."""
+        engine = self.engine
+        await page.goto(self.home_url)
+        await engine.wait_for_page_ready(page, 'text=Transferir')
+
+        await page.click('text=Transferir')
+        await engine.wait_for_page_ready(page, 'text=Con CBU, CVU o alias')
+
+        await page.click('text=Con CBU, CVU o alias')
+        await engine.wait_for_page_ready(page, 'input')
+        watch.lap('navigate')
+
+        await page.fill('input', destination)
+        await page.click('text=Continuar')
+
+        try:
+            await page.wait_for_selector('text=Confirmar cuenta', timeout=10000)
+            await page.click('text=Confirmar cuenta')
+        except Exception:
+            self.log("  Account not found", "ERROR")
+            return False
+        watch.lap('destination')
+
+        await page.wait_for_selector('#amount-field-input', timeout=10000)
+        if not await self.set_amount_react(page, amount):
+            # Nothing submitted yet: the engine rolls back the idempotency key
+            return False
+
+        await page.click('text=Continuar')
+        await page.wait_for_selector('text=Revisá si está todo bien', timeout=10000)
+        watch.lap('amount')
+
+        transfer_btn = await page.query_selector('button:has-text("Transferir")')
+        if transfer_btn:
+            await transfer_btn.click()
+
+        await engine.wait_for_navigation(page)
+        watch.lap('submit')
+
+        # Check for QR
+        qr_visible = await page.query_selector('text=Escaneá el QR')
+        if qr_visible:
+            self.log("  QR REQUIRED - Scan with app!", "WARN")
+            engine.alert("QR required for transfer")
+            try:
+                await page.wait_for_selector('text=Le transferiste', timeout=120000)
+            except Exception:
+                self.log("  QR timeout", "ERROR")
+                return False
+            watch.lap('qr')
+            return True
+
+        success = await page.query_selector('text=Le transferiste')
+        watch.lap('confirm')
+        return bool(success)
+
+    # ==========================================================================
+    # INCOMING PAYMENTS
+    # ==========================================================================
+
+    async def incoming_payments(self) -> Optional[List[IncomingPayment]]:
+        """Incoming movements from one refresh of the activity feed."""
+        if not self.activity_feed or await self.activity_feed.refresh() is None:
+            return None
+        return [IncomingPayment(m.id, m.amount, m.counterparty, m.ts)
+                for m in self.activity_feed.incoming()]
+
+    async def verify_payment(self, order: Dict, window_minutes: float,
+                             tolerance_percent: float) -> Optional[IncomingPayment]:
+        """Check if we received a payment in MercadoPago."""
+        expected_amount = int(order['amount_fiat'])
+        self.log(f"  Checking for ${expected_amount:,} ARS payment in MP...", "MP")
+        min_amount = expected_amount * (1 - tolerance_percent / 100)
+        max_amount = expected_amount * (1 + tolerance_percent / 100)
+
+        # Local lookup; concurrent checks share one refresh of the feed
+        if self.activity_feed:
+            max_age = self.engine.config.get('activity_feed', {}).get('max_age_seconds', 5)
+            if await self.activity_feed.refresh(max_age=max_age) is not None:
+                movement = self.activity_feed.find_incoming(
+                    min_amount, max_amount, since=time.time() - window_minutes * 60,
+                    exclude=self.engine.state.get('consumed_payments') or set()
+                )
+                if movement:
+                    self.log(f"  Payment found: ${movement.amount:,.2f} from {movement.counterparty}")
+                    return IncomingPayment(movement.id, movement.amount, movement.counterparty, movement.ts)
+                self.log(f"  Payment of ${expected_amount:,} ARS not found", "WARN")
+                return None
+            self.log("Activity feed unavailable, falling back to DOM scraping", "DEBUG")
+
+        async with self.engine._lease_page(self.site) as page:
+            return await self._scrape_payment(page, expected_amount, min_amount, max_amount)
+
+    async def _scrape_payment(self, page: Page, expected_amount: int,
+                              min_amount: float, max_amount: float) -> Optional[IncomingPayment]:
+        """Scrape the first activity rows for a matching payment (fallback path)."""
+        try:
+            await page.goto(f"{self.url}/activities")
+            await self.engine.wait_for_page_ready(page, '[data-testid="activity-row"], .activity-row')
+
+            activities = await self.engine.js.call(page, 'mpActivities', 20)
+
+            for activity in activities:
+                if activity['is_incoming'] and min_amount <= activity['amount'] <= max_amount:
+                    self.log(f"  Payment found: ${activity['amount']:,.2f} from {activity['from_name']}")
+                    # Rows carry no movement ID: the payment cannot be consumed
+                    return IncomingPayment('', activity['amount'], activity['from_name'])
+
+            self.log(f"  Payment of ${expected_amount:,} ARS not found", "WARN")
+            return None
+
+        except Exception as e:
+            self.log(f"  Error checking MP payment: {e}", "ERROR")
+            return None
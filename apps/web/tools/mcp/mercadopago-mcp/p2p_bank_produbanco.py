@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Produbanco Bank Adapter
+=======================
+
+Pays BUY orders and verifies SELL deposits through Produbanco Produnet
+(Ecuador) for P2PEngine:
+
+- Transfers to a new contact by account number inside the Produnet iframe,
+  waiting for manual login and token entry when asked
+- Deposits read from the movements table in one pass; rows have no ID, so
+  each deposit is keyed by its row text and rank among identical rows
+
+Usage:
+    class P2PDaemonEcuador(P2PEngine):
+        def create_bank(self):
+            return ProdubancoBank(self)
+"""
+
+import asyncio
+import hashlib
+import re
+from typing import Dict, List, Optional
+
+from playwright.async_api import Frame, Page
+
+from p2p_core import BankAdapter
+from p2p_js_actions import BANK_PAYMENT_DETAILS
+from p2p_metrics import Stopwatch
+from p2p_payment_matcher import IncomingPayment
+
+PRODUBANCO_URL = 'https://www.produbanco.com/produnet/?qsCanal=IN&qsBanca=E'
+
+
+class ProdubancoBank(BankAdapter):
+    """Produbanco transfers and deposits through the Produnet iframe."""
+
+    name = 'produbanco'
+    title = 'Produbanco'
+    site = 'produbanco'
+    country = 'EC'
+    payment_details = BANK_PAYMENT_DETAILS
+    verify_config_key = 'verify_produbanco_deposit'
+
+    def __init__(self, engine):
+        super().__init__(engine)
+        self.url = PRODUBANCO_URL
+        self.bank_code = "36"
+
+    def configure(self, config: Dict) -> Dict[str, str]:
+        produbanco = config.get('produbanco', {})
+        self.url = produbanco.get('login_url', PRODUBANCO_URL)
+        self.bank_code = str(produbanco.get('bank_code', "36"))
+        return {'produbanco': self.url} if self.url != PRODUBANCO_URL else {}
+
+    @property
+    def home_url(self) -> str:
+        return self.url
+
+    async def get_iframe(self, page: Page) -> Optional[Frame]:
+        """Get the main iframe in Produbanco where all content is."""
+        try:
+            iframe = page.frame(name="iframe_a") or page.frame(url=re.compile(r"Produnet"))
+            if not iframe:
+                for f in page.frames:
+                    if 'Produnet' in f.url or 'iframe_a' in f.name:
+                        return f
+            return iframe
+        except Exception:
+            return None
+
+    # ==========================================================================
+    # TRANSFERS
+    # ==========================================================================
+
+    def destination(self, details: Dict) -> Optional[str]:
+        return details.get('account_number') or None
+
+    async def transfer(self, page: Page, destination: str, amount: float, details: Dict,
+                       watch: Stopwatch) -> bool:
+        """Transfer to a new contact in Produnet, waiting for login and token if asked."""
+        engine = self.engine
+        await page.goto(self.url)
+        await engine.wait_for_page_ready(page)
+
+        # Check if logged in (look for dashboard elements)
+        if self.needs_login(page.url):
+            self.log("  PRODUBANCO: Login required", "WARN")
+            engine.alert("Produbanco login required")
+            # Wait for manual login
+            for _ in range(60):
+                await asyncio.sleep(5)
+                if not self.needs_login(page.url):
+                    break
+            else:
+                self.log("  Login timeout", "ERROR")
+                return False
+
+        watch.lap('login')
+
+        # Navigate to transfers
+        await page.click('a:has-text("Transferencias")')
+        await asyncio.sleep(2)
+
+        iframe = await self.get_iframe(page)
+        if not iframe:
+            self.log("  Could not find Produbanco iframe", "ERROR")
+            return False
+
+        # Click "A un nuevo contacto"
+        await iframe.click('.wp-opcion-transferencia >> nth=0')
+        await asyncio.sleep(2)
+        watch.lap('navigate')
+
+        # Fill bank selection and account number, then verify
+        await iframe.select_option('#cbxBanco', self.bank_code)
+        await asyncio.sleep(1)
+        await iframe.fill('input[name="numeroCuenta"]', destination)
+        await asyncio.sleep(0.5)
+        await iframe.click('button:has-text("Verificar")')
+        await asyncio.sleep(3)
+        watch.lap('destination')
+
+        # Fill amount (after verification)
+        amount_input = await iframe.query_selector('input[name="monto"], #monto, input[type="number"]')
+        if not amount_input:
+            self.log("  Amount field not found", "ERROR")
+            return False
+        await amount_input.fill(str(amount))
+        watch.lap('amount')
+
+        await iframe.click('button:has-text("Continuar"), button:has-text("Confirmar")')
+        await asyncio.sleep(2)
+        watch.lap('submit')
+
+        # Check for 2FA
+        token_input = await iframe.query_selector('input[name="token"], input[placeholder*="token"]')
+        if token_input:
+            self.log("  2FA TOKEN REQUIRED - Enter manually", "WARN")
+            engine.alert("2FA Token required for transfer")
+            # Wait for manual token entry
+            for _ in range(60):
+                await asyncio.sleep(5)
+                success = await iframe.query_selector(':text("exitosa"), :text("comprobante"), :text("Transferencia realizada")')
+                if success:
+                    break
+            else:
+                self.log("  2FA timeout", "ERROR")
+                return False
+            watch.lap('2fa')
+
+        success = await iframe.query_selector(':text("exitosa"), :text("comprobante"), :text("Transferencia realizada")')
+        watch.lap('confirm')
+        return bool(success)
+
+    # ==========================================================================
+    # DEPOSITS
+    # ==========================================================================
+
+    async def incoming_payments(self) -> Optional[List[IncomingPayment]]:
+        """Deposits from one read of the movements table."""
+        self.log("  Checking Produbanco deposits...", "PRODUBANCO")
+        async with self.engine._lease_page(self.site) as page:
+            return await self.fetch_deposits(page)
+
+    async def fetch_deposits(self, page: Page) -> Optional[List[IncomingPayment]]:
+        """Read recent movements from Produbanco. None if they could not be read."""
+        try:
+            await page.goto(self.url)
+            await self.engine.wait_for_page_ready(page)
+
+            iframe = await self.get_iframe(page)
+            if not iframe:
+                self.log("  Error checking deposit: no iframe", "ERROR")
+                return None
+
+            # Navigate to movements
+            await iframe.click('a:has-text("Movimientos"), a:has-text("Consultas")')
+            await asyncio.sleep(2)
+
+            movements = await self.engine.js.call(iframe, 'bankMovements', 20)
+        except Exception as e:
+            self.log(f"  Error checking deposit: {e}", "ERROR")
+            return None
+        return self.parse_deposits(movements)
+
+    def parse_deposits(self, movements: List[Dict]) -> List[IncomingPayment]:
+        """Positive movements as payments keyed by row text (plus rank among identical rows)."""
+        deposits = []
+        seen: Dict[str, int] = {}
+        for mov in movements:
+            try:
+                amount = float(mov.get('amount', 0))
+            except (ValueError, TypeError) as e:
+                # C1 FIX: Log parsing errors instead of silently ignoring
+                self.engine.logger.log_structured("WARN", "Movement parsing failed",
+                                                  error=str(e), movement_text=str(mov.get('text', ''))[:100])
+                continue
+            if amount <= 0:
+                continue
+            text = ' '.join(str(mov.get('text', '')).split())
+            digest = hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+            seen[digest] = seen.get(digest, 0) + 1
+            deposits.append(IncomingPayment(f"pb:{digest}:{seen[digest]}", amount, sender=text[:100]))
+        return deposits
@@ -0,0 +1,1597 @@
+#!/usr/bin/env python3
+"""
+P2P Core
+========
+
+Engine shared by every P2P daemon. A market is an exchange adapter (where
+orders and ads live) plus a bank adapter (where fiat is paid and received);
+the engine owns everything in between, so a fix to the order flow, the
+safety checks or the repricing loop lands once for every market:
+
+- Safety: destination validation, per-order limit, rate limiter
+  reservation, idempotency key with rollback, dry-run
+- Orders: detection (feed or DOM), BUY = pay + mark paid, SELL = match the
+  incoming payment + release, each attempt traced, through a worker pool
+  with pages leased per site
+- Pricing: order books through the price cache (every fetched book kept
+  in the price history), debounced repricing
+- Components: logger, journaled state, metrics endpoint, tracer, page pool
+  with health checks and per-site request blocking, JS action library
+
+Adapters:
+    ExchangeAdapter  fetch_orders(), payment_details(), mark_paid(),
+                     release(), fetch_book(), reprice(), ensure_ads()
+    BankAdapter      destination(), transfer(), incoming_payments(),
+                     verify_payment()
+
+A market is a subclass that picks its adapters and defaults:
+
+    class P2PDaemon(P2PEngine):
+        TITLE = "P2P AUTOMATION DAEMON v3 (Optimized)"
+        FIAT = 'ARS'
+        PAGES_PER_SITE = {'binance': 2, 'mp': 2}
+
+        def create_exchange(self):
+            return BinanceExchange(self)
+
+        def create_bank(self):
+            return MercadoPagoBank(self)
+
+    async with P2PDaemon(config_path) as daemon:
+        await daemon.run()
+
+Several markets can run in one process on a SharedStack (one browser
+context, HTTP session and price cache); see p2p_supervisor.py.
+"""
+
+import asyncio
+import json
+import re
+import subprocess
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+from playwright.async_api import async_playwright, BrowserContext, Page, Playwright
+
+from p2p_idempotency import IdempotencyStore
+from p2p_js_actions import JSActions, Patterns
+from p2p_logger import AsyncLogger
+from p2p_metrics import DaemonMetrics, MetricsServer, Stopwatch, count_retry
+from p2p_order_book import BookSpec, OrderBook
+from p2p_order_registry import OrderRegistry
+from p2p_page_pool import PagePool
+from p2p_payment_matcher import IncomingPayment, PaymentMatcher
+from p2p_price_cache import PriceCache
+from p2p_price_history import PriceHistory
+from p2p_pricing import OUTLIER_Z, STRATEGIES, BookArrays, PricingEngine, PricingParams
+from p2p_rate_limiter import TransferRateLimiter
+from p2p_route_policy import RoutePolicy
+from p2p_scheduler import AdaptiveInterval, HourOfWeekPriors, ORDERS_DETECTED, log_files
+from p2p_state import StateManager
+from p2p_tracing import Tracer, annotate, note_retry, set_outcome
+from p2p_worker_pool import OrderWorkerPool
+
+# ==============================================================================
+# RETRY UTILITIES
+# ==============================================================================
+
+async def retry_with_backoff(
+    operation,
+    max_attempts: int = 5,
+    base_delay: float = 0.2,
+    max_delay: float = 10.0,
+    exceptions: tuple = (Exception,),
+    on_retry=None
+):
+    """
+    Execute operation with exponential backoff retry.
+
+    Args:
+        operation: Async callable to execute
+        max_attempts: Maximum retry attempts (default 5)
+        base_delay: Initial delay in seconds (default 0.2)
+        max_delay: Maximum delay cap (default 10s)
+        exceptions: Tuple of exceptions to catch and retry
+        on_retry: Optional callback(attempt, error, delay) called before each retry
+
+    Returns:
+        Result of successful operation
+
+    Raises:
+        Last exception if all attempts fail
+    """
+    last_error = None
+    for attempt in range(1, max_attempts + 1):
+        try:
+            return await operation()
+        except exceptions as e:
+            last_error = e
+            if attempt == max_attempts:
+                raise
+            delay = min(base_delay * (2 ** (attempt - 1)), max_delay)
+            count_retry(e)
+            note_retry()
+            if on_retry:
+                on_retry(attempt, e, delay)
+            await asyncio.sleep(delay)
+    raise last_error
+
+
+# ==============================================================================
+# VALIDATION UTILITIES
+# ==============================================================================
+
+def validate_cvu(cvu: str) -> bool:
+    """Validate Argentine CVU format (22 digits)."""
+    if not cvu:
+        return False
+    cvu_clean = cvu.replace(" ", "").replace("-", "")
+    return cvu_clean.isdigit() and len(cvu_clean) == 22
+
+
+def validate_cbu(cbu: str) -> bool:
+    """Validate Argentine CBU format with full checksum verification."""
+    if not cbu:
+        return False
+    cbu_clean = cbu.replace(" ", "").replace("-", "")
+    if not cbu_clean.isdigit() or len(cbu_clean) != 22:
+        return False
+
+    # Verify first block checksum (positions 1-7, verifier at 8)
+    weights1 = [7, 1, 3, 9, 7, 1, 3]
+    sum1 = sum(int(cbu_clean[i]) * weights1[i] for i in range(7))
+    check1 = (10 - (sum1 % 10)) % 10
+    if int(cbu_clean[7]) != check1:
+        return False
+
+    # Verify second block checksum (positions 9-21, verifier at 22)
+    weights2 = [3, 9, 7, 1, 3, 9, 7, 1, 3, 9, 7, 1, 3]
+    sum2 = sum(int(cbu_clean[8 + i]) * weights2[i] for i in range(13))
+    check2 = (10 - (sum2 % 10)) % 10
+    if int(cbu_clean[21]) != check2:
+        return False
+
+    return True
+
+
+def validate_alias(alias: str) -> bool:
+    """Validate MercadoPago alias format."""
+    if not alias:
+        return False
+    # Alias: letters, numbers, dots, hyphens, 6-20 chars
+    pattern = r'^[a-zA-Z0-9.\-]{6,20}$'
+    return bool(re.match(pattern, alias))
+
+
+def validate_ecuador_account(account: str) -> bool:
+    """Validate Ecuador bank account number (Produbanco format)."""
+    if not account:
+        return False
+    account_clean = account.replace(" ", "").replace("-", "")
+    # Produbanco accounts: typically 10-11 digits
+    return account_clean.isdigit() and 9 <= len(account_clean) <= 15
+
+
+def validate_transfer_destination(destination: str, country: str = 'AR') -> tuple:
+    """
+    Validate transfer destination and return (is_valid, dest_type, cleaned_value).
+
+    Returns:
+        (bool, str, str): (is_valid, type, cleaned_value)
+        type can be: 'cvu', 'cbu', 'alias', 'account', 'unknown'
+    """
+    if not destination:
+        return (False, 'unknown', '')
+
+    dest_clean = destination.strip()
+
+    if country == 'AR':
+        if validate_cvu(dest_clean):
+            return (True, 'cvu', dest_clean.replace(" ", "").replace("-", ""))
+        if validate_cbu(dest_clean):
+            return (True, 'cbu', dest_clean.replace(" ", "").replace("-", ""))
+        if validate_alias(dest_clean):
+            return (True, 'alias', dest_clean)
+    elif country == 'EC':
+        if validate_ecuador_account(dest_clean):
+            return (True, 'account', dest_clean.replace(" ", "").replace("-", ""))
+
+    return (False, 'unknown', dest_clean)
+
+
+# ==============================================================================
+# JS INJECTION SANITIZATION (SECURITY FIX)
+# ==============================================================================
+
+def sanitize_ad_type(ad_type: str) -> str:
+    """Sanitize ad_type to prevent JS injection. Only allows 'buy' or 'sell'."""
+    ad_type_lower = str(ad_type).lower().strip()
+    if ad_type_lower in ('buy', 'sell'):
+        return ad_type_lower
+    raise ValueError(f"Invalid ad_type: {ad_type}. Must be 'buy' or 'sell'")
+
+
+def sanitize_asset_fiat(value: str) -> str:
+    """Sanitize asset/fiat codes. Only allows alphanumeric, max 10 chars."""
+    if not value:
+        raise ValueError("Empty asset/fiat value")
+    clean = str(value).strip().upper()
+    if not clean.isalnum() or len(clean) > 10:
+        raise ValueError(f"Invalid asset/fiat: {value}. Must be alphanumeric, max 10 chars")
+    return clean
+
+
+def sanitize_js_string(value: str, max_length: int = 50) -> str:
+    """Sanitize a string for safe JS interpolation. Escapes quotes and special chars."""
+    if not value:
+        return ''
+    clean = str(value)[:max_length]
+    # Escape single quotes, backslashes, and newlines
+    clean = clean.replace('\\', '\\\\').replace("'", "\\'").replace('\n', '\\n').replace('\r', '\\r')
+    return clean
+
+
+# ==============================================================================
+# SAFETY CLASSES (CRITICAL - prevent duplicate/runaway transfers)
+# ==============================================================================
+
+class OrderProcessingLock:
+    """Prevent concurrent processing of the same order."""
+
+    def __init__(self):
+        self._processing: set = set()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, order_id: str) -> bool:
+        """Try to acquire lock for order. Returns False if already processing."""
+        async with self._lock:
+            if order_id in self._processing:
+                return False
+            self._processing.add(order_id)
+            return True
+
+    async def release(self, order_id: str):
+        """Release lock for order."""
+        async with self._lock:
+            self._processing.discard(order_id)
+
+
+# ==============================================================================
+# ADAPTERS
+# ==============================================================================
+
+class ExchangeAdapter:
+    """
+    Where orders and ads live (Binance P2P). Browser flows get a page the
+    engine leased for `site`; the engine does the locking and bookkeeping.
+    """
+
+    name = 'exchange'   # Log and metrics label
+    title = 'Exchange'  # Shown in session messages
+    site = 'exchange'   # Page pool site of the pages order actions lease
+
+    def __init__(self, engine: 'P2PEngine'):
+        self.engine = engine
+
+    def log(self, msg: str, level: str = "INFO"):
+        self.engine.log(msg, level)
+
+    def configure(self, config: Dict) -> Dict[str, str]:
+        """Read endpoints from the config. Returns the ones that differ from production."""
+        return {}
+
+    @property
+    def orders_url(self) -> str:
+        raise NotImplementedError
+
+    @property
+    def ads_url(self) -> str:
+        raise NotImplementedError
+
+    def needs_login(self, url: str) -> bool:
+        return 'login' in url.lower()
+
+    async def start_services(self):
+        """Create HTTP-only components (the engine's session exists)."""
+
+    async def start_browser(self):
+        """Attach to the browser (the context, page pool and pinned pages exist)."""
+
+    async def stop(self):
+        """Release what start_services()/start_browser() created."""
+
+    def components(self) -> Dict[str, Any]:
+        """Components whose `stats` dicts are exported as metrics."""
+        return {}
+
+    async def on_orders_page_replaced(self, page: Page):
+        """The pinned 'orders' page died and was replaced."""
+
+    async def fetch_orders(self) -> List[Dict]:
+        """Current orders as dicts: order_number, type, amount_fiat, status, href."""
+        raise NotImplementedError
+
+    def created_at(self, order_number: str) -> Optional[float]:
+        """Creation time of an order, if known."""
+        return None
+
+    async def wait_for_orders(self, poll_interval: float):
+        """Wait until the next order scan."""
+        await asyncio.sleep(poll_interval)
+
+    async def payment_details(self, page: Page, order_href: str, patterns: Patterns,
+                              order_id: str = None) -> Dict:
+        """First capture of each pattern on the order page."""
+        raise NotImplementedError
+
+    async def mark_paid(self, page: Page, order_href: str, order_id: str = None) -> bool:
+        raise NotImplementedError
+
+    async def release(self, page: Page, order_href: str, order_id: str = None) -> bool:
+        raise NotImplementedError
+
+    async def fetch_book(self, spec: BookSpec, depth_pages: int = 1) -> Optional[OrderBook]:
+        raise NotImplementedError
+
+    async def reprice(self, ad: Dict, new_price: float) -> bool:
+        raise NotImplementedError
+
+    async def ensure_ads(self, ads: List[Dict]) -> bool:
+        """Create the enabled ads that do not exist yet."""
+        return True
+
+
+class BankAdapter:
+    """
+    Where fiat is paid from (BUY) and received into (SELL). `transfer()`
+    only drives the bank's UI: validation, limits, rate limiting and
+    idempotency have already passed when the engine calls it.
+    """
+
+    name = 'bank'
+    title = 'Bank'
+    site = 'bank'
+    country = ''                       # validate_transfer_destination() country
+    payment_details: Patterns = {}     # Patterns read from the order page
+    verify_config_key = 'verify_payment'  # sell_flow flag enabling payment checks
+
+    def __init__(self, engine: 'P2PEngine'):
+        self.engine = engine
+
+    def log(self, msg: str, level: str = "INFO"):
+        self.engine.log(msg, level)
+
+    def configure(self, config: Dict) -> Dict[str, str]:
+        """Read endpoints from the config. Returns the ones that differ from production."""
+        return {}
+
+    @property
+    def home_url(self) -> str:
+        """Page loaded to check the session."""
+        raise NotImplementedError
+
+    def needs_login(self, url: str) -> bool:
+        return 'login' in url.lower()
+
+    async def start_browser(self):
+        """Attach to the browser (the page pool holds the seeded bank page)."""
+
+    async def stop(self):
+        """Release what start_browser() created."""
+
+    def components(self) -> Dict[str, Any]:
+        """Components whose `stats` dicts are exported as metrics."""
+        return {}
+
+    def destination(self, details: Dict) -> Optional[str]:
+        """Transfer destination from the order's payment details."""
+        raise NotImplementedError
+
+    def transfer_amount(self, amount: float) -> float:
+        """Amount as the bank's form takes it."""
+        return float(amount)
+
+    async def transfer(self, page: Page, destination: str, amount: float, details: Dict,
+                       watch: Stopwatch) -> bool:
+        """Drive the transfer UI on a leased page. True only once the bank confirms."""
+        raise NotImplementedError
+
+    async def incoming_payments(self) -> Optional[List[IncomingPayment]]:
+        """Recent incoming payments for batch matching. None if they could not be read."""
+        return None
+
+    async def verify_payment(self, order: Dict, window_minutes: float,
+                             tolerance_percent: float) -> Optional[IncomingPayment]:
+        """Look for one order's payment when batch matching was unavailable."""
+        return None
+
+
+# ==============================================================================
+# SETTINGS
+# ==============================================================================
+
+STATE_FLUSH_INTERVAL = 30  # Save state every 30 seconds
+PRICE_CACHE_TTL = 30  # Cache prices for 30 seconds
+PRICE_CACHE_STALE = 60  # Serve expired prices this long while refreshing
+MIN_UPDATE_INTERVAL = 120  # Minimum seconds between price updates
+
+PRICE_STRATEGIES = STRATEGIES
+VECTOR_STRATEGIES = ('vwap', 'depth', 'percentile')  # Reject outliers by default
+PRICING_OPTIONS = ('depth_levels', 'depth_amount', 'percentile', 'outlier_z')  # Per-ad keys
+
+
+# ==============================================================================
+# BROWSER AND HTTP
+# ==============================================================================
+
+async def launch_browser(profile: str, headless: bool = False) -> Tuple[Playwright, BrowserContext]:
+    """Start Playwright and open the persistent Chromium context for `profile`."""
+    playwright = await async_playwright().start()
+    context = await playwright.chromium.launch_persistent_context(
+        profile,
+        headless=headless,
+        viewport={'width': 1400, 'height': 900}
+    )
+    return playwright, context
+
+
+def new_http_session() -> aiohttp.ClientSession:
+    """HTTP session for the order book and ad APIs (one connection pool)."""
+    return aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=10),
+        headers={
+            'Content-Type': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'
+        }
+    )
+
+
+class SharedStack:
+    """One browser context, HTTP session and price cache for several markets.
+
+    Engines built with `shared=` lease pages from this context and never
+    close it; the owner (p2p_supervisor.py) stops it after every market.
+    """
+
+    def __init__(self, profile: str, headless: bool = False,
+                 price_cache_ttl: float = PRICE_CACHE_TTL,
+                 price_cache_stale: float = PRICE_CACHE_STALE, log: Callable = None):
+        self.profile = profile
+        self.headless = headless
+        self._log = log
+        # Keyed by asset:fiat:side, so markets only share books they both read
+        self.price_cache = PriceCache(ttl_seconds=price_cache_ttl,
+                                      stale_seconds=price_cache_stale, log=log)
+        self.http_session: Optional[aiohttp.ClientSession] = None
+        self._playwright: Optional[Playwright] = None
+        self.browser: Optional[BrowserContext] = None
+        self._initial_page: Optional[Page] = None
+
+    def log(self, msg: str, level: str = "INFO"):
+        if self._log:
+            self._log(msg, level)
+
+    async def start_services(self):
+        self.http_session = new_http_session()
+
+    async def start_browser(self):
+        self.log(f"Starting shared browser ({self.profile})...")
+        self._playwright, self.browser = await launch_browser(self.profile, self.headless)
+        await JSActions(log=self._log).install(self.browser)
+        self._initial_page = self.browser.pages[0] if self.browser.pages else None
+
+    def take_initial_page(self) -> Optional[Page]:
+        """The context's first tab, handed to the first market only."""
+        page, self._initial_page = self._initial_page, None
+        return page
+
+    async def stop(self):
+        if self.browser:
+            await self.browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+        await self.price_cache.close()
+        if self.http_session:
+            await self.http_session.close()
+
+
+# ==============================================================================
+# ENGINE
+# ==============================================================================
+
+class P2PEngine:
+    """Order, safety and pricing engine of one market; adapters do the site work."""
+
+    # Market (overridden by each daemon)
+    TITLE = "P2P AUTOMATION DAEMON"
+    NOTIFY_TITLE = "P2P Daemon"
+    FIAT = 'ARS'
+    PRICE_DECIMALS = 2
+    MIN_PRICE_CHANGE = 1.0    # Only update if price changes by more than this
+    PRICE_MARGIN = 0.5        # Default top1 margin
+    UNDERCUT_STEP = 0.01
+    MAX_SINGLE_ORDER = ('max_single_order_ars', 500000)       # (safety key, default)
+    MAX_DAILY_AMOUNT = ('max_daily_transfer_ars', 50000000)
+    PAGES_PER_SITE: Dict[str, int] = {}
+    ENSURE_ADS = False        # Create missing ads before starting
+    RESUME_AFTER_PAUSE = False  # Reset the error count after an error pause
+    DEFAULTS = {
+        'log_file': '/tmp/p2p_daemon.log',
+        'state_file': '/tmp/daemon_state.json',
+        'rate_limit_file': '/tmp/p2p_rate_limit.json',
+        'idempotency_file': '/tmp/p2p_idempotency.db',
+        'trace_file': '/tmp/p2p_traces.jsonl',
+        'price_history_dir': '/tmp/p2p_price_history',
+        'browser_profile': '/tmp/p2p-browser-profile',
+        'metrics_port': 9464,
+    }
+
+    def __init__(self, config_path: str, shared: SharedStack = None):
+        self.config_path = config_path
+        self.config: Dict = {}
+        # Browser, HTTP session and price cache owned by a supervisor (None = own them)
+        self.shared = shared
+
+        # Components
+        self.logger: Optional[AsyncLogger] = None
+        self.state: Optional[StateManager] = None
+        self.price_cache: Optional[PriceCache] = None
+        self.price_history: Optional[PriceHistory] = None
+        self.http_session: Optional[aiohttp.ClientSession] = None
+        self.payment_matcher: Optional[PaymentMatcher] = None
+        self.js = JSActions(log=self.log)
+        self.metrics = DaemonMetrics()
+        self.metrics_server: Optional[MetricsServer] = None
+        self.tracer = Tracer(None, log=self.log)  # Replaced in start() when tracing is enabled
+        self.pricing = PricingEngine()
+        self.order_poller: Optional[AdaptiveInterval] = None
+        self.price_poller: Optional[AdaptiveInterval] = None
+        self._last_tops: Dict[Tuple, float] = {}  # (asset, fiat, side) -> competitor top price
+
+        # Playwright
+        self._playwright: Optional[Playwright] = None
+        self.browser: Optional[BrowserContext] = None
+        self.page_pool: Optional[PagePool] = None
+        self.route_policy: Optional[RoutePolicy] = None
+        self.worker_pool: Optional[OrderWorkerPool] = None
+
+        # Pinned pages ('orders' holds the order feed) and the seeded bank page
+        self.order_page: Optional[Page] = None
+        self.price_page: Optional[Page] = None
+        self.bank_page: Optional[Page] = None
+
+        # CRITICAL: Safety components
+        self.rate_limiter: Optional[TransferRateLimiter] = None
+        self.idempotency: Optional[IdempotencyStore] = None
+        self.order_lock: Optional[OrderProcessingLock] = None
+
+        self.exchange = self.create_exchange()
+        self.bank = self.create_bank()
+
+    def create_exchange(self) -> ExchangeAdapter:
+        raise NotImplementedError
+
+    def create_bank(self) -> BankAdapter:
+        raise NotImplementedError
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+    def _load_config(self) -> Dict:
+        """Load configuration from JSON file."""
+        with open(self.config_path, 'r') as f:
+            return json.load(f)
+
+    def log(self, msg: str, level: str = "INFO"):
+        """Log a message."""
+        if self.logger:
+            self.logger.log(msg, level)
+        else:
+            print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] [{level}] {msg}")
+
+    # --------------------------------------------------------------------------
+    # Market helpers
+    # --------------------------------------------------------------------------
+
+    def setting(self, key: str) -> Any:
+        """Top-level config value with the market's default."""
+        return self.config.get(key, self.DEFAULTS.get(key))
+
+    @property
+    def safety(self) -> Dict:
+        return self.config.get('safety', {})
+
+    @property
+    def max_single_order(self) -> float:
+        key, default = self.MAX_SINGLE_ORDER
+        return self.safety.get(key, default)
+
+    @property
+    def volume_key(self) -> str:
+        return f"daily_volume_{self.FIAT.lower()}"
+
+    def money(self, amount: float) -> str:
+        return f"${amount:,.2f} {self.FIAT}"
+
+    def price_str(self, price: float) -> str:
+        return f"{price:.{self.PRICE_DECIMALS}f}"
+
+    # --------------------------------------------------------------------------
+    # Lifecycle
+    # --------------------------------------------------------------------------
+
+    async def start(self):
+        """Initialize all components."""
+        await self.start_services()
+        await self.start_browser()
+
+    async def start_services(self):
+        """Config, logging, metrics, tracing, state, caches, safety and HTTP (no browser)."""
+        self.config = self._load_config()
+
+        # Initialize logger (OPT-4)
+        rotation = self.config.get('log_rotation', {})
+        self.logger = AsyncLogger(
+            self.setting('log_file'),
+            max_queue=rotation.get('max_queue', 10000),
+            max_bytes=rotation.get('max_mb', 50) * 1024 * 1024,
+            rotate_interval=rotation.get('interval_hours', 24) * 3600,
+            backups=rotation.get('backups', 7),
+            compress=rotation.get('compress', True)
+        )
+        await self.logger.start()
+
+        self.log("=" * 70)
+        self.log(self.TITLE)
+        self.log("=" * 70)
+
+        overridden = {**self.exchange.configure(self.config), **self.bank.configure(self.config)}
+        if overridden:
+            self.log("Endpoints overridden: " + ' '.join(f"{k}={v}" for k, v in overridden.items()), "WARN")
+
+        # OPT-20: Prometheus endpoint (localhost only by default)
+        metrics_config = self.config.get('metrics', {})
+        if metrics_config.get('enabled', True):
+            self.metrics.registry.add_collector(self._collect_metrics)
+            self.metrics_server = MetricsServer(
+                self.metrics.registry,
+                host=metrics_config.get('host', '127.0.0.1'),
+                port=metrics_config.get('port', self.DEFAULTS['metrics_port']),
+                log=self.log
+            )
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                self.log(f"Metrics endpoint disabled: {e}", "WARN")
+                self.metrics_server = None
+
+        # OPT-21: One trace per order attempt, spans written as JSON lines
+        tracing = self.config.get('tracing', {})
+        if tracing.get('enabled', True):
+            self.tracer = Tracer(
+                tracing.get('file', self.DEFAULTS['trace_file']),
+                max_bytes=tracing.get('max_mb', 50) * 1024 * 1024,
+                backups=tracing.get('backups', 5),
+                compress=True,
+                log=self.log
+            )
+            await self.tracer.start()
+
+        # Initialize state manager (OPT-7)
+        retention_days = self.config.get('order_retention_days', 7)
+        self.state = StateManager(
+            self.setting('state_file'),
+            flush_interval=STATE_FLUSH_INTERVAL,
+            defaults={
+                "processed_orders": OrderRegistry(horizon_days=retention_days),
+                "released_orders": OrderRegistry(horizon_days=retention_days),
+                "consumed_payments": OrderRegistry(horizon_days=retention_days),
+                self.volume_key: 0,
+                "daily_volume_date": datetime.now().strftime("%Y-%m-%d"),
+                "error_count": 0,
+                "last_price_update": None,
+                "current_ad_prices": {}
+            },
+            journal=self.config.get('state_journal', True),
+            durable_keys=('processed_orders', 'released_orders', 'consumed_payments'),
+            compact_interval=self.config.get('state_compact_interval_seconds', 600),
+            log=self.log
+        )
+        await self.state.start()
+
+        # Initialize price cache (OPT-5)
+        if self.shared:
+            self.price_cache = self.shared.price_cache
+        else:
+            self.price_cache = PriceCache(
+                ttl_seconds=self.config.get('price_cache_ttl_seconds', PRICE_CACHE_TTL),
+                stale_seconds=self.config.get('price_cache_stale_seconds', PRICE_CACHE_STALE),
+                log=self.log
+            )
+
+        # OPT-25: Every fetched book is kept as a snapshot (ring buffers + segments)
+        history = self.config.get('price_history', {})
+        if history.get('enabled', True):
+            self.price_history = PriceHistory(
+                history.get('dir', self.setting('price_history_dir')),
+                depth=history.get('depth', 10),
+                capacity=history.get('buffer_rows', 2880),
+                segment_rows=history.get('segment_rows', 720),
+                flush_interval=history.get('flush_interval_seconds', 300),
+                retention_days=history.get('retention_days', 30),
+                log=self.log
+            )
+            await self.price_history.start()
+
+        # OPT-23: Poll intervals follow activity and hour-of-week priors
+        await self._start_pollers()
+        self.log(f"Pricing engine: {self.pricing.backend} backend")
+
+        sell_flow = self.config.get('sell_flow', {})
+        self.payment_matcher = PaymentMatcher(
+            tolerance_percent=sell_flow.get('amount_tolerance_percent', 1),
+            window_minutes=sell_flow.get('payment_verification_window_minutes', 30),
+            log=self.log
+        )
+
+        # CRITICAL: Initialize safety components
+        daily_key, daily_default = self.MAX_DAILY_AMOUNT
+        self.rate_limiter = TransferRateLimiter(
+            max_per_minute=self.safety.get('max_transfers_per_minute', 3),
+            max_per_hour=self.safety.get('max_transfers_per_hour', 20),
+            max_daily_amount=self.safety.get(daily_key, daily_default),
+            mode=self.safety.get('rate_limit_mode', 'window'),
+            burst=self.safety.get('rate_limit_burst'),
+            path=self.setting('rate_limit_file'),
+            log=self.log
+        )
+        self.idempotency = IdempotencyStore(
+            ttl_hours=24,
+            path=self.setting('idempotency_file'),
+            log=self.log
+        )
+        self.order_lock = OrderProcessingLock()
+        self.log("Safety components initialized (rate limiter, idempotency, order lock)")
+
+        # DRY-RUN MODE indicator
+        if self.config.get('dry_run', False):
+            self.log("=" * 70, "WARN")
+            self.log("DRY-RUN MODE ENABLED - No real transfers will be executed", "WARN")
+            self.log("=" * 70, "WARN")
+
+        # Initialize HTTP session (OPT-2)
+        self.http_session = self.shared.http_session if self.shared else new_http_session()
+        await self.exchange.start_services()
+
+    async def _start_pollers(self):
+        """Adaptive intervals for the order and price loops, priors learned from the JSON log."""
+        adaptive = self.config.get('adaptive_polling', {})
+        enabled = adaptive.get('enabled', True)
+        order_priors = price_priors = None
+        if enabled and adaptive.get('learn_priors', True):
+            paths = log_files(self.logger.json_log_file)
+            since = time.time() - adaptive.get('prior_weeks', 4) * 7 * 86400
+            smoothing = adaptive.get('prior_smoothing_hours', 2.0)
+            order_priors, price_priors = await asyncio.gather(
+                asyncio.to_thread(HourOfWeekPriors.learn, paths, 'orders', since, smoothing),
+                asyncio.to_thread(HourOfWeekPriors.learn, paths, 'prices', since, smoothing),
+            )
+            self.log(f"Polling priors learned from {order_priors.observed_hours:.0f}h of logs")
+
+        self.order_poller = AdaptiveInterval.from_config(
+            self.config.get('poll_interval_seconds', 30),
+            {'enabled': enabled, **adaptive.get('orders', {})}, priors=order_priors
+        )
+        self.price_poller = AdaptiveInterval.from_config(
+            self.config.get('price_check_interval_seconds', 60),
+            {'enabled': enabled, **adaptive.get('prices', {})}, priors=price_priors
+        )
+
+    async def start_browser(self):
+        """Browser context, page pool, pinned pages, adapters' browser parts and workers."""
+        if self.shared:
+            # Supervised: the context (and its JS library) is already up
+            self.browser = self.shared.browser
+        else:
+            self.log("Starting browser...")
+            self._playwright, self.browser = await launch_browser(
+                self.setting('browser_profile'), self.config.get('headless', False)
+            )
+
+            # DOM helpers are parsed once per document, not rebuilt per call
+            await self.js.install(self.browser)
+
+        # OPT-22: Images, fonts, trackers and chat widgets are aborted per site
+        self.route_policy = RoutePolicy.from_config(self.config.get('route_policy', {}), log=self.log)
+
+        # OPT-12: Page pool owns every page; closed or crashed tabs are replaced
+        page_config = self.config.get('page_pool', {})
+        self.page_pool = PagePool(
+            self.browser,
+            max_pages=page_config.get('pages_per_site', self.PAGES_PER_SITE),
+            max_navigations=page_config.get('max_navigations', 200),
+            max_heap_mb=page_config.get('max_heap_mb', 400),
+            heap_check_interval=page_config.get('heap_check_interval_seconds', 60),
+            on_page=self._setup_page,
+            log=self.log
+        )
+
+        # Create separate pages (OPT-3)
+        # Use initial page from context to avoid 4+ tabs
+        if self.shared:
+            initial_page = self.shared.take_initial_page()
+        else:
+            initial_page = self.browser.pages[0] if self.browser.pages else None
+        self.order_page = await self.page_pool.pin(
+            'orders', initial_page, on_replace=self._on_order_page_replaced
+        )
+        self.price_page = await self.page_pool.pin('price', on_replace=self._on_price_page_replaced)
+
+        # bank_page seeds the bank's pool that transfers lease from
+        self.bank_page = await self.browser.new_page()
+        await self._setup_page(self.bank.site, self.bank_page)
+        self.page_pool.add(self.bank.site, self.bank_page)
+
+        await self.exchange.start_browser()
+        await self.bank.start_browser()
+
+        # OPT-11: Worker pool leasing pages per site. order_page stays on the
+        # order list for the feed.
+        pool_config = self.config.get('worker_pool', {})
+        if pool_config.get('enabled', True):
+            self.worker_pool = OrderWorkerPool(
+                self.process_order,
+                workers=pool_config.get('workers', 3),
+                max_queue=pool_config.get('max_queue', 100),
+                log=self.log
+            )
+            await self.worker_pool.start()
+            self.log(f"Worker pool ready ({self.worker_pool.workers} workers)")
+
+        self.log(f"Browser ready: {self.page_pool.describe()}")
+
+    async def _setup_page(self, site: str, page: Page):
+        """Install the route policy; pinned roles are exchange pages."""
+        if site in ('orders', 'price'):
+            site = self.exchange.site
+        await self.route_policy.install(page, site)
+
+    async def _on_order_page_replaced(self, page: Page):
+        """Rebind the order feed to a replacement order page."""
+        self.order_page = page
+        await self.exchange.on_orders_page_replaced(page)
+
+    async def _on_price_page_replaced(self, page: Page):
+        self.price_page = page
+
+    def _collect_metrics(self):
+        """Copy component stats into gauges right before a scrape."""
+        if self.price_cache:
+            self.metrics.collect_price_cache(self.price_cache.stats)
+        components = {**self.exchange.components(), **self.bank.components(),
+                      'route_policy': self.route_policy, 'pricing': self.pricing,
+                      'price_history': self.price_history,
+                      'order_poll': self.order_poller, 'price_poll': self.price_poller}
+        for name, component in components.items():
+            if component:
+                self.metrics.collect_stats(name, component.stats)
+        if self.route_policy:
+            self.metrics.collect_routes(self.route_policy.blocked_by_site,
+                                        self.route_policy.bytes_by_site)
+
+    async def stop(self):
+        """Cleanup all components."""
+        self.log("Shutting down...")
+
+        # Stop workers before their pages go away
+        if self.worker_pool:
+            await self.worker_pool.stop()
+
+        await self.bank.stop()
+        await self.exchange.stop()
+
+        # Close pages
+        if self.page_pool:
+            await self.page_pool.close()
+
+        # Close browser, price refreshes and HTTP session (the supervisor's if shared)
+        if not self.shared:
+            if self.browser:
+                await self.browser.close()
+            if self._playwright:
+                await self._playwright.stop()
+            if self.price_cache:
+                await self.price_cache.close()
+            if self.http_session:
+                await self.http_session.close()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        self.metrics.registry.remove_collector(self._collect_metrics)
+
+        # Stop state manager (saves final state)
+        if self.state:
+            await self.state.stop()
+        if self.price_history:
+            await self.price_history.stop()
+        if self.idempotency:
+            self.idempotency.close()
+
+        await self.tracer.stop()
+
+        # Stop logger
+        if self.logger:
+            await self.logger.stop()
+
+    def notify(self, title: str, message: str):
+        """Send notifications."""
+        notifications = self.config.get('notifications', {})
+
+        if notifications.get('sound', True):
+            subprocess.Popen(
+                ['paplay', '/usr/share/sounds/freedesktop/stereo/complete.oga'],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+
+        if notifications.get('desktop', True):
+            subprocess.Popen(
+                ['notify-send', title, message],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+
+    def alert(self, message: str):
+        """Notify with the market's title."""
+        self.notify(self.NOTIFY_TITLE, message)
+
+    # ==========================================================================
+    # SMART WAITS (OPT-1)
+    # ==========================================================================
+
+    async def wait_for_page_ready(self, page, selector: str = None, timeout: int = 10000):
+        """Wait for page to be ready using smart waits instead of fixed timeouts."""
+        try:
+            await page.wait_for_load_state('domcontentloaded', timeout=timeout)
+            if selector:
+                await page.wait_for_selector(selector, state='visible', timeout=timeout)
+        except asyncio.TimeoutError:
+            # Expected timeout, fallback to short wait
+            await page.wait_for_timeout(1000)
+        except Exception as e:
+            # Log unexpected errors for debugging
+            self.log(f"wait_for_page_ready error: {type(e).__name__}: {e}", "DEBUG")
+            await page.wait_for_timeout(1000)
+
+    async def wait_for_navigation(self, page: Page, timeout: int = 10000):
+        """Wait for navigation to complete."""
+        try:
+            await page.wait_for_load_state('networkidle', timeout=timeout)
+        except asyncio.TimeoutError:
+            # Expected timeout, just continue
+            await page.wait_for_timeout(500)
+        except Exception as e:
+            self.log(f"wait_for_navigation error: {type(e).__name__}: {e}", "DEBUG")
+            await page.wait_for_timeout(500)
+
+    @asynccontextmanager
+    async def _lease_page(self, site: str, timeout: Optional[float] = None):
+        """Lease a page for `site` from the page pool (asyncio.TimeoutError after `timeout`)."""
+        requested = time.monotonic()
+        async with self.page_pool.lease(site, timeout) as page:
+            annotate(page=self.page_pool.label(page),
+                     lease_wait=round(time.monotonic() - requested, 3))
+            yield page
+
+    # ==========================================================================
+    # TRANSFERS (every bank goes through the same safety checks)
+    # ==========================================================================
+
+    async def transfer(self, destination: str, amount: float, order_id: str = "",
+                       details: Dict = None) -> bool:
+        """Pay `amount` to `destination` through the bank, with every safety check."""
+        bank = self.bank.name
+        watch = self.metrics.transfer_steps.stopwatch(bank=bank)
+
+        # Validate destination before proceeding
+        is_valid, dest_type, cleaned_dest = validate_transfer_destination(destination, self.bank.country)
+        if not is_valid:
+            self.metrics.transfer_blocked.inc(reason='invalid_destination')
+            self.log(f"  INVALID destination format: {destination}", "ERROR")
+            self.logger.log_structured("ERROR", "Invalid transfer destination",
+                                       destination=destination, amount=amount, validation_failed=True)
+            return False
+
+        # Validate amount
+        if amount <= 0:
+            self.log(f"  INVALID amount: {amount}", "ERROR")
+            self.logger.log_structured("ERROR", "Invalid amount", amount=amount, reason="non_positive")
+            return False
+
+        if amount > self.max_single_order:
+            self.metrics.transfer_blocked.inc(reason='amount_limit')
+            self.log(f"  Amount {self.money(amount)} exceeds limit {self.money(self.max_single_order)}", "ERROR")
+            self.logger.log_structured("ERROR", "Amount exceeds limit",
+                                       amount=amount, limit=self.max_single_order)
+            return False
+
+        # CRITICAL: Reserve a rate limiter slot (holds across concurrent workers)
+        can_transfer, rate_reason = await self.rate_limiter.reserve(float(amount))
+        if not can_transfer:
+            self.metrics.transfer_blocked.inc(reason='rate_limit')
+            self.log(f"  BLOCKED by rate limiter: {rate_reason}", "ERROR")
+            self.logger.log_structured("BLOCKED", "Rate limit exceeded",
+                                       destination=cleaned_dest, amount=amount, reason=rate_reason)
+            return False
+
+        committed = False
+        try:
+            # CRITICAL: Check idempotency
+            idempotency_key = IdempotencyStore.generate_key(order_id or "unknown", cleaned_dest, float(amount))
+            if not await self.idempotency.check_and_set(idempotency_key):
+                self.metrics.transfer_blocked.inc(reason='duplicate')
+                self.log(f"  BLOCKED: Duplicate transfer detected (key={idempotency_key})", "ERROR")
+                self.logger.log_structured("BLOCKED", "Duplicate transfer",
+                                           destination=cleaned_dest, amount=amount, idempotency_key=idempotency_key)
+                return False
+            watch.lap('safety_checks')
+
+            self.log(f"  Transferring {self.money(amount)} to {cleaned_dest} ({dest_type})", self.bank.name.upper())
+            self.logger.log_structured("INFO", "Starting transfer",
+                                       destination=cleaned_dest, amount=amount, dest_type=dest_type,
+                                       order_id=order_id, idempotency_key=idempotency_key, bank=bank)
+
+            # DRY-RUN MODE: Simulate transfer without executing
+            if self.config.get('dry_run', False):
+                self.log(f"  [DRY-RUN] Would transfer {self.money(amount)} to {cleaned_dest}", "SUCCESS")
+                self.logger.log_structured("DRY_RUN", "Simulated transfer",
+                                           destination=cleaned_dest, amount=amount,
+                                           dest_type=dest_type, order_id=order_id)
+                # Record in rate limiter even in dry-run to test limits
+                await self.rate_limiter.commit(float(amount))
+                committed = True
+                return True
+
+            try:
+                async with self._lease_page(self.bank.site) as page:
+                    success = await self.bank.transfer(page, cleaned_dest, amount, details or {}, watch)
+            except Exception as e:
+                self.log(f"  Transfer error: {e}", "ERROR")
+                success = False
+
+            if success:
+                self.log("  Transfer successful!", "SUCCESS")
+                await self.rate_limiter.commit(float(amount))  # Record success
+                committed = True
+                self.logger.log_structured("SUCCESS", "Transfer completed",
+                                           destination=cleaned_dest, amount=amount, order_id=order_id)
+                return True
+
+            # Transfer failed - rollback idempotency
+            await self.idempotency.remove(idempotency_key)
+            return False
+        finally:
+            if not committed:
+                await self.rate_limiter.cancel(float(amount))
+            self.metrics.transfer_seconds.observe(
+                watch.elapsed, bank=bank, outcome='success' if committed else 'failed'
+            )
+
+    # ==========================================================================
+    # PRICING (OPT-5: with cache)
+    # ==========================================================================
+
+    async def get_competitor_prices(self, asset: str = 'USDT', fiat: str = None,
+                                    trade_type: str = 'SELL',
+                                    payment_methods: List[str] = None) -> List[Dict]:
+        """Get competitor prices with caching (single-flight, stale-while-revalidate)."""
+        book = await self.get_order_book(asset, fiat or self.FIAT, trade_type, payment_methods)
+        return book.levels if book else []
+
+    async def get_order_book(self, asset: str, fiat: str, trade_type: str,
+                             payment_methods: List[str] = None) -> Optional[OrderBook]:
+        """Get the competitor order book for one asset/fiat/side through the cache."""
+        spec = BookSpec(asset, fiat, trade_type, tuple(payment_methods or [self.bank.title]))
+        return await self.price_cache.get_or_fetch(
+            asset, fiat, trade_type, lambda: self._fetch_order_book(spec)
+        )
+
+    async def _fetch_order_book(self, spec: BookSpec) -> Optional[OrderBook]:
+        """Fetch a book (page 1, plus deeper pages in parallel if configured). None on failure."""
+        depth_pages = self.config.get('order_book', {}).get('depth_pages', 1)
+        with self.metrics.book_fetch_seconds.time(trade_type=spec.trade_type) as labels:
+            book = await self.exchange.fetch_book(spec, depth_pages)
+            labels['outcome'] = 'ok' if book else 'failed'
+        if book is None:
+            self.logger.log_structured("ERROR", "Failed to fetch prices",
+                                       asset=spec.asset, fiat=spec.fiat, trade_type=spec.trade_type)
+            return None
+        self.logger.log_structured("INFO", "Fetched competitor prices",
+                                   asset=spec.asset, fiat=spec.fiat, trade_type=spec.trade_type,
+                                   count=len(book.levels), pages=book.pages, total=book.total,
+                                   top=book.levels[0]['price'] if book.levels else None)
+        if self.price_history:
+            self.price_history.record(spec.key, book.levels, book.fetched_at or None)
+        return book
+
+    def calculate_optimal_price(self, competitors: List[Dict], strategy: str = 'top1',
+                                margin: float = None, min_price: float = 0,
+                                max_price: float = float('inf'), min_amount: float = 0,
+                                max_amount: float = float('inf'), **options) -> Optional[float]:
+        """
+        Calculate optimal price based on strategy (p2p_pricing.py).
+
+        Only competitors whose limits overlap [min_amount, max_amount] count.
+        `options` are PricingParams fields (depth_levels, depth_amount,
+        percentile, outlier_z); outliers are kept for the classic strategies
+        unless `outlier_z` is given.
+        """
+        if not competitors or strategy not in PRICE_STRATEGIES:
+            return None
+        options.setdefault('outlier_z', OUTLIER_Z if strategy in VECTOR_STRATEGIES else None)
+        params = PricingParams(
+            strategy=strategy,
+            margin=self.PRICE_MARGIN if margin is None else margin,
+            undercut_step=self.UNDERCUT_STEP,
+            min_amount=min_amount,
+            max_amount=max_amount,
+            min_price=min_price,
+            max_price=max_price,
+            decimals=self.PRICE_DECIMALS,
+            **options
+        )
+        return self.pricing.price(BookArrays.from_levels(competitors), params)
+
+    async def reprice_ad(self, ad: Dict, new_price: float) -> bool:
+        """Update an ad's price (HTTP first, UI fallback inside the exchange)."""
+        return await self.exchange.reprice(ad, new_price)
+
+    def _books_moved(self, ads: List[Dict], books: List[Optional[OrderBook]], min_change: float) -> bool:
+        """Whether any book's top price moved by `min_change` since the last check."""
+        moved = False
+        for ad, book in zip(ads, books):
+            if not book or not book.levels:
+                continue
+            key = (ad.get('asset', 'USDT'), ad.get('fiat', self.FIAT), ad['type'])
+            top = book.levels[0]['price']
+            last = self._last_tops.get(key)
+            if last is not None and abs(top - last) >= min_change:
+                moved = True
+            self._last_tops[key] = top
+        return moved
+
+    async def maintain_top1(self):
+        """Loop to maintain ads at Top 1 position with debouncing (OPT-6)."""
+        min_change = self.config.get('min_price_change_for_update', self.MIN_PRICE_CHANGE)
+        min_interval = self.config.get('min_update_interval_seconds', MIN_UPDATE_INTERVAL)
+
+        while True:
+            try:
+                eligible = [
+                    ad for ad in self.config.get('ads', [])
+                    if ad.get('enabled', True)
+                    and ad.get('price_strategy') in PRICE_STRATEGIES
+                ]
+
+                # OPT-15: Fetch every ad's book at once instead of one after another
+                books = await asyncio.gather(*[
+                    self.get_order_book(
+                        asset=ad.get('asset', 'USDT'),
+                        fiat=ad.get('fiat', self.FIAT),
+                        trade_type='SELL' if ad['type'] == 'sell' else 'BUY',
+                        payment_methods=ad.get('payment_methods')
+                    )
+                    for ad in eligible
+                ])
+
+                # OPT-23: Poll faster while competitors are moving
+                if self._books_moved(eligible, books, min_change):
+                    self.price_poller.activity()
+                else:
+                    self.price_poller.idle()
+
+                for ad, book in zip(eligible, books):
+                    trade_type = 'SELL' if ad['type'] == 'sell' else 'BUY'
+                    competitors = book.levels if book else []
+
+                    if not competitors:
+                        self.log(f"No competitors found for {trade_type}", "WARN")
+                        continue
+
+                    optimal = self.calculate_optimal_price(
+                        competitors,
+                        strategy=ad['price_strategy'],
+                        margin=ad.get('price_margin', self.PRICE_MARGIN),
+                        min_price=ad.get('min_price', 0),
+                        max_price=ad.get('max_price', float('inf')),
+                        min_amount=ad.get('min_amount', 0),
+                        max_amount=ad.get('max_amount', float('inf')),
+                        **{key: ad[key] for key in PRICING_OPTIONS if key in ad}
+                    )
+
+                    if optimal is None:
+                        self.log(f"No competitor can fill {ad['id']} limits for {trade_type}", "DEBUG")
+                        continue
+
+                    current_price = (self.state.get('current_ad_prices') or {}).get(ad['id'])
+
+                    # OPT-6: Debouncing - skip if change is too small
+                    if current_price and abs(current_price - optimal) < min_change:
+                        continue
+
+                    # OPT-6: Debouncing - skip if updated too recently
+                    last_update = self.state.get('last_price_update')
+                    if last_update:
+                        try:
+                            elapsed = (datetime.now() - datetime.fromisoformat(last_update)).total_seconds()
+                            if elapsed < min_interval:
+                                continue
+                        except Exception:
+                            pass
+
+                    self.log(f"Price update: {ad['type'].upper()} Top1={self.price_str(competitors[0]['price'])} "
+                             f"→ Optimal={self.price_str(optimal)}", "PRICE")
+
+                    updated = await self.reprice_ad(ad, optimal)
+
+                    if updated:
+                        prices = self.state.get('current_ad_prices') or {}
+                        prices[ad['id']] = optimal
+                        self.state.set('current_ad_prices', prices)
+                        self.state.set('last_price_update', datetime.now().isoformat())
+                    else:
+                        self.log("Failed to update ad price", "ERROR")
+
+            except Exception as e:
+                self.log(f"Error in maintain_top1: {e}", "ERROR")
+
+            await asyncio.sleep(self.price_poller.next())
+
+    # ==========================================================================
+    # ORDERS
+    # ==========================================================================
+
+    @property
+    def verify_payments(self) -> bool:
+        return self.config.get('sell_flow', {}).get(self.bank.verify_config_key, True)
+
+    def pending_orders(self, orders: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """BUY orders to pay and SELL orders to release, not handled yet."""
+        processed = self.state.get('processed_orders') or set()
+        released = self.state.get('released_orders') or set()
+        actionable = [o for o in orders if o.get('amount_fiat', 0) > 0]
+
+        # BUY orders: we pay through the bank (DOM rows without a status count as to pay)
+        buy_orders = []
+        if self.config.get('buy_flow', {}).get('auto_pay', True):
+            buy_orders = [o for o in actionable
+                          if o['type'] == 'buy' and o.get('status', 'to_pay') == 'to_pay'
+                          and o['order_number'] not in processed]
+
+        # SELL orders: we verify the incoming payment and release the asset
+        sell_orders = []
+        if self.config.get('sell_flow', {}).get('auto_release', True):
+            sell_orders = [o for o in actionable
+                           if o['type'] == 'sell' and o.get('status', 'paid') == 'paid'
+                           and o['order_number'] not in released]
+        return buy_orders, sell_orders
+
+    async def monitor_orders(self):
+        """Main loop to monitor orders and dispatch them for processing."""
+        while True:
+            try:
+                # Reset daily volume
+                today = datetime.now().strftime("%Y-%m-%d")
+                if self.state.get('daily_volume_date') != today:
+                    self.state.set(self.volume_key, 0)
+                    self.state.set('daily_volume_date', today)
+                    self.state.set('error_count', 0)
+
+                # Check error limit
+                if self.state.get('error_count', 0) >= self.safety.get('pause_on_error_count', 3):
+                    self.log("Too many errors, pausing...", "WARN")
+                    self.alert("Paused due to errors")
+                    await asyncio.sleep(300)
+                    if self.RESUME_AFTER_PAUSE:
+                        self.state.set('error_count', 0)
+                    continue
+
+                orders = await self.exchange.fetch_orders()
+                if self.metrics.observe_detection(orders, self.exchange.created_at):
+                    self.logger.log_structured("INFO", ORDERS_DETECTED,
+                                               orders=[o['order_number'] for o in orders])
+
+                buy_orders, sell_orders = self.pending_orders(orders)
+
+                # OPT-23: Poll faster while orders are coming in
+                if buy_orders or sell_orders:
+                    self.order_poller.activity()
+                else:
+                    self.order_poller.idle()
+                sell_orders = await self.match_sell_payments(sell_orders)
+
+                detected_at = time.time()
+                for order in buy_orders + sell_orders:
+                    order['detected_at'] = detected_at
+
+                if self.worker_pool:
+                    # OPT-11: Hand orders to the worker pool; slow transfers don't block others
+                    for order in buy_orders + sell_orders:
+                        self.worker_pool.submit(order)
+                else:
+                    for order in buy_orders + sell_orders:
+                        await self.process_order(order)
+
+                if not buy_orders and not sell_orders:
+                    self.log("No pending orders")
+
+            except Exception as e:
+                self.log(f"Error in monitor_orders: {e}", "ERROR")
+                self.state.increment('error_count')
+
+            await self.exchange.wait_for_orders(self.order_poller.next())
+
+    async def match_sell_payments(self, sell_orders: List[Dict]) -> List[Dict]:
+        """
+        Match SELL orders to incoming payments one-to-one (one read of the bank).
+
+        Matched orders carry their payment under 'payment'; unmatched ones
+        wait for the next cycle. If the payments cannot be read, every order
+        is returned as-is and verifies on its own.
+        """
+        if not sell_orders or not self.verify_payments:
+            return sell_orders
+        payments = await self.bank.incoming_payments()
+        if payments is None:
+            self.log("Incoming payments unavailable, verifying orders one by one", "DEBUG")
+            return sell_orders
+
+        assignments = self.payment_matcher.match(
+            sell_orders, payments, consumed=self.state.get('consumed_payments') or set()
+        )
+        matched = []
+        for order in sell_orders:
+            payment = assignments.get(order['order_number'])
+            if payment:
+                matched.append({**order, 'payment': payment})
+            else:
+                self.log(f"   {order['order_number']}: payment of {self.money(order['amount_fiat'])} "
+                         f"not received yet", "DEBUG")
+        return matched
+
+    async def process_order(self, order: Dict):
+        """Process one detected order (worker pool handler)."""
+        order_id = order['order_number']
+        with self.metrics.order_seconds.time(type=order['type']), \
+                self.tracer.trace(order_id, type=order['type'], amount=order['amount_fiat'],
+                                  start=order.get('detected_at'),
+                                  created_at=self.exchange.created_at(order_id)):
+            if order['type'] == 'buy':
+                await self._process_buy_order(order)
+            elif order['type'] == 'sell':
+                await self._process_sell_order(order)
+
+    async def _process_buy_order(self, order: Dict):
+        """Pay a BUY order through the bank and mark it as paid on the exchange."""
+        order_id = order['order_number']
+
+        # CRITICAL: Acquire order lock to prevent race conditions
+        if not await self.order_lock.acquire(order_id):
+            self.log(f"   Order {order_id} already being processed", "DEBUG")
+            set_outcome('locked')
+            return
+
+        try:
+            # Re-check under the lock: another worker may have finished it
+            if order_id in (self.state.get('processed_orders') or set()):
+                set_outcome('already_processed')
+                return
+
+            self.log(f"━━━ BUY ORDER: {order_id} ━━━", "ORDER")
+            self.log(f"   Amount: {self.money(order['amount_fiat'])}", "ORDER")
+
+            # Check limits
+            if order['amount_fiat'] > self.max_single_order:
+                self.log("   Exceeds limit, skipping", "WARN")
+                set_outcome('over_limit')
+                return
+
+            with self.tracer.span('get_order_payment_details') as span:
+                async with self._lease_page(self.exchange.site) as page:
+                    details = await self.exchange.payment_details(
+                        page, order['href'], self.bank.payment_details, order_id=order_id
+                    )
+                dest = self.bank.destination(details)
+                span.outcome = 'ok' if dest else 'not_found'
+
+            if not dest:
+                self.log("   Payment destination not found", "WARN")
+                set_outcome('no_destination')
+                return
+
+            self.log(f"   Destination: {dest}")
+            with self.tracer.span('execute_transfer', bank=self.bank.name) as span:
+                success = await self.transfer(
+                    dest, self.bank.transfer_amount(order['amount_fiat']), order_id=order_id, details=details
+                )
+                span.outcome = 'ok' if success else 'failed'
+
+            if success:
+                if self.config.get('buy_flow', {}).get('mark_as_paid_after_transfer', True):
+                    with self.tracer.span('mark_order_as_paid') as span:
+                        async with self._lease_page(self.exchange.site) as page:
+                            marked = await self.exchange.mark_paid(page, order['href'], order_id=order_id)
+                        span.outcome = 'ok' if marked else 'failed'
+                self.state.add_to_set('processed_orders', order_id)
+                self.state.increment(self.volume_key, order['amount_fiat'])
+                self.log("   Order processed!", "SUCCESS")
+                set_outcome('processed')
+            else:
+                self.state.increment('error_count')
+                set_outcome('transfer_failed')
+        finally:
+            await self.order_lock.release(order_id)
+
+    async def _process_sell_order(self, order: Dict):
+        """Verify the incoming payment of a SELL order and release the asset."""
+        order_id = order['order_number']
+
+        # CRITICAL: Acquire order lock to prevent race conditions
+        if not await self.order_lock.acquire(order_id):
+            self.log(f"   Order {order_id} already being processed", "DEBUG")
+            set_outcome('locked')
+            return
+
+        try:
+            if order_id in (self.state.get('released_orders') or set()):
+                set_outcome('already_released')
+                return
+
+            self.log(f"━━━ SELL ORDER: {order_id} ━━━", "ORDER")
+            self.log(f"   Amount: {self.money(order['amount_fiat'])}", "ORDER")
+
+            # Verify payment (matched in batch by monitor_orders when possible)
+            sell_flow = self.config.get('sell_flow', {})
+            payment = order.get('payment')
+            if payment:
+                annotate(payment=payment.id, payment_source='matched')
+                self.log(f"   Payment matched: {self.money(payment.amount)} from {payment.sender}",
+                         self.bank.name.upper())
+            elif self.verify_payments:
+                with self.tracer.span('verify_payment', bank=self.bank.name) as span:
+                    payment = await self.bank.verify_payment(
+                        order,
+                        sell_flow.get('payment_verification_window_minutes', 30),
+                        sell_flow.get('amount_tolerance_percent', 1)
+                    )
+                    span.outcome = 'ok' if payment else 'not_received'
+
+                if not payment:
+                    self.log("   Payment NOT verified, waiting...", "WARN")
+                    set_outcome('waiting_payment')
+                    return
+
+            with self.tracer.span('release_crypto') as span:
+                async with self._lease_page(self.exchange.site) as page:
+                    with self.metrics.release_seconds.time() as labels:
+                        released = await self.exchange.release(page, order['href'], order_id=order_id)
+                        labels['outcome'] = 'ok' if released else 'failed'
+                span.outcome = labels['outcome']
+
+            if released:
+                self.state.add_to_set('released_orders', order_id)
+                if payment and payment.id:
+                    self.state.add_to_set('consumed_payments', payment.id)
+                self.payment_matcher.consume(order_id)
+                self.state.increment(self.volume_key, order['amount_fiat'])
+                self.log("   USDT released!", "SUCCESS")
+                set_outcome('released')
+            else:
+                self.state.increment('error_count')
+                set_outcome('release_failed')
+        finally:
+            await self.order_lock.release(order_id)
+
+    # ==========================================================================
+    # MAIN LOOPS
+    # ==========================================================================
+
+    async def verify_sessions(self):
+        """Verify the exchange and bank sessions are active."""
+        self.log("Verifying sessions...")
+
+        # Load ALL pages in parallel first
+        self.log("Loading all pages in parallel...", "INFO")
+        await asyncio.gather(
+            self.order_page.goto(self.exchange.orders_url),
+            self.price_page.goto(self.exchange.ads_url),
+            self.bank_page.goto(self.bank.home_url),
+        )
+        self.log("All pages loaded", "SUCCESS")
+
+        sessions = [(self.exchange, lambda: self.order_page), (self.bank, lambda: self.bank_page)]
+        waiting = [(adapter, page) for adapter, page in sessions if adapter.needs_login(page().url)]
+        for adapter, _ in waiting:
+            self.log(f"{adapter.title.upper()}: Login required", "WARN")
+            self.alert(f"{adapter.title} login required")
+
+        # Wait for logins (up to 5 min)
+        if waiting:
+            self.log("Waiting for logins (up to 5 min)...", "INFO")
+            for i in range(60):
+                await asyncio.sleep(5)
+
+                for adapter, page in list(waiting):
+                    if not adapter.needs_login(page().url):
+                        self.log(f"{adapter.title} session ACTIVE", "SUCCESS")
+                        waiting.remove((adapter, page))
+
+                if not waiting:
+                    break
+
+                if i % 12 == 0 and i > 0:  # Every 60 sec
+                    names = ', '.join(adapter.title for adapter, _ in waiting)
+                    self.log(f"Still waiting for: {names} ({i*5}s)", "INFO")
+        else:
+            for adapter, _ in sessions:
+                self.log(f"{adapter.title} session ACTIVE", "SUCCESS")
+
+    async def run(self):
+        """Main entry point."""
+        await self.verify_sessions()
+
+        if self.config.get('ensure_ads', self.ENSURE_ADS):
+            self.log("-" * 70)
+            self.log("Checking ads...")
+            if not await self.exchange.ensure_ads(self.config.get('ads', [])):
+                self.log("Could not ensure ads exist. Please create manually.", "ERROR")
+                # Continue anyway - user might create manually
+
+        self.log("-" * 70)
+        self.log("Daemon started. Press Ctrl+C to stop.")
+        self.log("Closed or crashed tabs are reopened automatically")
+        self.log("-" * 70)
+
+        # Run tasks with page close monitoring
+        try:
+            await asyncio.gather(
+                self.monitor_orders(),
+                self.maintain_top1(),
+                self._monitor_page_health(),
+            )
+        except asyncio.CancelledError:
+            self.log("Tasks cancelled")
+
+    async def _monitor_page_health(self):
+        """Replace closed/crashed pages and recycle bloated ones (OPT-12)."""
+        interval = self.config.get('page_pool', {}).get('health_check_interval_seconds', 5)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                replaced = await self.page_pool.heal()
+                if replaced:
+                    self.logger.log_structured("WARN", "Pages replaced",
+                                               replaced=replaced, **self.page_pool.counters)
+            except Exception as e:
+                self.log(f"Error in page health check: {e}", "ERROR")
+
+
+# ==============================================================================
+# MAIN
+# ==============================================================================
+
+async def run_daemon(daemon: P2PEngine, dry_run: bool = False):
+    """Start a daemon, optionally forcing dry-run, and run it until cancelled."""
+    async with daemon:
+        # Override dry_run from command line
+        if dry_run:
+            daemon.config['dry_run'] = True
+            daemon.log("=" * 70, "WARN")
+            daemon.log("DRY-RUN MODE ENABLED via command line", "WARN")
+            daemon.log("=" * 70, "WARN")
+        await daemon.run()
@@ -0,0 +1,654 @@
+#!/usr/bin/env python3
+"""
+Binance P2P Exchange Adapter
+============================
+
+Orders and ads on Binance P2P for P2PEngine:
+
+- Orders from the intercepted order-list XHR (BinanceOrderFeed), with push
+  wake-ups; the order table is scraped only when the feed is unavailable
+- Payment details, mark as paid and release on the order detail page
+- Competitor books over HTTP (OrderBookFetcher)
+- Ad prices over HTTP (BinanceAdAPI) with the My Ads UI as fallback, and
+  creation of missing ads
+
+Usage:
+    class P2PDaemon(P2PEngine):
+        def create_exchange(self):
+            return BinanceExchange(self)
+"""
+
+import asyncio
+from typing import Dict, List, Optional
+
+from playwright.async_api import Page
+
+from p2p_ad_api import BinanceAdAPI
+from p2p_core import ExchangeAdapter, retry_with_backoff, sanitize_ad_type, sanitize_asset_fiat
+from p2p_js_actions import Patterns
+from p2p_order_book import ADV_SEARCH_PATH, BookSpec, OrderBook, OrderBookFetcher
+from p2p_order_feed import BinanceOrderFeed, PUSH_WEBSOCKET_PATTERN
+
+BINANCE_URL = 'https://p2p.binance.com'
+
+
+class BinanceExchange(ExchangeAdapter):
+    """Binance P2P orders (feed + DOM fallback) and ads (API + UI fallback)."""
+
+    name = 'binance'
+    title = 'Binance'
+    site = 'binance'
+
+    def __init__(self, engine, scrape_rows: bool = False):
+        super().__init__(engine)
+        self.url = BINANCE_URL
+        # DOM fallback: the fiatOrder table (with status) or generic order
+        # rows filtered by fiat (no status)
+        self.scrape_rows = scrape_rows
+        self.book_fetcher: Optional[OrderBookFetcher] = None
+        self.ad_api: Optional[BinanceAdAPI] = None
+        self.order_feed: Optional[BinanceOrderFeed] = None
+
+    def configure(self, config: Dict) -> Dict[str, str]:
+        self.url = config.get('endpoints', {}).get('binance', BINANCE_URL).rstrip('/')
+        return {'binance': self.url} if self.url != BINANCE_URL else {}
+
+    @property
+    def orders_url(self) -> str:
+        return f"{self.url}/en/fiatOrder?tab=1"
+
+    @property
+    def ads_url(self) -> str:
+        return f"{self.url}/en/myads?type=normal&code=default"
+
+    def needs_login(self, url: str) -> bool:
+        return 'login' in url.lower() or 'accounts.binance' in url
+
+    async def start_services(self):
+        engine = self.engine
+        order_book = engine.config.get('order_book', {})
+        self.book_fetcher = OrderBookFetcher(
+            engine.http_session,
+            concurrency=order_book.get('concurrency', 4),
+            rows=order_book.get('rows', 20),
+            url=f"{self.url}{ADV_SEARCH_PATH}",
+            retry=retry_with_backoff,
+            log=self.log
+        )
+
+    async def start_browser(self):
+        engine = self.engine
+
+        # Price updates over HTTP with the browser's cookies; UI flow is the fallback
+        ad_api = engine.config.get('ad_api', {})
+        if ad_api.get('enabled', True):
+            self.ad_api = BinanceAdAPI(
+                engine.http_session, engine.browser,
+                base_url=self.url,
+                max_failures=ad_api.get('max_failures', 3),
+                cooldown=ad_api.get('cooldown_seconds', 600),
+                log=self.log
+            )
+
+        # OPT-9: Listen for order-list XHRs on the order page
+        feed_config = engine.config.get('order_feed', {})
+        if feed_config.get('enabled', True):
+            self.order_feed = BinanceOrderFeed(
+                engine.order_page,
+                log=self.log,
+                orders_url=self.orders_url,
+                detail_url=f"{self.url}/en/fiatOrderDetail?orderNo={{order_number}}",
+                bootstrap_timeout=feed_config.get('bootstrap_timeout_seconds', 20)
+            )
+            await self.order_feed.attach()
+
+            # OPT-10: Wake monitor_orders on websocket frames / DOM mutations
+            if feed_config.get('push', True):
+                await self.order_feed.enable_push(
+                    websocket_pattern=feed_config.get('push_websocket_pattern', PUSH_WEBSOCKET_PATTERN)
+                )
+
+    def components(self) -> Dict:
+        return {'order_book': self.book_fetcher, 'ad_api': self.ad_api}
+
+    async def on_orders_page_replaced(self, page: Page):
+        if self.order_feed:
+            await self.order_feed.rebind(page)
+        else:
+            await page.goto(self.orders_url)
+
+    # ==========================================================================
+    # ORDERS
+    # ==========================================================================
+
+    async def fetch_orders(self) -> List[Dict]:
+        """Orders from the order-list XHR, falling back to DOM scraping."""
+        # OPT-9: Re-issue only the order-list XHR instead of reloading the page
+        if self.order_feed:
+            orders = await self.order_feed.refresh()
+            if orders is not None:
+                # One account can trade several fiats (other markets' orders)
+                fiat = self.engine.FIAT
+                return [o.to_dict() for o in orders if o.fiat in ('', fiat)]
+            self.log("Order feed unavailable, falling back to DOM scraping", "DEBUG")
+
+        async with self.engine.page_pool.pinned('orders') as page:
+            return await self._scrape_orders(page)
+
+    async def _scrape_orders(self, page: Page) -> List[Dict]:
+        """Scrape orders from the fiatOrder page (fallback path)."""
+        try:
+            await page.goto(self.orders_url)
+            if self.scrape_rows:
+                await self.engine.wait_for_page_ready(page, 'table, [class*="order"]')
+                return await self.engine.js.call(page, 'ordersFromRows', self.engine.FIAT)
+            await self.engine.wait_for_page_ready(page, 'table tbody tr')
+            return await self.engine.js.call(page, 'ordersFromTable')
+        except Exception as e:
+            self.log(f"Error getting orders: {e}", "ERROR")
+            return []
+
+    def created_at(self, order_number: str) -> Optional[float]:
+        """Creation time of an order known to the feed (None from the DOM path)."""
+        order = self.order_feed.get(order_number) if self.order_feed else None
+        return order.create_time if order else None
+
+    async def wait_for_orders(self, poll_interval: float):
+        """Wait until the next order scan (OPT-10: push signals wake it early)."""
+        feed = self.order_feed
+        if not feed or not feed.push_enabled:
+            await asyncio.sleep(poll_interval)
+            return
+
+        # Order processing navigates away; the observer only sees the list
+        await feed.ensure_on_orders_page()
+
+        # While push is delivering order signals, timed polling is only a safety
+        # net; once it goes quiet we are back to the normal interval
+        feed_config = self.engine.config.get('order_feed', {})
+        timeout = feed.wait_timeout(
+            poll_interval,
+            safety_poll=feed_config.get('push_safety_poll_seconds', 120),
+            max_silence=feed_config.get('push_max_silence_seconds', 120),
+        )
+
+        if await feed.wait_for_change(timeout):
+            # Coalesce bursts (row insert + status change) into a single scan
+            await asyncio.sleep(feed_config.get('push_debounce_seconds', 0.3))
+            feed.clear_changes()
+            self.engine.logger.log_structured("DEBUG", "Order scan triggered by push",
+                                              push_counts=dict(feed.push_counts))
+
+    async def payment_details(self, page: Page, order_href: str, patterns: Patterns,
+                              order_id: str = None) -> Dict:
+        """Get payment details from order detail page with error handling."""
+        logger = self.engine.logger
+        try:
+            await page.goto(order_href)
+            await self.engine.wait_for_page_ready(page)
+
+            details = await self.engine.js.call(page, 'extractFromText', patterns)
+
+            # Log structured data for monitoring
+            found = sorted(key for key, value in details.items() if value)
+            if found:
+                logger.log_structured("INFO", "Payment details extracted",
+                                      order_id=order_id, fields=found)
+            else:
+                self.log("  No payment details found in order page", "WARN")
+                logger.log_structured("WARN", "No payment details found",
+                                      order_id=order_id, order_href=order_href)
+
+            return details
+
+        except Exception as e:
+            self.log(f"  Error getting payment details: {e}", "ERROR")
+            logger.log_structured("ERROR", "Failed to get payment details",
+                                  order_id=order_id, error=str(e))
+            return {'error': str(e)}
+
+    async def mark_paid(self, page: Page, order_href: str, order_id: str = None) -> bool:
+        """Mark a BUY order as paid in Binance."""
+        logger = self.engine.logger
+
+        # CRITICAL: Verify order not already marked to prevent duplicate actions
+        if order_id and order_id in (self.engine.state.get('processed_orders') or set()):
+            self.log(f"  Order {order_id} already marked as paid, skipping", "WARN")
+            return True  # Return True as it's already done
+
+        try:
+            await page.goto(order_href)
+            await self.engine.wait_for_page_ready(page)
+
+            # Check if already in 'paid' state before clicking
+            page_text = await self.engine.js.call(page, 'bodyText')
+            if 'Waiting for seller' in page_text or 'Esperando al vendedor' in page_text:
+                self.log("  Order already marked as paid", "INFO")
+                return True
+
+            for btn_text in ['Transferred', 'paid', 'Pagado']:
+                btn = await page.query_selector(f'button:has-text("{btn_text}")')
+                if btn:
+                    await btn.click()
+                    await asyncio.sleep(0.5)
+                    confirm = await page.query_selector('button:has-text("Confirm")')
+                    if confirm:
+                        await confirm.click()
+                    self.log("  Marked as paid in Binance", "SUCCESS")
+                    logger.log_structured("SUCCESS", "Order marked as paid",
+                                          order_id=order_id, order_href=order_href)
+                    return True
+
+            self.log("  'Mark as paid' button not found", "WARN")
+            return False
+
+        except Exception as e:
+            self.log(f"  Error marking as paid: {e}", "ERROR")
+            logger.log_structured("ERROR", "Failed to mark as paid",
+                                  order_id=order_id, error=str(e))
+            return False
+
+    async def release(self, page: Page, order_href: str, order_id: str = None) -> bool:
+        """Release crypto for a SELL order with duplicate protection."""
+        logger = self.engine.logger
+
+        # CRITICAL: Verify order not already released to prevent double release
+        if order_id and order_id in (self.engine.state.get('released_orders') or set()):
+            self.log(f"  Order {order_id} already released, skipping", "WARN")
+            logger.log_structured("WARN", "Duplicate release prevented",
+                                  order_id=order_id)
+            return True  # Return True as it's already done
+
+        try:
+            await page.goto(order_href)
+            await self.engine.wait_for_page_ready(page)
+
+            # Check if already released/completed before clicking
+            page_text = await self.engine.js.call(page, 'bodyText')
+            if 'Completed' in page_text or 'Completada' in page_text or 'Released' in page_text:
+                self.log("  Order already completed/released", "INFO")
+                logger.log_structured("INFO", "Order already released",
+                                      order_id=order_id)
+                return True
+
+            for btn_text in ['Release', 'Liberar', 'Confirm']:
+                btn = await page.query_selector(f'button:has-text("{btn_text}")')
+                if btn:
+                    await btn.click()
+                    await asyncio.sleep(0.5)
+
+                    # Check for 2FA
+                    twofa = await page.query_selector(
+                        'input[placeholder*="2FA"], input[placeholder*="código"], input[placeholder*="code"]'
+                    )
+                    if twofa:
+                        self.log("  2FA REQUIRED - Enter code manually", "WARN")
+                        self.engine.alert("2FA required to release USDT")
+                        try:
+                            await page.wait_for_selector(':text("Released"), :text("Completed")', timeout=120000)
+                            self.log("  2FA completed, crypto released!", "SUCCESS")
+                            logger.log_structured("SUCCESS", "Crypto released (2FA)",
+                                                  order_id=order_id)
+                            return True
+                        except asyncio.TimeoutError:
+                            self.log("  2FA timeout", "ERROR")
+                            logger.log_structured("ERROR", "2FA timeout",
+                                                  order_id=order_id)
+                            return False
+                        except Exception as e:
+                            self.log(f"  2FA error: {e}", "ERROR")
+                            return False
+
+                    # Check success
+                    await asyncio.sleep(1)
+                    success = await page.query_selector('text=Released') or await page.query_selector('text=Completed')
+                    if success:
+                        self.log("  Crypto released successfully!", "SUCCESS")
+                        logger.log_structured("SUCCESS", "Crypto released",
+                                              order_id=order_id)
+                        return True
+
+                    # Try final confirm; success only once the order shows Released/Completed
+                    final_confirm = await page.query_selector('button:has-text("Confirm")')
+                    if final_confirm:
+                        await final_confirm.click()
+                        if await self._wait_released(page):
+                            self.log("  Release confirmed", "SUCCESS")
+                            logger.log_structured("SUCCESS", "Crypto released (confirmed)",
+                                                  order_id=order_id)
+                            return True
+                        self.log("  Release clicked but not confirmed by the page", "ERROR")
+                        logger.log_structured("ERROR", "Release not confirmed",
+                                              order_id=order_id)
+                        return False
+
+            self.log("  'Release' button not found", "WARN")
+            return False
+
+        except Exception as e:
+            self.log(f"  Error releasing crypto: {e}", "ERROR")
+            logger.log_structured("ERROR", "Failed to release crypto",
+                                  order_id=order_id, error=str(e))
+            return False
+
+    async def _wait_released(self, page: Page) -> bool:
+        """Wait for the order page to show Released/Completed after the final confirm."""
+        timeout = self.engine.config.get('sell_flow', {}).get('release_confirm_seconds', 15)
+        try:
+            await page.wait_for_selector(':text("Released"), :text("Completed")',
+                                         timeout=timeout * 1000)
+            return True
+        except Exception:
+            return False
+
+    # ==========================================================================
+    # PRICES AND ADS
+    # ==========================================================================
+
+    async def fetch_book(self, spec: BookSpec, depth_pages: int = 1) -> Optional[OrderBook]:
+        return await self.book_fetcher.fetch_book(spec, depth_pages)
+
+    async def reprice(self, ad: Dict, new_price: float) -> bool:
+        """Update an ad's price over HTTP; fall back to the UI flow on failure."""
+        engine = self.engine
+        fiat = ad.get('fiat', engine.FIAT)
+        if self.ad_api:
+            with engine.metrics.reprice_seconds.time(path='api') as labels:
+                updated = await self.ad_api.update_price(
+                    ad['type'], ad.get('asset', 'USDT'), fiat, new_price,
+                    adv_no=ad.get('adv_no'), decimals=engine.PRICE_DECIMALS
+                )
+                labels['outcome'] = 'ok' if updated else 'failed'
+            if updated:
+                self.log(f"  Price updated to {engine.price_str(new_price)} {fiat} (API)", "SUCCESS")
+                return True
+
+        async with engine.page_pool.pinned('price') as page:
+            with engine.metrics.reprice_seconds.time(path='ui') as labels:
+                updated = await self.update_ad_price(page, new_price, ad['type'], fiat)
+                labels['outcome'] = 'ok' if updated else 'failed'
+            return updated
+
+    async def update_ad_price(self, page: Page, new_price: float, ad_type: str = 'sell',
+                              fiat: str = '') -> bool:
+        """Update price of an existing ad in My Ads."""
+        price = self.engine.price_str(new_price)
+
+        # Only 'buy' or 'sell' (passed to the page as data, never as code)
+        try:
+            safe_ad_type = sanitize_ad_type(ad_type)
+        except ValueError as e:
+            self.log(f"  Invalid ad_type: {e}", "ERROR")
+            return False
+
+        self.log(f"  Updating {safe_ad_type.upper()} ad price to {price} {fiat}", "BINANCE")
+
+        try:
+            await page.goto(self.ads_url)
+            await self.engine.wait_for_page_ready(page, 'table, [class*="AdRow"]')
+
+            # Find the correct ad row and click edit
+            edit_clicked = await self.engine.js.call(page, 'clickAdEdit', safe_ad_type, fiat)
+
+            if not edit_clicked:
+                # Fallback: try to find any edit button
+                edit_btn = await page.query_selector('a[href*="edit"], button:has-text("Edit")')
+                if edit_btn:
+                    await edit_btn.click()
+                else:
+                    self.log("  Edit button not found", "WARN")
+                    return False
+
+            # Wait for edit form to load
+            await self.engine.wait_for_page_ready(page, 'input[name*="price"], input[placeholder*="price"]')
+
+            # Find and update price input
+            price_input = await page.query_selector('input[name*="price"], input[placeholder*="price"], input[id*="price"]')
+            if price_input:
+                # Clear and type new price
+                await price_input.click()
+                await page.keyboard.press('Control+a')
+                await page.keyboard.type(price)
+                await asyncio.sleep(0.5)
+
+                # Click save/post button
+                save_btn = await page.query_selector('button:has-text("Post"), button:has-text("Save"), button:has-text("Confirm"), button:has-text("Publicar")')
+                if save_btn:
+                    await save_btn.click()
+                    await asyncio.sleep(2)
+
+                    # Check for success
+                    success = await page.query_selector(':text("success"), :text("updated"), :text("exitoso")')
+                    if success or 'myads' in page.url.lower():
+                        self.log(f"  Price updated to {price} {fiat}", "SUCCESS")
+                        return True
+
+            self.log("  Could not update price", "WARN")
+            return False
+
+        except Exception as e:
+            self.log(f"  Error updating ad price: {e}", "ERROR")
+            return False
+
+    async def has_ad(self, page: Page, ad_type: str = 'buy', asset: str = 'USDT', fiat: str = 'USD') -> bool:
+        """Check if an ad of the specified type already exists."""
+        # Validate inputs (passed to the page as data, never as code)
+        try:
+            safe_ad_type = sanitize_ad_type(ad_type)
+            safe_asset = sanitize_asset_fiat(asset)
+            safe_fiat = sanitize_asset_fiat(fiat)
+        except ValueError as e:
+            self.log(f"  Invalid input: {e}", "ERROR")
+            return False
+
+        try:
+            await page.goto(self.ads_url)
+            await self.engine.wait_for_page_ready(page, 'table, [class*="AdRow"], .no-data')
+            await asyncio.sleep(2)
+
+            # Check for "no ads" message
+            no_ads = await page.query_selector(':text("No ads"), :text("No hay anuncios"), .no-data, [class*="empty"]')
+            if no_ads:
+                self.log(f"No {safe_ad_type.upper()} ads found", "INFO")
+                return False
+
+            # Look for existing ad matching type and fiat
+            found = await self.engine.js.call(page, 'hasAd', safe_ad_type, safe_asset, safe_fiat)
+
+            if found:
+                self.log(f"Found existing {safe_ad_type.upper()} {safe_asset}/{safe_fiat} ad", "SUCCESS")
+            else:
+                self.log(f"No {safe_ad_type.upper()} {safe_asset}/{safe_fiat} ad found", "INFO")
+
+            return found
+
+        except Exception as e:
+            self.log(f"Error checking ads: {e}", "ERROR")
+            return False
+
+    async def create_ad(self, page: Page, ad_config: Dict) -> bool:
+        """Create a new ad on Binance P2P."""
+        engine = self.engine
+        ad_type = ad_config.get('type', 'buy')
+        asset = ad_config.get('asset', 'USDT')
+        fiat = ad_config.get('fiat', engine.FIAT)
+        payment_methods = ad_config.get('payment_methods', [engine.bank.title])
+
+        self.log(f"Creating {ad_type.upper()} ad: {asset}/{fiat}", "BINANCE")
+
+        try:
+            # Navigate to post ad page
+            await page.goto(f"{self.url}/en/postAd")
+            await engine.wait_for_page_ready(page, 'button, [class*="tab"], input')
+            await asyncio.sleep(2)
+
+            # Step 1: Select Buy or Sell
+            if ad_type.lower() == 'buy':
+                buy_tab = await page.query_selector('button:has-text("I want to buy"), [data-testid="buy-tab"], button:has-text("Buy"), button:has-text("Comprar")')
+                if buy_tab:
+                    await buy_tab.click()
+                    await asyncio.sleep(1)
+                    self.log("  Selected: BUY", "INFO")
+            else:
+                sell_tab = await page.query_selector('button:has-text("I want to sell"), [data-testid="sell-tab"], button:has-text("Sell"), button:has-text("Vender")')
+                if sell_tab:
+                    await sell_tab.click()
+                    await asyncio.sleep(1)
+                    self.log("  Selected: SELL", "INFO")
+
+            # Step 2: Select Asset
+            asset_selector = await page.query_selector(f'button:has-text("{asset}"), [data-testid="asset-{asset}"], label:has-text("{asset}")')
+            if asset_selector:
+                await asset_selector.click()
+                await asyncio.sleep(0.5)
+                self.log(f"  Selected asset: {asset}", "INFO")
+
+            # Step 3: Select Fiat
+            fiat_dropdown = await page.query_selector('input[placeholder*="fiat"], [class*="fiat-select"], button:has-text("Select fiat")')
+            if fiat_dropdown:
+                await fiat_dropdown.click()
+                await asyncio.sleep(0.5)
+                fiat_option = await page.query_selector(f'li:has-text("{fiat}"), [data-value="{fiat}"], div:has-text("{fiat}")')
+                if fiat_option:
+                    await fiat_option.click()
+                    await asyncio.sleep(0.5)
+                    self.log(f"  Selected fiat: {fiat}", "INFO")
+
+            # Step 4: Get optimal price from competitors
+            trade_type_for_search = 'BUY' if ad_type.lower() == 'sell' else 'SELL'  # Look at opposite side
+            competitors = await engine.get_competitor_prices(
+                asset=asset,
+                fiat=fiat,
+                trade_type=trade_type_for_search,
+                payment_methods=payment_methods
+            )
+
+            margin = ad_config.get('price_margin', engine.PRICE_MARGIN)
+            if competitors:
+                # For BUY ad: we want to pay MORE than competitors (to attract sellers)
+                # For SELL ad: we want to charge LESS than competitors (to attract buyers)
+                if ad_type.lower() == 'buy':
+                    optimal_price = competitors[0]['price'] + margin
+                else:
+                    optimal_price = competitors[0]['price'] - margin
+
+                # Clamp to min/max
+                optimal_price = max(ad_config.get('min_price', 0), min(ad_config.get('max_price', float('inf')), optimal_price))
+            else:
+                # Default price if no competitors
+                optimal_price = 1.00 if fiat == 'USD' else ad_config.get('min_price', 1000)
+
+            price = engine.price_str(optimal_price)
+            self.log(f"  Optimal price: {price}", "INFO")
+
+            # Step 5: Enter price
+            price_input = await page.query_selector('input[name*="price"], input[placeholder*="price"], input[id*="price"], [data-testid="price-input"]')
+            if price_input:
+                await price_input.click()
+                await page.keyboard.press('Control+a')
+                await page.keyboard.type(price)
+                await asyncio.sleep(0.5)
+
+            # Step 6: Enter amounts
+            min_amount = ad_config.get('min_amount', 10)
+            max_amount = ad_config.get('max_amount', 5000)
+
+            min_input = await page.query_selector('input[name*="min"], input[placeholder*="Min"], [data-testid="min-amount"]')
+            if min_input:
+                await min_input.click()
+                await page.keyboard.press('Control+a')
+                await page.keyboard.type(str(min_amount))
+
+            max_input = await page.query_selector('input[name*="max"], input[placeholder*="Max"], [data-testid="max-amount"]')
+            if max_input:
+                await max_input.click()
+                await page.keyboard.press('Control+a')
+                await page.keyboard.type(str(max_amount))
+
+            await asyncio.sleep(1)
+
+            # Step 7: Select payment methods
+            for pm in payment_methods:
+                pm_selector = await page.query_selector(f'label:has-text("{pm}"), button:has-text("{pm}"), [data-value="{pm}"], input[value="{pm}"]')
+                if pm_selector:
+                    await pm_selector.click()
+                    await asyncio.sleep(0.5)
+                    self.log(f"  Selected payment: {pm}", "INFO")
+                else:
+                    # Try to find in dropdown
+                    pm_dropdown = await page.query_selector('button:has-text("Select payment"), [class*="payment-method"]')
+                    if pm_dropdown:
+                        await pm_dropdown.click()
+                        await asyncio.sleep(0.5)
+                        pm_option = await page.query_selector(f'li:has-text("{pm}"), [data-value="{pm}"]')
+                        if pm_option:
+                            await pm_option.click()
+                            await asyncio.sleep(0.5)
+                            self.log(f"  Selected payment: {pm}", "INFO")
+
+            # Step 8: Enter auto-reply message
+            auto_reply = ad_config.get('auto_reply', '')
+            if auto_reply:
+                reply_input = await page.query_selector('textarea[name*="remark"], textarea[placeholder*="remark"], [data-testid="auto-reply"]')
+                if reply_input:
+                    await reply_input.click()
+                    await page.keyboard.type(auto_reply)
+
+            await asyncio.sleep(1)
+
+            # Step 9: Click Next/Continue button (multi-step form)
+            for _ in range(3):  # Try up to 3 steps
+                next_btn = await page.query_selector('button:has-text("Next"), button:has-text("Continue"), button:has-text("Siguiente")')
+                if next_btn and await next_btn.is_visible():
+                    await next_btn.click()
+                    await asyncio.sleep(2)
+                else:
+                    break
+
+            # Step 10: Click Post/Publish button
+            post_btn = await page.query_selector('button:has-text("Post"), button:has-text("Publish"), button:has-text("Publicar"), button:has-text("Confirm")')
+            if post_btn:
+                await post_btn.click()
+                await asyncio.sleep(3)
+
+                # Check for success
+                success = await page.query_selector(':text("successfully"), :text("exitoso"), :text("publicado")')
+                if success or 'myads' in page.url.lower():
+                    self.log(f"Ad created successfully! Price: {price}", "SUCCESS")
+
+                    # Save to state
+                    prices = engine.state.get('current_ad_prices') or {}
+                    prices[ad_config['id']] = optimal_price
+                    engine.state.set('current_ad_prices', prices)
+                    engine.state.set('ad_created', True)
+
+                    return True
+
+            self.log("Could not create ad - check browser manually", "WARN")
+            return False
+
+        except Exception as e:
+            self.log(f"Error creating ad: {e}", "ERROR")
+            return False
+
+    async def ensure_ads(self, ads: List[Dict]) -> bool:
+        """Ensure that required ads exist, creating them if necessary."""
+        fiat_default = self.engine.FIAT
+        async with self.engine.page_pool.pinned('price') as page:
+            for ad in ads:
+                if not ad.get('enabled', True):
+                    continue
+                label = f"{ad['type'].upper()} {ad.get('asset', 'USDT')}/{ad.get('fiat', fiat_default)}"
+
+                exists = await self.has_ad(page, ad['type'], ad.get('asset', 'USDT'), ad.get('fiat', fiat_default))
+                if exists:
+                    self.log(f"Ad exists: {label}", "SUCCESS")
+                    continue
+
+                self.log(f"Ad not found, creating {label}...", "INFO")
+                if not await self.create_ad(page, ad):
+                    self.log("Failed to create ad. Please create manually.", "ERROR")
+                    self.log(f"Go to: {self.url}/en/postAd", "INFO")
+                    return False
+
+        return True
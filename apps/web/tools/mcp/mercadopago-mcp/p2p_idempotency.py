@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Transfer Idempotency Store
+==========================
+
+Remembers which transfers were already started so the same order is never
+paid twice, including across a crash or restart in the middle of a transfer.
+
+- Live keys are kept in a dict for O(1) lookups
+- Expiry uses a min-heap of (timestamp, key), so each check only pops the
+  keys that actually expired instead of scanning every key
+- With `path` set, keys are written to a SQLite file (indexed on timestamp)
+  before `check_and_set` returns, and reloaded on startup
+
+Usage:
+    store = IdempotencyStore(ttl_hours=24, path='/var/lib/p2p/idempotency.db')
+    key = IdempotencyStore.generate_key(order_id, destination, amount)
+    if not await store.check_and_set(key):
+        return  # Duplicate
+    ...
+    await store.remove(key)  # Rollback on failure
+"""
+
+import asyncio
+import hashlib
+import heapq
+import os
+import sqlite3
+import time
+from typing import Optional, Dict, List, Tuple, Callable
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    ts  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_ts ON idempotency_keys (ts);
+"""
+
+# How often expired rows are deleted from the file
+DB_PURGE_INTERVAL = 300
+
+
+class IdempotencyStore:
+    """Track transfer idempotency to prevent duplicates."""
+
+    def __init__(self, ttl_hours: int = 24, path: Optional[str] = None, log: Callable = None):
+        self.ttl_seconds = ttl_hours * 3600
+        self.path = path
+        self._log = log
+        self._keys: Dict[str, float] = {}  # key -> timestamp
+        self._expiry: List[Tuple[float, str]] = []  # Min-heap, may hold stale entries
+        self._lock = asyncio.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._last_purge = 0.0
+
+        if path:
+            self._open()
+
+    def log(self, msg: str, level: str = "DEBUG"):
+        if self._log:
+            self._log(msg, level)
+
+    @staticmethod
+    def generate_key(order_id: str, destination: str, amount: float) -> str:
+        """Generate idempotency key for a transfer."""
+        data = f"{order_id}:{destination}:{amount:.2f}"
+        return hashlib.sha256(data.encode()).hexdigest()[:16]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    # --------------------------------------------------------------------------
+    # Persistence
+    # --------------------------------------------------------------------------
+
+    def _open(self):
+        """Open the SQLite file and load keys that have not expired yet."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.executescript(SCHEMA)
+
+        cutoff = time.time() - self.ttl_seconds
+        self._db.execute("DELETE FROM idempotency_keys WHERE ts <= ?", (cutoff,))
+        for key, ts in self._db.execute("SELECT key, ts FROM idempotency_keys"):
+            self._keys[key] = ts
+            self._expiry.append((ts, key))
+        heapq.heapify(self._expiry)
+        self._last_purge = time.time()
+        if self._keys:
+            self.log(f"Idempotency: restored {len(self._keys)} keys from {self.path}", "INFO")
+
+    def _db_exec(self, sql: str, params: tuple):
+        self._db.execute(sql, params)
+
+    async def _persist(self, sql: str, params: tuple):
+        """Run a write off the event loop. Failures keep in-memory protection."""
+        if not self._db:
+            return
+        try:
+            await asyncio.to_thread(self._db_exec, sql, params)
+        except sqlite3.Error as e:
+            self.log(f"Idempotency: failed to persist to {self.path}: {e}", "ERROR")
+
+    def close(self):
+        if self._db:
+            self._db.close()
+            self._db = None
+
+    # --------------------------------------------------------------------------
+    # Expiry
+    # --------------------------------------------------------------------------
+
+    def _expire(self, now: float):
+        """Pop expired heap entries; skip ones whose key was re-set or removed."""
+        cutoff = now - self.ttl_seconds
+        while self._expiry and self._expiry[0][0] <= cutoff:
+            ts, key = heapq.heappop(self._expiry)
+            if self._keys.get(key) == ts:
+                del self._keys[key]
+
+    async def _purge_db(self, now: float):
+        if self._db and now - self._last_purge >= DB_PURGE_INTERVAL:
+            self._last_purge = now
+            await self._persist("DELETE FROM idempotency_keys WHERE ts <= ?",
+                                (now - self.ttl_seconds,))
+
+    # --------------------------------------------------------------------------
+    # API
+    # --------------------------------------------------------------------------
+
+    async def check_and_set(self, key: str) -> bool:
+        """
+        Check if key exists. If not, set it and return True.
+        Returns False if key already exists (duplicate).
+        """
+        async with self._lock:
+            now = time.time()
+            self._expire(now)
+
+            ts = self._keys.get(key)
+            if ts is not None and now - ts < self.ttl_seconds:
+                return False  # Duplicate
+
+            self._keys[key] = now
+            heapq.heappush(self._expiry, (now, key))
+            await self._persist("INSERT OR REPLACE INTO idempotency_keys (key, ts) VALUES (?, ?)",
+                                (key, now))
+            await self._purge_db(now)
+            return True  # OK to proceed
+
+    async def remove(self, key: str):
+        """Remove key (for rollback on failure)."""
+        async with self._lock:
+            if self._keys.pop(key, None) is not None:
+                await self._persist("DELETE FROM idempotency_keys WHERE key = ?", (key,))
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+JS Action Library
+=================
+
+All DOM helpers the daemons run in the browser, installed once per context
+with `add_init_script` and called by name with JSON arguments.
+
+- The browser parses the library once per document instead of compiling a
+  new f-string script on every call
+- Arguments travel as structured data (`page.evaluate(fn, arg)`), never
+  interpolated into source, so there is nothing to escape or inject
+- Text-extraction regexes live here as Python constants, not as doubly
+  escaped JS inside f-strings
+- If a document somehow lacks the library (e.g. it was loaded before
+  `install()`), `call()` installs it there and retries once
+
+Usage:
+    js = JSActions(log=self.log)
+    await js.install(browser_context)
+    await js.call(page, 'setReactValue', '#amount-field-input', '150000')
+    details = await js.call(page, 'extractFromText', MP_PAYMENT_DETAILS)
+"""
+
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+
+# ==============================================================================
+# LIBRARY
+# ==============================================================================
+
+LIBRARY_GLOBAL = '__p2pActions'
+MISSING = '__p2p_actions_missing__'
+
+ACTIONS_JS = r"""
+(() => {
+    if (window.__p2pActions) return;
+
+    const text = (el) => (el && el.innerText) || '';
+    const hasAny = (s, words) => words.some(w => s.includes(w));
+    const AD_ROWS = 'table tbody tr, [class*="AdRow"], [class*="ad-row"]';
+
+    const isAdRowOf = (row, adType, fiat) => {
+        const t = text(row);
+        const isSell = hasAny(t, ['Sell', 'Vender']);
+        const isBuy = hasAny(t, ['Buy', 'Comprar']);
+        if (fiat && !t.includes(fiat)) return false;
+        return (adType === 'sell' && isSell) || (adType === 'buy' && isBuy);
+    };
+
+    const actions = {
+        bodyText() {
+            return document.body ? document.body.innerText : '';
+        },
+
+        // First capture group of each pattern in the page text: {name: [source, flags]}
+        extractFromText(patterns) {
+            const body = document.body ? document.body.innerText : '';
+            const out = {};
+            for (const [name, [source, flags]] of Object.entries(patterns)) {
+                const m = body.match(new RegExp(source, flags || ''));
+                out[name] = m ? (m[1] || '').trim() : null;
+            }
+            return out;
+        },
+
+        // Set a React-controlled input in one call through its fiber's onChange
+        setReactValue(selector, value) {
+            const input = document.querySelector(selector);
+            if (!input) return false;
+            const rk = Object.keys(input).find(k => k.startsWith('__reactFiber'));
+            if (!rk) return false;
+            let cur = input[rk];
+            for (let i = 0; i < 15 && cur; i++) {
+                const onChange = cur.memoizedProps && cur.memoizedProps.onChange;
+                if (onChange) {
+                    onChange({ target: { value: String(value) }, currentTarget: { value: String(value) } });
+                    return true;
+                }
+                cur = cur.return;
+            }
+            return false;
+        },
+
+        // Binance "my ads": click Edit on the row of this side (and fiat, if given)
+        clickAdEdit(adType, fiat) {
+            for (const row of document.querySelectorAll(AD_ROWS)) {
+                if (!isAdRowOf(row, adType, fiat)) continue;
+                for (const el of row.querySelectorAll('a, button, [class*="edit"]')) {
+                    const label = text(el);
+                    const href = el.getAttribute('href') || '';
+                    if (hasAny(label, ['Edit', 'Editar']) || href.includes('edit')) {
+                        el.click();
+                        return true;
+                    }
+                }
+            }
+            return false;
+        },
+
+        hasAd(adType, asset, fiat) {
+            const label = adType === 'buy' ? 'Buy' : 'Sell';
+            for (const row of document.querySelectorAll(AD_ROWS)) {
+                const t = text(row);
+                if ((t.includes(label) || t.includes(label.toLowerCase())) &&
+                    t.includes(fiat) && t.includes(asset)) return true;
+            }
+            return false;
+        },
+
+        // Binance fiatOrder table (columns: type, amount, counterparty, status)
+        ordersFromTable() {
+            return Array.from(document.querySelectorAll('table tbody tr')).map(row => {
+                const cells = row.querySelectorAll('td');
+                const link = row.querySelector('a[href*="fiatOrderDetail"]');
+                const orderNum = link?.textContent?.match(/\d{19,20}/)?.[0];
+                const isBuy = (cells[1]?.textContent || '').includes('Buy');
+                const statusLower = (cells[5]?.textContent || '').toLowerCase();
+
+                let status = 'unknown';
+                if (statusLower.includes('to pay') || statusLower.includes('pending payment')) {
+                    status = 'to_pay';
+                } else if (statusLower.includes('paid') || statusLower.includes('payment received')) {
+                    status = 'paid';
+                } else if (statusLower.includes('completed')) {
+                    status = 'completed';
+                } else if (statusLower.includes('cancelled')) {
+                    status = 'cancelled';
+                }
+
+                const amountMatch = (cells[2]?.textContent || '').match(/([\d,.]+)/);
+                return {
+                    order_number: orderNum,
+                    type: isBuy ? 'buy' : 'sell',
+                    amount_fiat: amountMatch ? parseFloat(amountMatch[1].replace(',', '')) : 0,
+                    counterparty: cells[4]?.textContent?.trim() || '',
+                    status: status,
+                    href: link?.href
+                };
+            }).filter(o => o.order_number);
+        },
+
+        // Binance order rows matched by text, amounts in `fiat`
+        ordersFromRows(fiat) {
+            const amountRe = new RegExp('([\\d,]+\\.?\\d*)\\s*' + fiat, 'i');
+            const rows = document.querySelectorAll('table tbody tr, [class*="OrderList"] > div');
+            return Array.from(rows).map(row => {
+                const t = row.innerText;
+                const link = row.querySelector('a')?.href || '';
+                const isBuy = t.toLowerCase().includes('buy') || t.includes('Comprar');
+                const isSell = t.toLowerCase().includes('sell') || t.includes('Vender');
+                const amountMatch = t.match(amountRe);
+                const orderMatch = link.match(/orderNo=([\w]+)/);
+                return {
+                    type: isBuy ? 'buy' : (isSell ? 'sell' : 'unknown'),
+                    order_number: orderMatch ? orderMatch[1] : '',
+                    amount_fiat: amountMatch ? parseFloat(amountMatch[1].replace(',', '')) : 0,
+                    href: link,
+                    text: t.substring(0, 200)
+                };
+            }).filter(o => o.order_number && o.amount_fiat > 0);
+        },
+
+        // MercadoPago /activities rows
+        mpActivities(limit) {
+            const items = document.querySelectorAll('[data-testid="activity-row"], .activity-row, [class*="ActivityRow"]');
+            return Array.from(items).slice(0, limit).map(item => {
+                const t = item.innerText || '';
+                const amountMatch = t.match(/\$\s*([\d.,]+)/);
+                const lines = t.split('\n').filter(l => l.trim());
+                return {
+                    is_incoming: hasAny(t, ['Te transfirieron', 'Recibiste', 'cobro']),
+                    amount: amountMatch ?
+                        parseFloat(amountMatch[1].replace(/\./g, '').replace(',', '.')) : 0,
+                    from_name: lines[0] || ''
+                };
+            });
+        },
+
+        // Bank movements table rows (runs inside the Produbanco iframe)
+        bankMovements(limit) {
+            const rows = document.querySelectorAll('table tr, .movimiento, [class*="movement"]');
+            return Array.from(rows).slice(0, limit).map(row => ({
+                text: row.innerText,
+                amount: row.innerText.match(/\$?([\d,]+\.\d{2})/)?.[1]?.replace(',', '') || '0'
+            }));
+        },
+    };
+
+    Object.defineProperty(window, '__p2pActions', { value: Object.freeze(actions) });
+})();
+"""
+
+CALL_JS = """
+([name, args]) => {
+    const lib = window.__LIB__;
+    if (!lib) return '__MISSING__';
+    return lib[name](...args);
+}
+""".replace('__LIB__', LIBRARY_GLOBAL).replace('__MISSING__', MISSING)
+
+ACTION_NAMES = (
+    'bodyText', 'extractFromText', 'setReactValue', 'clickAdEdit', 'hasAd',
+    'ordersFromTable', 'ordersFromRows', 'mpActivities', 'bankMovements',
+)
+
+# ==============================================================================
+# TEXT PATTERNS (for extractFromText)
+# ==============================================================================
+
+Patterns = Dict[str, Tuple[str, str]]
+
+MP_PAYMENT_DETAILS: Patterns = {
+    'cvu': (r'\b(\d{22})\b', ''),
+    'alias': (r'([a-zA-Z0-9]+\.[a-zA-Z0-9]+\.[a-zA-Z0-9]+)', ''),
+}
+
+BANK_PAYMENT_DETAILS: Patterns = {
+    'account_number': (r'(?:Cuenta|Account)[:\s]*([\d\-]+)', 'i'),
+    'bank_name': (r'(?:Banco|Bank)[:\s]*([^\n]+)', 'i'),
+    'recipient_name': (r'(?:Nombre|Name|Beneficiario)[:\s]*([^\n]+)', 'i'),
+}
+
+
+# ==============================================================================
+# CALLER
+# ==============================================================================
+
+class JSActions:
+    """Installs the action library and calls its functions by name."""
+
+    def __init__(self, log: Callable = None):
+        self._log = log
+        self.calls: Counter = Counter()
+        self.reinstalls = 0
+
+    def log(self, msg: str, level: str = "DEBUG"):
+        if self._log:
+            self._log(msg, level)
+
+    async def install(self, context):
+        """Register the library for every page and frame the context opens."""
+        await context.add_init_script(ACTIONS_JS)
+
+    async def call(self, target, name: str, *args) -> Any:
+        """Run action `name` in a Page or Frame with JSON-serializable arguments."""
+        if name not in ACTION_NAMES:
+            raise ValueError(f"Unknown JS action: {name}")
+        self.calls[name] += 1
+        payload: List = [name, list(args)]
+        result = await target.evaluate(CALL_JS, payload)
+        if result == MISSING:
+            # Document loaded before install() (or an about:blank frame)
+            self.reinstalls += 1
+            self.log(f"JS actions: installing library for {name}()")
+            await target.evaluate(ACTIONS_JS)
+            result = await target.evaluate(CALL_JS, payload)
+        return result
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Async Logger
+============
+
+Non-blocking logger for the daemons: colored lines to stderr for real-time
+streaming, plus a plain text log and a JSON-lines log written in the
+background.
+
+- One file handle per sink stays open; each writer drains its queue in
+  batches and writes a batch with a single thread-pool hop (group commit)
+- Queues are bounded; when full, messages are dropped and counted, and a
+  "dropped N messages" line is written with the next batch
+- Rotation by size (`max_bytes`) and/or age (`rotate_interval`) into
+  `<file>.1 ... <file>.N`, optionally gzipped (`<file>.1.gz`)
+
+Usage:
+    logger = AsyncLogger('/tmp/p2p_daemon_v3.log', max_bytes=50_000_000,
+                         rotate_interval=86400, backups=7, compress=True)
+    await logger.start()
+    logger.log("Order processed", "SUCCESS", order_id=order_id)
+    await logger.stop()
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+from typing import Optional, Dict, List, Callable
+
+
+def _to_json(entry: Dict) -> str:
+    return json.dumps(entry, default=str)
+
+
+class LogSink:
+    """An append-only log file with an open handle and rotation."""
+
+    def __init__(self, path: str, max_bytes: int = 0, rotate_interval: float = 0,
+                 backups: int = 5, compress: bool = False):
+        self.path = path
+        self.max_bytes = max_bytes              # 0 = no size rotation
+        self.rotate_interval = rotate_interval  # 0 = no time rotation
+        self.backups = backups
+        self.compress = compress
+        self._file = None
+        self._size = 0
+        self._opened_at = 0.0
+        self.rotations = 0
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._size = self._file.tell()
+        self._opened_at = time.time()
+
+    def _backup_name(self, index: int) -> str:
+        name = f"{self.path}.{index}"
+        return f"{name}.gz" if self.compress else name
+
+    def _should_rotate(self) -> bool:
+        if self.max_bytes and self._size >= self.max_bytes:
+            return True
+        return bool(self.rotate_interval) and self._size > 0 and \
+            time.time() - self._opened_at >= self.rotate_interval
+
+    def rotate(self):
+        """Close the current file and shift it into the numbered backups."""
+        self.close()
+        if self.backups <= 0:
+            os.remove(self.path)
+        else:
+            oldest = self._backup_name(self.backups)
+            if os.path.exists(oldest):
+                os.remove(oldest)
+            for index in range(self.backups - 1, 0, -1):
+                src = self._backup_name(index)
+                if os.path.exists(src):
+                    os.replace(src, self._backup_name(index + 1))
+            if self.compress:
+                with open(self.path, 'rb') as src, gzip.open(self._backup_name(1), 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self._backup_name(1))
+        self.rotations += 1
+        self._open()
+
+    def write_batch(self, lines: List[str]):
+        """Write lines and flush once. Runs in a worker thread."""
+        if self._file is None:
+            self._open()
+        elif self._should_rotate():
+            self.rotate()
+        data = '\n'.join(lines) + '\n'
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data.encode('utf-8'))
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class AsyncLogger:
+    """Non-blocking async logger with real-time streaming, colors, and JSON support."""
+
+    COLORS = {
+        'INFO': '\033[97m',      # White
+        'WARN': '\033[93m',      # Yellow
+        'ERROR': '\033[91m',     # Red
+        'SUCCESS': '\033[92m',   # Green
+        'DEBUG': '\033[90m',     # Gray
+        'BINANCE': '\033[38;5;214m',  # Orange
+        'MP': '\033[38;5;39m',   # Blue (MercadoPago)
+        'PRODUBANCO': '\033[38;5;33m',  # Blue
+        'PRICE': '\033[38;5;183m',  # Light purple
+        'ORDER': '\033[38;5;219m',  # Pink
+        'RESET': '\033[0m'
+    }
+
+    EMOJIS = {
+        'INFO': 'ℹ️ ',
+        'WARN': '⚠️ ',
+        'ERROR': '❌',
+        'SUCCESS': '✅',
+        'DEBUG': '🔍',
+        'BINANCE': '🟡',
+        'MP': '💳',
+        'PRODUBANCO': '🏦',
+        'PRICE': '💰',
+        'ORDER': '📋',
+    }
+
+    def __init__(self, log_file: str, json_log_file: str = None, max_queue: int = 10000,
+                 batch_size: int = 500, max_bytes: int = 0, rotate_interval: float = 0,
+                 backups: int = 5, compress: bool = False):
+        self.log_file = log_file
+        self.json_log_file = json_log_file or log_file.replace('.log', '.json.log')
+        self.batch_size = batch_size
+        rotation = dict(max_bytes=max_bytes, rotate_interval=rotate_interval,
+                        backups=backups, compress=compress)
+        self._sinks = {
+            'text': LogSink(self.log_file, **rotation),
+            'json': LogSink(self.json_log_file, **rotation),
+        }
+        self._queues: Dict[str, asyncio.Queue] = {
+            'text': asyncio.Queue(maxsize=max_queue),
+            'json': asyncio.Queue(maxsize=max_queue),
+        }
+        self._tasks: List[asyncio.Task] = []
+        self._inflight: Dict[str, Optional[asyncio.Future]] = {'text': None, 'json': None}
+        self.dropped = {'text': 0, 'json': 0}
+        self._dropped_reported = {'text': 0, 'json': 0}
+        self.stats = {'written': 0, 'batches': 0, 'write_errors': 0}
+
+    async def start(self):
+        """Start the background log writers."""
+        self._tasks = [
+            asyncio.create_task(self._writer_loop('text', lambda line: line)),
+            asyncio.create_task(self._writer_loop('json', _to_json)),
+        ]
+
+    async def stop(self):
+        """Stop the writers, flush what is still queued and close the files."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks.clear()
+        # A batch handed to a worker thread before cancel still completes
+        for future in self._inflight.values():
+            if future:
+                await asyncio.gather(future, return_exceptions=True)
+        for name, fmt in (('text', lambda line: line), ('json', _to_json)):
+            lines = self._drain(name, fmt, limit=None)
+            if lines:
+                self._write(name, lines)
+            self._sinks[name].close()
+
+    # --------------------------------------------------------------------------
+    # Writers
+    # --------------------------------------------------------------------------
+
+    def _drain(self, name: str, fmt: Callable, limit: Optional[int]) -> List[str]:
+        queue = self._queues[name]
+        lines = []
+        while not queue.empty() and (limit is None or len(lines) < limit):
+            lines.append(fmt(queue.get_nowait()))
+        missed = self.dropped[name] - self._dropped_reported[name]
+        if missed:
+            self._dropped_reported[name] = self.dropped[name]
+            lines.append(fmt(self._drop_notice(name, missed)))
+        return lines
+
+    def _drop_notice(self, name: str, missed: int):
+        msg = f"Logger queue full: dropped {missed} messages"
+        if name == 'json':
+            return {"timestamp": datetime.now().isoformat(), "level": "WARN", "message": msg}
+        return f"[{datetime.now():%Y-%m-%d %H:%M:%S}] [WARN] {msg}"
+
+    def _write(self, name: str, lines: List[str]):
+        try:
+            self._sinks[name].write_batch(lines)
+            self.stats['written'] += len(lines)
+            self.stats['batches'] += 1
+        except OSError as e:
+            self.stats['write_errors'] += 1
+            print(f"[logger] write to {self._sinks[name].path} failed: {e}", file=sys.stderr)
+
+    async def _writer_loop(self, name: str, fmt: Callable):
+        """Wait for a message, then write everything queued as one batch."""
+        queue = self._queues[name]
+        while True:
+            first = await queue.get()
+            lines = [fmt(first)] + self._drain(name, fmt, limit=self.batch_size - 1)
+            self._inflight[name] = asyncio.ensure_future(asyncio.to_thread(self._write, name, lines))
+            await asyncio.shield(self._inflight[name])
+
+    # --------------------------------------------------------------------------
+    # API
+    # --------------------------------------------------------------------------
+
+    def _enqueue(self, name: str, item):
+        try:
+            self._queues[name].put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped[name] += 1
+
+    def log(self, msg: str, level: str = "INFO", **extra):
+        """Log a message with color output to stderr for real-time streaming."""
+        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+        color = self.COLORS.get(level, self.COLORS['INFO'])
+        reset = self.COLORS['RESET']
+        emoji = self.EMOJIS.get(level, '')
+        colored_line = f"{color}[{timestamp}] {emoji} {msg}{reset}"
+        print(colored_line, file=sys.stderr, flush=True)
+        self._enqueue('text', f"[{datetime.now():%Y-%m-%d %H:%M:%S}] [{level}] {msg}")
+        # Also write to JSON log if extra data provided
+        if extra:
+            self.log_structured(level, msg, **extra)
+
+    def log_structured(self, level: str, message: str, **data):
+        """Write structured JSON log entry for analytics and monitoring."""
+        self._enqueue('json', {
+            "timestamp": datetime.now().isoformat(),
+            "level": level,
+            "message": message,
+            **data
+        })
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Metrics Registry
+================
+
+In-process counters, gauges and fixed-bucket histograms, served on a local
+HTTP endpoint in the Prometheus text format so tail latency can be alerted
+on (`histogram_quantile(0.99, ...)`) without parsing logs.
+
+- Series are keyed by label values: `hist.observe(1.2, step='navigate')`
+- `hist.time(**labels)` times a block; labels may be filled in at the end
+  (e.g. the outcome) through the yielded dict
+- `hist.stopwatch(**labels)` times consecutive steps of one flow: each
+  `lap(step)` observes the time since the previous lap
+- Collectors run right before each scrape, to copy component `stats`
+  dicts into gauges instead of instrumenting every component
+- `REGISTRY` is the process-wide default (module-level helpers such as
+  `retry_with_backoff` count into it); `DaemonMetrics` declares the
+  families both daemons export
+
+Usage:
+    metrics = DaemonMetrics()
+    watch = metrics.transfer_steps.stopwatch(bank='mp')
+    ...
+    watch.lap('navigate')
+
+    server = MetricsServer(REGISTRY, port=9464, log=self.log)
+    await server.start()      # GET http://127.0.0.1:9464/metrics
+"""
+
+import math
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+# Seconds; browser flows take from tens of milliseconds to minutes (2FA, QR)
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _key(labels: Dict) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+# ==============================================================================
+# METRIC TYPES
+# ==============================================================================
+
+class Metric:
+    """Base class: a named family of series keyed by label values."""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str = ''):
+        self.name = name
+        self.documentation = documentation
+        self._series: Dict[LabelKey, float] = {}
+
+    def value(self, **labels) -> float:
+        return self._series.get(_key(labels), 0.0)
+
+    def samples(self) -> Iterator[Tuple[str, LabelKey, float]]:
+        for key, value in self._series.items():
+            yield self.name, key, value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation or self.name}",
+                 f"# TYPE {self.name} {self.kind}"]
+        for name, key, value in self.samples():
+            lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = _key(labels)
+        self._series[key] = self._series.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    """Value that can go up and down."""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        self._series[_key(labels)] = float(value)
+
+    def inc(self, amount: float = 1, **labels):
+        key = _key(labels)
+        self._series[key] = self._series.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Stopwatch:
+    """Times consecutive steps of one flow against a histogram."""
+
+    def __init__(self, histogram: 'Histogram', label: str = 'step', **labels):
+        self.histogram = histogram
+        self.label = label
+        self.labels = labels
+        self.started = self._last = time.monotonic()
+
+    def lap(self, step: str) -> float:
+        """Observe the time since the previous lap (or start) as `step`."""
+        now = time.monotonic()
+        elapsed = now - self._last
+        self._last = now
+        self.histogram.observe(elapsed, **{**self.labels, self.label: step})
+        return elapsed
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+
+class Histogram(Metric):
+    """Fixed-bucket histogram (cumulative buckets, sum and count per series)."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str = '', buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        bounds = sorted(float(b) for b in buckets)
+        if not bounds or bounds[-1] != math.inf:
+            bounds.append(math.inf)
+        self.buckets: Tuple[float, ...] = tuple(bounds)
+        self._counts: Dict[LabelKey, List[int]] = {}
+        self._sums: Dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = _key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * len(self.buckets)
+            self._sums[key] = 0.0
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[Dict]:
+        """Time a block. Labels added to the yielded dict apply to the observation."""
+        labels = dict(labels)
+        started = time.monotonic()
+        try:
+            yield labels
+        finally:
+            self.observe(time.monotonic() - started, **labels)
+
+    def stopwatch(self, label: str = 'step', **labels) -> Stopwatch:
+        return Stopwatch(self, label, **labels)
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(_key(labels), ()))
+
+    def sum(self, **labels) -> float:
+        return self._sums.get(_key(labels), 0.0)
+
+    def value(self, **labels) -> float:
+        return float(self.count(**labels))
+
+    def samples(self) -> Iterator[Tuple[str, LabelKey, float]]:
+        for key, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket", key + (('le', _format_value(bound)),), cumulative
+            yield f"{self.name}_sum", key, self._sums[key]
+            yield f"{self.name}_count", key, cumulative
+
+
+# ==============================================================================
+# REGISTRY
+# ==============================================================================
+
+class MetricsRegistry:
+    """Named metrics plus collectors run before each scrape."""
+
+    def __init__(self, log: Callable = None):
+        self._log = log
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def log(self, msg: str, level: str = "DEBUG"):
+        if self._log:
+            self._log(msg, level)
+
+    def _get_or_create(self, cls, name: str, documentation: str, **kwargs) -> Metric:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, documentation, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} already registered as {metric.kind}")
+        return metric
+
+    def counter(self, name: str, documentation: str = '') -> Counter:
+        return self._get_or_create(Counter, name, documentation)
+
+    def gauge(self, name: str, documentation: str = '') -> Gauge:
+        return self._get_or_create(Gauge, name, documentation)
+
+    def histogram(self, name: str, documentation: str = '',
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, buckets=buckets)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Register a callable that updates metrics right before each scrape."""
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], None]):
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def collect(self):
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception as e:
+                self.log(f"Metrics collector failed: {e}", "WARN")
+
+    def render(self) -> str:
+        """Prometheus text exposition of every metric."""
+        self.collect()
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+def count_retry(error: Exception, registry: MetricsRegistry = REGISTRY):
+    """Count one retry (called from retry_with_backoff)."""
+    registry.counter('p2p_retries_total', 'Operations retried after an error').inc(
+        error=type(error).__name__
+    )
+
+
+# ==============================================================================
+# DAEMON METRICS
+# ==============================================================================
+
+class DaemonMetrics:
+    """The metric families both daemons export."""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY):
+        self.registry = registry
+        self.detection_lag = registry.histogram(
+            'p2p_order_detection_lag_seconds', 'Order creation to first detection by the daemon')
+        self.order_seconds = registry.histogram(
+            'p2p_order_processing_seconds', 'Time to process one detected order')
+        self.transfer_steps = registry.histogram(
+            'p2p_transfer_step_seconds', 'Latency of each step of a bank transfer')
+        self.transfer_seconds = registry.histogram(
+            'p2p_transfer_seconds', 'End-to-end bank transfer latency')
+        self.transfer_blocked = registry.counter(
+            'p2p_transfer_blocked_total', 'Transfers refused by a safety check')
+        self.release_seconds = registry.histogram(
+            'p2p_release_seconds', 'Time to release crypto for a SELL order')
+        self.reprice_seconds = registry.histogram(
+            'p2p_update_ad_price_seconds', 'Time to update an ad price')
+        self.book_fetch_seconds = registry.histogram(
+            'p2p_order_book_fetch_seconds', 'Competitor order book fetch latency')
+        self.component_stats = registry.gauge(
+            'p2p_component_stat', 'Counters kept by daemon components')
+        self.cache_hit_ratio = registry.gauge(
+            'p2p_price_cache_hit_ratio', 'Price cache lookups served without a fetch')
+        self.route_blocked = registry.gauge(
+            'p2p_route_blocked_requests', 'Browser requests aborted by the route policy')
+        self.route_blocked_bytes = registry.gauge(
+            'p2p_route_blocked_bytes', 'Estimated bytes not downloaded thanks to the route policy')
+        self._seen_orders: set = set()
+
+    def observe_detection(self, orders: Sequence[Dict],
+                          created_at: Callable[[str], Optional[float]]) -> int:
+        """
+        Observe detection lag for orders not seen in the previous scan.
+
+        `created_at(order_number)` returns the order's creation time (epoch
+        seconds) or None when the source has no timestamps. Returns the
+        number of newly seen orders.
+        """
+        now = time.time()
+        current = {o['order_number'] for o in orders}
+        new = current - self._seen_orders
+        self._seen_orders = current
+        for order in orders:
+            if order['order_number'] not in new:
+                continue
+            created = created_at(order['order_number'])
+            if created:
+                self.detection_lag.observe(max(0.0, now - created), type=order.get('type', ''))
+        return len(new)
+
+    def collect_stats(self, component: str, stats: Optional[Dict]):
+        """Export a component's `stats` dict as gauges."""
+        for stat, value in (stats or {}).items():
+            if isinstance(value, (int, float)):
+                self.component_stats.set(value, component=component, stat=stat)
+
+    def collect_price_cache(self, stats: Dict):
+        self.collect_stats('price_cache', stats)
+        served = stats.get('hits', 0) + stats.get('stale_hits', 0) + stats.get('coalesced', 0)
+        lookups = served + stats.get('misses', 0)
+        if lookups:
+            self.cache_hit_ratio.set(served / lookups)
+
+    def collect_routes(self, blocked: Dict[Tuple[str, str], int], blocked_bytes: Dict[str, int]):
+        """Export route policy counts per (site, reason) and bytes per site."""
+        for (site, reason), count in blocked.items():
+            self.route_blocked.set(count, site=site, reason=reason)
+        for site, nbytes in blocked_bytes.items():
+            self.route_blocked_bytes.set(nbytes, site=site)
+
+
+# ==============================================================================
+# HTTP ENDPOINT
+# ==============================================================================
+
+class MetricsServer:
+    """Serves a registry on GET /metrics (localhost by default)."""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = '127.0.0.1',
+                 port: int = 9464, log: Callable = None):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._log = log
+        self._runner: Optional[web.AppRunner] = None
+        self.scrapes = 0
+
+    def log(self, msg: str, level: str = "DEBUG"):
+        if self._log:
+            self._log(msg, level)
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.scrapes += 1
+        return web.Response(body=self.registry.render().encode(),
+                            headers={'Content-Type': CONTENT_TYPE})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if self.port == 0 and self._runner.addresses:
+            self.port = self._runner.addresses[0][1]
+        self.log(f"Metrics endpoint on http://{self.host}:{self.port}/metrics", "INFO")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
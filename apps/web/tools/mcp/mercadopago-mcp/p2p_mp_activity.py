@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+MercadoPago Activity Feed
+=========================
+
+Keeps a local cache of MercadoPago account movements, read from the JSON
+the /activities page already fetches, so payment verification is a local
+lookup instead of a page load plus text scraping per order.
+
+How it works:
+- The feed listens to `context.on('response')` for the activities XHR, so
+  any MP page that loads /activities feeds the cache
+- The first matching request is captured as a template (url, headers, body)
+- `refresh()` re-issues that XHR through the context's APIRequestContext
+  (shares cookies with the browser) and pages back only until it reaches a
+  movement it has already seen (the cursor)
+- Refreshes younger than `max_age` are served from the cache, so several
+  pending sells verified together cost one request
+- Bootstrapping leases a page with `lease_timeout`, outside the refresh
+  lock: when every MP page is busy (e.g. transfers waiting on a QR) the
+  refresh returns None for this cycle instead of blocking its caller
+- Movements are keyed by ID; the cache keeps the newest `max_entries`
+
+Usage:
+    feed = MPActivityFeed(browser, lease_page=lambda timeout=None: pool.lease('mp', timeout))
+    await feed.attach()
+    if await feed.refresh(max_age=5) is not None:
+        movement = feed.find_incoming(min_amount, max_amount, since=time.time() - 1800)
+"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Dict, List, Any, Callable, Container
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from playwright.async_api import BrowserContext, Request, Response
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+ACTIVITIES_URL = 'https://www.mercadopago.com.ar/activities'
+ACTIVITIES_API_PATTERN = r'mercadopago\.com(\.[a-z]{2})?/activities/api/'
+
+# Headers that must not be replayed (set by the request context itself)
+SKIP_REPLAY_HEADERS = {'cookie', 'content-length', 'host', 'connection', 'accept-encoding'}
+
+# Same wording the DOM scraper uses to recognize money coming in
+INCOMING_KEYWORDS = ('Te transfirieron', 'Recibiste', 'cobro', 'Transferencia recibida')
+INCOMING_TYPES = ('income', 'incoming', 'credit', 'in', 'money_in')
+OUTGOING_TYPES = ('expense', 'outgoing', 'debit', 'out', 'money_out')
+
+
+# ==============================================================================
+# MOVEMENT RECORD
+# ==============================================================================
+
+@dataclass
+class MPMovement:
+    """One account movement parsed from the activities JSON."""
+
+    id: str
+    amount: float           # Absolute value
+    incoming: bool
+    counterparty: str = ''
+    title: str = ''
+    ts: float = 0.0         # Epoch seconds, 0 if unknown
+
+    @classmethod
+    def from_api(cls, item: Dict) -> Optional['MPMovement']:
+        """Build a movement from one entry of the activities list."""
+        movement_id = item.get('id') or item.get('operationId') or item.get('operation_id')
+        if not movement_id:
+            return None
+
+        amount, sign = _parse_amount(item.get('amount'))
+        sign = item.get('amountSign') or item.get('sign') or sign
+        title = str(item.get('title') or '')
+        description = str(item.get('description') or '')
+        kind = str(item.get('type') or item.get('direction') or '').lower()
+
+        if sign in ('+', '-'):
+            incoming = sign == '+'
+        elif kind in INCOMING_TYPES or kind in OUTGOING_TYPES:
+            incoming = kind in INCOMING_TYPES
+        else:
+            text = f"{title} {description}"
+            incoming = any(keyword in text for keyword in INCOMING_KEYWORDS)
+
+        counterparty = item.get('counterparty')
+        if isinstance(counterparty, dict):
+            counterparty = counterparty.get('name') or ''
+
+        return cls(
+            id=str(movement_id),
+            amount=abs(amount),
+            incoming=incoming,
+            counterparty=str(counterparty or description or title),
+            title=title,
+            ts=_parse_ts(item.get('date') or item.get('creationDate') or item.get('dateCreated')
+                         or item.get('date_created')),
+        )
+
+
+def _parse_amount(value: Any) -> tuple:
+    """Amount as number, string or {fraction, cents[, sign]} → (float, sign or None)."""
+    if isinstance(value, dict):
+        sign = value.get('sign') or value.get('symbol_sign')
+        if 'value' in value:
+            amount, _ = _parse_amount(value['value'])
+        else:
+            fraction = str(value.get('fraction') or '0').replace('.', '').replace(',', '')
+            cents = str(value.get('cents') or '0')
+            amount = _to_float(f"{fraction}.{cents}")
+        if sign is None and amount < 0:
+            sign = '-'
+        return abs(amount), sign
+    amount = _to_float(value)
+    return abs(amount), '-' if amount < 0 else None
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value) if value not in (None, '') else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _parse_ts(value: Any) -> float:
+    if value in (None, ''):
+        return 0.0
+    if isinstance(value, (int, float)):
+        return value / 1000 if value > 1e11 else float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def parse_activities(payload: Any) -> Optional[List[MPMovement]]:
+    """Parse an activities response body. Returns None if it is not a list of movements."""
+    if isinstance(payload, dict):
+        items = next((payload[key] for key in ('results', 'data', 'activities', 'items')
+                      if isinstance(payload.get(key), list)), None)
+    else:
+        items = payload if isinstance(payload, list) else None
+    if items is None:
+        return None
+    movements = []
+    for item in items:
+        if isinstance(item, dict):
+            movement = MPMovement.from_api(item)
+            if movement:
+                movements.append(movement)
+    return movements
+
+
+def activities_api_pattern(site_url: str) -> str:
+    """XHR pattern for the activities API of a MercadoPago site root.
+
+    The production site keeps the country-agnostic default; any other root
+    (e.g. a local simulator under a path prefix) is matched literally.
+    """
+    parts = urlsplit(site_url.rstrip('/'))
+    if parts.netloc.endswith('mercadopago.com') or 'mercadopago.com.' in parts.netloc:
+        return ACTIVITIES_API_PATTERN
+    return re.escape(parts.netloc + parts.path) + '/activities/api/'
+
+
+# ==============================================================================
+# ACTIVITY FEED
+# ==============================================================================
+
+class MPActivityFeed:
+    """Movement cache backed by the /activities page's own XHR."""
+
+    def __init__(self, context: BrowserContext, lease_page: Callable = None,
+                 log: Callable = None, url_pattern: str = ACTIVITIES_API_PATTERN,
+                 activities_url: str = ACTIVITIES_URL, bootstrap_timeout: float = 20.0,
+                 page_param: str = 'page', max_pages: int = 5, max_entries: int = 2000,
+                 lease_timeout: float = 5.0):
+        self.context = context
+        self._lease_page = lease_page  # (timeout) -> async context manager yielding a Page
+        self.lease_timeout = lease_timeout
+        self._log = log
+        self.url_pattern = re.compile(url_pattern)
+        self.activities_url = activities_url
+        self.bootstrap_timeout = bootstrap_timeout
+        self.page_param = page_param
+        self.max_pages = max_pages
+        self.max_entries = max_entries
+
+        self._template: Optional[Dict] = None
+        self._movements: Dict[str, MPMovement] = {}
+        self._last_update: float = 0
+        self._ready = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._bootstrap_lock = asyncio.Lock()
+        self._attached = False
+        self.stats = {'refreshes': 0, 'requests': 0, 'cached': 0, 'new': 0, 'lease_timeouts': 0}
+
+    def log(self, msg: str, level: str = "DEBUG"):
+        if self._log:
+            self._log(msg, level)
+
+    # --------------------------------------------------------------------------
+    # Capture
+    # --------------------------------------------------------------------------
+
+    async def attach(self):
+        """Start listening to activities responses on every page of the context."""
+        if not self._attached:
+            self.context.on('response', self._on_response)
+            self._attached = True
+
+    def detach(self):
+        if self._attached:
+            self.context.remove_listener('response', self._on_response)
+            self._attached = False
+
+    def matches(self, url: str) -> bool:
+        return bool(self.url_pattern.search(url))
+
+    async def _on_response(self, response: Response):
+        """Passively ingest every activities response a page receives."""
+        if not self.matches(response.url):
+            return
+        try:
+            if not response.ok:
+                return
+            payload = await response.json()
+        except Exception as e:
+            self.log(f"Activity feed: unreadable response: {e}")
+            return
+
+        movements = parse_activities(payload)
+        if movements is None:
+            return
+
+        if self._template is None:
+            await self._capture_template(response.request)
+        self._ingest(movements)
+        self._ready.set()
+
+    async def _capture_template(self, request: Request):
+        """Remember the XHR so it can be re-issued without a page."""
+        try:
+            headers = await request.all_headers()
+        except Exception:
+            headers = request.headers
+        self._template = {
+            'url': request.url,
+            'method': request.method,
+            'headers': {
+                k: v for k, v in headers.items()
+                if not k.startswith(':') and k.lower() not in SKIP_REPLAY_HEADERS
+            },
+            'data': request.post_data,
+        }
+        self.log(f"Activity feed: captured {request.method} {request.url}")
+
+    def _ingest(self, movements: List[MPMovement]) -> int:
+        """Add movements to the cache. Returns how many were not seen before."""
+        new = 0
+        for movement in movements:
+            if movement.id not in self._movements:
+                new += 1
+            self._movements[movement.id] = movement
+        if len(self._movements) > self.max_entries:
+            newest = sorted(self._movements.values(), key=lambda m: m.ts, reverse=True)
+            self._movements = {m.id: m for m in newest[:self.max_entries]}
+        self._last_update = time.time()
+        self.stats['new'] += new
+        return new
+
+    # --------------------------------------------------------------------------
+    # Lookup
+    # --------------------------------------------------------------------------
+
+    @property
+    def has_template(self) -> bool:
+        return self._template is not None
+
+    @property
+    def age(self) -> float:
+        """Seconds since the last successful update (inf if never)."""
+        return time.time() - self._last_update if self._last_update else float('inf')
+
+    def __len__(self) -> int:
+        return len(self._movements)
+
+    def get(self, movement_id: str) -> Optional[MPMovement]:
+        return self._movements.get(movement_id)
+
+    def incoming(self, since: float = 0) -> List[MPMovement]:
+        """Cached incoming movements, newest first, optionally after `since`."""
+        return [
+            m for m in sorted(self._movements.values(), key=lambda m: m.ts, reverse=True)
+            if m.incoming and not (since and m.ts and m.ts < since)
+        ]
+
+    def find_incoming(self, min_amount: float, max_amount: float, since: float = 0,
+                      exclude: Optional[Container] = None) -> Optional[MPMovement]:
+        """Newest incoming movement in the amount range, optionally after `since`."""
+        for movement in self.incoming(since):
+            if not min_amount <= movement.amount <= max_amount:
+                continue
+            if exclude and movement.id in exclude:
+                continue
+            return movement
+        return None
+
+    # --------------------------------------------------------------------------
+    # Refresh
+    # --------------------------------------------------------------------------
+
+    async def bootstrap(self) -> bool:
+        """Load /activities once in a leased page so the XHR can be captured."""
+        if self._lease_page is None:
+            return False
+        if self._bootstrap_lock.locked():
+            return self.has_template  # Another caller is bootstrapping; don't queue behind it
+        async with self._bootstrap_lock:
+            if self.has_template:
+                return True
+            await self.attach()
+            self._ready.clear()
+            leased = False
+            try:
+                async with self._lease_page(timeout=self.lease_timeout) as page:
+                    leased = True
+                    await page.goto(self.activities_url)
+                    await asyncio.wait_for(self._ready.wait(), timeout=self.bootstrap_timeout)
+                return self.has_template
+            except asyncio.TimeoutError:
+                if leased:
+                    self.log("Activity feed: no activities XHR seen during bootstrap", "WARN")
+                else:
+                    self.stats['lease_timeouts'] += 1
+                    self.log("Activity feed: no free page to bootstrap, skipping this cycle", "DEBUG")
+                return False
+            except Exception as e:
+                self.log(f"Activity feed: bootstrap failed: {e}", "WARN")
+                return False
+
+    def _page_url(self, page: int) -> str:
+        parts = urlsplit(self._template['url'])
+        query = dict(parse_qsl(parts.query, keep_blank_values=True))
+        query[self.page_param] = str(page)
+        return urlunsplit(parts._replace(query=urlencode(query)))
+
+    async def _fetch(self, url: str) -> Optional[List[MPMovement]]:
+        template = self._template
+        self.stats['requests'] += 1
+        try:
+            response = await self.context.request.fetch(
+                url,
+                method=template['method'],
+                headers=template['headers'],
+                data=template['data'],
+            )
+            if not response.ok:
+                self.log(f"Activity feed: HTTP {response.status}", "WARN")
+                if response.status in (401, 403):
+                    self._template = None  # Re-bootstrap next time
+                return None
+            payload = await response.json()
+        except Exception as e:
+            self.log(f"Activity feed: refresh failed: {e}", "WARN")
+            return None
+
+        movements = parse_activities(payload)
+        if movements is None:
+            self.log("Activity feed: unexpected payload", "WARN")
+            self._template = None
+        return movements
+
+    async def refresh(self, max_age: float = 0) -> Optional[int]:
+        """
+        Fetch movements newer than the cursor. Returns how many were new.
+
+        Returns None if the feed cannot serve data (no template, session
+        expired, unexpected payload) so callers can fall back to the DOM.
+        """
+        if not self.has_template and not await self.bootstrap():
+            return None
+        async with self._lock:
+            if not self.has_template:
+                return None  # Invalidated by a concurrent refresh; bootstraps next time
+            if self.age < max_age:
+                self.stats['cached'] += 1
+                return 0
+
+            self.stats['refreshes'] += 1
+            first_load = not self._movements
+            new_total = 0
+            pageable = self._template['method'] == 'GET'
+            for page in range(1, self.max_pages + 1):
+                url = self._page_url(page) if pageable and page > 1 else self._template['url']
+                movements = await self._fetch(url)
+                if movements is None:
+                    return None if page == 1 else new_total
+                new = self._ingest(movements)
+                new_total += new
+                # Stop at the cursor: a page that holds already-seen movements
+                if first_load or not pageable or not movements or new < len(movements):
+                    break
+            return new_total
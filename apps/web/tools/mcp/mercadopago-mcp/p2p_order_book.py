@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Competitor Order Book Fetcher
+=============================
+
+Fetches Binance P2P ad lists (the competitor "order book") through the
+public adv/search API.
+
+- Every HTTP request goes through one semaphore in `_post()`, shared by all
+  books; `P2PEngine.maintain_top1()` gathers `get_order_book()` for every
+  ad at once (price cache -> exchange -> `fetch_book()`), so a repricing
+  cycle costs about one round-trip of wall time without flooding the API
+- `depth_pages > 1` reads page 1 for the total, then the remaining pages
+  in parallel
+- Results are normalized into an `OrderBook` whose `levels` have the same
+  shape the daemons already use for competitors
+
+Usage:
+    fetcher = OrderBookFetcher(session, concurrency=4, rows=20, retry=retry_with_backoff)
+    book = await fetcher.fetch_book(
+        BookSpec('USDT', 'ARS', 'SELL', ('MercadoPagoNew',)), depth_pages=3)
+    # OrderBook, or None if the first page could not be fetched
+"""
+
+import asyncio
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Dict, List, Tuple, Callable
+
+import aiohttp
+
+ADV_SEARCH_PATH = '/bapi/c2c/v2/friendly/c2c/adv/search'
+ADV_SEARCH_URL = 'https://p2p.binance.com' + ADV_SEARCH_PATH
+
+
+@dataclass(frozen=True)
+class BookSpec:
+    """Which book to fetch: one asset/fiat/side with its payment methods."""
+
+    asset: str
+    fiat: str
+    trade_type: str
+    pay_types: Tuple[str, ...] = ()
+
+    @property
+    def key(self) -> str:
+        return f"{self.asset}:{self.fiat}:{self.trade_type}"
+
+
+@dataclass
+class OrderBook:
+    """Normalized competitor ads for one spec, best price first."""
+
+    spec: BookSpec
+    levels: List[Dict] = field(default_factory=list)
+    total: int = 0          # Ads the API reports for this book
+    pages: int = 0          # Pages actually fetched
+    fetched_at: float = 0.0
+
+    @property
+    def best(self) -> Optional[Dict]:
+        return self.levels[0] if self.levels else None
+
+    @property
+    def total_available(self) -> float:
+        """Asset available across all fetched levels."""
+        return sum(level['available'] for level in self.levels)
+
+
+def parse_ads(data: Dict) -> Optional[List[Dict]]:
+    """Normalize an adv/search payload. None if the API reported failure."""
+    if not isinstance(data, dict) or not data.get('success'):
+        return None
+    levels = []
+    for ad in data.get('data') or []:
+        try:
+            levels.append({
+                'advertiser': ad['advertiser']['nickName'],
+                'price': float(ad['adv']['price']),
+                'available': float(ad['adv']['surplusAmount']),
+                'min': float(ad['adv']['minSingleTransAmount']),
+                'max': float(ad['adv']['maxSingleTransAmount']),
+            })
+        except (KeyError, TypeError, ValueError):
+            continue
+    return levels
+
+
+class OrderBookFetcher:
+    """Concurrent, optionally deep, competitor ad fetching."""
+
+    def __init__(self, session: aiohttp.ClientSession, concurrency: int = 4, rows: int = 20,
+                 url: str = ADV_SEARCH_URL, retry: Callable = None, log: Callable = None):
+        self.session = session
+        self.rows = rows
+        self.url = url
+        self._retry = retry
+        self._log = log
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.stats = {'requests': 0, 'errors': 0}
+
+    def log(self, msg: str, level: str = "DEBUG"):
+        if self._log:
+            self._log(msg, level)
+
+    async def _post(self, payload: Dict) -> Dict:
+        async with self._semaphore:
+            self.stats['requests'] += 1
+            async with self.session.post(self.url, json=payload) as response:
+                if response.status != 200:
+                    raise aiohttp.ClientResponseError(
+                        response.request_info, response.history,
+                        status=response.status, message=f"API error: {response.status}"
+                    )
+                return await response.json()
+
+    async def fetch_page(self, spec: BookSpec, page: int) -> Tuple[Optional[List[Dict]], int]:
+        """One page of a book. Returns (levels or None, total)."""
+        payload = {
+            'fiat': spec.fiat,
+            'asset': spec.asset,
+            'tradeType': spec.trade_type.upper(),
+            'page': page,
+            'rows': self.rows,
+            'payTypes': list(spec.pay_types),
+            'publisherType': None,
+        }
+        try:
+            if self._retry:
+                data = await self._retry(
+                    lambda: self._post(payload),
+                    max_attempts=3,
+                    base_delay=0.5,
+                    max_delay=5.0,
+                    exceptions=(aiohttp.ClientError, asyncio.TimeoutError),
+                    on_retry=lambda attempt, err, delay: self.log(
+                        f"Retry {attempt}/3 fetching {spec.key} page {page} after {delay:.1f}s: {err}", "WARN"
+                    )
+                )
+            else:
+                data = await self._post(payload)
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.log(f"Error fetching {spec.key} page {page}: {e}", "ERROR")
+            return None, 0
+
+        levels = parse_ads(data)
+        if levels is None:
+            self.log(f"API returned for {spec.key}: success={data.get('success')}, "
+                     f"total={data.get('total', 0)}", "DEBUG")
+        return levels, int(data.get('total') or 0)
+
+    async def fetch_book(self, spec: BookSpec, depth_pages: int = 1) -> Optional[OrderBook]:
+        """Fetch page 1, then pages 2..depth_pages in parallel. None if page 1 fails."""
+        levels, total = await self.fetch_page(spec, 1)
+        if levels is None:
+            return None  # An empty book (no competitors) is a valid result
+        pages = 1
+
+        last_page = min(depth_pages, math.ceil(total / self.rows)) if total else 1
+        if last_page > 1:
+            results = await asyncio.gather(*[self.fetch_page(spec, p) for p in range(2, last_page + 1)])
+            for page_levels, _ in results:
+                if page_levels is None:
+                    break  # Keep the book contiguous
+                levels.extend(page_levels)
+                pages += 1
+
+        return OrderBook(spec=spec, levels=levels, total=total, pages=pages, fetched_at=time.time())
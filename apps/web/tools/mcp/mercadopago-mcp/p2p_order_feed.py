@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+"""
+Binance P2P Order Feed
+======================
+
+Reads pending orders from the JSON the fiatOrder page already fetches
+instead of reloading the page and scraping table rows.
+
+How it works:
+- The feed listens to `page.on('response')` for the order-list XHR
+- The first matching request is captured as a template (url, headers, body)
+- `refresh()` re-issues only that XHR through the page's APIRequestContext,
+  which shares cookies with the persistent browser session
+- The page is navigated only once, to bootstrap the template
+
+Push mode (optional):
+- Websocket frames on the order page and a MutationObserver on the order
+  table (bridged through `expose_binding`) signal changes as they happen
+- `wait_for_change(timeout)` wakes the caller on the first signal, so the
+  timeout only matters when the push channel is silent
+- `wait_timeout()` stretches the wait to the safety poll only while push is
+  proven live (an order socket open and an order signal seen recently);
+  a socket that stays quiet falls back to the normal poll interval
+
+Usage:
+    feed = BinanceOrderFeed(page)
+    await feed.attach()
+    orders = await feed.refresh()   # List[P2POrder] or None if unavailable
+
+    await feed.enable_push()
+    changed = await feed.wait_for_change(timeout=30)
+"""
+
+import asyncio
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional, Dict, List, Any, Callable
+
+from playwright.async_api import Page, Request, Response, WebSocket
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+ORDERS_PAGE_URL = 'https://p2p.binance.com/en/fiatOrder?tab=1'
+ORDER_DETAIL_URL = 'https://p2p.binance.com/en/fiatOrderDetail?orderNo={order_number}'
+ORDER_LIST_PATTERN = r'/bapi/c2c/v\d+/private/c2c/order-match/order-list'
+
+# Headers that must not be replayed (set by the request context itself)
+SKIP_REPLAY_HEADERS = {'cookie', 'content-length', 'host', 'connection', 'accept-encoding'}
+
+# Binance C2C orderStatus codes -> daemon status names
+ORDER_STATUS_MAP = {
+    1: 'to_pay',        # TRADING: waiting for buyer payment
+    2: 'paid',          # BUYER_PAYED: buyer marked as paid
+    3: 'paid',          # DISTRIBUTING: release in progress
+    4: 'completed',
+    5: 'appeal',
+    6: 'cancelled',
+    7: 'cancelled',     # CANCELLED_BY_SYSTEM
+    'TRADING': 'to_pay',
+    'BUYER_PAYED': 'paid',
+    'DISTRIBUTING': 'paid',
+    'COMPLETED': 'completed',
+    'IN_APPEAL': 'appeal',
+    'CANCELLED': 'cancelled',
+    'CANCELLED_BY_SYSTEM': 'cancelled',
+}
+
+# Statuses shown on the "Processing" tab (tab=1)
+PENDING_STATUSES = ('to_pay', 'paid', 'appeal')
+
+# Push mode: websocket endpoints and frame keywords that indicate an order change
+PUSH_WEBSOCKET_PATTERN = r'binance\.com.*(stream|c2c)'
+PUSH_FRAME_KEYWORDS = ('orderNo', 'orderNumber', 'orderStatus', 'ORDER_STATUS', 'order_status')
+PUSH_BINDING_NAME = '__p2pOrdersChanged'
+
+# Installed on every navigation of the order page. Watches the order table
+# and reports (debounced) mutations back to Python through PUSH_BINDING_NAME.
+MUTATION_OBSERVER_JS = """
+(() => {
+    if (window.__p2pOrderObserver) return;
+    const path = () => location.pathname || '';
+    const isOrderList = () => path().includes('fiatOrder') && !path().includes('fiatOrderDetail');
+    let timer = null, pending = 0;
+    const flush = () => {
+        timer = null;
+        const count = pending;
+        pending = 0;
+        if (isOrderList() && window.__BINDING__) window.__BINDING__(count);
+    };
+    const relevant = (m) => {
+        const el = m.target.nodeType === 1 ? m.target : m.target.parentElement;
+        return el && el.closest && el.closest('table tbody, [class*="OrderList"], [class*="order-list"]');
+    };
+    window.__p2pOrderObserver = new MutationObserver((mutations) => {
+        if (!isOrderList()) return;
+        for (const m of mutations) {
+            if (relevant(m)) pending++;
+        }
+        if (pending && !timer) timer = setTimeout(flush, 250);
+    });
+    const start = () => window.__p2pOrderObserver.observe(document.documentElement, {
+        childList: true, subtree: true, characterData: true
+    });
+    if (document.documentElement) start();
+    else document.addEventListener('DOMContentLoaded', start);
+})();
+""".replace('__BINDING__', PUSH_BINDING_NAME)
+
+
+# ==============================================================================
+# ORDER RECORD
+# ==============================================================================
+
+@dataclass
+class P2POrder:
+    """Typed order record parsed from the order-list JSON."""
+
+    order_number: str
+    type: str               # 'buy' or 'sell' (from our side)
+    status: str             # 'to_pay', 'paid', 'completed', 'cancelled', 'appeal', 'unknown'
+    amount_fiat: float
+    amount_asset: float = 0.0
+    asset: str = ''
+    fiat: str = ''
+    price: float = 0.0
+    counterparty: str = ''
+    create_time: float = 0.0  # Epoch seconds
+    href: str = ''
+
+    @classmethod
+    def from_api(cls, item: Dict, detail_url: str = ORDER_DETAIL_URL) -> Optional['P2POrder']:
+        """Build an order from one entry of the order-list `data` array."""
+        order_number = str(item.get('orderNumber') or '')
+        if not order_number:
+            return None
+
+        trade_type = str(item.get('tradeType', '')).lower()
+        if trade_type not in ('buy', 'sell'):
+            return None
+
+        raw_status = item.get('orderStatus')
+        status = ORDER_STATUS_MAP.get(raw_status, 'unknown')
+
+        # Counterparty is the other side of the trade
+        if trade_type == 'buy':
+            counterparty = item.get('sellerNickname') or ''
+        else:
+            counterparty = item.get('buyerNickname') or ''
+
+        create_time = item.get('createTime') or 0
+        try:
+            create_time = float(create_time) / 1000 if create_time else 0.0
+        except (TypeError, ValueError):
+            create_time = 0.0
+
+        return cls(
+            order_number=order_number,
+            type=trade_type,
+            status=status,
+            amount_fiat=_to_float(item.get('totalPrice')),
+            amount_asset=_to_float(item.get('amount')),
+            asset=item.get('asset') or '',
+            fiat=item.get('fiatUnit') or item.get('fiat') or '',
+            price=_to_float(item.get('price')),
+            counterparty=counterparty,
+            create_time=create_time,
+            href=detail_url.format(order_number=order_number),
+        )
+
+    @property
+    def is_pending(self) -> bool:
+        return self.status in PENDING_STATUSES
+
+    def to_dict(self) -> Dict:
+        """DOM scraper shape used by monitor_orders, plus create_time for payment matching."""
+        return {
+            'order_number': self.order_number,
+            'type': self.type,
+            'amount_fiat': self.amount_fiat,
+            'counterparty': self.counterparty,
+            'status': self.status,
+            'href': self.href,
+            'create_time': self.create_time,
+        }
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(str(value).replace(',', '')) if value not in (None, '') else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_order_list(payload: Dict, detail_url: str = ORDER_DETAIL_URL) -> Optional[List[P2POrder]]:
+    """Parse an order-list response body. Returns None if it is not a valid list."""
+    if not isinstance(payload, dict):
+        return None
+    if payload.get('success') is False or payload.get('code') not in (None, '000000'):
+        return None
+    data = payload.get('data')
+    if not isinstance(data, list):
+        return None
+    orders = []
+    for item in data:
+        if isinstance(item, dict):
+            order = P2POrder.from_api(item, detail_url)
+            if order:
+                orders.append(order)
+    return orders
+
+
+# ==============================================================================
+# ORDER FEED
+# ==============================================================================
+
+class BinanceOrderFeed:
+    """Order feed backed by the fiatOrder page's own order-list XHR."""
+
+    def __init__(self, page: Page, log: Callable = None,
+                 url_pattern: str = ORDER_LIST_PATTERN,
+                 orders_url: str = ORDERS_PAGE_URL,
+                 detail_url: str = ORDER_DETAIL_URL,
+                 bootstrap_timeout: float = 20.0):
+        self.page = page
+        self._log = log
+        self.url_pattern = re.compile(url_pattern)
+        self.orders_url = orders_url
+        self.detail_url = detail_url  # '{order_number}' placeholder
+        self.bootstrap_timeout = bootstrap_timeout
+
+        self._template: Optional[Dict] = None
+        self._orders: Dict[str, P2POrder] = {}
+        self._last_update: float = 0
+        self._ready = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._attached = False
+
+        # Push mode
+        self.push_enabled = False
+        self.push_counts: Counter = Counter()
+        self._changed = asyncio.Event()
+        self._last_push: float = 0
+        self._open_sockets: set = set()
+        self._ws_pattern: Optional[re.Pattern] = None
+        self._frame_keywords: tuple = PUSH_FRAME_KEYWORDS
+
+    def log(self, msg: str, level: str = "DEBUG"):
+        if self._log:
+            self._log(msg, level)
+
+    # --------------------------------------------------------------------------
+    # Capture
+    # --------------------------------------------------------------------------
+
+    async def attach(self):
+        """Start listening to order-list responses on the page."""
+        if not self._attached:
+            self.page.on('response', self._on_response)
+            self._attached = True
+
+    def detach(self):
+        if self._attached:
+            self.page.remove_listener('response', self._on_response)
+            self._attached = False
+
+    def matches(self, url: str) -> bool:
+        return bool(self.url_pattern.search(url))
+
+    async def _on_response(self, response: Response):
+        """Passively ingest every order-list response the page receives."""
+        if not self.matches(response.url):
+            return
+        try:
+            if not response.ok:
+                return
+            payload = await response.json()
+        except Exception as e:
+            self.log(f"Order feed: unreadable response: {e}")
+            return
+
+        orders = parse_order_list(payload, self.detail_url)
+        if orders is None:
+            return
+
+        if self._template is None:
+            await self._capture_template(response.request)
+        self._ingest(orders, source='xhr')
+
+    async def _capture_template(self, request: Request):
+        """Remember the XHR so it can be re-issued without the page."""
+        try:
+            headers = await request.all_headers()
+        except Exception:
+            headers = request.headers
+        self._template = {
+            'url': request.url,
+            'method': request.method,
+            'headers': {
+                k: v for k, v in headers.items()
+                if not k.startswith(':') and k.lower() not in SKIP_REPLAY_HEADERS
+            },
+            'data': request.post_data,
+        }
+        self.log(f"Order feed: captured {request.method} {request.url}")
+
+    def _ingest(self, orders: List[P2POrder], source: str = None):
+        previous = {(o.order_number, o.status) for o in self._orders.values()}
+        self._orders = {o.order_number: o for o in orders}
+        self._last_update = time.time()
+        self._ready.set()
+        # Responses the page fetched on its own count as push signals
+        if source and previous != {(o.order_number, o.status) for o in orders}:
+            self._signal(source)
+
+    # --------------------------------------------------------------------------
+    # Push mode
+    # --------------------------------------------------------------------------
+
+    async def enable_push(self, websocket_pattern: str = PUSH_WEBSOCKET_PATTERN,
+                          frame_keywords: tuple = PUSH_FRAME_KEYWORDS):
+        """Subscribe to websocket frames and order-table DOM mutations."""
+        if self.push_enabled:
+            return
+        await self.attach()
+        self._ws_pattern = re.compile(websocket_pattern)
+        self._frame_keywords = tuple(frame_keywords)
+        await self._install_push()
+        self.push_enabled = True
+        self.log("Order feed: push mode enabled (websocket + DOM observer)")
+
+    async def _install_push(self):
+        self.page.on('websocket', self._on_websocket)
+        try:
+            await self.page.expose_binding(PUSH_BINDING_NAME, self._on_dom_mutation)
+            await self.page.add_init_script(MUTATION_OBSERVER_JS)
+            # Also install on the document that is already loaded
+            await self.page.evaluate(MUTATION_OBSERVER_JS)
+        except Exception as e:
+            self.log(f"Order feed: DOM observer unavailable: {e}", "WARN")
+
+    async def rebind(self, page: Page):
+        """Move the feed to a replacement page (e.g. after a crash or recycle)."""
+        if self._attached and not self.page.is_closed():
+            self.page.remove_listener('response', self._on_response)
+            if self.push_enabled:
+                self.page.remove_listener('websocket', self._on_websocket)
+        self.page = page
+        self._open_sockets.clear()
+        self._attached = False
+        await self.attach()
+        if self.push_enabled:
+            await self._install_push()
+        # The captured XHR template stays valid: cookies live in the context
+        await self.ensure_on_orders_page()
+
+    def _signal(self, source: str):
+        self.push_counts[source] += 1
+        self._last_push = time.time()
+        self._changed.set()
+
+    def _on_websocket(self, ws: WebSocket):
+        if not self._ws_pattern or not self._ws_pattern.search(ws.url):
+            return
+        self._open_sockets.add(ws)  # By object: a reconnect reuses the URL
+        self.log(f"Order feed: listening to websocket {ws.url}")
+        ws.on('framereceived', self._on_frame)
+        ws.on('close', lambda _ws: self._open_sockets.discard(ws))
+
+    def _on_frame(self, payload):
+        if isinstance(payload, bytes):
+            try:
+                payload = payload.decode('utf-8', errors='ignore')
+            except Exception:
+                return
+        if any(keyword in payload for keyword in self._frame_keywords):
+            self._signal('websocket')
+
+    def _on_dom_mutation(self, source, count: int = 0):
+        """Called from the page's MutationObserver via expose_binding."""
+        self._signal('dom')
+
+    @property
+    def push_alive(self) -> bool:
+        """True while at least one matching websocket is open."""
+        return self.push_enabled and bool(self._open_sockets)
+
+    @property
+    def push_age(self) -> float:
+        """Seconds since the last push signal (inf if never)."""
+        return time.time() - self._last_push if self._last_push else float('inf')
+
+    def wait_timeout(self, poll_interval: float, safety_poll: float, max_silence: float) -> float:
+        """Safety poll while push delivered an order signal within `max_silence`, else poll_interval."""
+        if self.push_alive and self.push_age <= max_silence:
+            return max(poll_interval, safety_poll)
+        return poll_interval
+
+    async def wait_for_change(self, timeout: float) -> bool:
+        """Wait for a push signal. Returns False if the timeout elapsed first."""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._changed.clear()
+
+    def clear_changes(self):
+        """Drop signals that arrived while the caller was already scanning."""
+        self._changed.clear()
+
+    async def ensure_on_orders_page(self):
+        """Return the page to the order list so push signals keep flowing."""
+        url = self.page.url or ''
+        if 'fiatOrder' in url and 'fiatOrderDetail' not in url:
+            return
+        try:
+            await self.page.goto(self.orders_url)
+        except Exception as e:
+            self.log(f"Order feed: could not return to order list: {e}", "WARN")
+
+    # --------------------------------------------------------------------------
+    # Refresh
+    # --------------------------------------------------------------------------
+
+    @property
+    def has_template(self) -> bool:
+        return self._template is not None
+
+    @property
+    def age(self) -> float:
+        """Seconds since the last successful update (inf if never)."""
+        return time.time() - self._last_update if self._last_update else float('inf')
+
+    def latest(self, pending_only: bool = True) -> List[P2POrder]:
+        """Last known orders without any network activity."""
+        orders = list(self._orders.values())
+        if pending_only:
+            orders = [o for o in orders if o.is_pending]
+        return orders
+
+    def get(self, order_number: str) -> Optional[P2POrder]:
+        """Last known state of one order (None if not in the latest list)."""
+        return self._orders.get(order_number)
+
+    async def bootstrap(self) -> bool:
+        """Load the orders page once so the page issues the XHR we capture."""
+        await self.attach()
+        self._ready.clear()
+        try:
+            await self.page.goto(self.orders_url)
+            await asyncio.wait_for(self._ready.wait(), timeout=self.bootstrap_timeout)
+            return self.has_template
+        except asyncio.TimeoutError:
+            self.log("Order feed: no order-list XHR seen during bootstrap", "WARN")
+            return False
+        except Exception as e:
+            self.log(f"Order feed: bootstrap failed: {e}", "WARN")
+            return False
+
+    async def refresh(self, pending_only: bool = True) -> Optional[List[P2POrder]]:
+        """
+        Re-issue the order-list XHR and return parsed orders.
+
+        Returns None if the feed cannot serve data (no template, session
+        expired, unexpected payload) so callers can fall back to the DOM.
+        """
+        async with self._lock:
+            if not self.has_template and not await self.bootstrap():
+                return None
+
+            template = self._template
+            try:
+                response = await self.page.request.fetch(
+                    template['url'],
+                    method=template['method'],
+                    headers=template['headers'],
+                    data=template['data'],
+                )
+                if not response.ok:
+                    self.log(f"Order feed: HTTP {response.status}", "WARN")
+                    if response.status in (401, 403):
+                        self._template = None  # Re-bootstrap next time
+                    return None
+                payload = await response.json()
+            except Exception as e:
+                self.log(f"Order feed: refresh failed: {e}", "WARN")
+                return None
+
+            orders = parse_order_list(payload, self.detail_url)
+            if orders is None:
+                code = payload.get('code') if isinstance(payload, dict) else None
+                self.log(f"Order feed: unexpected payload (code={code})", "WARN")
+                self._template = None
+                return None
+
+            self._ingest(orders)
+            return self.latest(pending_only)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Order Registry
+==============
+
+Set-like record of handled order numbers (processed / released) whose
+memory and state-file size stay flat over months of operation.
+
+- Recent IDs: exact, in a dict of order_id -> timestamp kept in insertion
+  (= time) order, so horizon eviction pops from the front in amortized O(1)
+- Older IDs: moved into a Bloom filter sized for `capacity` IDs at
+  `error_rate`. Two generations are kept; when the current one is full the
+  oldest is dropped, so IDs are forgotten entirely after roughly
+  2 * capacity evictions
+- Membership is O(1): exact set first, then the filters. A filter false
+  positive reports an order as already handled, which is the safe side
+  (the order is skipped, never paid or released twice)
+
+Usage:
+    processed = OrderRegistry(horizon_days=7)
+    processed.add(order_id)
+    if order_id in processed: ...
+    data = processed.to_dict()                  # JSON-serializable
+    processed = OrderRegistry(horizon_days=7).restore(data)
+"""
+
+import base64
+import hashlib
+import math
+import time
+import zlib
+from typing import Optional, Dict, List, Any
+
+REGISTRY_TYPE = 'order_registry'
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on blake2b)."""
+
+    def __init__(self, capacity: int, error_rate: float, bits: bytes = None, count: int = 0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        size = (self.num_bits + 7) // 8
+        self._bits = bytearray(bits) if bits and len(bits) == size else bytearray(size)
+        self.count = count
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+    def to_dict(self) -> Dict:
+        bits = zlib.compress(bytes(self._bits))  # Sparse filters compress well
+        return {'count': self.count, 'bits': base64.b64encode(bits).decode()}
+
+    @classmethod
+    def from_dict(cls, data: Dict, capacity: int, error_rate: float) -> 'BloomFilter':
+        try:
+            bits = zlib.decompress(base64.b64decode(data.get('bits', '')))
+        except (ValueError, zlib.error):
+            bits = None  # Start empty rather than fail the whole load
+        return cls(capacity, error_rate, bits=bits, count=data.get('count', 0))
+
+
+class OrderRegistry:
+    """Exact recent order IDs plus Bloom filters for older ones."""
+
+    def __init__(self, horizon_days: float = 7, capacity: int = 50_000,
+                 error_rate: float = 1e-6):
+        self.horizon_seconds = horizon_days * 86400
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._recent: Dict[str, float] = {}
+        self._filters: List[BloomFilter] = [self._new_filter()]  # Newest last
+
+    def _new_filter(self) -> BloomFilter:
+        return BloomFilter(self.capacity, self.error_rate)
+
+    def fresh(self) -> 'OrderRegistry':
+        """Empty registry with the same settings."""
+        return OrderRegistry(self.horizon_seconds / 86400, self.capacity, self.error_rate)
+
+    def __contains__(self, order_id: str) -> bool:
+        if order_id in self._recent:
+            return True
+        return any(order_id in f for f in self._filters)
+
+    def __len__(self) -> int:
+        """Number of IDs tracked exactly (the filters are not counted)."""
+        return len(self._recent)
+
+    def __bool__(self) -> bool:
+        # Callers use `registry or set()`; archived IDs must keep it truthy
+        return bool(self._recent) or any(f.count for f in self._filters)
+
+    def __iter__(self):
+        return iter(self._recent)
+
+    def add(self, order_id: str, ts: Optional[float] = None):
+        ts = time.time() if ts is None else ts
+        if order_id in self._recent:
+            return
+        self._recent[order_id] = ts
+        self.prune(ts)
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Move IDs older than the horizon into the filter. Returns how many moved."""
+        now = time.time() if now is None else now
+        cutoff = now - self.horizon_seconds
+        moved = 0
+        while self._recent:
+            order_id = next(iter(self._recent))
+            if self._recent[order_id] > cutoff:
+                break
+            del self._recent[order_id]
+            self._archive(order_id)
+            moved += 1
+        return moved
+
+    def _archive(self, order_id: str):
+        current = self._filters[-1]
+        if current.full:
+            current = self._new_filter()
+            self._filters = [self._filters[-1], current]
+        current.add(order_id)
+
+    # --------------------------------------------------------------------------
+    # Serialization
+    # --------------------------------------------------------------------------
+
+    def to_dict(self) -> Dict:
+        return {
+            '_type': REGISTRY_TYPE,
+            'recent': self._recent,
+            'filters': [f.to_dict() for f in self._filters],
+        }
+
+    def restore(self, data: Any) -> 'OrderRegistry':
+        """
+        Load from `to_dict()` output. A plain list/set (older state files) is
+        imported as recent IDs stamped now, so they age out after the horizon.
+        """
+        if isinstance(data, dict) and data.get('_type') == REGISTRY_TYPE:
+            self._recent = dict(sorted(data.get('recent', {}).items(), key=lambda kv: kv[1]))
+            filters = [BloomFilter.from_dict(f, self.capacity, self.error_rate)
+                       for f in data.get('filters', [])]
+            self._filters = filters[-2:] or [self._new_filter()]
+        elif isinstance(data, (list, set, tuple)):
+            now = time.time()
+            self._recent = {order_id: now for order_id in data}
+        self.prune()
+        return self
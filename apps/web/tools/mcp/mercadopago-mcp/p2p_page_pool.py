@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Browser Page Pool
+=================
+
+Manages the pages of a persistent BrowserContext so a multi-day run
+survives closed tabs, renderer crashes and slow memory growth.
+
+Two kinds of pages:
+- Leased pages: per-site pools (e.g. 'binance', 'mp', 'produbanco') handed
+  out exclusively with `lease(site)` to concurrent workers
+- Pinned pages: one long-lived page per role (e.g. 'orders', 'price') that
+  keeps listeners attached; `heal()` replaces it when it dies and calls the
+  role's `on_replace` callback so the owner can rebind
+
+Health and recycling:
+- Closed or crashed pages are dropped and replaced on demand
+- A page is recycled after `max_navigations` main-frame navigations
+- A page is recycled when its JS heap grows past `max_heap_mb`
+  (checked at most every `heap_check_interval` seconds)
+- `on_page(site, page)` runs for every page the pool opens or is given to
+  pin, including replacements (pages seeded with `add()` are set up by
+  the caller)
+
+Usage:
+    pool = PagePool(context, max_pages={'binance': 2, 'mp': 2},
+                    max_navigations=200, max_heap_mb=300)
+
+    async with pool.lease('mp') as page:
+        await page.goto('https://www.mercadopago.com.ar/home')
+
+    order_page = await pool.pin('orders', on_replace=rebind_feed)
+    await pool.heal()   # Call periodically
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Optional, Dict, Callable, Awaitable
+
+from playwright.async_api import Page, BrowserContext
+
+HEAP_JS = "() => (performance.memory && performance.memory.usedJSHeapSize) || 0"
+
+
+@dataclass
+class PageStats:
+    """Per-page bookkeeping used for health checks."""
+
+    site: str
+    created: float
+    serial: int = 0
+    navigations: int = 0
+    crashed: bool = False
+    heap_mb: float = 0.0
+    heap_checked: float = 0.0
+
+
+class PagePool:
+    """Per-site pool of browser pages with health checks and recycling."""
+
+    def __init__(self, context: BrowserContext, max_pages: Dict[str, int] = None,
+                 default_max: int = 1, max_navigations: int = 0,
+                 max_heap_mb: float = 0, heap_check_interval: float = 60,
+                 on_page: Callable[[str, Page], Awaitable] = None, log: Callable = None):
+        self.context = context
+        self.max_pages = dict(max_pages or {})
+        self.default_max = default_max
+        self.max_navigations = max_navigations  # 0 = unlimited
+        self.max_heap_mb = max_heap_mb          # 0 = unlimited
+        self.heap_check_interval = heap_check_interval
+        self.on_page = on_page  # Setup for each page the pool opens or adopts (e.g. routes)
+        self._log = log
+
+        self._idle: Dict[str, asyncio.Queue] = {}
+        self._count: Dict[str, int] = {}
+        self._stats: Dict[Page, PageStats] = {}
+        self._lock = asyncio.Lock()
+        self._closed = False
+        self._serial = 0
+
+        # Pinned pages
+        self._pinned: Dict[str, Page] = {}
+        self._pin_callbacks: Dict[str, Optional[Callable[[Page], Awaitable]]] = {}
+        self._pin_locks: Dict[str, asyncio.Lock] = {}
+
+        self.counters = {'created': 0, 'replaced_dead': 0, 'recycled': 0}
+
+    def log(self, msg: str, level: str = "DEBUG"):
+        if self._log:
+            self._log(msg, level)
+
+    # --------------------------------------------------------------------------
+    # Tracking and health
+    # --------------------------------------------------------------------------
+
+    def _track(self, site: str, page: Page):
+        if page in self._stats:
+            return
+        self._serial += 1
+        stats = PageStats(site=site, created=time.time(), serial=self._serial)
+        self._stats[page] = stats
+
+        def on_navigated(frame):
+            if frame == page.main_frame:
+                stats.navigations += 1
+
+        def on_crash(_page):
+            stats.crashed = True
+            self.log(f"Page pool: {site} page crashed", "WARN")
+
+        page.on('framenavigated', on_navigated)
+        page.on('crash', on_crash)
+
+    async def _setup(self, site: str, page: Page):
+        if self.on_page:
+            try:
+                await self.on_page(site, page)
+            except Exception as e:
+                self.log(f"Page pool: {site} page setup failed: {e}", "WARN")
+
+    async def _new_page(self, site: str) -> Page:
+        page = await self.context.new_page()
+        try:
+            self._track(site, page)
+            self.counters['created'] += 1
+            await self._setup(site, page)
+        except BaseException:
+            # Cancelled (lease timeout, worker shutdown) mid-setup: don't leak the tab
+            await self._discard(page)
+            raise
+        return page
+
+    def stats(self, page: Page) -> Optional[PageStats]:
+        return self._stats.get(page)
+
+    def label(self, page: Page) -> str:
+        """Short stable name of a tracked page, e.g. 'mp#3' (for logs and traces)."""
+        stats = self._stats.get(page)
+        return f"{stats.site}#{stats.serial}" if stats else 'untracked'
+
+    def is_dead(self, page: Page) -> bool:
+        stats = self._stats.get(page)
+        return page.is_closed() or bool(stats and stats.crashed)
+
+    async def heap_mb(self, page: Page) -> float:
+        """Used JS heap of the page in MB (0 if unavailable)."""
+        try:
+            return (await page.evaluate(HEAP_JS)) / (1024 * 1024)
+        except Exception:
+            return 0.0
+
+    async def recycle_reason(self, page: Page) -> Optional[str]:
+        """Why a healthy page should be replaced, or None."""
+        stats = self._stats.get(page)
+        if not stats:
+            return None
+        if self.max_navigations and stats.navigations >= self.max_navigations:
+            return f"{stats.navigations} navigations"
+        if self.max_heap_mb and time.time() - stats.heap_checked >= self.heap_check_interval:
+            stats.heap_checked = time.time()
+            stats.heap_mb = await self.heap_mb(page)
+            if stats.heap_mb > self.max_heap_mb:
+                return f"JS heap {stats.heap_mb:.0f}MB > {self.max_heap_mb:.0f}MB"
+        return None
+
+    async def _discard(self, page: Page):
+        self._stats.pop(page, None)
+        if not page.is_closed():
+            try:
+                await page.close()
+            except Exception as e:
+                self.log(f"Page pool: error closing page: {e}", "WARN")
+
+    # --------------------------------------------------------------------------
+    # Leased pages
+    # --------------------------------------------------------------------------
+
+    def _queue(self, site: str) -> asyncio.Queue:
+        if site not in self._idle:
+            self._idle[site] = asyncio.Queue()
+            self._count[site] = 0
+        return self._idle[site]
+
+    def limit(self, site: str) -> int:
+        return self.max_pages.get(site, self.default_max)
+
+    def add(self, site: str, page: Page):
+        """Seed the pool with an already open page."""
+        self._track(site, page)
+        self._queue(site).put_nowait(page)
+        self._count[site] += 1
+
+    def size(self, site: str) -> int:
+        """Pages currently owned by the pool for a site (idle + leased)."""
+        return self._count.get(site, 0)
+
+    def idle(self, site: str) -> int:
+        return self._idle[site].qsize() if site in self._idle else 0
+
+    def describe(self) -> str:
+        """Pinned roles and pooled pages per site (open/limit), for startup logs."""
+        sites = sorted(set(self.max_pages) | set(self._count))
+        pooled = ', '.join(f"{site} {self.size(site)}/{self.limit(site)}" for site in sites)
+        pinned = ', '.join(self._pinned) or 'none'
+        return f"{len(self._pinned)} pinned ({pinned}), pooled: {pooled or 'none'}"
+
+    async def _acquire(self, site: str) -> Page:
+        queue = self._queue(site)
+        while True:
+            create = False
+            async with self._lock:
+                if self._closed:
+                    raise RuntimeError("PagePool is closed")
+                if queue.empty() and self._count[site] < self.limit(site):
+                    self._count[site] += 1
+                    create = True
+
+            if create:
+                try:
+                    page = await self._new_page(site)
+                except BaseException:
+                    # Includes CancelledError, or the slot would be lost for good
+                    self._count[site] -= 1
+                    raise
+                self.log(f"Page pool: opened {site} page ({self._count[site]}/{self.limit(site)})")
+                return page
+
+            page = await queue.get()
+            if self.is_dead(page):
+                # Closed or crashed while idle: drop it and try again
+                self._count[site] -= 1
+                self.counters['replaced_dead'] += 1
+                await self._discard(page)
+                continue
+            return page
+
+    async def _release(self, site: str, page: Page):
+        if self._closed or self.is_dead(page):
+            self._count[site] -= 1
+            if not self._closed:
+                self.counters['replaced_dead'] += 1
+            await self._discard(page)
+            return
+
+        reason = await self.recycle_reason(page)
+        if reason:
+            self.log(f"Page pool: recycling {site} page ({reason})", "INFO")
+            self._count[site] -= 1
+            self.counters['recycled'] += 1
+            await self._discard(page)
+            return
+
+        self._idle[site].put_nowait(page)
+
+    @asynccontextmanager
+    async def lease(self, site: str, timeout: Optional[float] = None):
+        """Exclusively lease a page for `site` for the duration of the block."""
+        if timeout is None:
+            page = await self._acquire(site)
+        else:
+            page = await asyncio.wait_for(self._acquire(site), timeout=timeout)
+        try:
+            yield page
+        finally:
+            await self._release(site, page)
+
+    # --------------------------------------------------------------------------
+    # Pinned pages
+    # --------------------------------------------------------------------------
+
+    async def pin(self, role: str, page: Page = None,
+                  on_replace: Callable[[Page], Awaitable] = None) -> Page:
+        """Register a long-lived page for `role` (opened if not given)."""
+        if page is None:
+            page = await self._new_page(role)
+        else:
+            self._track(role, page)
+            await self._setup(role, page)
+        self._pinned[role] = page
+        self._pin_callbacks[role] = on_replace
+        self._pin_locks.setdefault(role, asyncio.Lock())
+        return page
+
+    def get_pinned(self, role: str) -> Optional[Page]:
+        return self._pinned.get(role)
+
+    async def _replace_pinned(self, role: str, reason: str) -> Page:
+        old = self._pinned[role]
+        self.log(f"Page pool: replacing {role} page ({reason})", "WARN")
+        page = await self._new_page(role)
+        self._pinned[role] = page
+        await self._discard(old)
+        callback = self._pin_callbacks.get(role)
+        if callback:
+            try:
+                await callback(page)
+            except Exception as e:
+                self.log(f"Page pool: {role} rebind failed: {e}", "ERROR")
+        return page
+
+    @asynccontextmanager
+    async def pinned(self, role: str):
+        """Use the pinned page exclusively; a dead page is replaced first."""
+        async with self._pin_locks[role]:
+            page = self._pinned[role]
+            if self.is_dead(page):
+                self.counters['replaced_dead'] += 1
+                page = await self._replace_pinned(role, "closed or crashed")
+            yield page
+
+    async def heal(self) -> int:
+        """
+        Replace dead pinned pages and recycle bloated ones.
+        Pinned pages in use are left alone until the next call.
+        Returns the number of pages replaced.
+        """
+        replaced = 0
+        for role in list(self._pinned):
+            lock = self._pin_locks[role]
+            if lock.locked():
+                continue
+            async with lock:
+                page = self._pinned[role]
+                if self.is_dead(page):
+                    self.counters['replaced_dead'] += 1
+                    await self._replace_pinned(role, "closed or crashed")
+                    replaced += 1
+                    continue
+                reason = await self.recycle_reason(page)
+                if reason:
+                    self.counters['recycled'] += 1
+                    await self._replace_pinned(role, reason)
+                    replaced += 1
+        return replaced
+
+    # --------------------------------------------------------------------------
+    # Shutdown
+    # --------------------------------------------------------------------------
+
+    async def close(self, close_pages: bool = True):
+        """Close idle and pinned pages. Leased pages are closed when returned."""
+        self._closed = True
+        for site, queue in self._idle.items():
+            while not queue.empty():
+                page = queue.get_nowait()
+                self._count[site] -= 1
+                if close_pages:
+                    await self._discard(page)
+        if close_pages:
+            for page in self._pinned.values():
+                await self._discard(page)
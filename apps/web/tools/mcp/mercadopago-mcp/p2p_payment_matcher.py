@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Payment Matcher
+===============
+
+Assigns incoming payments to pending SELL orders one-to-one, from a single
+snapshot of movements per cycle, instead of checking each order on its own
+(where two orders of similar amounts could both "find" the same payment).
+
+- Candidates: amount within `tolerance_percent`, payment not older than the
+  verification window (nor much older than the order, when known), and not
+  already consumed
+- Cost: relative amount difference, plus a penalty when the sender name
+  does not resemble the order's counterparty
+- Assignment: maximum one-to-one matching (augmenting paths), each order
+  trying its cheapest candidates first; the most constrained orders pick
+  first
+- Claims: a matched payment stays claimed by its order until the order is
+  released (`consume`) or leaves the pending set, so a later cycle cannot
+  hand it to another order while the release is still running
+
+Usage:
+    matcher = PaymentMatcher(tolerance_percent=1, window_minutes=30)
+    assignments = matcher.match(sell_orders, payments, consumed=consumed_ids)
+    payment = assignments.get(order_id)   # IncomingPayment or None
+    ...
+    matcher.consume(order_id)             # after USDT is released
+"""
+
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Optional, Dict, List, Callable, Iterable, Container
+
+# An order's payment may land a little before the order time (clock skew)
+ORDER_TIME_SLACK = 120
+
+
+@dataclass(frozen=True)
+class IncomingPayment:
+    """A movement that may pay a SELL order."""
+
+    id: str
+    amount: float
+    sender: str = ''
+    ts: float = 0.0     # Epoch seconds, 0 if the source has no timestamps
+
+
+def _tokens(name: str) -> set:
+    normalized = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode()
+    return {t for t in ''.join(c if c.isalnum() else ' ' for c in normalized.lower()).split()
+            if len(t) > 1}
+
+
+def name_similarity(a: str, b: str) -> Optional[float]:
+    """Token overlap of two names in [0, 1]. None if either name is empty."""
+    ta, tb = _tokens(a), _tokens(b)
+    if not ta or not tb:
+        return None
+    return len(ta & tb) / min(len(ta), len(tb))
+
+
+class PaymentMatcher:
+    """One-to-one assignment of incoming payments to pending SELL orders."""
+
+    def __init__(self, tolerance_percent: float = 1, window_minutes: float = 30,
+                 name_weight: float = 0.01, log: Callable = None):
+        self.tolerance = tolerance_percent / 100
+        self.window = window_minutes * 60
+        self.name_weight = name_weight  # Cost of a full name mismatch
+        self._log = log
+        self._claims: Dict[str, str] = {}   # order_id -> payment_id
+
+    def log(self, msg: str, level: str = "DEBUG"):
+        if self._log:
+            self._log(msg, level)
+
+    # --------------------------------------------------------------------------
+    # Scoring
+    # --------------------------------------------------------------------------
+
+    def cost(self, order: Dict, payment: IncomingPayment, now: float) -> Optional[float]:
+        """Cost of paying `order` with `payment`; None if not a candidate."""
+        expected = float(order['amount_fiat'])
+        if expected <= 0:
+            return None
+        diff = abs(payment.amount - expected) / expected
+        if diff > self.tolerance:
+            return None
+
+        if payment.ts:
+            if payment.ts < now - self.window:
+                return None
+            created = order.get('create_time') or 0
+            if created and payment.ts < created - ORDER_TIME_SLACK:
+                return None
+
+        similarity = name_similarity(order.get('counterparty', ''), payment.sender)
+        name_cost = 0.0 if similarity is None else (1 - similarity) * self.name_weight
+        return diff + name_cost
+
+    # --------------------------------------------------------------------------
+    # Assignment
+    # --------------------------------------------------------------------------
+
+    def match(self, orders: Iterable[Dict], payments: Iterable[IncomingPayment],
+              consumed: Container = (), now: float = None) -> Dict[str, IncomingPayment]:
+        """Assign payments to orders. Returns {order_id: payment} for matched orders."""
+        now = now or time.time()
+        orders = list(orders)
+        pending_ids = {o['order_number'] for o in orders}
+        payments = {p.id: p for p in payments if p.id not in consumed}
+
+        # Claims of orders that are no longer pending are void
+        self._claims = {oid: pid for oid, pid in self._claims.items() if oid in pending_ids}
+        claimed_by = {pid: oid for oid, pid in self._claims.items()}
+
+        candidates: Dict[str, List[str]] = {}
+        for order in orders:
+            order_id = order['order_number']
+            held = self._claims.get(order_id)
+            if held in payments and self.cost(order, payments[held], now) is not None:
+                candidates[order_id] = [held]  # Keep what it already holds
+                continue
+            scored = []
+            for payment in payments.values():
+                if claimed_by.get(payment.id, order_id) != order_id:
+                    continue
+                cost = self.cost(order, payment, now)
+                if cost is not None:
+                    scored.append((cost, payment.ts and -payment.ts, payment.id))
+            candidates[order_id] = [pid for _, _, pid in sorted(scored)]
+
+        owner: Dict[str, str] = {}  # payment_id -> order_id
+
+        def assign(order_id: str, seen: set) -> bool:
+            for pid in candidates[order_id]:
+                if pid in seen:
+                    continue
+                seen.add(pid)
+                if pid not in owner or assign(owner[pid], seen):
+                    owner[pid] = order_id
+                    return True
+            return False
+
+        for order_id in sorted(candidates, key=lambda oid: len(candidates[oid])):
+            if candidates[order_id]:
+                assign(order_id, set())
+
+        assignments = {oid: payments[pid] for pid, oid in owner.items()}
+        for order_id, payment in assignments.items():
+            self._claims[order_id] = payment.id
+
+        unmatched = len(orders) - len(assignments)
+        if orders:
+            self.log(f"Payment matcher: {len(assignments)}/{len(orders)} orders matched "
+                     f"from {len(payments)} payments" + (f", {unmatched} waiting" if unmatched else ""))
+        return assignments
+
+    def consume(self, order_id: str) -> Optional[str]:
+        """Drop the order's claim once it is released. Returns the payment id."""
+        return self._claims.pop(order_id, None)
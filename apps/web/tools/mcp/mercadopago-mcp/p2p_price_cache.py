@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Competitor Price Cache
+======================
+
+TTL cache for competitor ad lists / order books, keyed by asset:fiat:trade_type.
+
+- Single-flight: while a fetch for a key is in flight, other callers await
+  the same fetch instead of issuing their own request
+- Stale-while-revalidate: for `stale_seconds` after the TTL, the old value
+  is returned immediately and one background refresh is started
+- Counters: hits, stale_hits, misses, coalesced, refreshes, fetch_errors
+
+Usage:
+    cache = PriceCache(ttl_seconds=30, stale_seconds=60)
+    prices = await cache.get_or_fetch('USDT', 'ARS', 'SELL', fetch)
+    # `fetch` is an async callable returning the value, or None on failure
+"""
+
+import asyncio
+import time
+from typing import Optional, Dict, List, Any, Callable, Awaitable, Set
+
+FetchFn = Callable[[], Awaitable[Optional[Any]]]
+
+
+class PriceCache:
+    """Cache competitor prices with TTL, request coalescing and background refresh."""
+
+    def __init__(self, ttl_seconds: float = 30, stale_seconds: float = 0, log: Callable = None):
+        self.ttl = ttl_seconds
+        self.stale_seconds = stale_seconds  # 0 = never serve stale
+        self._log = log
+        self._cache: Dict[str, tuple] = {}  # key -> (data, timestamp)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._refreshes: Set[asyncio.Task] = set()
+        self._lock = asyncio.Lock()
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'coalesced': 0,
+                      'refreshes': 0, 'fetch_errors': 0}
+
+    def log(self, msg: str, level: str = "DEBUG"):
+        if self._log:
+            self._log(msg, level)
+
+    def _make_key(self, asset: str, fiat: str, trade_type: str) -> str:
+        return f"{asset}:{fiat}:{trade_type}"
+
+    async def get(self, asset: str, fiat: str, trade_type: str) -> Optional[List[Dict]]:
+        """Get cached prices if not expired."""
+        key = self._make_key(asset, fiat, trade_type)
+        async with self._lock:
+            if key in self._cache:
+                data, timestamp = self._cache[key]
+                if time.time() - timestamp < self.ttl:
+                    return data
+        return None
+
+    async def set(self, asset: str, fiat: str, trade_type: str, data: List[Dict]):
+        """Cache prices."""
+        key = self._make_key(asset, fiat, trade_type)
+        async with self._lock:
+            self._cache[key] = (data, time.time())
+
+    def invalidate(self, asset: str = None, fiat: str = None, trade_type: str = None):
+        """Clear cache entries."""
+        if asset and fiat and trade_type:
+            key = self._make_key(asset, fiat, trade_type)
+            self._cache.pop(key, None)
+        else:
+            self._cache.clear()
+
+    # --------------------------------------------------------------------------
+    # Single-flight / stale-while-revalidate
+    # --------------------------------------------------------------------------
+
+    async def _run_fetch(self, key: str, fetch: FetchFn) -> Optional[Any]:
+        try:
+            data = await fetch()
+        except Exception as e:
+            self.stats['fetch_errors'] += 1
+            self.log(f"Price cache: fetch for {key} failed: {e}", "WARN")
+            data = None
+        else:
+            if data is None:
+                self.stats['fetch_errors'] += 1
+            else:
+                async with self._lock:
+                    self._cache[key] = (data, time.time())
+        finally:
+            self._inflight.pop(key, None)
+        return data
+
+    def _start_fetch(self, key: str, fetch: FetchFn) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run_fetch(key, fetch))
+            self._inflight[key] = task
+        return task
+
+    async def get_or_fetch(self, asset: str, fiat: str, trade_type: str,
+                           fetch: FetchFn) -> Optional[Any]:
+        """
+        Return cached prices, fetching at most once per key at a time.
+        Returns None only when nothing usable is cached and the fetch failed.
+        """
+        key = self._make_key(asset, fiat, trade_type)
+        entry = self._cache.get(key)
+        if entry is not None:
+            data, timestamp = entry
+            age = time.time() - timestamp
+            if age < self.ttl:
+                self.stats['hits'] += 1
+                return data
+            if age < self.ttl + self.stale_seconds:
+                self.stats['stale_hits'] += 1
+                if key not in self._inflight:
+                    self.stats['refreshes'] += 1
+                    task = self._start_fetch(key, fetch)
+                    self._refreshes.add(task)  # Keep a reference until done
+                    task.add_done_callback(self._refreshes.discard)
+                return data
+
+        if key in self._inflight:
+            self.stats['coalesced'] += 1
+        else:
+            self.stats['misses'] += 1
+        # Shield so a cancelled caller does not cancel the fetch others await
+        return await asyncio.shield(self._start_fetch(key, fetch))
+
+    async def close(self):
+        """Cancel background refreshes."""
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._inflight.clear()
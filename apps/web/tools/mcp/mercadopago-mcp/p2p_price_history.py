@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+Competitor Price History
+========================
+
+Time series of competitor book snapshots per `asset:fiat:trade_type`, so
+fetched books outlive PRICE_CACHE_TTL and can be replayed for dashboards
+and strategy tuning.
+
+- In memory: one fixed-capacity ring buffer per book, stored as flat
+  `array` columns (timestamps, top-`depth` prices, top-`depth` available),
+  so recording a snapshot is O(1) and memory is bounded by
+  books * capacity rows no matter how long the daemon runs
+- On disk: once `segment_rows` snapshots are pending (or every
+  `flush_interval` seconds) they are written, off the event loop, as one
+  columnar segment per book: a fixed header, then the timestamp column,
+  the price column and the available column, little-endian. Segment file
+  names carry their time range, so a query opens only overlapping segments
+  and reads just the rows it needs (bisect on the timestamp column, then
+  one seek per column)
+- Segments older than `retention_days` are deleted after each flush
+- Books with fewer than `depth` levels are padded with NaN
+
+Segment layout (<book dir>/<first ms>-<last ms>.seg):
+    header   '<4sHHIdd'  magic b'P2PH', version, depth, rows, t_min, t_max
+    ts       rows * float64
+    price    rows * depth * float64   (row-major: row 0 levels 0..depth-1, ...)
+    avail    rows * depth * float32
+
+Usage:
+    history = PriceHistory('/tmp/p2p_price_history', depth=10, capacity=2880)
+    await history.start()
+    history.record('USDT:ARS:SELL', book.levels, book.fetched_at)
+    window = history.query('USDT:ARS:SELL', start=time.time() - 86400)
+    window.best       # Top competitor price per snapshot
+    await history.stop()
+
+    python p2p_price_history.py /tmp/p2p_price_history USDT:ARS:SELL --hours 24
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+MAGIC = b'P2PH'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIdd')
+SEGMENT_SUFFIX = '.seg'
+
+# Column typecodes: prices keep full precision, volumes are fine as float32
+TS_TYPE, PRICE_TYPE, AVAIL_TYPE = 'd', 'd', 'f'
+
+NAN = float('nan')
+
+
+def _little_endian(column: array) -> array:
+    """A copy of `column` in on-disk (little-endian) byte order."""
+    if sys.byteorder == 'little':
+        return column
+    column = array(column.typecode, column)
+    column.byteswap()
+    return column
+
+
+def _read_column(f, typecode: str, count: int) -> array:
+    column = array(typecode)
+    column.fromfile(f, count)
+    if sys.byteorder != 'little':
+        column.byteswap()
+    return column
+
+
+def book_dir(root: str, key: str) -> str:
+    """Directory holding a book's segments ('USDT:ARS:SELL' -> USDT_ARS_SELL)."""
+    return os.path.join(root, key.replace(':', '_').replace(os.sep, '_'))
+
+
+# ==============================================================================
+# SLICES
+# ==============================================================================
+
+@dataclass
+class HistorySlice:
+    """Snapshots of one book in time order, as flat columns."""
+
+    depth: int
+    ts: array
+    price: array
+    available: array
+
+    @classmethod
+    def empty(cls, depth: int) -> 'HistorySlice':
+        return cls(depth, array(TS_TYPE), array(PRICE_TYPE), array(AVAIL_TYPE))
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def level(self, n: int) -> array:
+        """Price of the n-th best competitor per snapshot (NaN if missing)."""
+        return self.price[n::self.depth] if n < self.depth else array(PRICE_TYPE, [NAN] * len(self))
+
+    @property
+    def best(self) -> array:
+        return self.level(0)
+
+    def total_available(self) -> List[float]:
+        """Asset available across the stored levels, per snapshot."""
+        d = self.depth
+        return [sum(a for a in self.available[i * d:(i + 1) * d] if not math.isnan(a))
+                for i in range(len(self))]
+
+    def rows(self) -> Iterator[Tuple[float, Tuple[float, ...], Tuple[float, ...]]]:
+        """(ts, prices, available) per snapshot."""
+        d = self.depth
+        for i, ts in enumerate(self.ts):
+            yield ts, tuple(self.price[i * d:(i + 1) * d]), tuple(self.available[i * d:(i + 1) * d])
+
+    def resized(self, depth: int) -> 'HistorySlice':
+        """Same snapshots with `depth` levels (extra levels dropped, missing ones NaN)."""
+        if depth == self.depth:
+            return self
+        out = HistorySlice.empty(depth)
+        out.ts.extend(self.ts)
+        keep = min(depth, self.depth)
+        pad_price = array(PRICE_TYPE, [NAN] * (depth - keep))
+        pad_avail = array(AVAIL_TYPE, [NAN] * (depth - keep))
+        for i in range(len(self)):
+            row = i * self.depth
+            out.price.extend(self.price[row:row + keep])
+            out.price.extend(pad_price)
+            out.available.extend(self.available[row:row + keep])
+            out.available.extend(pad_avail)
+        return out
+
+    def extend(self, other: 'HistorySlice'):
+        other = other.resized(self.depth)
+        self.ts.extend(other.ts)
+        self.price.extend(other.price)
+        self.available.extend(other.available)
+
+
+# ==============================================================================
+# RING BUFFER
+# ==============================================================================
+
+class RingBuffer:
+    """Fixed-capacity snapshot buffer for one book; the oldest row is overwritten."""
+
+    def __init__(self, capacity: int, depth: int):
+        self.capacity = capacity
+        self.depth = depth
+        self.ts = array(TS_TYPE, bytes(8 * capacity))
+        self.price = array(PRICE_TYPE, [NAN]) * (capacity * depth)
+        self.available = array(AVAIL_TYPE, [NAN]) * (capacity * depth)
+        self.start = 0        # Physical index of the oldest row
+        self.size = 0
+        self.pending = 0      # Newest rows not yet written to a segment
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _slot(self, i: int) -> int:
+        return (self.start + i) % self.capacity
+
+    @property
+    def last_ts(self) -> Optional[float]:
+        return self.ts[self._slot(self.size - 1)] if self.size else None
+
+    @property
+    def first_ts(self) -> Optional[float]:
+        return self.ts[self.start] if self.size else None
+
+    def append(self, ts: float, prices: Sequence[float], available: Sequence[float]) -> bool:
+        """Add a snapshot. False if an unflushed row had to be overwritten."""
+        kept = True
+        if self.size < self.capacity:
+            slot = self._slot(self.size)
+            self.size += 1
+        else:
+            slot = self.start
+            self.start = (self.start + 1) % self.capacity
+            kept = self.pending < self.capacity
+        self.pending = min(self.pending + 1, self.capacity)
+
+        self.ts[slot] = ts
+        d = self.depth
+        base = slot * d
+        for n in range(d):
+            self.price[base + n] = prices[n] if n < len(prices) else NAN
+            self.available[base + n] = available[n] if n < len(available) else NAN
+        return kept
+
+    def _bisect(self, ts: float, right: bool = False) -> int:
+        """Logical index of the first row with timestamp >= ts (> ts if right)."""
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = self.ts[self._slot(mid)]
+            if value < ts or (right and value == ts):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def slice(self, lo: int, hi: int) -> HistorySlice:
+        """Logical rows [lo, hi) copied into a HistorySlice."""
+        out = HistorySlice.empty(self.depth)
+        if lo >= hi:
+            return out
+        d = self.depth
+        first, last = self._slot(lo), self._slot(hi - 1)
+        spans = [(first, last + 1)] if first <= last else [(first, self.capacity), (0, last + 1)]
+        for a, b in spans:
+            out.ts.extend(self.ts[a:b])
+            out.price.extend(self.price[a * d:b * d])
+            out.available.extend(self.available[a * d:b * d])
+        return out
+
+    def range(self, start: float, end: float) -> HistorySlice:
+        return self.slice(self._bisect(start), self._bisect(end, right=True))
+
+    def take_pending(self) -> HistorySlice:
+        """The rows not yet on disk; they count as flushed afterwards."""
+        rows = self.slice(self.size - self.pending, self.size)
+        self.pending = 0
+        return rows
+
+
+# ==============================================================================
+# SEGMENTS
+# ==============================================================================
+
+@dataclass(frozen=True)
+class Segment:
+    """One on-disk segment, known from its file name."""
+
+    t_min: float
+    t_max: float
+    path: str
+
+    @classmethod
+    def from_path(cls, path: str) -> Optional['Segment']:
+        name = os.path.basename(path)
+        if not name.endswith(SEGMENT_SUFFIX):
+            return None
+        try:
+            first, last = name[:-len(SEGMENT_SUFFIX)].split('-')[:2]
+            return cls(int(first) / 1000, int(last) / 1000, path)
+        except ValueError:
+            return None
+
+    def overlaps(self, start: float, end: float) -> bool:
+        # Names are truncated to the millisecond
+        return self.t_max + 0.001 >= start and self.t_min <= end
+
+
+def write_segment(directory: str, rows: HistorySlice) -> Tuple[Segment, int]:
+    """Write rows as a segment (atomically). Returns the segment and its size in bytes."""
+    os.makedirs(directory, exist_ok=True)
+    t_min, t_max = rows.ts[0], rows.ts[-1]
+    stem = f"{int(t_min * 1000):013d}-{int(t_max * 1000):013d}"
+    path = os.path.join(directory, stem + SEGMENT_SUFFIX)
+    n = 1
+    while os.path.exists(path):
+        path = os.path.join(directory, f"{stem}-{n}{SEGMENT_SUFFIX}")
+        n += 1
+
+    temp_file = path + '.tmp'
+    with open(temp_file, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, rows.depth, len(rows), t_min, t_max))
+        for column in (rows.ts, rows.price, rows.available):
+            _little_endian(column).tofile(f)
+    os.replace(temp_file, path)  # Atomic on POSIX
+    return Segment(t_min, t_max, path), os.path.getsize(path)
+
+
+def read_segment(path: str, start: float = -math.inf, end: float = math.inf) -> HistorySlice:
+    """Rows of a segment with start <= ts <= end; only those rows are read."""
+    with open(path, 'rb') as f:
+        magic, version, depth, count, _, _ = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a price history segment")
+        ts = _read_column(f, TS_TYPE, count)
+        lo, hi = bisect_left(ts, start), bisect_right(ts, end)
+        out = HistorySlice.empty(depth)
+        if lo >= hi:
+            return out
+        out.ts = ts[lo:hi]
+        price_at = HEADER.size + count * ts.itemsize
+        avail_at = price_at + count * depth * out.price.itemsize
+        f.seek(price_at + lo * depth * out.price.itemsize)
+        out.price = _read_column(f, PRICE_TYPE, (hi - lo) * depth)
+        f.seek(avail_at + lo * depth * out.available.itemsize)
+        out.available = _read_column(f, AVAIL_TYPE, (hi - lo) * depth)
+        return out
+
+
+# ==============================================================================
+# STORE
+# ==============================================================================
+
+class PriceHistory:
+    """Per-book ring buffers flushed to columnar segments under `directory`."""
+
+    def __init__(self, directory: str, depth: int = 10, capacity: int = 2880,
+                 segment_rows: int = 720, flush_interval: float = 300,
+                 retention_days: float = 30, log: Callable = None):
+        self.directory = directory
+        self.depth = depth
+        self.segment_rows = segment_rows
+        self.capacity = max(capacity, segment_rows)
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self._log = log
+
+        self._buffers: Dict[str, RingBuffer] = {}
+        self._segments: Dict[str, List[Segment]] = {}  # Sorted by t_min, loaded lazily
+        self._flush_due = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats = {
+            'books': 0, 'recorded': 0, 'dropped': 0, 'flushed_rows': 0,
+            'segments_written': 0, 'segments_deleted': 0, 'bytes_written': 0,
+            'queries': 0, 'errors': 0,
+        }
+
+    def log(self, msg: str, level: str = "DEBUG"):
+        if self._log:
+            self._log(msg, level)
+
+    async def start(self):
+        """Start the background flush loop."""
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flush loop and write what is still pending."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    # --------------------------------------------------------------------------
+    # Recording
+    # --------------------------------------------------------------------------
+
+    def record(self, key: str, levels: List[Dict], ts: float = None):
+        """Add a book snapshot (OrderBook.levels, best price first)."""
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = RingBuffer(self.capacity, self.depth)
+            self.stats['books'] = len(self._buffers)
+        ts = time.time() if ts is None else ts
+        if buffer.size and ts < buffer.last_ts:
+            ts = buffer.last_ts  # Keep each book's timestamps sorted
+        head = levels[:self.depth]
+        if not buffer.append(ts, [level['price'] for level in head],
+                             [level.get('available', NAN) for level in head]):
+            self.stats['dropped'] += 1
+        self.stats['recorded'] += 1
+        if buffer.pending >= self.segment_rows:
+            self._flush_due.set()
+
+    @property
+    def keys(self) -> List[str]:
+        """Books in memory or on disk."""
+        on_disk = []
+        if os.path.isdir(self.directory):
+            on_disk = [name.replace('_', ':') for name in os.listdir(self.directory)
+                       if os.path.isdir(os.path.join(self.directory, name))]
+        return sorted(set(self._buffers) | set(on_disk))
+
+    # --------------------------------------------------------------------------
+    # Flushing
+    # --------------------------------------------------------------------------
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_due.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def flush(self):
+        """Write pending rows of every book as segments and apply retention."""
+        async with self._flush_lock:
+            self._flush_due.clear()
+            batches = [(key, buffer.take_pending()) for key, buffer in self._buffers.items()
+                       if buffer.pending]
+            if batches or self.retention_days:
+                await asyncio.to_thread(self._write, batches)
+
+    def _write(self, batches: List[Tuple[str, HistorySlice]]):
+        for key, rows in batches:
+            segments = self._segments_for(key)  # Index existing files before adding one
+            try:
+                segment, size = write_segment(book_dir(self.directory, key), rows)
+            except OSError as e:
+                self.stats['errors'] += 1
+                self.log(f"Price history: could not write {key}: {e}", "ERROR")
+                continue
+            segments.append(segment)
+            segments.sort(key=lambda s: s.t_min)
+            self.stats['segments_written'] += 1
+            self.stats['flushed_rows'] += len(rows)
+            self.stats['bytes_written'] += size
+        if self.retention_days:
+            self._apply_retention(time.time() - self.retention_days * 86400)
+
+    def _apply_retention(self, cutoff: float):
+        for key in self.keys:
+            segments = self._segments_for(key)
+            for segment in [s for s in segments if s.t_max < cutoff]:
+                try:
+                    os.remove(segment.path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    self.stats['errors'] += 1
+                    self.log(f"Price history: could not delete {segment.path}: {e}", "WARN")
+                    continue
+                segments.remove(segment)
+                self.stats['segments_deleted'] += 1
+
+    def _segments_for(self, key: str) -> List[Segment]:
+        if key not in self._segments:
+            directory = book_dir(self.directory, key)
+            names = os.listdir(directory) if os.path.isdir(directory) else []
+            found = (Segment.from_path(os.path.join(directory, name)) for name in names)
+            self._segments[key] = sorted((s for s in found if s), key=lambda s: s.t_min)
+        return self._segments[key]
+
+    # --------------------------------------------------------------------------
+    # Queries
+    # --------------------------------------------------------------------------
+
+    def query(self, key: str, start: float = -math.inf, end: float = math.inf) -> HistorySlice:
+        """Snapshots of a book with start <= ts <= end, oldest first."""
+        self.stats['queries'] += 1
+        buffer = self._buffers.get(key)
+        # Rows still in memory come from the buffer; only older ones are read from disk
+        disk_end = end
+        if buffer is not None and buffer.size:
+            disk_end = min(end, math.nextafter(buffer.first_ts, -math.inf))
+
+        out = HistorySlice.empty(self.depth)
+        if start <= disk_end:
+            for segment in self._segments_for(key):
+                if not segment.overlaps(start, disk_end):
+                    continue
+                try:
+                    out.extend(read_segment(segment.path, start, disk_end))
+                except (OSError, ValueError, EOFError) as e:
+                    self.stats['errors'] += 1
+                    self.log(f"Price history: skipping {segment.path}: {e}", "WARN")
+        if buffer is not None:
+            out.extend(buffer.range(start, end))
+        return out
+
+    async def query_async(self, key: str, start: float = -math.inf,
+                          end: float = math.inf) -> HistorySlice:
+        """query() without blocking the event loop on disk reads."""
+        return await asyncio.to_thread(self.query, key, start, end)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Competitor price history from P2P book snapshots")
+    parser.add_argument("directory", help="price_history.dir of the daemon")
+    parser.add_argument("key", nargs='?', help="Book, e.g. USDT:ARS:SELL (omit to list books)")
+    parser.add_argument("--hours", type=float, default=24, help="Only the last N hours (0 = all)")
+    parser.add_argument("--levels", type=int, default=1, help="Price levels per row")
+    args = parser.parse_args()
+
+    history = PriceHistory(args.directory, retention_days=0)
+    if not args.key:
+        print('\n'.join(history.keys))
+        sys.exit(0)
+
+    since = time.time() - args.hours * 3600 if args.hours else -math.inf
+    window = history.query(args.key, start=since)
+    columns = [window.level(n) for n in range(args.levels)]
+    available = window.total_available()
+    print("timestamp," + ','.join(f"price_{n}" for n in range(args.levels)) + ",available")
+    for i, ts in enumerate(window.ts):
+        prices = ','.join('' if math.isnan(c[i]) else f"{c[i]:g}" for c in columns)
+        print(f"{ts:.3f},{prices},{available[i]:g}")
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Order-Book Pricing Engine
+=========================
+
+Prices an ad from a competitor book held as columns (price, available,
+min, max) instead of a list of dicts, so a whole multi-ad book is priced
+in microseconds on every refresh.
+
+- Limit filter: only competitors whose per-trade limits overlap our ad's
+  `min_amount`/`max_amount` count. A level's capacity (in fiat) is
+  min(max, available * price), so an ad that cannot fill our size is
+  ignored
+- Outlier rejection: prices far from the median (modified z-score over the
+  median absolute deviation, Iglewicz-Hoaglin) are dropped, e.g. bait ads
+- Strategies: `top1`, `undercut`, `top3_avg` (as before), plus
+    `vwap`        capacity-weighted average of the first `depth_levels`
+    `depth`       price at which cumulative capacity reaches `depth_amount`
+                  (our max_amount by default): the queue we have to beat
+    `percentile`  the price `percentile`% of the way down the book
+                  (0 = best, 100 = worst fillable level)
+- NumPy when installed; otherwise the same math in plain Python
+
+Usage:
+    engine = PricingEngine()
+    book = BookArrays.from_levels(order_book.levels)
+    price = engine.price(book, PricingParams(strategy='vwap', margin=0.5,
+                                             min_amount=5000, max_amount=500000))
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised where NumPy is missing
+    np = None
+
+STRATEGIES = ('top1', 'undercut', 'top3_avg', 'vwap', 'depth', 'percentile')
+
+# Modified z-score above which a price is an outlier (Iglewicz-Hoaglin)
+OUTLIER_Z = 3.5
+MIN_LEVELS_FOR_OUTLIERS = 4
+
+
+@dataclass(frozen=True)
+class PricingParams:
+    """How to price one ad against a book."""
+
+    strategy: str = 'top1'
+    margin: float = 0.5
+    undercut_step: float = 0.01
+    min_amount: float = 0.0            # Our ad's limits (fiat)
+    max_amount: float = math.inf
+    depth_levels: int = 5              # vwap: levels averaged
+    depth_amount: Optional[float] = None  # depth: fiat to cover (default max_amount)
+    percentile: float = 25.0           # percentile: 0 = best price, 100 = worst
+    outlier_z: Optional[float] = OUTLIER_Z  # None = keep outliers
+    min_price: float = 0.0
+    max_price: float = math.inf
+    decimals: int = 2
+
+
+class BookArrays:
+    """Column view of competitor levels (best price first)."""
+
+    def __init__(self, price: Sequence[float], available: Sequence[float],
+                 min_amount: Sequence[float], max_amount: Sequence[float]):
+        if np is not None:
+            self.price = np.asarray(price, dtype=float)
+            available = np.asarray(available, dtype=float)
+            self.min = np.asarray(min_amount, dtype=float)
+            self.capacity = np.minimum(np.asarray(max_amount, dtype=float), available * self.price)
+        else:
+            self.price = [float(p) for p in price]
+            self.min = [float(m) for m in min_amount]
+            self.capacity = [min(float(mx), float(a) * p)
+                             for mx, a, p in zip(max_amount, available, self.price)]
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    @classmethod
+    def from_levels(cls, levels: List[Dict]) -> 'BookArrays':
+        """From OrderBook.levels; levels without limits are treated as unlimited."""
+        return cls(
+            [level['price'] for level in levels],
+            [level.get('available', math.inf) for level in levels],
+            [level.get('min', 0.0) for level in levels],
+            [level.get('max', math.inf) for level in levels],
+        )
+
+
+class PricingEngine:
+    """Evaluates pricing strategies over BookArrays (NumPy or pure Python)."""
+
+    def __init__(self, use_numpy: bool = True):
+        self.use_numpy = use_numpy and np is not None
+        self.stats = {'priced': 0, 'no_fillable': 0, 'outliers_dropped': 0}
+
+    @property
+    def backend(self) -> str:
+        return 'numpy' if self.use_numpy else 'python'
+
+    def price(self, book: BookArrays, params: PricingParams) -> Optional[float]:
+        """Optimal price for the ad, or None if no competitor can trade our size."""
+        if params.strategy not in STRATEGIES or not len(book):
+            return None
+        if self.use_numpy and isinstance(book.price, np.ndarray):
+            prices, capacity = self._filter_numpy(book, params)
+        else:
+            prices, capacity = self._filter_python(book, params)
+        if not len(prices):
+            self.stats['no_fillable'] += 1
+            return None
+
+        reference = self._reference(prices, capacity, params)
+        if params.strategy in ('top1', 'vwap', 'depth', 'percentile'):
+            reference -= params.margin
+        elif params.strategy == 'undercut':
+            reference -= params.undercut_step
+
+        self.stats['priced'] += 1
+        return round(max(params.min_price, min(params.max_price, float(reference))), params.decimals)
+
+    # --------------------------------------------------------------------------
+    # Filters
+    # --------------------------------------------------------------------------
+
+    def _filter_numpy(self, book: BookArrays, params: PricingParams):
+        fillable = (book.capacity >= params.min_amount) & (book.min <= params.max_amount)
+        prices, capacity = book.price[fillable], book.capacity[fillable]
+        if params.outlier_z is not None and len(prices) >= MIN_LEVELS_FOR_OUTLIERS:
+            median = np.median(prices)
+            mad = np.median(np.abs(prices - median))
+            if mad > 0:
+                keep = 0.6745 * np.abs(prices - median) / mad <= params.outlier_z
+                self.stats['outliers_dropped'] += int(len(prices) - keep.sum())
+                prices, capacity = prices[keep], capacity[keep]
+        return prices, capacity
+
+    def _filter_python(self, book: BookArrays, params: PricingParams):
+        rows = [(p, c) for p, c, m in zip(book.price, book.capacity, book.min)
+                if c >= params.min_amount and m <= params.max_amount]
+        if params.outlier_z is not None and len(rows) >= MIN_LEVELS_FOR_OUTLIERS:
+            median = _median([p for p, _ in rows])
+            mad = _median([abs(p - median) for p, _ in rows])
+            if mad > 0:
+                kept = [(p, c) for p, c in rows if 0.6745 * abs(p - median) / mad <= params.outlier_z]
+                self.stats['outliers_dropped'] += len(rows) - len(kept)
+                rows = kept
+        return [p for p, _ in rows], [c for _, c in rows]
+
+    # --------------------------------------------------------------------------
+    # Strategies
+    # --------------------------------------------------------------------------
+
+    def _reference(self, prices, capacity, params: PricingParams) -> float:
+        strategy = params.strategy
+        total = np.sum if self.use_numpy else sum
+        if strategy in ('top1', 'undercut'):
+            return prices[0]
+        if strategy == 'top3_avg':
+            top3 = prices[:3]
+            return total(top3) / len(top3)
+        if strategy == 'vwap':
+            n = max(1, params.depth_levels)
+            head, weights = prices[:n], capacity[:n]
+            weight = total(weights)
+            if weight <= 0 or math.isinf(weight):
+                return total(head) / len(head)
+            if self.use_numpy:
+                return float(np.dot(head, weights) / weight)
+            return sum(p * w for p, w in zip(head, weights)) / weight
+        if strategy == 'depth':
+            target = params.depth_amount if params.depth_amount is not None else params.max_amount
+            if self.use_numpy:
+                reached = np.flatnonzero(np.cumsum(capacity) >= target)
+                return prices[reached[0]] if len(reached) else prices[-1]
+            cumulative = 0.0
+            for p, c in zip(prices, capacity):
+                cumulative += c
+                if cumulative >= target:
+                    return p
+            return prices[-1]
+        # percentile: interpolated along the book, best price first
+        return _percentile(prices, params.percentile, presorted=True)
+
+
+def _median(values: List[float]) -> float:
+    return _percentile(sorted(values), 50.0, presorted=True)
+
+
+def _percentile(values: List[float], q: float, presorted: bool = False) -> float:
+    ordered = values if presorted else sorted(values)
+    rank = (len(ordered) - 1) * min(100.0, max(0.0, q)) / 100
+    low = int(math.floor(rank))
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Transfer Rate Limiter
+=====================
+
+Caps how many transfers go out per minute/hour and how much money per day,
+so a bug or a hijacked page cannot drain the account.
+
+- Sliding windows are deques of timestamps in arrival order; expired entries
+  are popped from the left, so each check is amortized O(1)
+- `mode='token_bucket'` replaces the per-minute window with a bucket of
+  `burst` tokens refilled at `max_per_minute`/min, allowing short bursts
+  while keeping the same average rate (the hourly and daily caps still apply)
+- Concurrent workers reserve() a slot before transferring and commit() or
+  cancel() it afterwards, so limits hold between check and record
+- With `path` set, the hour window, token bucket and daily amount are saved
+  after every recorded transfer and reloaded on startup, so a crash-looping
+  daemon cannot reset its daily limit
+
+Usage:
+    limiter = TransferRateLimiter(max_per_minute=3, max_per_hour=20,
+                                  max_daily_amount=50_000_000,
+                                  path='/var/lib/p2p/rate_limit.json')
+    allowed, reason = await limiter.reserve(amount)
+    ...
+    await limiter.commit(amount)   # or cancel(amount) on failure
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional, Dict, Callable, Iterable
+
+import aiofiles
+
+MINUTE = 60
+HOUR = 3600
+
+WINDOW = 'window'
+TOKEN_BUCKET = 'token_bucket'
+
+
+class TransferRateLimiter:
+    """Rate limiter to prevent runaway transfers."""
+
+    def __init__(self, max_per_minute: int = 3, max_per_hour: int = 20,
+                 max_daily_amount: float = 10000, mode: str = WINDOW,
+                 burst: Optional[int] = None, path: Optional[str] = None,
+                 log: Callable = None):
+        if mode not in (WINDOW, TOKEN_BUCKET):
+            raise ValueError(f"Unknown rate limit mode: {mode}")
+        self.max_per_minute = max_per_minute
+        self.max_per_hour = max_per_hour
+        self.max_daily_amount = max_daily_amount
+        self.mode = mode
+        self.burst = burst or max_per_minute
+        self.path = path
+        self._log = log
+
+        self._minute: deque = deque()
+        self._hour: deque = deque()
+        self._daily_amount: float = 0
+        self._daily_date: str = datetime.now().strftime("%Y-%m-%d")
+
+        # Token bucket (only used in token_bucket mode)
+        self._tokens: float = float(self.burst)
+        self._tokens_at: float = time.time()
+
+        # In-flight reservations (concurrent workers)
+        self._reserved_count: int = 0
+        self._reserved_amount: float = 0
+        self._lock = asyncio.Lock()
+
+        if path:
+            self._load()
+
+    def log(self, msg: str, level: str = "DEBUG"):
+        if self._log:
+            self._log(msg, level)
+
+    # Windows are exposed as assignable attributes so callers can seed them
+    @property
+    def _minute_window(self) -> deque:
+        return self._minute
+
+    @_minute_window.setter
+    def _minute_window(self, timestamps: Iterable[float]):
+        self._minute = deque(sorted(timestamps))
+
+    @property
+    def _hour_window(self) -> deque:
+        return self._hour
+
+    @_hour_window.setter
+    def _hour_window(self, timestamps: Iterable[float]):
+        self._hour = deque(sorted(timestamps))
+
+    # --------------------------------------------------------------------------
+    # Limits
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def _evict(window: deque, now: float, span: float):
+        while window and now - window[0] >= span:
+            window.popleft()
+
+    def _refill(self, now: float):
+        elapsed = max(0.0, now - self._tokens_at)
+        self._tokens = min(float(self.burst), self._tokens + elapsed * self.max_per_minute / MINUTE)
+        self._tokens_at = now
+
+    def _check(self, amount: float) -> tuple:
+        """Evaluate limits including in-flight reservations. Caller holds the lock."""
+        now = time.time()
+        today = datetime.now().strftime("%Y-%m-%d")
+
+        # Reset daily if new day
+        if today != self._daily_date:
+            self._daily_date = today
+            self._daily_amount = 0
+
+        self._evict(self._hour, now, HOUR)
+
+        if self.mode == TOKEN_BUCKET:
+            self._refill(now)
+            if self._tokens - self._reserved_count < 1:
+                return (False, f"Rate limit: burst of {self.burst} used, refills {self.max_per_minute}/min")
+        else:
+            self._evict(self._minute, now, MINUTE)
+            if len(self._minute) + self._reserved_count >= self.max_per_minute:
+                return (False, f"Rate limit: max {self.max_per_minute}/min exceeded")
+
+        if len(self._hour) + self._reserved_count >= self.max_per_hour:
+            return (False, f"Rate limit: max {self.max_per_hour}/hour exceeded")
+
+        if self._daily_amount + self._reserved_amount + amount > self.max_daily_amount:
+            return (False, f"Daily limit ${self.max_daily_amount:,.2f} exceeded")
+
+        return (True, "")
+
+    async def can_transfer(self, amount: float) -> tuple:
+        """Check if transfer is allowed. Returns (allowed, reason)."""
+        async with self._lock:
+            return self._check(amount)
+
+    async def reserve(self, amount: float) -> tuple:
+        """
+        Atomically check limits and hold a slot for an in-flight transfer.
+        Must be followed by commit() on success or cancel() on failure.
+        """
+        async with self._lock:
+            allowed, reason = self._check(amount)
+            if allowed:
+                self._reserved_count += 1
+                self._reserved_amount += amount
+            return (allowed, reason)
+
+    def _unreserve(self, amount: float):
+        self._reserved_count = max(0, self._reserved_count - 1)
+        self._reserved_amount = max(0, self._reserved_amount - amount)
+
+    async def commit(self, amount: float):
+        """Turn a reservation into a recorded transfer."""
+        async with self._lock:
+            self._unreserve(amount)
+        await self.record_transfer(amount)
+
+    async def cancel(self, amount: float):
+        """Release a reservation without recording a transfer."""
+        async with self._lock:
+            self._unreserve(amount)
+
+    async def record_transfer(self, amount: float):
+        """Record a successful transfer."""
+        async with self._lock:
+            now = time.time()
+            self._minute.append(now)
+            self._hour.append(now)
+            self._daily_amount += amount
+            if self.mode == TOKEN_BUCKET:
+                self._refill(now)
+                self._tokens -= 1
+            if self.path:
+                await self._save()
+
+    # --------------------------------------------------------------------------
+    # Persistence
+    # --------------------------------------------------------------------------
+
+    def _snapshot(self) -> Dict:
+        return {
+            'daily_date': self._daily_date,
+            'daily_amount': self._daily_amount,
+            'transfers': list(self._hour),
+            'tokens': self._tokens,
+            'tokens_at': self._tokens_at,
+        }
+
+    def _load(self):
+        """Restore windows and the daily amount from `path`."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self.log(f"Rate limiter: could not load {self.path}: {e}", "WARN")
+            return
+
+        now = time.time()
+        if data.get('daily_date') == self._daily_date:
+            self._daily_amount = float(data.get('daily_amount', 0))
+        self._hour_window = [t for t in data.get('transfers', []) if now - t < HOUR]
+        self._minute_window = [t for t in self._hour if now - t < MINUTE]
+        if 'tokens' in data:
+            self._tokens = float(data['tokens'])
+            self._tokens_at = float(data.get('tokens_at', now))
+            self._refill(now)
+        self.log(f"Rate limiter: restored {len(self._hour)} transfers in last hour, "
+                 f"daily amount {self._daily_amount:,.2f}", "INFO")
+
+    async def _save(self):
+        """Write state atomically. Caller holds the lock."""
+        try:
+            temp_file = f"{self.path}.tmp"
+            async with aiofiles.open(temp_file, 'w') as f:
+                await f.write(json.dumps(self._snapshot()))
+                await f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self.path)  # Atomic on POSIX
+        except OSError as e:
+            self.log(f"Rate limiter: could not save {self.path}: {e}", "ERROR")
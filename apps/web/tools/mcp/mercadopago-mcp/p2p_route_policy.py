@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Request Routing Policy
+======================
+
+Aborts requests the automation never needs (images, fonts, video, analytics
+beacons, chat widgets, marketing iframes) on daemon pages, so pages load
+faster and the long-running Chromium holds less memory.
+
+- Rules per site ('binance', 'mp', 'produbanco'): resource types and URL
+  patterns to block, plus an allow-list that wins over both (e.g. the MP
+  QR image a human has to scan, login captchas)
+- URL patterns are shell-style globs matched against the lowercased URL
+  and compiled into one regex per list
+- Installed per page with `page.route`, so markets sharing one browser keep
+  their own rules; pages that must render in full can opt out per site
+- Counters: requests seen, blocked (by type / by URL), allowed by the
+  allow-list, and an estimate of the bytes not downloaded (an aborted
+  request has no response, so each resource type counts a typical size)
+
+Note: routing a page turns off Chromium's HTTP cache for it, so scripts and
+stylesheets are fetched again on each navigation. Blocking images and fonts
+more than pays for that on these sites; set `enabled: false` to compare.
+
+Config (`route_policy`, every key optional):
+    {
+        "enabled": true,
+        "block_types": ["image", "media", "font"],
+        "block_urls": ["*hotjar*"],          # added to the defaults
+        "allow_urls": ["*/2fa/*"],           # added to the defaults
+        "sites": {
+            "mp": {"allow_urls": ["*qr*"]},
+            "produbanco": {"block_types": []}
+        }
+    }
+
+Usage:
+    policy = RoutePolicy.from_config(config.get('route_policy', {}), log=self.log)
+    await policy.install(page, 'mp')
+"""
+
+import fnmatch
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, Iterable, Optional, Tuple
+
+from playwright.async_api import Page, Request, Route
+
+DEFAULT_BLOCK_TYPES = ('image', 'media', 'font')
+
+# Analytics, tag managers, session recording, chat and ad networks
+DEFAULT_BLOCK_URLS = (
+    '*google-analytics.com/*', '*googletagmanager.com/*', '*doubleclick.net/*',
+    '*googleadservices.com/*', '*facebook.net/*', '*facebook.com/tr*',
+    '*connect.facebook.*', '*hotjar.com/*', '*clarity.ms/*', '*bat.bing.com/*',
+    '*analytics.tiktok.com/*', '*sentry.io/*', '*newrelic.com/*', '*nr-data.net/*',
+    '*zendesk.com/*', '*zdassets.com/*', '*intercom.io/*', '*intercomcdn.com/*',
+    '*livechatinc.com/*', '*onetrust.com/*', '*cookielaw.org/*',
+)
+
+# Screens a human has to see: login captchas everywhere
+DEFAULT_ALLOW_URLS = ('*captcha*',)
+
+# Per-site defaults, merged under the config's `sites`
+DEFAULT_SITES: Dict[str, Dict] = {
+    # The transfer may stop on a QR the user scans with the MP app
+    'mp': {'allow_urls': ['*qr*']},
+    # Produnet login shows a security image; only trackers are dropped
+    'produbanco': {'block_types': []},
+}
+
+# Typical transfer size per resource type, for the blocked-bytes estimate
+TYPICAL_BYTES = {
+    'image': 30_000, 'media': 500_000, 'font': 50_000, 'script': 60_000,
+    'stylesheet': 30_000, 'document': 50_000, 'xhr': 2_000, 'fetch': 2_000,
+    'ping': 500, 'beacon': 500,
+}
+DEFAULT_TYPICAL_BYTES = 10_000
+
+
+def compile_globs(patterns: Iterable[str]) -> Optional[re.Pattern]:
+    """One regex for a list of shell-style URL globs (None if empty)."""
+    patterns = [p.lower() for p in patterns if p]
+    if not patterns:
+        return None
+    return re.compile('|'.join(f'(?:{fnmatch.translate(p)})' for p in patterns))
+
+
+@dataclass
+class SiteRules:
+    """What to block on one site's pages."""
+
+    block_types: FrozenSet[str] = frozenset()
+    block_urls: Tuple[str, ...] = ()
+    allow_urls: Tuple[str, ...] = ()
+    enabled: bool = True
+    _block_re: Optional[re.Pattern] = field(default=None, init=False, repr=False)
+    _allow_re: Optional[re.Pattern] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self._block_re = compile_globs(self.block_urls)
+        self._allow_re = compile_globs(self.allow_urls)
+
+    def decide(self, url: str, resource_type: str) -> Optional[str]:
+        """'type' or 'url' if the request should be blocked, 'allow' if allow-listed, else None."""
+        url = url.lower()
+        if resource_type in self.block_types:
+            reason = 'type'
+        elif self._block_re and self._block_re.match(url):
+            reason = 'url'
+        else:
+            return None
+        if self._allow_re and self._allow_re.match(url):
+            return 'allow'
+        return reason
+
+
+class RoutePolicy:
+    """Per-site request blocking installed on pages with `page.route`."""
+
+    def __init__(self, sites: Dict[str, SiteRules] = None, default: SiteRules = None,
+                 typical_bytes: Dict[str, int] = None, log: Callable = None):
+        self.sites = dict(sites or {})
+        self.default = default or SiteRules()
+        self.typical_bytes = {**TYPICAL_BYTES, **(typical_bytes or {})}
+        self._log = log
+        self.stats = {'requests': 0, 'blocked': 0, 'blocked_bytes': 0,
+                      'allow_listed': 0, 'errors': 0, 'pages': 0}
+        # (site, reason) -> requests, site -> estimated bytes
+        self.blocked_by_site: Dict[Tuple[str, str], int] = {}
+        self.bytes_by_site: Dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict, log: Callable = None) -> 'RoutePolicy':
+        """Build the rules from a `route_policy` config section on top of the defaults."""
+        enabled = config.get('enabled', True)
+        block_types = config.get('block_types', DEFAULT_BLOCK_TYPES)
+        block_urls = tuple(DEFAULT_BLOCK_URLS) + tuple(config.get('block_urls', ()))
+        allow_urls = tuple(DEFAULT_ALLOW_URLS) + tuple(config.get('allow_urls', ()))
+
+        def rules(site_config: Dict) -> SiteRules:
+            return SiteRules(
+                block_types=frozenset(site_config.get('block_types', block_types)),
+                block_urls=block_urls + tuple(site_config.get('block_urls', ())),
+                allow_urls=allow_urls + tuple(site_config.get('allow_urls', ())),
+                enabled=site_config.get('enabled', enabled)
+            )
+
+        site_configs = {site: dict(defaults) for site, defaults in DEFAULT_SITES.items()}
+        for site, site_config in config.get('sites', {}).items():
+            site_configs.setdefault(site, {}).update(site_config)
+        return cls(
+            sites={site: rules(site_config) for site, site_config in site_configs.items()},
+            default=rules({}),
+            typical_bytes=config.get('typical_bytes'),
+            log=log
+        )
+
+    def log(self, msg: str, level: str = "DEBUG"):
+        if self._log:
+            self._log(msg, level)
+
+    def rules(self, site: str) -> SiteRules:
+        return self.sites.get(site, self.default)
+
+    async def install(self, page: Page, site: str) -> bool:
+        """Route every request of `page` through the site's rules. False if disabled or failed."""
+        rules = self.rules(site)
+        if not rules.enabled:
+            return False
+        try:
+            await page.route('**/*', lambda route, request: self._handle(route, request, site))
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.log(f"Route policy: could not install on {site} page: {e}", "WARN")
+            return False
+        self.stats['pages'] += 1
+        return True
+
+    def check(self, site: str, url: str, resource_type: str) -> Optional[str]:
+        """Count one request and return 'type' or 'url' if it must be aborted."""
+        self.stats['requests'] += 1
+        reason = self.rules(site).decide(url, resource_type)
+        if reason == 'allow':
+            self.stats['allow_listed'] += 1
+            return None
+        if reason:
+            size = self.typical_bytes.get(resource_type, DEFAULT_TYPICAL_BYTES)
+            self.stats['blocked'] += 1
+            self.stats['blocked_bytes'] += size
+            key = (site, reason)
+            self.blocked_by_site[key] = self.blocked_by_site.get(key, 0) + 1
+            self.bytes_by_site[site] = self.bytes_by_site.get(site, 0) + size
+        return reason
+
+    async def _handle(self, route: Route, request: Request, site: str):
+        try:
+            if self.check(site, request.url, request.resource_type):
+                await route.abort('blockedbyclient')
+            else:
+                await route.continue_()
+        except Exception as e:
+            # Page closed or request already handled; never leave it hanging
+            self.stats['errors'] += 1
+            self.log(f"Route policy: {e}", "DEBUG")
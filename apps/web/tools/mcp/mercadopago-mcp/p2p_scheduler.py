@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Adaptive Polling Scheduler
+==========================
+
+Wait times for the order and price loops that follow activity instead of a
+fixed `poll_interval_seconds` / `price_check_interval_seconds`:
+
+- Recent activity (a new order, a competitor price move) drops the interval
+  to its floor; every idle cycle multiplies it by `backoff`
+- The wait never exceeds `ceiling` (the base interval unless configured),
+  except in slots the priors mark as quiet, where it may grow toward
+  `quiet_ceiling` in proportion to how quiet the slot is
+- Hour-of-week priors scale each wait: slots that were busy in past weeks
+  poll faster, quiet slots (4 a.m.) slower while idle, within
+  [min_scale, max_scale]
+- Priors are learned from the daemon's JSON log (rotated `.gz` backups
+  included): distinct orders first seen per hour of week, and competitor
+  top-price changes, each divided by the hours the daemon was running in
+  that slot and shrunk toward the overall mean so sparse slots stay neutral
+
+Usage:
+    priors = HourOfWeekPriors.learn(log_files('/tmp/p2p_daemon_v3.json.log'), kind='orders')
+    poller = AdaptiveInterval(30, floor=5, ceiling=30, quiet_ceiling=120, priors=priors)
+
+    while True:
+        if await scan():
+            poller.activity()
+        else:
+            poller.idle()
+        await asyncio.sleep(poller.next())
+"""
+
+import glob
+import gzip
+import json
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+HOURS_PER_WEEK = 168
+
+# JSON log messages that carry activity
+ORDERS_DETECTED = "Orders detected"
+PRICES_FETCHED = "Fetched competitor prices"
+
+
+def hour_of_week(ts: float) -> int:
+    """0 = Monday 00:00-00:59 local time, 167 = Sunday 23:00-23:59."""
+    dt = datetime.fromtimestamp(ts)
+    return dt.weekday() * 24 + dt.hour
+
+
+def log_files(path: str) -> List[str]:
+    """A log file and its rotated backups (`.1`, `.2.gz`, ...), oldest first."""
+    backups = [p for p in glob.glob(f"{path}.*") if p[len(path) + 1:].split('.')[0].isdigit()]
+    backups.sort(key=lambda p: int(p[len(path) + 1:].split('.')[0]), reverse=True)
+    return backups + ([path] if os.path.exists(path) else [])
+
+
+def read_entries(paths: Iterable[str]) -> Iterator[Dict]:
+    """JSON log entries with a parseable timestamp (`_ts`, epoch seconds added)."""
+    for path in paths:
+        opener = gzip.open if path.endswith('.gz') else open
+        try:
+            with opener(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        entry['_ts'] = datetime.fromisoformat(entry['timestamp']).timestamp()
+                    except (ValueError, TypeError, KeyError):
+                        continue
+                    yield entry
+        except OSError:
+            continue
+
+
+# ==============================================================================
+# PRIORS
+# ==============================================================================
+
+class HourOfWeekPriors:
+    """Relative activity per hour of week (1.0 = average)."""
+
+    def __init__(self, events: List[float] = None, hours: List[float] = None, smoothing: float = 2.0):
+        self.events = list(events or [0.0] * HOURS_PER_WEEK)
+        self.hours = list(hours or [0.0] * HOURS_PER_WEEK)
+        self.smoothing = smoothing  # Pseudo-hours at the mean rate added to each slot
+        self.relative = self._relative()
+
+    def _relative(self) -> List[float]:
+        total_hours = sum(self.hours)
+        total_events = sum(self.events)
+        if not total_hours or not total_events:
+            return [1.0] * HOURS_PER_WEEK
+        mean = total_events / total_hours
+        return [
+            (events + self.smoothing * mean) / (hours + self.smoothing) / mean
+            for events, hours in zip(self.events, self.hours)
+        ]
+
+    @property
+    def observed_hours(self) -> float:
+        return sum(self.hours)
+
+    def scale(self, ts: float, min_scale: float = 0.5, max_scale: float = 2.0) -> float:
+        """Multiplier for a wait at `ts`: below 1 in busy slots, above 1 in quiet ones."""
+        relative = self.relative[hour_of_week(ts)]
+        if relative <= 0:
+            return max_scale
+        return min(max_scale, max(min_scale, 1.0 / relative))
+
+    @classmethod
+    def learn(cls, paths: Iterable[str], kind: str = 'orders', since: float = 0,
+              smoothing: float = 2.0) -> 'HourOfWeekPriors':
+        """
+        Learn priors from JSON log files.
+
+        kind='orders': distinct order IDs, counted in the hour they first appear
+        kind='prices': changes of a book's top price between consecutive fetches
+        Entries before `since` (epoch seconds) are ignored.
+        """
+        events = [0.0] * HOURS_PER_WEEK
+        running: Set[Tuple[str, int]] = set()  # (date, hour) the daemon logged in
+        seen_orders: Set[str] = set()
+        last_top: Dict[Tuple, float] = {}
+
+        for entry in read_entries(paths):
+            ts = entry['_ts']
+            if ts < since:
+                continue
+            dt = datetime.fromtimestamp(ts)
+            running.add((dt.strftime('%Y-%m-%d'), dt.hour))
+            slot = dt.weekday() * 24 + dt.hour
+
+            if kind == 'orders':
+                ids = entry.get('orders') if entry.get('message') == ORDERS_DETECTED else None
+                for order_id in ids or ([entry['order_id']] if entry.get('order_id') else []):
+                    if order_id not in seen_orders:
+                        seen_orders.add(order_id)
+                        events[slot] += 1
+            elif kind == 'prices' and entry.get('message') == PRICES_FETCHED and 'top' in entry:
+                key = (entry.get('asset'), entry.get('fiat'), entry.get('trade_type'))
+                top = entry['top']
+                if key in last_top and last_top[key] != top:
+                    events[slot] += 1
+                last_top[key] = top
+
+        hours = [0.0] * HOURS_PER_WEEK
+        for date, hour in running:
+            hours[datetime.strptime(date, '%Y-%m-%d').weekday() * 24 + hour] += 1
+        return cls(events, hours, smoothing=smoothing)
+
+
+# ==============================================================================
+# ADAPTIVE INTERVAL
+# ==============================================================================
+
+class AdaptiveInterval:
+    """Poll interval that drops on activity, backs off while idle and follows priors."""
+
+    def __init__(self, base: float, floor: float = None, ceiling: float = None,
+                 backoff: float = 1.5, priors: HourOfWeekPriors = None,
+                 min_scale: float = 0.5, max_scale: float = 2.0,
+                 quiet_ceiling: float = None, clock: Callable[[], float] = time.time):
+        self.floor = base if floor is None else floor
+        self.ceiling = base if ceiling is None else max(ceiling, self.floor)
+        # Cap in the quietest slots (scale == max_scale); busy and neutral slots use `ceiling`
+        self.quiet_ceiling = self.ceiling if quiet_ceiling is None else max(quiet_ceiling, self.ceiling)
+        self.backoff = backoff
+        self.priors = priors
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.clock = clock
+        self.interval = min(self.ceiling, max(self.floor, base))
+        self.stats = {'activity': 0, 'idle': 0, 'waits': 0, 'waited_seconds': 0.0,
+                      'interval': self.interval, 'scale': 1.0}
+
+    def activity(self):
+        """Something happened: poll again at the floor."""
+        self.stats['activity'] += 1
+        self.interval = self.floor
+
+    def idle(self):
+        """Nothing happened: back off toward the ceiling."""
+        self.stats['idle'] += 1
+        self.interval = min(self.quiet_ceiling, self.interval * self.backoff)
+
+    def next(self) -> float:
+        """Seconds to wait before the next poll."""
+        scale = 1.0
+        if self.priors:
+            scale = self.priors.scale(self.clock(), self.min_scale, self.max_scale)
+            if self.interval <= self.floor:
+                scale = min(scale, 1.0)  # Right after activity, quiet slots don't slow us down
+        wait = min(self._cap(scale), max(self.floor, self.interval * scale))
+        self.stats['waits'] += 1
+        self.stats['waited_seconds'] += wait
+        self.stats['interval'] = wait
+        self.stats['scale'] = scale
+        return wait
+
+    def _cap(self, scale: float) -> float:
+        """`ceiling`, raised toward `quiet_ceiling` as the slot gets quieter."""
+        if scale <= 1.0 or self.max_scale <= 1.0:
+            return self.ceiling
+        quietness = min(1.0, (scale - 1.0) / (self.max_scale - 1.0))
+        return self.ceiling + (self.quiet_ceiling - self.ceiling) * quietness
+
+    @classmethod
+    def from_config(cls, base: float, config: Dict, priors: Optional[HourOfWeekPriors] = None,
+                    **kwargs) -> 'AdaptiveInterval':
+        """A loop's `adaptive_polling.<loop>` section; fixed at `base` when disabled."""
+        if not config.get('enabled', True):
+            return cls(base)
+        return cls(
+            base,
+            floor=config.get('floor_seconds', base / 4),
+            ceiling=config.get('ceiling_seconds', base),
+            quiet_ceiling=config.get('quiet_ceiling_seconds', base * 4),
+            backoff=config.get('backoff', 1.5),
+            priors=priors,
+            min_scale=config.get('min_scale', 0.5),
+            max_scale=config.get('max_scale', 2.0),
+            **kwargs
+        )
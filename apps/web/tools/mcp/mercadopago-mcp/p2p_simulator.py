@@ -0,0 +1,791 @@
+#!/usr/bin/env python3
+"""
+P2P Site Simulator
+==================
+
+A local stand-in for Binance P2P, MercadoPago and Produbanco, so the
+daemons can run end to end (real browser, real pages) against synthetic
+order flow instead of live accounts.
+
+- Binance (`/binance`): fiatOrder list page and its order-list XHR, order
+  detail pages with mark-paid / release buttons, the my-ads table with an
+  inline price editor, the private ad list/update endpoints and the public
+  `adv/search` order book
+- MercadoPago (`/mp`): home, the CBU/CVU/alias transfer wizard (amount input
+  driven through a React-style fiber) and /activities with its JSON API
+- Produbanco (`/produbanco`): Produnet page with the `iframe_a` transfer
+  and movements views
+- Orders arrive as a Poisson process (`rate_per_minute`, `sell_ratio`);
+  simulated counterparties pay SELL orders and release paid BUY orders
+- Safety counters flag what a daemon must never do: release an unpaid
+  order, pay twice, pay an unknown account, mark paid without paying
+
+Latency is measured on the simulator side: BUY = order created → marked
+paid, SELL = buyer paid → released.
+
+Usage:
+    python p2p_simulator.py --port 8700 --rate 6 --sell-ratio 0.5
+
+    # daemon config
+    "endpoints": {"binance": "http://127.0.0.1:8700/binance",
+                  "mercadopago": "http://127.0.0.1:8700/mp"},
+    "produbanco": {"login_url": "http://127.0.0.1:8700/produbanco/produnet/"}
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from aiohttp import web
+
+from p2p_tracing import percentile
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+# Per fiat: reference price and the order sizes counterparties open
+MARKETS = {
+    'ARS': {'price': 1250.0, 'min_amount': 5000, 'max_amount': 200000, 'decimals': 0},
+    'USD': {'price': 1.0, 'min_amount': 10, 'max_amount': 500, 'decimals': 2},
+}
+
+SESSION_COOKIES = {'p20t': 'sim-session', 'cr00': 'sim-csrf'}
+ORDER_NUMBER_BASE = 22_000_000_000_000_000_000  # 20 digits, like Binance order numbers
+
+# Binance orderStatus codes
+TO_PAY, PAID, COMPLETED, CANCELLED = 1, 2, 4, 6
+PENDING = (TO_PAY, PAID)
+
+
+@dataclass
+class SimOrder:
+    """One simulated P2P order (trade type from the daemon's side)."""
+
+    order_number: str
+    trade_type: str         # 'BUY' (daemon pays fiat) or 'SELL' (daemon releases USDT)
+    fiat: str
+    amount: float           # Fiat total
+    price: float
+    counterparty: str
+    destination: str        # Where the daemon must pay a BUY order (alias or account)
+    created_at: float
+    status: int = TO_PAY
+    paid_at: float = 0.0
+    released_at: float = 0.0
+
+    def to_api(self) -> Dict:
+        """Entry of the order-list `data` array."""
+        nick = 'sellerNickname' if self.trade_type == 'BUY' else 'buyerNickname'
+        return {
+            'orderNumber': self.order_number,
+            'tradeType': self.trade_type,
+            'orderStatus': self.status,
+            'totalPrice': f"{self.amount:.2f}",
+            'amount': f"{self.amount / self.price:.2f}",
+            'price': f"{self.price:.4f}",
+            'asset': 'USDT',
+            'fiatUnit': self.fiat,
+            nick: self.counterparty,
+            'createTime': int(self.created_at * 1000),
+        }
+
+
+def _money(amount: float, fiat: str) -> str:
+    """Amount as MercadoPago shows it ($ 12.345,00) or as Produbanco does ($1,234.56)."""
+    if fiat == 'ARS':
+        return '$ ' + f"{amount:,.2f}".replace(',', 'x').replace('.', ',').replace('x', '.')
+    return f"${amount:,.2f}"
+
+
+def _page(title: str, body: str, script: str = '', data: Dict = None) -> web.Response:
+    """HTML response; `data` is exposed to the script as window.SIM."""
+    state = json.dumps(data or {}).replace('</', '<\\/')
+    html = (f"<!doctype html><html><head><meta charset='utf-8'><title>{title}</title></head>"
+            f"<body>{body}<script>window.SIM = {state};</script>"
+            f"<script>{script}</script></body></html>")
+    return web.Response(text=html, content_type='text/html')
+
+
+# ==============================================================================
+# PAGE SCRIPTS
+# ==============================================================================
+
+# fiatOrder: fetches the order-list XHR (captured by BinanceOrderFeed) and
+# renders the table the DOM fallback scrapes; re-polls like the real page
+ORDERS_JS = """
+const render = (orders) => {
+    const rows = orders.map(o => `<tr>
+        <td><a href="${SIM.base}/en/fiatOrderDetail?orderNo=${o.orderNumber}">${o.orderNumber}</a></td>
+        <td>${o.tradeType === 'BUY' ? 'Buy' : 'Sell'} USDT</td>
+        <td>${o.totalPrice} ${o.fiatUnit}</td>
+        <td>${o.price}</td>
+        <td>${o.sellerNickname || o.buyerNickname || ''}</td>
+        <td>${o.orderStatus === 1 ? 'To pay' : 'Paid'}</td></tr>`).join('');
+    document.querySelector('tbody').innerHTML = rows;
+};
+const poll = async () => {
+    const response = await fetch(SIM.base + '/bapi/c2c/v2/private/c2c/order-match/order-list', {
+        method: 'POST', headers: {'Content-Type': 'application/json', 'clienttype': 'web'},
+        body: JSON.stringify({page: 1, rows: 20, orderStatusList: [1, 2, 3, 5]})
+    });
+    const payload = await response.json();
+    if (payload.success) render(payload.data);
+};
+poll();
+setInterval(poll, SIM.pollMs);
+"""
+
+DETAIL_JS = """
+const post = async (action) => {
+    const response = await fetch(`${SIM.base}/api/order/${SIM.orderNo}/${action}`, {method: 'POST'});
+    return (await response.json()).status;
+};
+const paid = document.getElementById('paid');
+if (paid) paid.onclick = () => {
+    document.getElementById('modal').innerHTML = '<button id="confirm">Confirm</button>';
+    document.getElementById('confirm').onclick = async () => {
+        document.getElementById('modal').innerHTML = '';
+        if (await post('paid')) {
+            paid.remove();
+            document.getElementById('status').innerText = 'Waiting for seller to release';
+        }
+    };
+};
+const release = document.getElementById('release');
+if (release) release.onclick = async () => {
+    if (await post('release')) {
+        release.remove();
+        document.getElementById('status').innerText = 'Released';
+    }
+};
+"""
+
+ADS_JS = """
+document.querySelectorAll('button.edit').forEach(button => button.onclick = () => {
+    const advNo = button.dataset.adv;
+    document.getElementById('editor').innerHTML =
+        `<input name="price" id="price" type="number" step="any"><button id="save">Save</button>`;
+    document.getElementById('save').onclick = async () => {
+        const price = document.getElementById('price').value;
+        const response = await fetch(SIM.base + '/api/ad/edit', {
+            method: 'POST', headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({advNo, price})
+        });
+        document.getElementById('editor').innerText = (await response.json()).success
+            ? 'Price updated successfully' : 'Update failed';
+    };
+});
+"""
+
+# Transfer wizard: one step rendered at a time, like the SPA
+MP_TRANSFER_JS = """
+const state = {destination: '', amount: ''};
+const root = document.getElementById('wizard');
+const step = (html, bind) => { root.innerHTML = html; bind && bind(); };
+const click = (id, fn) => document.getElementById(id).onclick = fn;
+
+const method = () => step(
+    '<p>Elegí un método</p><button id="cvu">Con CBU, CVU o alias</button>',
+    () => click('cvu', destination));
+const destination = (error) => step(
+    (error ? '<p>No encontramos la cuenta</p>' : '') +
+    '<label>CBU, CVU o alias</label><input id="destination"><button id="next">Continuar</button>',
+    () => click('next', async () => {
+        state.destination = document.getElementById('destination').value.trim();
+        const response = await fetch(SIM.base + '/api/accounts?q=' + encodeURIComponent(state.destination));
+        const account = await response.json();
+        account.found ? confirmAccount(account) : destination(true);
+    }));
+const confirmAccount = (account) => step(
+    `<p>${account.name}</p><button id="confirm">Confirmar cuenta</button>`,
+    () => click('confirm', amount));
+const amount = () => step(
+    '<label>Monto</label><input id="amount-field-input" inputmode="decimal"><button id="next">Continuar</button>',
+    () => {
+        const input = document.getElementById('amount-field-input');
+        // React keeps the handler on the fiber, not on the element
+        input['__reactFiber$sim'] = {memoizedProps: {onChange: (e) => {
+            state.amount = e.target.value;
+            input.value = e.target.value;
+        }}, return: null};
+        click('next', () => Number(state.amount) > 0 ? review() : null);
+    });
+const review = () => step(
+    `<p>Revisá si está todo bien</p><p>${state.destination}</p><p>$ ${state.amount}</p>
+     <button id="send">Transferir</button>`,
+    () => click('send', async () => {
+        const response = await fetch(SIM.base + '/api/transfer', {
+            method: 'POST', headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify(state)
+        });
+        const result = await response.json();
+        location.href = SIM.base + '/transfer/done?id=' + result.id;
+    }));
+method();
+"""
+
+MP_ACTIVITIES_JS = """
+(async () => {
+    const response = await fetch(SIM.base + '/activities/api/list?page=1');
+    const payload = await response.json();
+    document.getElementById('list').innerHTML = payload.results.map(a =>
+        `<div class="activity-row">${a.description}\n${a.title}\n${a.display}</div>`).join('');
+})();
+"""
+
+PRODUBANCO_TRANSFER_JS = """
+const form = document.getElementById('form');
+document.querySelector('.wp-opcion-transferencia').onclick = () => {
+    form.innerHTML = `<select id="cbxBanco"><option value="">Banco</option>
+        <option value="36">PRODUBANCO</option><option value="10">PICHINCHA</option></select>
+        <input name="numeroCuenta"><button id="verify">Verificar</button><div id="holder"></div>`;
+    document.getElementById('verify').onclick = async () => {
+        const account = document.querySelector('input[name="numeroCuenta"]').value.trim();
+        const response = await fetch(SIM.base + '/api/accounts?q=' + encodeURIComponent(account));
+        const found = await response.json();
+        if (!found.found) { document.getElementById('holder').innerText = 'Cuenta no encontrada'; return; }
+        document.getElementById('holder').innerHTML =
+            `<p>${found.name}</p><input name="monto" type="number" step="0.01">
+             <button id="continue">Continuar</button>`;
+        document.getElementById('continue').onclick = async () => {
+            const amount = document.querySelector('input[name="monto"]').value;
+            const result = await (await fetch(SIM.base + '/api/transfer', {
+                method: 'POST', headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({destination: account, amount})
+            })).json();
+            form.innerHTML = result.id
+                ? `<p>Transferencia exitosa</p><p>Número de comprobante ${result.id}</p>`
+                : '<p>La transferencia no pudo ser procesada</p>';
+        };
+    };
+};
+"""
+
+
+# ==============================================================================
+# SIMULATOR
+# ==============================================================================
+
+class P2PSimulator:
+    """Serves the simulated sites and drives synthetic order flow."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8700, rate_per_minute: float = 6.0,
+                 sell_ratio: float = 0.5, fiat: str = 'ARS', payment_delay: tuple = (2.0, 10.0),
+                 release_delay: float = 2.0, order_timeout: float = 900.0, page_poll: float = 3.0,
+                 seed: Optional[int] = None, log: Callable = None):
+        if fiat not in MARKETS:
+            raise ValueError(f"Unknown fiat: {fiat}. Expected one of {sorted(MARKETS)}")
+        self.host = host
+        self.port = port
+        self.rate_per_minute = rate_per_minute
+        self.sell_ratio = sell_ratio
+        self.fiat = fiat
+        self.payment_delay = payment_delay
+        self.release_delay = release_delay
+        self.order_timeout = order_timeout
+        self.page_poll = page_poll
+        self._random = random.Random(seed)
+        self._log = log
+        self._runner: Optional[web.AppRunner] = None
+        self._arrivals: Optional[asyncio.Task] = None
+        self._timers: set = set()
+        self._seq = itertools.count(1)
+
+        self.orders: Dict[str, SimOrder] = {}
+        self.transfers: List[Dict] = []         # Daemon → counterparty
+        self.movements: List[Dict] = []         # MercadoPago activity, newest last
+        self.bank_rows: List[Dict] = []         # Produbanco movements, newest last
+        self.ads: Dict[str, Dict] = {}
+        self.latencies: Dict[str, List[float]] = {'buy': [], 'sell': []}
+        self.stats = {
+            'created': 0, 'paid': 0, 'released': 0, 'expired': 0, 'transfers': 0,
+            'order_list_requests': 0, 'book_requests': 0, 'ad_updates': 0,
+            # Safety: any non-zero value is a daemon bug
+            'released_unpaid': 0, 'duplicate_transfers': 0, 'unknown_transfers': 0,
+            'amount_mismatches': 0, 'paid_without_transfer': 0,
+        }
+        self._book_price = {fiat: market['price'] for fiat, market in MARKETS.items()}
+        for fiat_unit in MARKETS:
+            for side in ('SELL', 'BUY'):
+                adv_no = f"{11_000_000_000 + len(self.ads) + 1}"
+                self.ads[adv_no] = {'advNo': adv_no, 'tradeType': side, 'asset': 'USDT',
+                                    'fiatUnit': fiat_unit, 'price': MARKETS[fiat_unit]['price']}
+
+    def log(self, msg: str, level: str = "DEBUG"):
+        if self._log:
+            self._log(msg, level)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def endpoints(self) -> Dict[str, str]:
+        """Site roots to put in a daemon config."""
+        return {
+            'binance': f"{self.url}/binance",
+            'mercadopago': f"{self.url}/mp",
+            'produbanco': f"{self.url}/produbanco/produnet/",
+        }
+
+    # --------------------------------------------------------------------------
+    # Lifecycle
+    # --------------------------------------------------------------------------
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        r = app.router
+        r.add_get('/binance/en/fiatOrder', self._orders_page)
+        r.add_post('/binance/bapi/c2c/v2/private/c2c/order-match/order-list', self._order_list)
+        r.add_get('/binance/en/fiatOrderDetail', self._order_detail)
+        r.add_post('/binance/api/order/{order_number}/{action}', self._order_action)
+        r.add_get('/binance/en/myads', self._ads_page)
+        r.add_get('/binance/en/advertiserManage', self._ads_page)
+        r.add_post('/binance/api/ad/edit', self._ad_edit)
+        r.add_post('/binance/bapi/c2c/v2/private/c2c/adv/list-by-page', self._ad_list)
+        r.add_post('/binance/bapi/c2c/v3/private/c2c/adv/update', self._ad_update)
+        r.add_post('/binance/bapi/c2c/v2/friendly/c2c/adv/search', self._adv_search)
+        r.add_get('/mp/home', self._mp_home)
+        r.add_get('/mp/transfer', self._mp_transfer)
+        r.add_get('/mp/transfer/done', self._mp_transfer_done)
+        r.add_get('/mp/activities', self._mp_activities)
+        r.add_get('/mp/activities/api/list', self._mp_activities_api)
+        r.add_get('/produbanco/produnet/', self._pb_home)
+        r.add_get('/produbanco/Produnet/inicio', self._pb_start)
+        r.add_get('/produbanco/Produnet/transferencias', self._pb_transfer)
+        r.add_get('/produbanco/Produnet/movimientos', self._pb_movements)
+        for site in ('mp', 'produbanco'):
+            r.add_get(f'/{site}/api/accounts', self._accounts)
+            r.add_post(f'/{site}/api/transfer', self._transfer)
+        return app
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if self.port == 0 and self._runner.addresses:
+            self.port = self._runner.addresses[0][1]
+        if self.rate_per_minute > 0:
+            self._arrivals = asyncio.create_task(self._arrival_loop())
+        self.log(f"Simulator on {self.url} ({self.rate_per_minute}/min, {self.fiat})", "INFO")
+
+    async def stop(self):
+        if self._arrivals:
+            self._arrivals.cancel()
+            try:
+                await self._arrivals
+            except asyncio.CancelledError:
+                pass
+            self._arrivals = None
+        for handle in self._timers:
+            handle.cancel()
+        self._timers.clear()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    # --------------------------------------------------------------------------
+    # Order flow
+    # --------------------------------------------------------------------------
+
+    def _later(self, delay: float, callback: Callable, *args):
+        loop = asyncio.get_running_loop()
+        handle = None
+
+        def run():
+            self._timers.discard(handle)
+            callback(*args)
+
+        handle = loop.call_later(delay, run)
+        self._timers.add(handle)
+
+    async def _arrival_loop(self):
+        while True:
+            await asyncio.sleep(self._random.expovariate(self.rate_per_minute / 60))
+            self.create_order()
+
+    def create_order(self, trade_type: str = None, amount: float = None) -> SimOrder:
+        """Open an order now (BUY or SELL from the daemon's side; random if None)."""
+        seq = next(self._seq)
+        market = MARKETS[self.fiat]
+        if trade_type is None:
+            trade_type = 'SELL' if self._random.random() < self.sell_ratio else 'BUY'
+        if amount is None:
+            amount = round(self._random.uniform(market['min_amount'], market['max_amount']),
+                           market['decimals'])
+        if self.fiat == 'ARS':
+            destination = f"sim.seller.{seq}"
+        else:
+            destination = f"{2_200_000_000 + seq}"
+        order = SimOrder(
+            order_number=str(ORDER_NUMBER_BASE + seq),
+            trade_type=trade_type.upper(),
+            fiat=self.fiat,
+            amount=float(amount),
+            price=self._book_price[self.fiat],
+            counterparty=f"Trader {seq}",
+            destination=destination,
+            created_at=time.time(),
+        )
+        self.orders[order.order_number] = order
+        self.stats['created'] += 1
+        if order.trade_type == 'SELL':
+            self._later(self._random.uniform(*self.payment_delay), self.buyer_pays, order.order_number)
+        else:
+            self._later(self.order_timeout, self._expire, order.order_number)
+        self.log(f"Simulator: new {order.trade_type} order {order.order_number} "
+                 f"{order.amount:.2f} {order.fiat}")
+        return order
+
+    def buyer_pays(self, order_number: str):
+        """Counterparty of a SELL order sends the fiat and marks the order paid."""
+        order = self.orders.get(order_number)
+        if not order or order.status != TO_PAY:
+            return
+        order.status = PAID
+        order.paid_at = time.time()
+        self._credit(order.amount, order.counterparty, order.paid_at)
+
+    def _credit(self, amount: float, sender: str, ts: float):
+        ref = len(self.movements) + len(self.bank_rows) + 1
+        if self.fiat == 'ARS':
+            self.movements.append({'id': f"sim{ref}", 'amount': amount, 'sign': '+',
+                                   'title': 'Te transfirieron', 'description': sender, 'ts': ts})
+        else:
+            self.bank_rows.append({'ref': ref, 'amount': amount, 'text': f"Depósito de {sender}",
+                                   'ts': ts})
+
+    def _expire(self, order_number: str):
+        order = self.orders.get(order_number)
+        if order and order.status == TO_PAY:
+            order.status = CANCELLED
+            self.stats['expired'] += 1
+
+    def _seller_releases(self, order_number: str):
+        order = self.orders.get(order_number)
+        if order and order.status == PAID:
+            order.status = COMPLETED
+            order.released_at = time.time()
+
+    def mark_paid(self, order_number: str) -> bool:
+        """Daemon marks a BUY order as paid."""
+        order = self.orders.get(order_number)
+        if not order or order.trade_type != 'BUY' or order.status != TO_PAY:
+            return False
+        if not any(t['order_number'] == order_number for t in self.transfers):
+            self.stats['paid_without_transfer'] += 1
+        order.status = PAID
+        order.paid_at = time.time()
+        self.stats['paid'] += 1
+        self.latencies['buy'].append(order.paid_at - order.created_at)
+        self._later(self.release_delay, self._seller_releases, order_number)
+        return True
+
+    def release(self, order_number: str) -> bool:
+        """Daemon releases USDT of a SELL order."""
+        order = self.orders.get(order_number)
+        if not order or order.trade_type != 'SELL':
+            return False
+        if order.status == TO_PAY:
+            self.stats['released_unpaid'] += 1
+        elif order.status != PAID:
+            return False
+        order.status = COMPLETED
+        order.released_at = time.time()
+        self.stats['released'] += 1
+        if order.paid_at:
+            self.latencies['sell'].append(order.released_at - order.paid_at)
+        return True
+
+    def transfer(self, destination: str, amount: float) -> Optional[str]:
+        """Daemon sends fiat. Returns a receipt ID, None if the account is unknown."""
+        order = next((o for o in self.orders.values()
+                      if o.trade_type == 'BUY' and o.destination == destination), None)
+        if order is None:
+            self.stats['unknown_transfers'] += 1
+            return None
+        if any(t['order_number'] == order.order_number for t in self.transfers):
+            self.stats['duplicate_transfers'] += 1
+        if abs(amount - order.amount) > max(1.0, order.amount * 0.001):
+            self.stats['amount_mismatches'] += 1
+        receipt = f"{len(self.transfers) + 1:08d}"
+        self.transfers.append({'id': receipt, 'order_number': order.order_number,
+                               'destination': destination, 'amount': amount, 'ts': time.time()})
+        self.stats['transfers'] += 1
+        if self.fiat == 'ARS':
+            self.movements.append({'id': f"out{receipt}", 'amount': amount, 'sign': '-',
+                                   'title': 'Transferencia enviada', 'description': order.counterparty,
+                                   'ts': time.time()})
+        return receipt
+
+    def summary(self) -> Dict:
+        """Counters, pending orders and latency percentiles so far."""
+        latency = {}
+        for side, values in self.latencies.items():
+            values = sorted(values)
+            latency[side] = {
+                'count': len(values),
+                'p50': percentile(values, 50),
+                'p95': percentile(values, 95),
+                'p99': percentile(values, 99),
+                'max': values[-1] if values else 0.0,
+            }
+        pending = sum(1 for o in self.orders.values() if o.status in PENDING)
+        return {**self.stats, 'pending': pending, 'latency': latency}
+
+    # --------------------------------------------------------------------------
+    # Binance
+    # --------------------------------------------------------------------------
+
+    def _binance_page(self, title: str, body: str, script: str = '', **data) -> web.Response:
+        response = _page(title, body, script, {'base': '/binance', **data})
+        for name, value in SESSION_COOKIES.items():
+            response.set_cookie(name, value, path='/')
+        return response
+
+    @staticmethod
+    def _logged_in(request: web.Request) -> bool:
+        return request.cookies.get('p20t') == SESSION_COOKIES['p20t']
+
+    async def _orders_page(self, request: web.Request) -> web.Response:
+        body = ("<h1>P2P Orders</h1><table><thead><tr><th>Order</th><th>Type</th><th>Total</th>"
+                "<th>Price</th><th>Counterparty</th><th>Status</th></tr></thead><tbody></tbody></table>")
+        return self._binance_page('Orders', body, ORDERS_JS, pollMs=int(self.page_poll * 1000))
+
+    async def _order_list(self, request: web.Request) -> web.Response:
+        self.stats['order_list_requests'] += 1
+        if not self._logged_in(request):
+            return web.json_response({'code': '100002001', 'message': 'Please log in', 'success': False})
+        data = [o.to_api() for o in self.orders.values() if o.status in PENDING]
+        return web.json_response({'code': '000000', 'data': data, 'total': len(data), 'success': True})
+
+    async def _order_detail(self, request: web.Request) -> web.Response:
+        order = self.orders.get(request.query.get('orderNo', ''))
+        if order is None:
+            raise web.HTTPNotFound()
+        # Payment details first: the daemons take the first match in the page text
+        if order.trade_type == 'BUY' and order.fiat == 'ARS':
+            payment = f"<p>Alias: {order.destination}</p><p>Titular: {order.counterparty}</p>"
+        elif order.trade_type == 'BUY':
+            payment = (f"<p>Cuenta: {order.destination}</p><p>Banco: Produbanco</p>"
+                       f"<p>Nombre: {order.counterparty}</p>")
+        else:
+            payment = ''
+        total = f"{order.amount:.2f} {order.fiat}"
+        if order.trade_type == 'BUY':
+            status = {TO_PAY: 'Pending payment', PAID: 'Waiting for seller to release'}.get(
+                order.status, 'Completed' if order.status == COMPLETED else 'Cancelled')
+            action = '<button id="paid">Transferred, notify seller</button>' if order.status == TO_PAY else ''
+        else:
+            status = {TO_PAY: 'Waiting for buyer payment', PAID: 'Buyer marked the order as paid'}.get(
+                order.status, 'Released' if order.status == COMPLETED else 'Cancelled')
+            action = '<button id="release">Release USDT</button>' if order.status == PAID else ''
+        body = (f"{payment}<h1>Order {order.order_number}</h1><p>Total {total}</p>"
+                f"<p id='status'>{status}</p>{action}<div id='modal'></div>")
+        return self._binance_page('Order detail', body, DETAIL_JS, orderNo=order.order_number)
+
+    async def _order_action(self, request: web.Request) -> web.Response:
+        order_number = request.match_info['order_number']
+        action = request.match_info['action']
+        if action == 'paid':
+            ok = self.mark_paid(order_number)
+        elif action == 'release':
+            ok = self.release(order_number)
+        else:
+            raise web.HTTPNotFound()
+        return web.json_response({'status': ok})
+
+    async def _ads_page(self, request: web.Request) -> web.Response:
+        rows = ''.join(
+            f"<tr><td>{'Sell' if ad['tradeType'] == 'SELL' else 'Buy'}</td>"
+            f"<td>{ad['asset']}/{ad['fiatUnit']}</td><td>{ad['price']}</td>"
+            f"<td><button class='edit' data-adv='{adv_no}'>Edit</button></td></tr>"
+            for adv_no, ad in self.ads.items()
+        )
+        body = (f"<h1>My Ads</h1><table><thead><tr><th>Type</th><th>Pair</th><th>Price</th><th></th>"
+                f"</tr></thead><tbody>{rows}</tbody></table><div id='editor'></div>")
+        return self._binance_page('My ads', body, ADS_JS)
+
+    def _set_ad_price(self, adv_no: str, price) -> bool:
+        ad = self.ads.get(str(adv_no))
+        try:
+            price = float(price)
+        except (TypeError, ValueError):
+            return False
+        if ad is None or price <= 0:
+            return False
+        ad['price'] = price
+        self.stats['ad_updates'] += 1
+        return True
+
+    async def _ad_edit(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        return web.json_response({'success': self._set_ad_price(payload.get('advNo'), payload.get('price'))})
+
+    async def _ad_list(self, request: web.Request) -> web.Response:
+        if not self._logged_in(request):
+            return web.json_response({'code': '100002001', 'success': False})
+        return web.json_response({'code': '000000', 'data': list(self.ads.values()), 'success': True})
+
+    async def _ad_update(self, request: web.Request) -> web.Response:
+        if not self._logged_in(request):
+            return web.json_response({'code': '100002001', 'success': False})
+        payload = await request.json()
+        ok = self._set_ad_price(payload.get('advNo'), payload.get('price'))
+        return web.json_response({'code': '000000' if ok else '83001', 'success': ok})
+
+    async def _adv_search(self, request: web.Request) -> web.Response:
+        """Public order book: competitors around a slowly drifting price."""
+        self.stats['book_requests'] += 1
+        payload = await request.json()
+        fiat = payload.get('fiat') if payload.get('fiat') in MARKETS else self.fiat
+        side = str(payload.get('tradeType', 'SELL')).upper()
+        rows = int(payload.get('rows') or 20)
+        page = int(payload.get('page') or 1)
+        base = self._book_price[fiat] * (1 + self._random.uniform(-0.0005, 0.0005))
+        self._book_price[fiat] = base
+        step = base * 0.0004
+        market = MARKETS[fiat]
+        ads = []
+        for i in range(rows):
+            rank = (page - 1) * rows + i
+            price = base + step * rank if side == 'SELL' else base - step * rank
+            ads.append({
+                'advertiser': {'nickName': f"competitor{rank + 1}"},
+                'adv': {
+                    'price': f"{price:.4f}",
+                    'surplusAmount': f"{self._random.uniform(100, 5000):.2f}",
+                    'minSingleTransAmount': f"{market['min_amount']}",
+                    'maxSingleTransAmount': f"{market['max_amount']}",
+                },
+            })
+        return web.json_response({'code': '000000', 'data': ads, 'total': rows * 5, 'success': True})
+
+    # --------------------------------------------------------------------------
+    # MercadoPago
+    # --------------------------------------------------------------------------
+
+    async def _mp_home(self, request: web.Request) -> web.Response:
+        body = "<h1>Inicio</h1><p>Dinero disponible</p><a href='/mp/transfer'>Transferir</a>"
+        return _page('Mercado Pago', body, data={'base': '/mp'})
+
+    async def _mp_transfer(self, request: web.Request) -> web.Response:
+        return _page('Mercado Pago', "<div id='wizard'></div>", MP_TRANSFER_JS, {'base': '/mp'})
+
+    async def _mp_transfer_done(self, request: web.Request) -> web.Response:
+        transfer = next((t for t in self.transfers if t['id'] == request.query.get('id')), None)
+        if transfer is None:
+            body = "<h1>No pudimos hacer la transferencia</h1>"
+        else:
+            body = (f"<h1>Le transferiste {_money(transfer['amount'], 'ARS')}</h1>"
+                    f"<p>{transfer['destination']}</p>")
+        return _page('Mercado Pago', body)
+
+    async def _mp_activities(self, request: web.Request) -> web.Response:
+        return _page('Actividad', "<h1>Actividad</h1><div id='list'></div>",
+                     MP_ACTIVITIES_JS, {'base': '/mp'})
+
+    async def _mp_activities_api(self, request: web.Request) -> web.Response:
+        page = max(1, int(request.query.get('page') or 1))
+        size = 20
+        newest = self.movements[::-1][(page - 1) * size:page * size]
+        results = []
+        for m in newest:
+            fraction, cents = f"{m['amount']:.2f}".split('.')
+            results.append({
+                'id': m['id'],
+                'amount': {'fraction': fraction, 'cents': cents, 'sign': m['sign']},
+                'title': m['title'],
+                'description': m['description'],
+                'date': datetime.fromtimestamp(m['ts'], timezone.utc).isoformat(),
+                'display': _money(m['amount'], 'ARS'),
+            })
+        return web.json_response({'results': results, 'paging': {'page': page, 'total': len(self.movements)}})
+
+    # --------------------------------------------------------------------------
+    # Produbanco
+    # --------------------------------------------------------------------------
+
+    async def _pb_home(self, request: web.Request) -> web.Response:
+        body = ("<nav><a href='/produbanco/Produnet/transferencias' target='iframe_a'>Transferencias</a></nav>"
+                "<iframe name='iframe_a' src='/produbanco/Produnet/inicio' width='1200' height='700'></iframe>")
+        return _page('Produnet', body)
+
+    async def _pb_start(self, request: web.Request) -> web.Response:
+        body = ("<h1>Posición consolidada</h1>"
+                "<a href='/produbanco/Produnet/movimientos'>Movimientos</a>")
+        return _page('Produnet', body)
+
+    async def _pb_transfer(self, request: web.Request) -> web.Response:
+        body = ("<h1>Transferencias</h1><div class='wp-opcion-transferencia'>A un nuevo contacto</div>"
+                "<div class='wp-opcion-transferencia'>A mis contactos</div><div id='form'></div>")
+        return _page('Produnet', body, PRODUBANCO_TRANSFER_JS, {'base': '/produbanco'})
+
+    async def _pb_movements(self, request: web.Request) -> web.Response:
+        rows = ''.join(
+            f"<tr><td>{_money(row['amount'], 'USD')}</td><td>{row['text']}</td><td>Ref {row['ref']}</td></tr>"
+            for row in self.bank_rows[::-1][:50]
+        )
+        body = (f"<h1>Movimientos</h1><table><tr><th>Monto</th><th>Detalle</th><th>Referencia</th></tr>"
+                f"{rows}</table>")
+        return _page('Produnet', body)
+
+    # --------------------------------------------------------------------------
+    # Shared transfer endpoints
+    # --------------------------------------------------------------------------
+
+    async def _accounts(self, request: web.Request) -> web.Response:
+        destination = request.query.get('q', '')
+        order = next((o for o in self.orders.values()
+                      if o.trade_type == 'BUY' and o.destination == destination), None)
+        if order is None:
+            return web.json_response({'found': False})
+        return web.json_response({'found': True, 'name': order.counterparty})
+
+    async def _transfer(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        try:
+            amount = float(payload.get('amount'))
+        except (TypeError, ValueError):
+            return web.json_response({'id': None}, status=400)
+        return web.json_response({'id': self.transfer(str(payload.get('destination', '')), amount)})
+
+
+# ==============================================================================
+# CLI
+# ==============================================================================
+
+async def main(args):
+    simulator = P2PSimulator(host=args.host, port=args.port, rate_per_minute=args.rate,
+                             sell_ratio=args.sell_ratio, fiat=args.fiat, seed=args.seed,
+                             log=lambda msg, level="DEBUG": print(f"[{level}] {msg}"))
+    await simulator.start()
+    print(json.dumps(simulator.endpoints(), indent=2))
+    try:
+        while True:
+            await asyncio.sleep(args.report_seconds)
+            print(json.dumps(simulator.summary()))
+    finally:
+        await simulator.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Binance/MercadoPago/Produbanco simulator")
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--rate", type=float, default=6.0, help="Orders per minute (Poisson arrivals)")
+    parser.add_argument("--sell-ratio", type=float, default=0.5, help="Share of SELL orders")
+    parser.add_argument("--fiat", choices=sorted(MARKETS), default='ARS', help="ARS (MercadoPago) or USD (Produbanco)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--report-seconds", type=float, default=60, help="Print a summary every N seconds")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
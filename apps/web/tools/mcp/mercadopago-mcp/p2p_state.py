@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Daemon State Manager
+====================
+
+Key/value state for the daemons (processed orders, daily volume, prices...).
+
+Two modes:
+- Snapshot mode (`journal=False`): the whole state is rewritten to
+  `file_path` every `flush_interval` seconds
+- Journal mode (default): every mutation appends one compact record to
+  `<file_path>.journal`; mutations of `durable_keys` (the processed/released
+  order sets) are fsynced before the call returns, the rest are flushed every
+  `flush_interval` seconds. A background compaction writes a snapshot and
+  truncates the journal once it grows past `compact_bytes` or every
+  `compact_interval` seconds. Loading is snapshot + replay.
+
+Journal records are JSON arrays: [seq, op, key, value] with op one of
+'s' (set), 'a' (add_to_set), 'l' (append_to_list), 'i' (increment),
+'r' (add to an OrderRegistry, value = [order_id, timestamp]).
+The snapshot stores the last applied seq, so replay after a crash between
+snapshot and truncate never applies a record twice.
+
+A default that is an OrderRegistry (e.g. processed_orders) makes that key a
+retention-bounded registry instead of a plain set; add_to_set() and `in`
+work the same.
+
+Usage:
+    state = StateManager('/var/lib/p2p/state.json', defaults={...})
+    await state.start()
+    state.add_to_set('processed_orders', order_id)   # Durable on return
+    await state.stop()
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Optional, Dict, List, Any, Callable, Iterable
+
+import aiofiles
+
+from p2p_order_registry import OrderRegistry
+
+STATE_FLUSH_INTERVAL = 30  # Save state every 30 seconds
+
+# Keys stored as sets by older snapshots that did not record _set_keys
+LEGACY_SET_KEYS = ('processed_orders', 'released_orders')
+
+SEQ_KEY = '_journal_seq'
+SET_KEYS_KEY = '_set_keys'
+
+
+def _json_default(value):
+    if isinstance(value, set):
+        return list(value)
+    if isinstance(value, OrderRegistry):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class StateManager:
+    """Manages state with a write-ahead journal (or batch saving)."""
+
+    def __init__(self, file_path: str, flush_interval: int = STATE_FLUSH_INTERVAL,
+                 defaults: Dict = None, journal: bool = True,
+                 durable_keys: Iterable[str] = LEGACY_SET_KEYS,
+                 compact_interval: float = 600, compact_bytes: int = 1_000_000,
+                 log: Callable = None):
+        self.file_path = file_path
+        self.journal_path = f"{file_path}.journal"
+        self.flush_interval = flush_interval
+        self.defaults = defaults or {}
+        self.journal = journal
+        self.durable_keys = set(durable_keys)
+        self.compact_interval = compact_interval
+        self.compact_bytes = compact_bytes
+        self._log = log
+
+        self._state: Dict = {}
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+        # Journal mode
+        self._seq = 0
+        self._pending: List[str] = []
+        self._journal_fd: Optional[int] = None
+        self._journal_bytes = 0
+        self._last_compact = time.time()
+
+    def log(self, msg: str, level: str = "DEBUG"):
+        if self._log:
+            self._log(msg, level)
+
+    async def start(self):
+        """Load state and start flush loop."""
+        await self._load()
+        if self.journal:
+            self._open_journal()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop and save final state."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self.journal:
+            self.compact()
+            self._close_journal()
+        else:
+            await self._save()
+
+    # --------------------------------------------------------------------------
+    # Load
+    # --------------------------------------------------------------------------
+
+    def _default_state(self) -> Dict:
+        state = {}
+        for key, value in self.defaults.items():
+            if isinstance(value, OrderRegistry):
+                value = value.fresh()
+            elif isinstance(value, set):
+                value = set(value)
+            state[key] = value
+        return state
+
+    async def _load(self):
+        """Load snapshot from file, then replay the journal."""
+        set_keys = LEGACY_SET_KEYS
+        if os.path.exists(self.file_path):
+            async with aiofiles.open(self.file_path, 'r') as f:
+                content = await f.read()
+            self._state = json.loads(content) if content else {}
+            self._seq = self._state.pop(SEQ_KEY, 0)
+            set_keys = self._state.pop(SET_KEYS_KEY, LEGACY_SET_KEYS)
+        else:
+            self._state = self._default_state()
+
+        # Convert lists to sets for O(1) lookup
+        for key in set_keys:
+            if key in self._state and isinstance(self._state[key], list):
+                self._state[key] = set(self._state[key])
+
+        # Registries: restore from their dict form (or a legacy list/set)
+        for key, default in self.defaults.items():
+            if isinstance(default, OrderRegistry):
+                self._state[key] = default.fresh().restore(self._state.get(key))
+
+        if self.journal and os.path.exists(self.journal_path):
+            replayed = await self._replay()
+            if replayed:
+                self.log(f"State: replayed {replayed} journal records", "INFO")
+
+    async def _replay(self) -> int:
+        replayed = 0
+        async with aiofiles.open(self.journal_path, 'r') as f:
+            async for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    seq, op, key, value = json.loads(line)
+                except (ValueError, TypeError):
+                    # Torn write from a crash mid-append; later records are still applied
+                    self.log(f"State: skipping corrupt journal record: {line[:80]}", "WARN")
+                    continue
+                if seq <= self._seq:
+                    continue  # Already in the snapshot
+                self._apply(op, key, value)
+                self._seq = seq
+                replayed += 1
+        return replayed
+
+    def _apply(self, op: str, key: str, value: Any):
+        if op == 's':
+            self._state[key] = value
+        elif op in ('a', 'r'):
+            item, ts = value if op == 'r' else (value, None)
+            current = self._state.get(key)
+            if isinstance(current, OrderRegistry):
+                current.add(item, ts)
+                return
+            if not isinstance(current, set):
+                current = set(current or [])
+                self._state[key] = current
+            current.add(item)
+        elif op == 'l':
+            self._state.setdefault(key, []).append(value)
+        elif op == 'i':
+            self._state[key] = self._state.get(key, 0) + value
+
+    # --------------------------------------------------------------------------
+    # Journal
+    # --------------------------------------------------------------------------
+
+    def _open_journal(self):
+        self._journal_fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        self._journal_bytes = os.fstat(self._journal_fd).st_size
+        self._flush_pending(fsync=True)
+
+    def _close_journal(self):
+        if self._journal_fd is not None:
+            os.close(self._journal_fd)
+            self._journal_fd = None
+
+    def _record(self, op: str, key: str, value: Any):
+        self._dirty = True
+        if not self.journal:
+            return
+        self._seq += 1
+        self._pending.append(json.dumps([self._seq, op, key, value],
+                                        default=_json_default, separators=(',', ':')))
+        if key in self.durable_keys:
+            self._flush_pending(fsync=True)
+
+    def _flush_pending(self, fsync: bool = False):
+        """Append buffered records to the journal (in order)."""
+        if self._journal_fd is None or not self._pending:
+            return
+        data = ('\n'.join(self._pending) + '\n').encode()
+        os.write(self._journal_fd, data)
+        self._journal_bytes += len(data)
+        self._pending.clear()
+        if fsync:
+            os.fsync(self._journal_fd)
+
+    def _snapshot(self) -> str:
+        state = dict(self._state)
+        state[SEQ_KEY] = self._seq
+        state[SET_KEYS_KEY] = [k for k, v in self._state.items() if isinstance(v, set)]
+        return json.dumps(state, default=_json_default, separators=(',', ':'))
+
+    def compact(self):
+        """
+        Write a snapshot and truncate the journal.
+        Synchronous on purpose: no mutation may land between the snapshot and
+        the truncate, or it would be lost.
+        """
+        if self._journal_fd is None:
+            return
+        self._flush_pending()
+        for value in self._state.values():
+            if isinstance(value, OrderRegistry):
+                value.prune()
+        temp_file = f"{self.file_path}.tmp"
+        with open(temp_file, 'w') as f:
+            f.write(self._snapshot())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.file_path)  # Atomic on POSIX
+        os.ftruncate(self._journal_fd, 0)
+        self._journal_bytes = 0
+        self._last_compact = time.time()
+        self._dirty = False
+
+    def _should_compact(self) -> bool:
+        if self._journal_bytes >= self.compact_bytes:
+            return True
+        return self._journal_bytes > 0 and time.time() - self._last_compact >= self.compact_interval
+
+    # --------------------------------------------------------------------------
+    # Snapshot mode
+    # --------------------------------------------------------------------------
+
+    async def _save(self):
+        """Save state to file."""
+        async with self._lock:
+            if self._dirty:
+                temp_file = f"{self.file_path}.tmp"
+                async with aiofiles.open(temp_file, 'w') as f:
+                    await f.write(json.dumps(self._state, default=_json_default, indent=2))
+                os.replace(temp_file, self.file_path)  # Atomic on POSIX
+                self._dirty = False
+
+    async def _flush_loop(self):
+        """Periodically flush the journal (compacting when due) or save state."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if not self.journal:
+                await self._save()
+                continue
+            try:
+                self._flush_pending(fsync=True)
+                if self._should_compact():
+                    self.compact()
+            except OSError as e:
+                self.log(f"State: journal flush failed: {e}", "ERROR")
+
+    # --------------------------------------------------------------------------
+    # API
+    # --------------------------------------------------------------------------
+
+    def get(self, key: str, default=None):
+        return self._state.get(key, default)
+
+    def set(self, key: str, value: Any):
+        self._state[key] = value
+        self._record('s', key, value)
+
+    def append_to_list(self, key: str, value: Any):
+        if key not in self._state:
+            self._state[key] = []
+        self._state[key].append(value)
+        self._record('l', key, value)
+
+    def add_to_set(self, key: str, value: Any):
+        """Add value to a set (O(1) lookup, no duplicates)."""
+        if key not in self._state:
+            self._state[key] = set()
+        if value in self._state[key]:
+            return
+        if isinstance(self._state[key], OrderRegistry):
+            ts = time.time()
+            self._state[key].add(value, ts)
+            self._record('r', key, [value, ts])
+            return
+        self._state[key].add(value)
+        self._record('a', key, value)
+
+    def increment(self, key: str, amount: float = 1):
+        self._state[key] = self._state.get(key, 0) + amount
+        self._record('i', key, amount)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+P2P Market Supervisor
+=====================
+
+Runs several markets (p2p_daemon_v3.py, p2p_daemon_ecuador.py) in one event
+loop on a SharedStack: one Chromium context, one HTTP connection pool and one
+competitor-price cache instead of one of each per process.
+
+Each market keeps its own config, logger, state, rate limiter, idempotency
+store, page pool, tracer and metrics endpoint, so safety limits stay per
+market. A market that crashes is logged and stopped; the others keep running.
+
+The browser profile and headless flag come from the first market's config,
+so that profile must be logged in to every market's bank.
+
+Usage:
+    python p2p_supervisor.py                      # v3 + ecuador, default configs
+    python p2p_supervisor.py --market v3=p2p_config.json --market ecuador=ec.json
+    python p2p_supervisor.py --dry-run
+"""
+
+import asyncio
+import json
+from typing import Callable, Dict, List, Tuple, Type
+
+from p2p_core import P2PEngine, PRICE_CACHE_STALE, PRICE_CACHE_TTL, SharedStack
+from p2p_daemon_ecuador import CONFIG_FILE as ECUADOR_CONFIG, P2PDaemonEcuador
+from p2p_daemon_v3 import CONFIG_FILE as V3_CONFIG, P2PDaemon
+from p2p_metrics import DaemonMetrics, MetricsRegistry
+
+MARKETS: Dict[str, Tuple[Type[P2PEngine], str]] = {
+    'v3': (P2PDaemon, V3_CONFIG),
+    'ecuador': (P2PDaemonEcuador, ECUADOR_CONFIG),
+}
+
+
+class Supervisor:
+    """Start, run and stop several markets that share one browser and HTTP stack."""
+
+    def __init__(self, markets: List[Tuple[Type[P2PEngine], str]], log: Callable = None):
+        self._log = log
+        config = self._first_config(markets)
+        self.stack = SharedStack(
+            config.get('browser_profile', markets[0][0].DEFAULTS['browser_profile']),
+            headless=config.get('headless', False),
+            price_cache_ttl=config.get('price_cache_ttl_seconds', PRICE_CACHE_TTL),
+            price_cache_stale=config.get('price_cache_stale_seconds', PRICE_CACHE_STALE),
+            log=self.log
+        )
+        self.daemons: List[P2PEngine] = [cls(path, shared=self.stack) for cls, path in markets]
+        # The first market serves the process-wide registry (retry counters);
+        # the others get their own so per-market series never mix
+        for daemon in self.daemons[1:]:
+            daemon.metrics = DaemonMetrics(MetricsRegistry())
+        self.stats = {'crashed': 0}
+
+    @staticmethod
+    def _first_config(markets: List[Tuple[Type[P2PEngine], str]]) -> Dict:
+        with open(markets[0][1], 'r') as f:
+            return json.load(f)
+
+    def log(self, msg: str, level: str = "INFO"):
+        if self._log:
+            self._log(msg, level)
+        else:
+            print(f"[SUPERVISOR] [{level}] {msg}")
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+    async def start(self):
+        """HTTP and per-market services first, then the shared browser, then each market's pages."""
+        await self.stack.start_services()
+        for daemon in self.daemons:
+            await daemon.start_services()
+        await self.stack.start_browser()
+        for daemon in self.daemons:
+            await daemon.start_browser()
+        self.log(f"{len(self.daemons)} markets ready: " + ', '.join(d.FIAT for d in self.daemons))
+
+    async def stop(self):
+        """Stop every market (one failure does not skip the rest), then the shared stack."""
+        for daemon in reversed(self.daemons):
+            try:
+                await daemon.stop()
+            except Exception as e:
+                self.log(f"Error stopping {daemon.FIAT} market: {e}", "ERROR")
+        await self.stack.stop()
+
+    async def run(self):
+        """Run every market until all of them have stopped."""
+        await asyncio.gather(*(self._run_market(daemon) for daemon in self.daemons))
+
+    async def _run_market(self, daemon: P2PEngine):
+        try:
+            await daemon.run()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats['crashed'] += 1
+            daemon.log(f"Market stopped after an error: {e}", "ERROR")
+            self.log(f"{daemon.FIAT} market crashed: {e}", "ERROR")
+
+
+# ==============================================================================
+# MAIN
+# ==============================================================================
+
+def parse_markets(specs: List[str]) -> List[Tuple[Type[P2PEngine], str]]:
+    """`name` or `name=config_path` entries (default: every market)."""
+    markets = []
+    for spec in specs or list(MARKETS):
+        name, _, path = spec.partition('=')
+        if name not in MARKETS:
+            raise ValueError(f"Unknown market: {name} (expected one of {', '.join(MARKETS)})")
+        cls, default_path = MARKETS[name]
+        markets.append((cls, path or default_path))
+    return markets
+
+
+async def main(specs: List[str] = None, dry_run: bool = False):
+    async with Supervisor(parse_markets(specs)) as supervisor:
+        if dry_run:
+            for daemon in supervisor.daemons:
+                daemon.config['dry_run'] = True
+                daemon.log("DRY-RUN MODE ENABLED via command line", "WARN")
+        await supervisor.run()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Run several P2P markets on one browser')
+    parser.add_argument('--market', action='append', default=[], metavar='NAME[=CONFIG]',
+                        help=f"Market to run ({', '.join(MARKETS)}); repeatable, default all")
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Enable dry-run mode (no real transfers)')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args.market, dry_run=args.dry_run))
+    except KeyboardInterrupt:
+        print("\nSupervisor stopped")
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Order Tracing
+=============
+
+Lightweight per-order traces: one trace per processing attempt of an order,
+with nested spans for each step (payment details, transfer, mark-paid,
+payment check, release). Every finished span is written as one JSON line,
+so the log lines of an order can be correlated and the step that dominates
+end-to-end latency can be found.
+
+- The current span lives in a ContextVar: each worker task has its own, and
+  code called inside a span (e.g. `retry_with_backoff`, page leases) can
+  annotate it without being passed a tracer
+- Spans outside a trace are not written, so instrumented helpers can also
+  run from loops that are not order flows
+- Span lines are queued and written in batches by a background task to a
+  rotating file (same sink as the logger); a full queue drops and counts
+- `python p2p_tracing.py /tmp/p2p_traces_v3.jsonl` prints per-stage
+  p50/p95/p99 and the slowest orders
+
+Span line:
+    {"trace_id": "...", "span_id": 3, "parent_id": 1, "order_id": "2201...",
+     "name": "execute_transfer", "start": 1791..., "end": 1791...,
+     "duration": 8.41, "outcome": "ok", "retries": 0, "bank": "mercadopago", "page": "mp#2"}
+
+Usage:
+    tracer = Tracer('/tmp/p2p_traces_v3.jsonl', log=self.log)
+    await tracer.start()
+
+    with tracer.trace(order_id, type='buy', start=detected_at):
+        with tracer.span('execute_transfer', bank='mercadopago') as span:
+            annotate(page='mp#2')
+            span.outcome = 'ok' if await transfer() else 'failed'
+"""
+
+import argparse
+import asyncio
+import gzip
+import itertools
+import json
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from p2p_logger import LogSink
+
+_ids = itertools.count(1)
+
+
+class Span:
+    """One timed step of a trace."""
+
+    __slots__ = ('trace_id', 'order_id', 'span_id', 'parent_id', 'name',
+                 'start', 'end', 'outcome', 'retries', 'attrs')
+
+    def __init__(self, trace_id: str, order_id: str, name: str,
+                 parent_id: Optional[int] = None, start: float = None, **attrs):
+        self.trace_id = trace_id
+        self.order_id = order_id
+        self.span_id = next(_ids)
+        self.parent_id = parent_id
+        self.name = name
+        self.start = start or time.time()
+        self.end: Optional[float] = None
+        self.outcome = 'ok'
+        self.retries = 0
+        self.attrs: Dict = dict(attrs)
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.time()) - self.start
+
+    def to_dict(self) -> Dict:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'order_id': self.order_id,
+            'name': self.name,
+            'start': round(self.start, 3),
+            'end': round(self.end or time.time(), 3),
+            'duration': round(self.duration, 3),
+            'outcome': self.outcome,
+            'retries': self.retries,
+            **self.attrs,
+        }
+
+
+_current: ContextVar[Optional[Span]] = ContextVar('p2p_current_span', default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def annotate(**attrs):
+    """Add attributes to the current span (no-op outside a trace)."""
+    span = _current.get()
+    if span:
+        span.set(**attrs)
+
+
+def set_outcome(outcome: str):
+    """Set the outcome of the current span (no-op outside a trace)."""
+    span = _current.get()
+    if span:
+        span.outcome = outcome
+
+
+def note_retry():
+    """Count a retry on the current span (no-op outside a trace)."""
+    span = _current.get()
+    if span:
+        span.retries += 1
+
+
+# ==============================================================================
+# TRACER
+# ==============================================================================
+
+class Tracer:
+    """Opens traces and spans and writes finished spans as JSON lines."""
+
+    def __init__(self, path: Optional[str], max_queue: int = 10000, max_bytes: int = 0,
+                 backups: int = 5, compress: bool = False, log: Callable = None):
+        self.path = path  # None = tracing disabled (spans are timed but not written)
+        self._sink = LogSink(path, max_bytes=max_bytes, backups=backups,
+                             compress=compress) if path else None
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._log = log
+        self.stats = {'traces': 0, 'spans': 0, 'dropped': 0, 'write_errors': 0}
+
+    def log(self, msg: str, level: str = "DEBUG"):
+        if self._log:
+            self._log(msg, level)
+
+    @property
+    def enabled(self) -> bool:
+        return self._sink is not None
+
+    async def start(self):
+        if self.enabled:
+            self._task = asyncio.create_task(self._writer_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # A batch handed to a worker thread before cancel still completes
+        if self._inflight:
+            await asyncio.gather(self._inflight, return_exceptions=True)
+        lines = self._drain()
+        if lines:
+            self._write(lines)
+        if self._sink:
+            self._sink.close()
+
+    # --------------------------------------------------------------------------
+    # Writer
+    # --------------------------------------------------------------------------
+
+    def _drain(self, limit: Optional[int] = None) -> List[str]:
+        lines = []
+        while not self._queue.empty() and (limit is None or len(lines) < limit):
+            lines.append(json.dumps(self._queue.get_nowait(), default=str))
+        return lines
+
+    def _write(self, lines: List[str]):
+        try:
+            self._sink.write_batch(lines)
+        except OSError as e:
+            self.stats['write_errors'] += 1
+            self.log(f"Tracer: write to {self.path} failed: {e}", "WARN")
+
+    async def _writer_loop(self):
+        while True:
+            first = await self._queue.get()
+            lines = [json.dumps(first, default=str)] + self._drain(limit=499)
+            self._inflight = asyncio.ensure_future(asyncio.to_thread(self._write, lines))
+            await asyncio.shield(self._inflight)
+
+    def _emit(self, span: Span):
+        if not self.enabled:
+            return
+        self.stats['spans'] += 1
+        try:
+            self._queue.put_nowait(span.to_dict())
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+
+    # --------------------------------------------------------------------------
+    # API
+    # --------------------------------------------------------------------------
+
+    @contextmanager
+    def _open(self, span: Span) -> Iterator[Span]:
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.outcome = 'cancelled' if isinstance(e, asyncio.CancelledError) else 'error'
+            span.set(error=str(e)[:200])
+            raise
+        finally:
+            span.end = time.time()
+            _current.reset(token)
+            self._emit(span)
+
+    @contextmanager
+    def trace(self, order_id: str, name: str = 'order', start: float = None,
+              **attrs) -> Iterator[Span]:
+        """Open the root span of one processing attempt of an order."""
+        self.stats['traces'] += 1
+        root = Span(uuid.uuid4().hex[:16], str(order_id), name, start=start, **attrs)
+        if start:
+            # Time between detection and a worker picking the order up
+            self.record('queued', start, time.time(), parent=root)
+        with self._open(root) as span:
+            yield span
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Span]:
+        """Open a child of the current span (outside a trace, a span nobody writes)."""
+        parent = _current.get()
+        if parent is None:
+            yield Span('', '', name, **attrs)
+            return
+        child = Span(parent.trace_id, parent.order_id, name, parent_id=parent.span_id, **attrs)
+        with self._open(child) as span:
+            yield span
+
+    def record(self, name: str, start: float, end: float, parent: Span = None, **attrs):
+        """Write an already finished span (e.g. a wait measured elsewhere)."""
+        parent = parent or _current.get()
+        if parent is None:
+            return
+        span = Span(parent.trace_id, parent.order_id, name, parent_id=parent.span_id,
+                    start=start, **attrs)
+        span.end = end
+        self._emit(span)
+
+
+# ==============================================================================
+# REPORT (CLI)
+# ==============================================================================
+
+def read_spans(paths: Iterable[str]) -> Iterator[Dict]:
+    """Span dicts from JSON-lines files (rotated `.gz` backups included)."""
+    for path in paths:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    span = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(span, dict) and 'name' in span and 'duration' in span:
+                    yield span
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * q // 100))  # ceil
+    return values[int(rank) - 1]
+
+
+def summarize(spans: Iterable[Dict], slowest: int = 10, since: float = 0) -> Dict:
+    """Per-stage latency percentiles and the slowest order traces."""
+    stages: Dict[str, List[float]] = {}
+    outcomes: Dict[str, Dict[str, int]] = {}
+    roots: List[Dict] = []
+    for span in spans:
+        if span.get('start', 0) < since:
+            continue
+        name = span['name']
+        stages.setdefault(name, []).append(float(span['duration']))
+        counts = outcomes.setdefault(name, {})
+        counts[span.get('outcome', 'ok')] = counts.get(span.get('outcome', 'ok'), 0) + 1
+        if span.get('parent_id') is None:
+            roots.append(span)
+
+    table = []
+    for name, durations in stages.items():
+        durations.sort()
+        table.append({
+            'stage': name,
+            'count': len(durations),
+            'p50': percentile(durations, 50),
+            'p95': percentile(durations, 95),
+            'p99': percentile(durations, 99),
+            'max': durations[-1],
+            'total': sum(durations),
+            'outcomes': outcomes[name],
+        })
+    table.sort(key=lambda row: row['total'], reverse=True)
+    roots.sort(key=lambda span: span['duration'], reverse=True)
+    return {'stages': table, 'slowest': roots[:slowest]}
+
+
+def format_report(summary: Dict) -> str:
+    lines = [f"{'stage':<28}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  outcomes"]
+    for row in summary['stages']:
+        outcomes = ', '.join(f"{k}={v}" for k, v in sorted(row['outcomes'].items()))
+        lines.append(f"{row['stage']:<28}{row['count']:>7}{row['p50']:>9.2f}{row['p95']:>9.2f}"
+                     f"{row['p99']:>9.2f}{row['max']:>9.2f}  {outcomes}")
+    if summary['slowest']:
+        lines.append("")
+        lines.append("Slowest orders:")
+        for span in summary['slowest']:
+            lines.append(f"  {span.get('order_id', '?'):<22} {span.get('type', ''):<5}"
+                         f"{span['duration']:>9.2f}s  {span.get('outcome', '')}  trace={span['trace_id']}")
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-stage latency report from P2P order traces")
+    parser.add_argument("paths", nargs='+', help="Span log files (JSON lines, .gz backups allowed)")
+    parser.add_argument("--slowest", type=int, default=10, help="Slowest orders to list")
+    parser.add_argument("--hours", type=float, default=0, help="Only spans from the last N hours")
+    parser.add_argument("--json", action='store_true', help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    since = time.time() - args.hours * 3600 if args.hours else 0
+    summary = summarize(read_spans(args.paths), slowest=args.slowest, since=since)
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+    else:
+        print(format_report(summary))
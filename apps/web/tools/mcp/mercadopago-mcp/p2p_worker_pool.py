@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Order Worker Pool
+=================
+
+Bounded pool of asyncio workers fed by a queue of detected orders, so a
+slow transfer (e.g. a 120 s QR wait) no longer blocks every other order.
+
+Duplicate submissions of an order that is still queued or in flight are
+ignored; per-order exclusion across scans is still enforced by
+OrderProcessingLock inside the handler.
+
+Usage:
+    pool = OrderWorkerPool(handler=process_order, workers=3)
+    await pool.start()
+    pool.submit(order)      # order dict with 'type' and 'order_number'
+    await pool.stop()
+"""
+
+import asyncio
+from typing import Optional, Dict, List, Callable, Awaitable
+
+
+class OrderWorkerPool:
+    """Concurrent order processing with a bounded queue."""
+
+    def __init__(self, handler: Callable[[Dict], Awaitable], workers: int = 3,
+                 max_queue: int = 100, log: Callable = None):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self._log = log
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._tasks: List[asyncio.Task] = []
+        self._pending: set = set()  # Job keys queued or in flight
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'duplicates': 0, 'dropped': 0}
+
+    def log(self, msg: str, level: str = "DEBUG"):
+        if self._log:
+            self._log(msg, level)
+
+    @staticmethod
+    def job_key(order: Dict) -> str:
+        return f"{order.get('type')}:{order.get('order_number')}"
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def start(self):
+        """Spawn the worker tasks."""
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(i)))
+
+    async def stop(self):
+        """Cancel workers. Orders in flight are interrupted, queued ones dropped."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks.clear()
+
+    async def join(self):
+        """Wait until every submitted order has been handled."""
+        await self._queue.join()
+
+    def submit(self, order: Dict) -> bool:
+        """Queue an order. Returns False if it is already pending or the queue is full."""
+        key = self.job_key(order)
+        if key in self._pending:
+            self.stats['duplicates'] += 1
+            return False
+        try:
+            self._queue.put_nowait(order)
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+            self.log(f"Worker pool: queue full, dropping {key} until next scan", "WARN")
+            return False
+        self._pending.add(key)
+        self.stats['submitted'] += 1
+        return True
+
+    async def _worker(self, worker_id: int):
+        while True:
+            order = await self._queue.get()
+            key = self.job_key(order)
+            try:
+                await self.handler(order)
+                self.stats['completed'] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats['failed'] += 1
+                self.log(f"Worker {worker_id}: error processing {key}: {e}", "ERROR")
+            finally:
+                self._pending.discard(key)
+                self._queue.task_done()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the HTTP ad price updater.
+
+Run with: pytest test_ad_api.py -v
+"""
+
+import hashlib
+import pytest
+
+from p2p_ad_api import ADV_LIST_PATH, ADV_UPDATE_PATH, BinanceAdAPI
+
+
+class FakeContext:
+    """Browser context whose cookies can change between exports."""
+
+    def __init__(self, cookies):
+        self.cookies_list = cookies
+        self.exports = 0
+
+    async def cookies(self, url=None):
+        self.exports += 1
+        return list(self.cookies_list)
+
+
+class FakeResponse:
+    def __init__(self, payload, status=200):
+        self.status = status
+        self.payload = payload
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def json(self, content_type=None):
+        return self.payload
+
+
+class FakeSession:
+    """Answers list/update calls; rejects requests without the expected token."""
+
+    def __init__(self, token='t1', ads=None, update_status=200):
+        self.token = token
+        self.ads = ads if ads is not None else [
+            {'advNo': '111', 'tradeType': 'SELL', 'asset': 'USDT', 'fiatUnit': 'ARS'},
+            {'advNo': '222', 'tradeType': 'BUY', 'asset': 'USDT', 'fiatUnit': 'ARS'},
+        ]
+        self.update_status = update_status
+        self.calls = []
+
+    def post(self, url, json, headers=None):
+        self.calls.append((url, json, headers))
+        if f"p20t={self.token}" not in (headers or {}).get('Cookie', ''):
+            return FakeResponse({'success': False, 'code': '100001005'})
+        if url.endswith(ADV_LIST_PATH):
+            return FakeResponse({'success': True, 'data': self.ads})
+        if url.endswith(ADV_UPDATE_PATH):
+            return FakeResponse({'success': True}, status=self.update_status)
+        return FakeResponse({}, status=404)
+
+
+def cookies(token='t1'):
+    return [{'name': 'p20t', 'value': token}, {'name': 'cr00', 'value': 'abc'},
+            {'name': 'bnc-uuid', 'value': 'uuid-1'}]
+
+
+# ==============================================================================
+# COOKIE EXPORT TESTS
+# ==============================================================================
+
+class TestHeadersFromCookies:
+    """Tests for BinanceAdAPI.headers_from_cookies()."""
+
+    def test_csrf_derived_from_cookie(self):
+        headers = BinanceAdAPI.headers_from_cookies(cookies())
+        assert headers['csrftoken'] == hashlib.md5(b'abc').hexdigest()
+        assert headers['bnc-uuid'] == 'uuid-1'
+        assert 'p20t=t1' in headers['Cookie']
+
+    def test_logged_out_is_none(self):
+        assert BinanceAdAPI.headers_from_cookies([{'name': 'cr00', 'value': 'abc'}]) is None
+
+
+# ==============================================================================
+# PRICE UPDATE TESTS
+# ==============================================================================
+
+class TestUpdatePrice:
+    """Tests for BinanceAdAPI.update_price()."""
+
+    @pytest.mark.asyncio
+    async def test_resolves_adv_no_once(self):
+        session = FakeSession()
+        api = BinanceAdAPI(session, FakeContext(cookies()))
+
+        assert await api.update_price('sell', 'USDT', 'ARS', 1250.456)
+        assert await api.update_price('sell', 'USDT', 'ARS', 1251)
+
+        urls = [url for url, _, _ in session.calls]
+        assert sum(url.endswith(ADV_LIST_PATH) for url in urls) == 1
+        assert session.calls[1][1] == {'advNo': '111', 'price': '1250.46'}
+        assert session.calls[2][1] == {'advNo': '111', 'price': '1251.00'}
+
+    @pytest.mark.asyncio
+    async def test_configured_adv_no_skips_lookup(self):
+        session = FakeSession()
+        api = BinanceAdAPI(session, FakeContext(cookies()))
+        assert await api.update_price('buy', 'USDT', 'USD', 1.0123, adv_no='999', decimals=4)
+        assert session.calls == [(api.base_url + ADV_UPDATE_PATH,
+                                  {'advNo': '999', 'price': '1.0123'}, api._headers)]
+
+    @pytest.mark.asyncio
+    async def test_expired_session_resynced(self):
+        context = FakeContext(cookies('old'))
+        session = FakeSession(token='new')
+        api = BinanceAdAPI(session, context)
+        await api.sync_from_context()
+
+        context.cookies_list = cookies('new')  # Browser refreshed its session
+        assert await api.update_price('sell', 'USDT', 'ARS', 1250, adv_no='111')
+        assert context.exports == 2
+
+    @pytest.mark.asyncio
+    async def test_logged_out_fails_without_request(self):
+        session = FakeSession()
+        api = BinanceAdAPI(session, FakeContext([]))
+        assert not await api.update_price('sell', 'USDT', 'ARS', 1250)
+        assert session.calls == []
+
+    @pytest.mark.asyncio
+    async def test_unknown_ad_fails(self):
+        api = BinanceAdAPI(FakeSession(ads=[]), FakeContext(cookies()))
+        assert not await api.update_price('sell', 'USDT', 'ARS', 1250)
+        assert api.stats['failures'] == 1
+
+    @pytest.mark.asyncio
+    async def test_cooldown_after_repeated_failures(self):
+        session = FakeSession(update_status=500)
+        api = BinanceAdAPI(session, FakeContext(cookies()), max_failures=2, cooldown=60)
+
+        assert not await api.update_price('sell', 'USDT', 'ARS', 1250, adv_no='111')
+        assert api.available
+        assert not await api.update_price('sell', 'USDT', 'ARS', 1250, adv_no='111')
+        assert not api.available
+
+        calls = len(session.calls)
+        assert not await api.update_price('sell', 'USDT', 'ARS', 1250, adv_no='111')
+        assert len(session.calls) == calls  # Straight to the UI fallback
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the MercadoPago bank adapter's transfer flow.
+
+Run with: pytest test_bank_mercadopago.py -v
+"""
+
+import pytest
+
+from p2p_bank_mercadopago import MercadoPagoBank, parse_amount_field
+from p2p_daemon_v3 import P2PDaemon
+from p2p_metrics import DaemonMetrics, MetricsRegistry
+
+
+# ==============================================================================
+# FAKES
+# ==============================================================================
+
+class FakePage:
+    """Transfer UI: `react_ok` is what setReactValue returns, `shown` what the input reads back."""
+
+    def __init__(self, react_ok=True, shown=None):
+        self.react_ok = react_ok
+        self.shown = shown
+        self.clicks = []
+        self.value = ''
+
+    async def goto(self, url):
+        pass
+
+    async def wait_for_load_state(self, state, timeout=None):
+        pass
+
+    async def wait_for_selector(self, selector, timeout=None, state=None):
+        pass
+
+    async def fill(self, selector, value):
+        pass
+
+    async def click(self, selector):
+        self.clicks.append(selector)
+
+    async def evaluate(self, script, payload=None):
+        name, args = payload
+        assert name == 'setReactValue'
+        if self.react_ok:
+            self.value = args[1]
+        return self.react_ok
+
+    async def input_value(self, selector):
+        return self.value if self.shown is None else self.shown
+
+    async def query_selector(self, selector):
+        if 'Transferir' in selector:
+            page = self
+
+            class Button:
+                async def click(self):
+                    page.clicks.append('submit')
+            return Button()
+        if 'Le transferiste' in selector:
+            return object()
+        return None
+
+
+def make_bank() -> MercadoPagoBank:
+    daemon = P2PDaemon('config.json')
+    daemon.metrics = DaemonMetrics(MetricsRegistry())
+    return MercadoPagoBank(daemon)
+
+
+async def transfer(page) -> bool:
+    bank = make_bank()
+    watch = bank.engine.metrics.transfer_steps.stopwatch(bank=bank.name)
+    return await bank.transfer(page, 'juan.perez.mp', 150000, {}, watch)
+
+
+# ==============================================================================
+# TRANSFER TESTS
+# ==============================================================================
+
+class TestTransfer:
+    """Tests for MercadoPagoBank.transfer amount checks."""
+
+    @pytest.mark.asyncio
+    async def test_amount_confirmed_then_submitted(self):
+        page = FakePage(shown='$ 150.000')
+        assert await transfer(page) is True
+        assert page.clicks[-1] == 'submit'
+
+    @pytest.mark.asyncio
+    async def test_missing_react_handler_aborts_before_submit(self):
+        page = FakePage(react_ok=False)
+        assert await transfer(page) is False
+        assert 'submit' not in page.clicks
+        assert page.clicks.count('text=Continuar') == 1  # Destination step only
+
+    @pytest.mark.asyncio
+    async def test_wrong_amount_shown_aborts_before_submit(self):
+        page = FakePage(shown='15.000')
+        assert await transfer(page) is False
+        assert 'submit' not in page.clicks
+
+    def test_parse_amount_field(self):
+        assert parse_amount_field('$ 150.000') == 150000
+        assert parse_amount_field('150.000,00') == 150000
+        assert parse_amount_field('150000') == 150000
+        assert parse_amount_field('') is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the shared P2P engine with fake exchange and bank adapters.
+
+Run with: pytest test_core.py -v
+"""
+
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List
+
+import pytest
+
+from p2p_core import BankAdapter, ExchangeAdapter, OrderProcessingLock, P2PEngine
+from p2p_idempotency import IdempotencyStore
+from p2p_metrics import DaemonMetrics, MetricsRegistry
+from p2p_order_book import BookSpec, OrderBook
+from p2p_order_feed import P2POrder
+from p2p_page_pool import PagePool
+from p2p_payment_matcher import IncomingPayment, PaymentMatcher
+from p2p_price_history import PriceHistory
+from p2p_rate_limiter import TransferRateLimiter
+from p2p_state import StateManager
+
+ALIAS = 'juan.perez.mp'
+
+
+# ==============================================================================
+# FAKES
+# ==============================================================================
+
+class FakePage:
+    def __init__(self):
+        self.main_frame = object()
+
+    def on(self, event, handler):
+        pass
+
+    def is_closed(self):
+        return False
+
+    async def close(self):
+        pass
+
+
+class FakeContext:
+    async def new_page(self):
+        return FakePage()
+
+
+class FakeLogger:
+    def __init__(self):
+        self.lines = []
+        self.events = []
+
+    def log(self, msg, level="INFO"):
+        self.lines.append((level, msg))
+
+    def log_structured(self, level, message, **fields):
+        self.events.append((level, message, fields))
+
+
+class FakeExchange(ExchangeAdapter):
+    name = 'fakex'
+    site = 'exchange'
+
+    def __init__(self, engine):
+        super().__init__(engine)
+        self.orders: List[Dict] = []
+        self.details: Dict = {'alias': ALIAS}
+        self.marked: List[str] = []
+        self.released: List[str] = []
+        self.release_ok = True
+        self.book_levels: List[Dict] = []
+
+    async def fetch_orders(self):
+        return self.orders
+
+    async def payment_details(self, page, order_href, patterns, order_id=None):
+        return dict(self.details)
+
+    async def mark_paid(self, page, order_href, order_id=None):
+        self.marked.append(order_id)
+        return True
+
+    async def release(self, page, order_href, order_id=None):
+        self.released.append(order_id)
+        return self.release_ok
+
+    async def fetch_book(self, spec, depth_pages=1):
+        return OrderBook(spec, list(self.book_levels), fetched_at=1_700_000_000.0)
+
+
+class FakeBank(BankAdapter):
+    name = 'fakebank'
+    site = 'bank'
+    country = 'AR'
+
+    def __init__(self, engine):
+        super().__init__(engine)
+        self.transfers = []
+        self.transfer_ok = True
+        self.payments = None
+        self.verified = None
+
+    def destination(self, details):
+        return details.get('alias')
+
+    async def transfer(self, page, destination, amount, details, watch):
+        self.transfers.append((destination, amount))
+        return self.transfer_ok
+
+    async def incoming_payments(self):
+        return self.payments
+
+    async def verify_payment(self, order, window_minutes, tolerance_percent):
+        return self.verified
+
+
+class FakeEngine(P2PEngine):
+    FIAT = 'ARS'
+    MAX_SINGLE_ORDER = ('max_single_order_ars', 100000)
+
+    def create_exchange(self):
+        return FakeExchange(self)
+
+    def create_bank(self):
+        return FakeBank(self)
+
+
+def order(number: str, kind: str = 'buy', amount: float = 5000, **fields) -> Dict:
+    return {'order_number': number, 'type': kind, 'amount_fiat': amount,
+            'href': f'https://example.test/order/{number}', **fields}
+
+
+@asynccontextmanager
+async def engine_running(tmp_path, config: Dict = None, max_per_minute: int = 100):
+    """FakeEngine with in-memory safety components and no browser."""
+    engine = FakeEngine(str(tmp_path / 'config.json'))
+    engine.config = {'notifications': {'sound': False, 'desktop': False}, **(config or {})}
+    engine.logger = FakeLogger()
+    engine.metrics = DaemonMetrics(MetricsRegistry())
+    engine.state = StateManager(str(tmp_path / 'state.json'), journal=False, defaults={
+        'processed_orders': set(), 'released_orders': set(), 'consumed_payments': set(),
+        engine.volume_key: 0, 'error_count': 0,
+    })
+    await engine.state.start()
+    engine.rate_limiter = TransferRateLimiter(max_per_minute=max_per_minute, max_per_hour=1000,
+                                              max_daily_amount=10 ** 9)
+    engine.idempotency = IdempotencyStore()
+    engine.order_lock = OrderProcessingLock()
+    engine.payment_matcher = PaymentMatcher()
+    engine.page_pool = PagePool(FakeContext())
+    try:
+        yield engine
+    finally:
+        await engine.state.stop()
+
+
+# ==============================================================================
+# TRANSFER SAFETY TESTS
+# ==============================================================================
+
+class TestTransfer:
+    """Tests for P2PEngine.transfer safety checks."""
+
+    @pytest.mark.asyncio
+    async def test_transfer_through_bank(self, tmp_path):
+        async with engine_running(tmp_path) as engine:
+            assert await engine.transfer(ALIAS, 5000, order_id='1') is True
+            assert engine.bank.transfers == [(ALIAS, 5000)]
+            assert engine.metrics.transfer_seconds.count(bank='fakebank', outcome='success') == 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_destination_blocked(self, tmp_path):
+        async with engine_running(tmp_path) as engine:
+            assert await engine.transfer('no', 5000, order_id='1') is False
+            assert engine.bank.transfers == []
+            assert engine.metrics.transfer_blocked.value(reason='invalid_destination') == 1
+
+    @pytest.mark.asyncio
+    async def test_amount_limit_blocked(self, tmp_path):
+        async with engine_running(tmp_path) as engine:
+            assert await engine.transfer(ALIAS, 100001, order_id='1') is False
+            assert engine.bank.transfers == []
+            assert engine.metrics.transfer_blocked.value(reason='amount_limit') == 1
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_blocked(self, tmp_path):
+        async with engine_running(tmp_path, max_per_minute=1) as engine:
+            assert await engine.transfer(ALIAS, 5000, order_id='1') is True
+            assert await engine.transfer(ALIAS, 5000, order_id='2') is False
+            assert len(engine.bank.transfers) == 1
+            assert engine.metrics.transfer_blocked.value(reason='rate_limit') == 1
+
+    @pytest.mark.asyncio
+    async def test_duplicate_blocked(self, tmp_path):
+        async with engine_running(tmp_path) as engine:
+            assert await engine.transfer(ALIAS, 5000, order_id='1') is True
+            assert await engine.transfer(ALIAS, 5000, order_id='1') is False
+            assert len(engine.bank.transfers) == 1
+            assert engine.metrics.transfer_blocked.value(reason='duplicate') == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_transfer_can_be_retried(self, tmp_path):
+        """A failed transfer rolls back its idempotency key and rate limiter slot."""
+        async with engine_running(tmp_path, max_per_minute=1) as engine:
+            engine.bank.transfer_ok = False
+            assert await engine.transfer(ALIAS, 5000, order_id='1') is False
+            engine.bank.transfer_ok = True
+            assert await engine.transfer(ALIAS, 5000, order_id='1') is True
+            assert len(engine.bank.transfers) == 2
+
+    @pytest.mark.asyncio
+    async def test_bank_error_rolls_back(self, tmp_path):
+        async with engine_running(tmp_path) as engine:
+            async def broken(*args):
+                raise RuntimeError("page crashed")
+            engine.bank.transfer = broken
+            assert await engine.transfer(ALIAS, 5000, order_id='1') is False
+            assert await engine.idempotency.check_and_set(
+                IdempotencyStore.generate_key('1', ALIAS, 5000.0)
+            ) is True
+
+    @pytest.mark.asyncio
+    async def test_dry_run_skips_bank(self, tmp_path):
+        async with engine_running(tmp_path, config={'dry_run': True}) as engine:
+            assert await engine.transfer(ALIAS, 5000, order_id='1') is True
+            assert engine.bank.transfers == []
+
+
+# ==============================================================================
+# ORDER FLOW TESTS
+# ==============================================================================
+
+class TestOrderFlow:
+    """Tests for P2PEngine order processing."""
+
+    @pytest.mark.asyncio
+    async def test_buy_order_paid_and_marked(self, tmp_path):
+        async with engine_running(tmp_path) as engine:
+            await engine.process_order(order('1'))
+            assert engine.bank.transfers == [(ALIAS, 5000)]
+            assert engine.exchange.marked == ['1']
+            assert '1' in engine.state.get('processed_orders')
+            assert engine.state.get('daily_volume_ars') == 5000
+
+    @pytest.mark.asyncio
+    async def test_buy_order_without_destination(self, tmp_path):
+        async with engine_running(tmp_path) as engine:
+            engine.exchange.details = {}
+            await engine.process_order(order('1'))
+            assert engine.bank.transfers == []
+            assert engine.state.get('processed_orders') == set()
+
+    @pytest.mark.asyncio
+    async def test_failed_buy_counts_error(self, tmp_path):
+        async with engine_running(tmp_path) as engine:
+            engine.bank.transfer_ok = False
+            await engine.process_order(order('1'))
+            assert engine.exchange.marked == []
+            assert engine.state.get('error_count') == 1
+
+    @pytest.mark.asyncio
+    async def test_sell_order_matched_payment_released(self, tmp_path):
+        async with engine_running(tmp_path) as engine:
+            payment = IncomingPayment('mov-1', 5000, 'Ana')
+            await engine.process_order(order('2', 'sell', payment=payment))
+            assert engine.exchange.released == ['2']
+            assert 'mov-1' in engine.state.get('consumed_payments')
+
+    @pytest.mark.asyncio
+    async def test_sell_order_waits_for_payment(self, tmp_path):
+        async with engine_running(tmp_path) as engine:
+            await engine.process_order(order('2', 'sell'))
+            assert engine.exchange.released == []
+
+            engine.bank.verified = IncomingPayment('mov-2', 5000)
+            await engine.process_order(order('2', 'sell'))
+            assert engine.exchange.released == ['2']
+
+    @pytest.mark.asyncio
+    async def test_sell_released_without_verification_when_disabled(self, tmp_path):
+        async with engine_running(tmp_path, config={'sell_flow': {'verify_payment': False}}) as engine:
+            await engine.process_order(order('2', 'sell'))
+            assert engine.exchange.released == ['2']
+
+
+# ==============================================================================
+# ORDER SELECTION TESTS
+# ==============================================================================
+
+class TestPendingOrders:
+    """Tests for P2PEngine order selection and payment matching."""
+
+    @pytest.mark.asyncio
+    async def test_filters_by_status_and_history(self, tmp_path):
+        async with engine_running(tmp_path) as engine:
+            engine.state.add_to_set('processed_orders', 'done')
+            orders = [
+                order('a', status='to_pay'), order('b', status='paid'), order('c'),
+                order('done', status='to_pay'), order('z', amount=0),
+                order('s1', 'sell', status='paid'), order('s2', 'sell', status='to_pay'),
+            ]
+            buy, sell = engine.pending_orders(orders)
+            assert [o['order_number'] for o in buy] == ['a', 'c']
+            assert [o['order_number'] for o in sell] == ['s1']
+
+    @pytest.mark.asyncio
+    async def test_auto_pay_disabled(self, tmp_path):
+        async with engine_running(tmp_path, config={'buy_flow': {'auto_pay': False}}) as engine:
+            buy, _ = engine.pending_orders([order('a')])
+            assert buy == []
+
+    @pytest.mark.asyncio
+    async def test_match_sell_payments(self, tmp_path):
+        async with engine_running(tmp_path) as engine:
+            engine.bank.payments = [IncomingPayment('mov-1', 5000, ts=0)]
+            sells = [order('s1', 'sell'), order('s2', 'sell', amount=7000)]
+            matched = await engine.match_sell_payments(sells)
+            assert [(o['order_number'], o['payment'].id) for o in matched] == [('s1', 'mov-1')]
+
+    @pytest.mark.asyncio
+    async def test_feed_orders_reject_payments_older_than_order(self, tmp_path):
+        created = time.time() - 600
+        feed_order = P2POrder.from_api({
+            'orderNumber': 's1', 'tradeType': 'SELL', 'orderStatus': 2, 'totalPrice': '5000',
+            'buyerNickname': 'buyer', 'createTime': int(created * 1000),
+        }).to_dict()
+        async with engine_running(tmp_path) as engine:
+            # Inside the match window but sent before the order existed
+            engine.bank.payments = [IncomingPayment('old', 5000, ts=created - 300)]
+            assert await engine.match_sell_payments([feed_order]) == []
+
+            engine.bank.payments.append(IncomingPayment('new', 5000, ts=created + 60))
+            matched = await engine.match_sell_payments([feed_order])
+            assert [o['payment'].id for o in matched] == ['new']
+
+    @pytest.mark.asyncio
+    async def test_unreadable_payments_return_all(self, tmp_path):
+        async with engine_running(tmp_path) as engine:
+            sells = [order('s1', 'sell')]
+            assert await engine.match_sell_payments(sells) == sells
+
+
+# ==============================================================================
+# PRICING TESTS
+# ==============================================================================
+
+class TestOptimalPrice:
+    """Tests for P2PEngine.calculate_optimal_price."""
+
+    BOOK = [
+        {'price': 1000.0, 'available': 1.0, 'min': 500, 'max': 1000},   # Can't fill 5000+
+        {'price': 1010.0, 'available': 500.0, 'min': 1000, 'max': 200000},
+        {'price': 1020.0, 'available': 500.0, 'min': 1000, 'max': 200000},
+    ]
+
+    def test_classic_strategies_unchanged_without_limits(self, tmp_path):
+        engine = FakeEngine(str(tmp_path / 'config.json'))
+        assert engine.calculate_optimal_price(self.BOOK, 'top1', margin=0.5) == 999.5
+        assert engine.calculate_optimal_price(self.BOOK, 'undercut') == 999.99
+        assert engine.calculate_optimal_price(self.BOOK, 'fixed') is None
+
+    def test_ad_limits_skip_unfillable_competitors(self, tmp_path):
+        engine = FakeEngine(str(tmp_path / 'config.json'))
+        assert engine.calculate_optimal_price(self.BOOK, 'top1', margin=0.5,
+                                              min_amount=5000, max_amount=100000) == 1009.5
+        assert engine.calculate_optimal_price(self.BOOK, 'vwap', margin=0,
+                                              min_amount=5000, max_amount=100000) == 1015.0
+
+    @pytest.mark.asyncio
+    async def test_fetched_books_recorded(self, tmp_path):
+        async with engine_running(tmp_path) as engine:
+            engine.price_history = PriceHistory(str(tmp_path / 'history'), depth=2)
+            engine.exchange.book_levels = self.BOOK
+            spec = BookSpec('USDT', 'ARS', 'SELL')
+            assert await engine._fetch_order_book(spec)
+            window = engine.price_history.query(spec.key)
+            assert list(window.ts) == [1_700_000_000.0]
+            assert list(window.price) == [1000.0, 1010.0]
+            assert list(window.available) == [1.0, 500.0]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
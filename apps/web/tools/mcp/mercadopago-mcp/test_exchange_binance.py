@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Binance exchange adapter's release flow.
+
+Run with: pytest test_exchange_binance.py -v
+"""
+
+import asyncio
+
+import pytest
+
+from p2p_daemon_ecuador import P2PDaemonEcuador
+from p2p_daemon_v3 import P2PDaemon
+from p2p_exchange_binance import BinanceExchange
+
+
+# ==============================================================================
+# FAKES
+# ==============================================================================
+
+class FakeLogger:
+    def __init__(self):
+        self.events = []
+
+    def log(self, msg, level="INFO"):
+        pass
+
+    def log_structured(self, level, message, **fields):
+        self.events.append((level, message))
+
+
+class FakeButton:
+    def __init__(self, page, text):
+        self.page = page
+        self.text = text
+
+    async def click(self):
+        self.page.clicked.append(self.text)
+
+
+class FakePage:
+    """Order page with Release and Confirm buttons; `confirms` decides the outcome."""
+
+    def __init__(self, confirms: bool):
+        self.confirms = confirms
+        self.clicked = []
+
+    async def goto(self, url):
+        pass
+
+    async def wait_for_load_state(self, state, timeout=None):
+        pass
+
+    async def evaluate(self, script, payload=None):
+        return 'Order 123  Pending release'
+
+    async def query_selector(self, selector):
+        for text in ('Release', 'Confirm'):
+            if f'has-text("{text}")' in selector:
+                return FakeButton(self, text)
+        return None  # No 2FA input, no immediate success text
+
+    async def wait_for_selector(self, selector, timeout=None, state=None):
+        if 'Released' in selector and not self.confirms:
+            raise TimeoutError("Timeout waiting for Released")
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    real_sleep = asyncio.sleep
+    monkeypatch.setattr(asyncio, 'sleep', lambda *_: real_sleep(0))
+
+
+def exchange_for(daemon_cls) -> BinanceExchange:
+    daemon = daemon_cls('config.json')
+    daemon.config = {'sell_flow': {'release_confirm_seconds': 0.01}}
+    daemon.logger = FakeLogger()
+    return BinanceExchange(daemon)
+
+
+# ==============================================================================
+# RELEASE TESTS
+# ==============================================================================
+
+@pytest.mark.parametrize('daemon_cls', [P2PDaemon, P2PDaemonEcuador])
+class TestRelease:
+    """Tests for BinanceExchange.release confirmation (both markets)."""
+
+    @pytest.mark.asyncio
+    async def test_confirmed_release(self, daemon_cls, no_sleep):
+        page = FakePage(confirms=True)
+        assert await exchange_for(daemon_cls).release(page, 'https://example.test/order/1') is True
+        assert page.clicked == ['Release', 'Confirm']
+
+    @pytest.mark.asyncio
+    async def test_unconfirmed_release_fails(self, daemon_cls, no_sleep):
+        exchange = exchange_for(daemon_cls)
+        page = FakePage(confirms=False)
+        assert await exchange.release(page, 'https://example.test/order/1') is False
+        assert ('ERROR', 'Release not confirmed') in exchange.engine.logger.events
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the JS action library caller.
+
+Run with: pytest test_js_actions.py -v
+"""
+
+import pytest
+
+from p2p_js_actions import ACTION_NAMES, ACTIONS_JS, CALL_JS, MISSING, JSActions
+
+
+class FakeTarget:
+    """Page/Frame stand-in: the library is 'present' once ACTIONS_JS ran."""
+
+    def __init__(self, installed=True, result=None):
+        self.installed = installed
+        self.result = result
+        self.evaluated = []
+
+    async def evaluate(self, script, arg=None):
+        self.evaluated.append((script, arg))
+        if script == ACTIONS_JS:
+            self.installed = True
+            return None
+        return self.result if self.installed else MISSING
+
+
+class FakeContext:
+    def __init__(self):
+        self.init_scripts = []
+
+    async def add_init_script(self, script):
+        self.init_scripts.append(script)
+
+
+class TestJSActions:
+    """Tests for JSActions class."""
+
+    @pytest.mark.asyncio
+    async def test_install_registers_init_script(self):
+        context = FakeContext()
+        await JSActions().install(context)
+        assert context.init_scripts == [ACTIONS_JS]
+
+    @pytest.mark.asyncio
+    async def test_arguments_passed_as_data(self):
+        target = FakeTarget(result=True)
+        js = JSActions()
+        hostile = "sell'); alert(1); ('"
+        assert await js.call(target, 'clickAdEdit', hostile, 'USD') is True
+        script, arg = target.evaluated[0]
+        assert script == CALL_JS
+        assert arg == ['clickAdEdit', [hostile, 'USD']]
+        assert hostile not in script
+
+    @pytest.mark.asyncio
+    async def test_missing_library_installed_once(self):
+        target = FakeTarget(installed=False, result=[{'order_number': '1'}])
+        js = JSActions()
+        assert await js.call(target, 'ordersFromTable') == [{'order_number': '1'}]
+        assert [s for s, _ in target.evaluated] == [CALL_JS, ACTIONS_JS, CALL_JS]
+        assert js.reinstalls == 1
+
+        await js.call(target, 'ordersFromTable')
+        assert js.reinstalls == 1
+        assert js.calls['ordersFromTable'] == 2
+
+    @pytest.mark.asyncio
+    async def test_unknown_action(self):
+        with pytest.raises(ValueError):
+            await JSActions().call(FakeTarget(), 'document.cookie')
+
+    def test_every_action_defined_in_library(self):
+        for name in ACTION_NAMES:
+            assert f"{name}(" in ACTIONS_JS
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the async logger (batching, rotation, bounded queues).
+
+Run with: pytest test_logger.py -v
+"""
+
+import gzip
+import json
+import os
+import pytest
+
+from p2p_logger import AsyncLogger, LogSink
+
+
+# ==============================================================================
+# LOG SINK TESTS
+# ==============================================================================
+
+class TestLogSink:
+    """Tests for LogSink class."""
+
+    def test_batch_written_with_one_handle(self, tmp_path):
+        path = str(tmp_path / "daemon.log")
+        sink = LogSink(path)
+        sink.write_batch(["one", "two"])
+        handle = sink._file
+        sink.write_batch(["three"])
+        assert sink._file is handle
+        sink.close()
+        with open(path) as f:
+            assert f.read() == "one\ntwo\nthree\n"
+
+    def test_size_rotation(self, tmp_path):
+        path = str(tmp_path / "daemon.log")
+        sink = LogSink(path, max_bytes=10, backups=2)
+        sink.write_batch(["first line"])
+        sink.write_batch(["second line"])
+        sink.write_batch(["third line"])
+        sink.close()
+
+        with open(path) as f:
+            assert f.read() == "third line\n"
+        with open(path + ".1") as f:
+            assert f.read() == "second line\n"
+        with open(path + ".2") as f:
+            assert f.read() == "first line\n"
+
+    def test_backups_bounded(self, tmp_path):
+        path = str(tmp_path / "daemon.log")
+        sink = LogSink(path, max_bytes=1, backups=2)
+        for i in range(5):
+            sink.write_batch([f"line {i}"])
+        sink.close()
+        assert sorted(os.listdir(tmp_path)) == ["daemon.log", "daemon.log.1", "daemon.log.2"]
+
+    def test_gzip_rotation(self, tmp_path):
+        path = str(tmp_path / "daemon.log")
+        sink = LogSink(path, max_bytes=1, backups=3, compress=True)
+        sink.write_batch(["old"])
+        sink.write_batch(["new"])
+        sink.close()
+        with gzip.open(path + ".1.gz", 'rt') as f:
+            assert f.read() == "old\n"
+
+    def test_time_rotation(self, tmp_path):
+        path = str(tmp_path / "daemon.log")
+        sink = LogSink(path, rotate_interval=3600)
+        sink.write_batch(["yesterday"])
+        sink._opened_at -= 7200
+        sink.write_batch(["today"])
+        sink.close()
+        assert sink.rotations == 1
+
+
+# ==============================================================================
+# ASYNC LOGGER TESTS
+# ==============================================================================
+
+class TestAsyncLogger:
+    """Tests for AsyncLogger class."""
+
+    @pytest.mark.asyncio
+    async def test_lines_flushed_on_stop(self, tmp_path, capsys):
+        path = str(tmp_path / "daemon.log")
+        logger = AsyncLogger(path)
+        await logger.start()
+        for i in range(100):
+            logger.log(f"message {i}", "INFO", order_id=str(i))
+        await logger.stop()
+
+        with open(path) as f:
+            assert len(f.read().splitlines()) == 100
+        with open(logger.json_log_file) as f:
+            entries = [json.loads(line) for line in f]
+        assert entries[-1]['order_id'] == '99'
+        assert logger.stats['batches'] < 100  # Written in batches, not per line
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_and_reports(self, tmp_path, capsys):
+        path = str(tmp_path / "daemon.log")
+        logger = AsyncLogger(path, max_queue=5)
+        for i in range(8):  # Writers not started: queue fills up
+            logger.log(f"message {i}")
+        assert logger.dropped['text'] == 3
+
+        await logger.stop()
+        with open(path) as f:
+            lines = f.read().splitlines()
+        assert len(lines) == 6
+        assert "dropped 3 messages" in lines[-1]
+
+    @pytest.mark.asyncio
+    async def test_unserializable_extra(self, tmp_path, capsys):
+        path = str(tmp_path / "daemon.log")
+        logger = AsyncLogger(path)
+        await logger.start()
+        logger.log_structured("INFO", "with object", value=object())
+        await logger.stop()
+        with open(logger.json_log_file) as f:
+            assert json.loads(f.readline())['message'] == "with object"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
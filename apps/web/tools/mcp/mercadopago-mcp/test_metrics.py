@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the metrics registry, daemon metrics and /metrics endpoint.
+
+Run with: pytest test_metrics.py -v
+"""
+
+import aiohttp
+import pytest
+
+from p2p_metrics import DaemonMetrics, MetricsRegistry, MetricsServer, count_retry
+
+
+# ==============================================================================
+# REGISTRY TESTS
+# ==============================================================================
+
+class TestMetricsRegistry:
+    """Tests for MetricsRegistry class."""
+
+    def test_counter_and_gauge(self):
+        registry = MetricsRegistry()
+        blocked = registry.counter('blocked_total', 'Blocked transfers')
+        blocked.inc(reason='rate_limit')
+        blocked.inc(2, reason='rate_limit')
+        assert blocked.value(reason='rate_limit') == 3
+        assert blocked.value(reason='duplicate') == 0
+        with pytest.raises(ValueError):
+            blocked.inc(-1)
+
+        gauge = registry.gauge('queue_depth')
+        gauge.set(5)
+        gauge.dec()
+        assert gauge.value() == 4
+
+    def test_same_name_returns_same_metric(self):
+        registry = MetricsRegistry()
+        assert registry.counter('x') is registry.counter('x')
+        with pytest.raises(ValueError):
+            registry.gauge('x')
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        hist = registry.histogram('step_seconds', buckets=(0.1, 1, 10))
+        for value in (0.05, 0.5, 0.7, 5, 50):
+            hist.observe(value, step='navigate')
+        text = registry.render()
+        assert 'step_seconds_bucket{step="navigate",le="0.1"} 1' in text
+        assert 'step_seconds_bucket{step="navigate",le="1"} 3' in text
+        assert 'step_seconds_bucket{step="navigate",le="10"} 4' in text
+        assert 'step_seconds_bucket{step="navigate",le="+Inf"} 5' in text
+        assert 'step_seconds_count{step="navigate"} 5' in text
+        assert hist.sum(step='navigate') == pytest.approx(56.25)
+
+    def test_time_labels_set_inside_block(self):
+        hist = MetricsRegistry().histogram('release_seconds')
+        with hist.time() as labels:
+            labels['outcome'] = 'ok'
+        assert hist.count(outcome='ok') == 1
+
+    def test_stopwatch_laps(self):
+        hist = MetricsRegistry().histogram('transfer_step_seconds')
+        watch = hist.stopwatch(bank='mp')
+        watch.lap('navigate')
+        watch.lap('amount')
+        assert hist.count(bank='mp', step='navigate') == 1
+        assert hist.count(bank='mp', step='amount') == 1
+
+    def test_render_format(self):
+        registry = MetricsRegistry()
+        registry.counter('errors_total', 'Errors').inc(error='say "hi"\n')
+        text = registry.render()
+        assert '# HELP errors_total Errors' in text
+        assert '# TYPE errors_total counter' in text
+        assert 'errors_total{error="say \\"hi\\"\\n"} 1' in text
+
+    def test_collectors_run_before_render(self):
+        registry = MetricsRegistry()
+        stats = {'hits': 0}
+        registry.add_collector(lambda: registry.gauge('hits').set(stats['hits']))
+        stats['hits'] = 7
+        assert 'hits 7' in registry.render()
+
+    def test_failing_collector_does_not_break_scrape(self):
+        registry = MetricsRegistry()
+        registry.counter('up').inc()
+        registry.add_collector(lambda: 1 / 0)
+        assert 'up 1' in registry.render()
+
+    def test_count_retry(self):
+        registry = MetricsRegistry()
+        count_retry(TimeoutError(), registry)
+        assert registry.get('p2p_retries_total').value(error='TimeoutError') == 1
+
+
+# ==============================================================================
+# DAEMON METRICS TESTS
+# ==============================================================================
+
+class TestDaemonMetrics:
+    """Tests for DaemonMetrics class."""
+
+    def test_detection_lag_once_per_order(self):
+        metrics = DaemonMetrics(MetricsRegistry())
+        created = {'1': 1.0, '2': None}
+        orders = [{'order_number': '1', 'type': 'buy'}, {'order_number': '2', 'type': 'sell'}]
+
+        assert metrics.observe_detection(orders, created.get) == 2
+        assert metrics.detection_lag.count(type='buy') == 1
+        assert metrics.detection_lag.count(type='sell') == 0  # No timestamp
+
+        assert metrics.observe_detection(orders, created.get) == 0
+        assert metrics.detection_lag.count(type='buy') == 1
+
+    def test_price_cache_hit_ratio(self):
+        metrics = DaemonMetrics(MetricsRegistry())
+        metrics.collect_price_cache({'hits': 6, 'stale_hits': 1, 'coalesced': 1, 'misses': 2})
+        assert metrics.cache_hit_ratio.value() == pytest.approx(0.8)
+        assert metrics.component_stats.value(component='price_cache', stat='misses') == 2
+
+
+# ==============================================================================
+# ENDPOINT TESTS
+# ==============================================================================
+
+class TestMetricsServer:
+    """Tests for MetricsServer class."""
+
+    @pytest.mark.asyncio
+    async def test_serves_prometheus_text(self):
+        registry = MetricsRegistry()
+        registry.counter('p2p_test_total').inc()
+        server = MetricsServer(registry, port=0)
+        await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{server.port}/metrics") as response:
+                    assert response.status == 200
+                    assert response.headers['Content-Type'].startswith('text/plain')
+                    assert 'p2p_test_total 1' in await response.text()
+            assert server.scrapes == 1
+        finally:
+            await server.stop()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the MercadoPago activity feed (parser, cache and cursor).
+
+Run with: pytest test_mp_activity.py -v
+"""
+
+import asyncio
+import re
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from p2p_mp_activity import (ACTIVITIES_API_PATTERN, MPActivityFeed, MPMovement,
+                             activities_api_pattern, parse_activities)
+
+API_URL = 'https://www.mercadopago.com.ar/activities/api/activities/list?page=1&size=2'
+
+
+def make_item(movement_id, amount, title='Te transfirieron', ts=None, **overrides):
+    item = {
+        'id': movement_id,
+        'amount': {'fraction': f"{int(amount):,}".replace(',', '.'), 'cents': '00', 'sign': '+'},
+        'title': title,
+        'description': 'Juan Perez',
+        'date': ts or '2026-10-17T12:00:00Z',
+    }
+    item.update(overrides)
+    return item
+
+
+class FakeAPIResponse:
+    def __init__(self, payload, status=200):
+        self.payload = payload
+        self.status = status
+        self.ok = status == 200
+
+    async def json(self):
+        return self.payload
+
+
+class FakeRequestContext:
+    """Serves pages of `items` (newest first), `size` per page."""
+
+    def __init__(self, items, size=2):
+        self.items = items
+        self.size = size
+        self.fetched = []
+
+    async def fetch(self, url, method='GET', headers=None, data=None):
+        page = int(parse_qs(urlsplit(url).query).get('page', ['1'])[0])
+        self.fetched.append(page)
+        start = (page - 1) * self.size
+        return FakeAPIResponse({'results': self.items[start:start + self.size]})
+
+
+class FakeContext:
+    def __init__(self, items):
+        self.request = FakeRequestContext(items)
+        self.listeners = []
+
+    def on(self, event, handler):
+        self.listeners.append(handler)
+
+
+def primed_feed(items, **kwargs):
+    """A feed whose template was already captured."""
+    feed = MPActivityFeed(FakeContext(items), **kwargs)
+    feed._template = {'url': API_URL, 'method': 'GET', 'headers': {}, 'data': None}
+    return feed
+
+
+# ==============================================================================
+# PARSER TESTS
+# ==============================================================================
+
+class TestParseActivities:
+    """Tests for MPMovement.from_api / parse_activities."""
+
+    def test_fraction_amount_and_sign(self):
+        movement = MPMovement.from_api(make_item('m1', 150000))
+        assert movement.amount == 150000.0
+        assert movement.incoming is True
+        assert movement.counterparty == 'Juan Perez'
+        assert movement.ts > 0
+
+    def test_negative_amount_is_outgoing(self):
+        movement = MPMovement.from_api({'id': 'm2', 'amount': -5000, 'title': 'Transferencia'})
+        assert movement.incoming is False
+        assert movement.amount == 5000.0
+
+    def test_keywords_when_no_sign(self):
+        movement = MPMovement.from_api({'id': 'm3', 'amount': '2500.5', 'title': 'Recibiste dinero'})
+        assert movement.incoming is True
+        assert movement.amount == 2500.5
+
+    def test_not_a_list(self):
+        assert parse_activities({'error': 'unauthorized'}) is None
+        assert parse_activities({'results': [{'title': 'no id'}]}) == []
+
+    def test_api_pattern_for_site_root(self):
+        assert activities_api_pattern('https://www.mercadopago.com.ar') == ACTIVITIES_API_PATTERN
+        pattern = re.compile(activities_api_pattern('http://127.0.0.1:8700/mp/'))
+        assert pattern.search('http://127.0.0.1:8700/mp/activities/api/list?page=1')
+        assert not pattern.search('http://127.0.0.1:8700/other/activities/api/list')
+
+
+# ==============================================================================
+# FEED TESTS
+# ==============================================================================
+
+class TestMPActivityFeed:
+    """Tests for MPActivityFeed class."""
+
+    @pytest.mark.asyncio
+    async def test_first_refresh_reads_one_page(self):
+        items = [make_item(f"m{i}", 1000 + i) for i in range(6)]
+        feed = primed_feed(items)
+        assert await feed.refresh() == 2
+        assert feed.context.request.fetched == [1]
+
+    @pytest.mark.asyncio
+    async def test_pages_back_to_cursor(self):
+        items = [make_item(f"m{i}", 1000 + i) for i in range(6)]
+        feed = primed_feed(items)
+        await feed.refresh()  # Knows m0, m1
+
+        # Three new movements arrive on top
+        feed.context.request.items = [make_item(f"n{i}", 2000 + i) for i in range(3)] + items
+        feed.context.request.fetched.clear()
+        assert await feed.refresh() == 3
+        assert feed.context.request.fetched == [1, 2]  # Page 2 reaches m0
+        assert feed.get('n2') is not None
+
+    @pytest.mark.asyncio
+    async def test_recent_refresh_served_from_cache(self):
+        feed = primed_feed([make_item('m1', 1000)])
+        await feed.refresh(max_age=5)
+        assert await feed.refresh(max_age=5) == 0
+        assert feed.context.request.fetched == [1]
+        assert feed.stats['cached'] == 1
+
+    @pytest.mark.asyncio
+    async def test_find_incoming(self):
+        now = time.time()
+        feed = primed_feed([
+            make_item('new', 150000, ts=now * 1000),
+            make_item('old', 150000, ts=(now - 7200) * 1000),
+            {'id': 'out', 'amount': -150000, 'title': 'Transferencia enviada'},
+        ])
+        feed.context.request.size = 3
+        await feed.refresh()
+        assert feed.find_incoming(149000, 151000).id == 'new'
+        assert feed.find_incoming(149000, 151000, exclude={'new'}).id == 'old'
+        assert feed.find_incoming(149000, 151000, since=now - 60, exclude={'new'}) is None
+        assert feed.find_incoming(1, 10) is None
+
+    @pytest.mark.asyncio
+    async def test_cache_bounded(self):
+        items = [make_item(f"m{i}", 1000 + i, ts=1_700_000_000_000 + i) for i in range(10)]
+        feed = primed_feed(items, max_entries=3)
+        feed.context.request.size = 10
+        await feed.refresh()
+        assert len(feed) == 3
+        assert feed.get('m9') is not None and feed.get('m0') is None
+
+    @pytest.mark.asyncio
+    async def test_no_template_without_lease_is_unavailable(self):
+        feed = MPActivityFeed(FakeContext([]))
+        assert await feed.refresh() is None
+
+    @pytest.mark.asyncio
+    async def test_bootstrap_through_leased_page(self):
+        items = [make_item('m1', 1000)]
+        context = FakeContext(items)
+
+        class FakeRequest:
+            url = API_URL
+            method = 'GET'
+            headers = {'accept': 'application/json', 'cookie': 'secret'}
+            post_data = None
+
+            async def all_headers(self):
+                return self.headers
+
+        class FakeResponse:
+            url = API_URL
+            ok = True
+            request = FakeRequest()
+
+            async def json(self):
+                return {'results': items}
+
+        class FakePage:
+            async def goto(self, url):
+                for handler in context.listeners:
+                    await handler(FakeResponse())
+
+        @asynccontextmanager
+        async def lease(timeout=None):
+            yield FakePage()
+
+        feed = MPActivityFeed(context, lease_page=lease)
+        assert await feed.refresh(max_age=5) == 0  # Bootstrap response is fresh
+        assert feed.has_template
+        assert 'cookie' not in feed._template['headers']
+        assert feed.get('m1') is not None
+
+
+    @pytest.mark.asyncio
+    async def test_busy_pages_skip_bootstrap_without_blocking(self):
+        held = asyncio.Event()  # Never set: every MP page is held by a transfer
+
+        @asynccontextmanager
+        async def lease(timeout=None):
+            await asyncio.wait_for(held.wait(), timeout=timeout)
+            yield None
+
+        feed = MPActivityFeed(FakeContext([]), lease_page=lease, lease_timeout=0.05)
+        assert await asyncio.wait_for(feed.refresh(), timeout=1) is None
+        assert feed.stats['lease_timeouts'] == 1
+        assert not feed._lock.locked()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the concurrent competitor order-book fetcher.
+
+Run with: pytest test_order_book.py -v
+"""
+
+import asyncio
+import pytest
+from types import SimpleNamespace
+
+from p2p_order_book import BookSpec, OrderBookFetcher, parse_ads
+
+
+def make_ad(nick, price, available=100.0):
+    return {
+        'advertiser': {'nickName': nick},
+        'adv': {
+            'price': str(price),
+            'surplusAmount': str(available),
+            'minSingleTransAmount': '10',
+            'maxSingleTransAmount': '1000',
+        },
+    }
+
+
+class FakeResponse:
+    def __init__(self, payload, status=200):
+        self.status = status
+        self.payload = payload
+        self.request_info = SimpleNamespace(real_url='https://p2p.test/adv/search')
+        self.history = ()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """Serves pages of `total` ads; records concurrency and requested pages."""
+
+    def __init__(self, total=60, fail_pages=(), delay=0.01):
+        self.total = total
+        self.fail_pages = set(fail_pages)
+        self.delay = delay
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+
+    def post(self, url, json):
+        return _Post(self, json)
+
+
+class _Post:
+    def __init__(self, session, payload):
+        self.session = session
+        self.payload = payload
+
+    async def __aenter__(self):
+        session = self.session
+        session.requests.append((self.payload['tradeType'], self.payload['page']))
+        session.active += 1
+        session.peak = max(session.peak, session.active)
+        try:
+            await asyncio.sleep(session.delay)
+        finally:
+            session.active -= 1
+        page, rows = self.payload['page'], self.payload['rows']
+        if page in session.fail_pages:
+            return FakeResponse({}, status=500)
+        start = (page - 1) * rows
+        ads = [make_ad(f"ad{i}", 1000 + i) for i in range(start, min(start + rows, session.total))]
+        return FakeResponse({'success': True, 'total': session.total, 'data': ads})
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+SELL = BookSpec('USDT', 'ARS', 'SELL', ('MercadoPagoNew',))
+BUY = BookSpec('USDT', 'ARS', 'BUY', ('MercadoPagoNew',))
+
+
+# ==============================================================================
+# PARSING TESTS
+# ==============================================================================
+
+class TestParseAds:
+    """Tests for parse_ads()."""
+
+    def test_normalizes_levels(self):
+        levels = parse_ads({'success': True, 'data': [make_ad('alice', 1050.5, 42)]})
+        assert levels == [{'advertiser': 'alice', 'price': 1050.5, 'available': 42.0,
+                           'min': 10.0, 'max': 1000.0}]
+
+    def test_failure_is_none(self):
+        assert parse_ads({'success': False}) is None
+
+    def test_malformed_ad_skipped(self):
+        levels = parse_ads({'success': True, 'data': [{'adv': {}}, make_ad('bob', 1)]})
+        assert [level['advertiser'] for level in levels] == ['bob']
+
+
+# ==============================================================================
+# FETCHER TESTS
+# ==============================================================================
+
+class TestOrderBookFetcher:
+    """Tests for OrderBookFetcher class."""
+
+    @pytest.mark.asyncio
+    async def test_single_page(self):
+        fetcher = OrderBookFetcher(FakeSession(total=60), rows=20)
+        book = await fetcher.fetch_book(SELL)
+        assert book.pages == 1
+        assert len(book.levels) == 20
+        assert book.total == 60
+        assert book.best['advertiser'] == 'ad0'
+
+    @pytest.mark.asyncio
+    async def test_deep_pages_in_parallel(self):
+        session = FakeSession(total=60)
+        fetcher = OrderBookFetcher(session, concurrency=4, rows=20)
+        book = await fetcher.fetch_book(SELL, depth_pages=5)
+        assert book.pages == 3  # Capped by the reported total
+        assert [level['advertiser'] for level in book.levels] == [f"ad{i}" for i in range(60)]
+        assert session.peak == 2  # Pages 2 and 3 fetched together
+
+    @pytest.mark.asyncio
+    async def test_failed_page_keeps_book_contiguous(self):
+        session = FakeSession(total=80, fail_pages={3})
+        fetcher = OrderBookFetcher(session, rows=20)
+        book = await fetcher.fetch_book(SELL, depth_pages=4)
+        assert book.pages == 2
+        assert len(book.levels) == 40
+        assert fetcher.stats['errors'] == 1
+
+    @pytest.mark.asyncio
+    async def test_first_page_failure_is_none(self):
+        fetcher = OrderBookFetcher(FakeSession(fail_pages={1}), rows=20)
+        assert await fetcher.fetch_book(SELL, depth_pages=3) is None
+
+    @pytest.mark.asyncio
+    async def test_empty_book_is_not_a_failure(self):
+        fetcher = OrderBookFetcher(FakeSession(total=0), rows=20)
+        book = await fetcher.fetch_book(SELL, depth_pages=3)
+        assert book is not None
+        assert book.levels == [] and book.best is None
+        assert fetcher.stats['errors'] == 0
+
+    @pytest.mark.asyncio
+    async def test_concurrent_books_share_the_semaphore(self):
+        session = FakeSession(total=100)
+        fetcher = OrderBookFetcher(session, concurrency=3, rows=20)
+        books = await asyncio.gather(*[fetcher.fetch_book(spec, depth_pages=5) for spec in (SELL, BUY)])
+
+        assert all(book.pages == 5 for book in books)
+        assert len(session.requests) == 10
+        assert session.peak == 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Binance order feed (parser and push signals).
+
+Run with: pytest test_order_feed.py -v
+"""
+
+import asyncio
+import re
+
+import pytest
+
+from p2p_order_feed import PUSH_WEBSOCKET_PATTERN, BinanceOrderFeed, P2POrder, parse_order_list
+
+
+class FakeWebSocket:
+    def __init__(self, url):
+        self.url = url
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def emit(self, event, payload=None):
+        self.handlers[event](payload if payload is not None else self)
+
+
+def make_item(**overrides):
+    item = {
+        'orderNumber': '22712345678901234567',
+        'tradeType': 'BUY',
+        'orderStatus': 1,
+        'totalPrice': '150000.00',
+        'amount': '120.50',
+        'asset': 'USDT',
+        'fiatUnit': 'ARS',
+        'price': '1245.00',
+        'sellerNickname': 'seller_one',
+        'buyerNickname': 'us',
+        'createTime': 1700000000000,
+    }
+    item.update(overrides)
+    return item
+
+
+class TestP2POrder:
+    """Tests for P2POrder.from_api."""
+
+    def test_buy_order_fields(self):
+        order = P2POrder.from_api(make_item())
+        assert order.order_number == '22712345678901234567'
+        assert order.type == 'buy'
+        assert order.status == 'to_pay'
+        assert order.amount_fiat == 150000.0
+        assert order.amount_asset == 120.5
+        assert order.counterparty == 'seller_one'
+        assert order.create_time == 1700000000.0
+        assert order.href.endswith('orderNo=22712345678901234567')
+
+    def test_sell_order_counterparty_is_buyer(self):
+        order = P2POrder.from_api(make_item(tradeType='SELL', orderStatus=2, buyerNickname='buyer_x'))
+        assert order.type == 'sell'
+        assert order.status == 'paid'
+        assert order.counterparty == 'buyer_x'
+
+    def test_string_status(self):
+        order = P2POrder.from_api(make_item(orderStatus='COMPLETED'))
+        assert order.status == 'completed'
+        assert order.is_pending is False
+
+    def test_missing_order_number(self):
+        assert P2POrder.from_api(make_item(orderNumber=None)) is None
+
+    def test_to_dict_matches_dom_shape(self):
+        order = P2POrder.from_api(make_item())
+        assert set(order.to_dict()) == {
+            'order_number', 'type', 'amount_fiat', 'counterparty', 'status', 'href', 'create_time'
+        }
+        assert order.to_dict()['create_time'] == 1700000000.0
+
+
+class TestParseOrderList:
+    """Tests for parse_order_list."""
+
+    def test_valid_payload(self):
+        payload = {'code': '000000', 'success': True,
+                   'data': [make_item(), make_item(orderNumber='2')]}
+        orders = parse_order_list(payload)
+        assert [o.order_number for o in orders] == ['22712345678901234567', '2']
+
+    def test_detail_url_override(self):
+        payload = {'code': '000000', 'data': [make_item()]}
+        orders = parse_order_list(payload, 'http://127.0.0.1:8700/binance/en/fiatOrderDetail?orderNo={order_number}')
+        assert orders[0].href == 'http://127.0.0.1:8700/binance/en/fiatOrderDetail?orderNo=22712345678901234567'
+
+    def test_error_payload(self):
+        assert parse_order_list({'code': '100001002', 'success': False, 'data': None}) is None
+
+    def test_non_dict(self):
+        assert parse_order_list(['not', 'a', 'dict']) is None
+
+    def test_skips_malformed_items(self):
+        payload = {'code': '000000', 'data': [make_item(), 'junk', make_item(tradeType='X')]}
+        assert len(parse_order_list(payload)) == 1
+
+
+class TestPushSignals:
+    """Tests for push-mode change signalling (no browser needed)."""
+
+    @pytest.mark.asyncio
+    async def test_order_frame_wakes_waiter(self):
+        feed = BinanceOrderFeed(page=None)
+        waiter = asyncio.create_task(feed.wait_for_change(timeout=1.0))
+        await asyncio.sleep(0)
+        feed._on_frame('{"e":"c2cOrder","orderNo":"123","orderStatus":2}')
+        assert await waiter is True
+        assert feed.push_counts['websocket'] == 1
+
+    @pytest.mark.asyncio
+    async def test_unrelated_frame_ignored(self):
+        feed = BinanceOrderFeed(page=None)
+        feed._on_frame('{"ping":1}')
+        assert await feed.wait_for_change(timeout=0.05) is False
+
+    @pytest.mark.asyncio
+    async def test_passive_xhr_signals_only_on_change(self):
+        feed = BinanceOrderFeed(page=None)
+        orders = [P2POrder.from_api(make_item())]
+        feed._ingest(orders, source='xhr')
+        feed._ingest(orders, source='xhr')  # Same snapshot, no new signal
+        assert feed.push_counts['xhr'] == 1
+
+    def test_quiet_socket_falls_back_to_polling(self):
+        feed = BinanceOrderFeed(page=None)
+        feed.push_enabled = True
+        feed._open_sockets.add(FakeWebSocket('wss://stream.binance.com/c2c'))
+        # Socket open but no order signal yet: normal interval
+        assert feed.wait_timeout(30, safety_poll=120, max_silence=120) == 30
+
+        feed._on_frame('{"orderNo":"1","orderStatus":1}')
+        assert feed.wait_timeout(30, safety_poll=120, max_silence=120) == 120
+
+        feed._last_push -= 600   # Push has been silent for 10 minutes
+        assert feed.wait_timeout(30, safety_poll=120, max_silence=120) == 30
+
+    def test_reconnect_keeps_push_alive(self):
+        feed = BinanceOrderFeed(page=None)
+        feed.push_enabled = True
+        feed._ws_pattern = re.compile(PUSH_WEBSOCKET_PATTERN)
+        old = FakeWebSocket('wss://stream.binance.com:9443/c2c/orders')
+        new = FakeWebSocket(old.url)
+        feed._on_websocket(old)
+        feed._on_websocket(new)
+
+        old.emit('close')   # Late close of the replaced socket
+        assert feed.push_alive
+        new.emit('close')
+        assert not feed.push_alive
+
+    def test_chat_sockets_not_followed(self):
+        pattern = re.compile(PUSH_WEBSOCKET_PATTERN)
+        assert not pattern.search('wss://chat.binance.com/im/socket')
+        assert pattern.search('wss://stream.binance.com:9443/c2c/orders')
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
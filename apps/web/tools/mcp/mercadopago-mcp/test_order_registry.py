@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the retention-bounded order registry.
+
+Run with: pytest test_order_registry.py -v
+"""
+
+import json
+import time
+import pytest
+
+from p2p_order_registry import BloomFilter, OrderRegistry
+from p2p_state import StateManager
+
+
+DAY = 86400
+
+
+# ==============================================================================
+# BLOOM FILTER TESTS
+# ==============================================================================
+
+class TestBloomFilter:
+    """Tests for BloomFilter class."""
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=1e-4)
+        ids = [f"2271{i:016d}" for i in range(1000)]
+        for order_id in ids:
+            bloom.add(order_id)
+        assert all(order_id in bloom for order_id in ids)
+
+    def test_false_positive_rate_near_target(self):
+        bloom = BloomFilter(capacity=2000, error_rate=1e-3)
+        for i in range(2000):
+            bloom.add(f"in_{i}")
+        false_positives = sum(f"out_{i}" in bloom for i in range(20000))
+        assert false_positives / 20000 < 5e-3
+
+    def test_roundtrip(self):
+        bloom = BloomFilter(capacity=100, error_rate=1e-3)
+        bloom.add("A1")
+        restored = BloomFilter.from_dict(bloom.to_dict(), capacity=100, error_rate=1e-3)
+        assert "A1" in restored
+        assert restored.count == 1
+
+
+# ==============================================================================
+# ORDER REGISTRY TESTS
+# ==============================================================================
+
+class TestOrderRegistry:
+    """Tests for OrderRegistry class."""
+
+    def test_recent_ids_exact(self):
+        registry = OrderRegistry(horizon_days=7)
+        registry.add("A1")
+        assert "A1" in registry
+        assert "A2" not in registry
+        assert len(registry) == 1
+
+    def test_old_ids_move_to_filter(self):
+        registry = OrderRegistry(horizon_days=1)
+        now = time.time()
+        registry.add("old", ts=now - 2 * DAY)
+        registry.add("new", ts=now)
+
+        assert len(registry) == 1  # Only "new" is kept exactly
+        assert "old" in registry   # Still found through the filter
+        assert "new" in registry
+
+    def test_truthy_with_only_archived_ids(self):
+        """`registry or set()` must not drop archived IDs."""
+        registry = OrderRegistry(horizon_days=1)
+        registry.add("old", ts=time.time() - 2 * DAY)
+        registry.prune()
+        assert len(registry) == 0
+        assert "old" in (registry or set())
+
+    def test_memory_flat_over_time(self):
+        """Exact IDs stay bounded by the horizon however many orders pass."""
+        registry = OrderRegistry(horizon_days=1, capacity=500, error_rate=1e-3)
+        start = time.time() - 30 * DAY
+        for i in range(3000):  # 100 orders/day for 30 days
+            registry.add(f"order_{i}", ts=start + i * DAY / 100)
+        assert len(registry) <= 101
+        assert len(registry._filters) <= 2
+
+    def test_oldest_generation_dropped(self):
+        registry = OrderRegistry(horizon_days=0, capacity=10, error_rate=1e-3)
+        for i in range(25):
+            registry.add(f"order_{i}")
+        assert len(registry._filters) == 2
+        assert "order_24" in registry
+
+    def test_roundtrip(self):
+        registry = OrderRegistry(horizon_days=1)
+        registry.add("old", ts=time.time() - 2 * DAY)
+        registry.add("new")
+        data = json.loads(json.dumps(registry.to_dict()))
+
+        restored = OrderRegistry(horizon_days=1).restore(data)
+        assert "old" in restored
+        assert "new" in restored
+        assert len(restored) == 1
+
+    def test_restore_legacy_list(self):
+        restored = OrderRegistry(horizon_days=7).restore(["A1", "A2"])
+        assert "A1" in restored
+        assert len(restored) == 2
+
+
+# ==============================================================================
+# STATE MANAGER INTEGRATION
+# ==============================================================================
+
+class TestRegistryInStateManager:
+    """OrderRegistry defaults are journaled and snapshotted by StateManager."""
+
+    @pytest.mark.asyncio
+    async def test_journal_and_snapshot(self, tmp_path):
+        path = str(tmp_path / "state.json")
+        defaults = {"processed_orders": OrderRegistry(horizon_days=7)}
+
+        state = StateManager(path, flush_interval=3600, defaults=defaults)
+        await state.start()
+        state.add_to_set('processed_orders', 'A1')
+        state.compact()
+        state.add_to_set('processed_orders', 'A2')
+        state._task.cancel()
+        state._close_journal()
+
+        recovered = StateManager(path, flush_interval=3600, defaults=defaults)
+        await recovered.start()
+        registry = recovered.get('processed_orders')
+        assert isinstance(registry, OrderRegistry)
+        assert 'A1' in registry and 'A2' in registry
+        await recovered.stop()
+
+    @pytest.mark.asyncio
+    async def test_legacy_state_file_imported(self, tmp_path):
+        path = tmp_path / "state.json"
+        path.write_text(json.dumps({'processed_orders': ['X1', 'X2']}))
+        defaults = {"processed_orders": OrderRegistry(horizon_days=7)}
+
+        state = StateManager(str(path), flush_interval=3600, defaults=defaults)
+        await state.start()
+        assert 'X1' in state.get('processed_orders')
+        await state.stop()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Unit tests for one-to-one payment-to-order matching.
+
+Run with: pytest test_payment_matcher.py -v
+"""
+
+import pytest
+
+from p2p_payment_matcher import IncomingPayment, PaymentMatcher, name_similarity
+
+NOW = 1_800_000_000.0
+
+
+def order(order_id, amount, counterparty='', **extra):
+    return {'order_number': order_id, 'amount_fiat': amount, 'counterparty': counterparty, **extra}
+
+
+# ==============================================================================
+# SCORING TESTS
+# ==============================================================================
+
+class TestScoring:
+    """Tests for name_similarity and PaymentMatcher.cost."""
+
+    def test_name_similarity(self):
+        assert name_similarity('Juan Pérez', 'JUAN PEREZ') == 1.0
+        assert name_similarity('juan_perez88', 'Perez Juan Carlos') == 0.5
+        assert name_similarity('', 'Juan') is None
+
+    def test_outside_tolerance(self):
+        matcher = PaymentMatcher(tolerance_percent=1)
+        assert matcher.cost(order('A', 1000), IncomingPayment('p', 1020), NOW) is None
+        assert matcher.cost(order('A', 1000), IncomingPayment('p', 1005), NOW) == pytest.approx(0.005)
+
+    def test_outside_window(self):
+        matcher = PaymentMatcher(window_minutes=30)
+        stale = IncomingPayment('p', 1000, ts=NOW - 3600)
+        assert matcher.cost(order('A', 1000), stale, NOW) is None
+        # Sources without timestamps are not filtered by time
+        assert matcher.cost(order('A', 1000), IncomingPayment('p', 1000), NOW) == 0
+
+    def test_payment_before_order(self):
+        matcher = PaymentMatcher()
+        early = IncomingPayment('p', 1000, ts=NOW - 600)
+        assert matcher.cost(order('A', 1000, create_time=NOW - 60), early, NOW) is None
+
+
+# ==============================================================================
+# ASSIGNMENT TESTS
+# ==============================================================================
+
+class TestMatch:
+    """Tests for PaymentMatcher.match."""
+
+    def test_one_payment_two_orders(self):
+        """Two similar orders cannot both be verified by the same payment."""
+        matcher = PaymentMatcher(tolerance_percent=1)
+        result = matcher.match([order('A', 1000), order('B', 1002)],
+                               [IncomingPayment('p1', 1001)], now=NOW)
+        assert len(result) == 1
+
+    def test_constrained_order_not_starved(self):
+        # A fits both payments, B only p1: both must be matched
+        matcher = PaymentMatcher(tolerance_percent=1)
+        result = matcher.match(
+            [order('A', 1000), order('B', 1008)],
+            [IncomingPayment('p1', 1000), IncomingPayment('p2', 991)],
+            now=NOW
+        )
+        assert result['A'].id == 'p2'
+        assert result['B'].id == 'p1'
+
+    def test_sender_name_breaks_ties(self):
+        matcher = PaymentMatcher()
+        result = matcher.match(
+            [order('A', 1000, 'Ana Gomez'), order('B', 1000, 'Luis Diaz')],
+            [IncomingPayment('p1', 1000, 'Luis Alberto Diaz'), IncomingPayment('p2', 1000, 'Ana Gomez')],
+            now=NOW
+        )
+        assert result['A'].id == 'p2'
+        assert result['B'].id == 'p1'
+
+    def test_consumed_payments_skipped(self):
+        matcher = PaymentMatcher()
+        result = matcher.match([order('A', 1000)], [IncomingPayment('p1', 1000)],
+                               consumed={'p1'}, now=NOW)
+        assert result == {}
+
+    def test_claim_survives_next_cycle(self):
+        matcher = PaymentMatcher()
+        payments = [IncomingPayment('p1', 1000)]
+        assert matcher.match([order('A', 1000)], payments, now=NOW)['A'].id == 'p1'
+
+        # B appears while A's release is still running: p1 stays with A
+        result = matcher.match([order('A', 1000), order('B', 1000)], payments, now=NOW)
+        assert result['A'].id == 'p1'
+        assert 'B' not in result
+
+    def test_consume_frees_claim(self):
+        matcher = PaymentMatcher()
+        matcher.match([order('A', 1000)], [IncomingPayment('p1', 1000)], now=NOW)
+        assert matcher.consume('A') == 'p1'
+        assert matcher.consume('A') is None
+
+    def test_claim_void_when_order_gone(self):
+        matcher = PaymentMatcher()
+        payments = [IncomingPayment('p1', 1000)]
+        matcher.match([order('A', 1000)], payments, now=NOW)
+        # A was cancelled; its claim no longer blocks B
+        assert matcher.match([order('B', 1000)], payments, now=NOW)['B'].id == 'p1'
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the competitor price cache.
+
+Run with: pytest test_price_cache.py -v
+"""
+
+import asyncio
+import pytest
+
+from p2p_price_cache import PriceCache
+
+
+PRICES = [{'advertiser': 'a', 'price': 1200.0}]
+
+
+def counting_fetch(result=PRICES, delay: float = 0.02):
+    calls = {'n': 0}
+
+    async def fetch():
+        calls['n'] += 1
+        await asyncio.sleep(delay)
+        return result
+
+    return fetch, calls
+
+
+# ==============================================================================
+# SINGLE-FLIGHT TESTS
+# ==============================================================================
+
+class TestSingleFlight:
+    """Concurrent misses share one fetch."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_coalesced(self):
+        cache = PriceCache(ttl_seconds=30)
+        fetch, calls = counting_fetch()
+
+        results = await asyncio.gather(*[
+            cache.get_or_fetch('USDT', 'ARS', 'SELL', fetch) for _ in range(10)
+        ])
+        assert calls['n'] == 1
+        assert all(r == PRICES for r in results)
+        assert cache.stats['misses'] == 1
+        assert cache.stats['coalesced'] == 9
+
+    @pytest.mark.asyncio
+    async def test_fresh_value_is_hit(self):
+        cache = PriceCache(ttl_seconds=30)
+        fetch, calls = counting_fetch()
+        await cache.get_or_fetch('USDT', 'ARS', 'SELL', fetch)
+        await cache.get_or_fetch('USDT', 'ARS', 'SELL', fetch)
+        assert calls['n'] == 1
+        assert cache.stats['hits'] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_fetch_not_cached(self):
+        cache = PriceCache(ttl_seconds=30)
+        fetch, calls = counting_fetch(result=None)
+        assert await cache.get_or_fetch('USDT', 'ARS', 'SELL', fetch) is None
+        assert await cache.get_or_fetch('USDT', 'ARS', 'SELL', fetch) is None
+        assert calls['n'] == 2
+        assert cache.stats['fetch_errors'] == 2
+
+    @pytest.mark.asyncio
+    async def test_fetch_exception_returns_none(self):
+        cache = PriceCache(ttl_seconds=30)
+
+        async def boom():
+            raise RuntimeError("network down")
+
+        assert await cache.get_or_fetch('USDT', 'ARS', 'SELL', boom) is None
+        assert cache._inflight == {}
+
+
+# ==============================================================================
+# STALE-WHILE-REVALIDATE TESTS
+# ==============================================================================
+
+class TestStaleWhileRevalidate:
+    """Expired values within the stale window are served while refreshing."""
+
+    @pytest.mark.asyncio
+    async def test_stale_served_and_refreshed_once(self):
+        cache = PriceCache(ttl_seconds=30, stale_seconds=60)
+        await cache.set('USDT', 'ARS', 'SELL', PRICES)
+        data, ts = cache._cache['USDT:ARS:SELL']
+        cache._cache['USDT:ARS:SELL'] = (data, ts - 40)  # Expired, within stale window
+
+        new_prices = [{'advertiser': 'b', 'price': 1210.0}]
+        fetch, calls = counting_fetch(result=new_prices)
+        first = await cache.get_or_fetch('USDT', 'ARS', 'SELL', fetch)
+        second = await cache.get_or_fetch('USDT', 'ARS', 'SELL', fetch)
+        assert first == PRICES and second == PRICES
+        assert cache.stats['stale_hits'] == 2
+        assert cache.stats['refreshes'] == 1
+
+        await asyncio.sleep(0.05)
+        assert await cache.get_or_fetch('USDT', 'ARS', 'SELL', fetch) == new_prices
+        assert calls['n'] == 1
+
+    @pytest.mark.asyncio
+    async def test_too_old_blocks_on_fetch(self):
+        cache = PriceCache(ttl_seconds=30, stale_seconds=60)
+        await cache.set('USDT', 'ARS', 'SELL', PRICES)
+        data, ts = cache._cache['USDT:ARS:SELL']
+        cache._cache['USDT:ARS:SELL'] = (data, ts - 100)
+
+        new_prices = [{'advertiser': 'b', 'price': 1210.0}]
+        fetch, _ = counting_fetch(result=new_prices)
+        assert await cache.get_or_fetch('USDT', 'ARS', 'SELL', fetch) == new_prices
+        assert cache.stats['misses'] == 1
+
+    @pytest.mark.asyncio
+    async def test_close_cancels_refresh(self):
+        cache = PriceCache(ttl_seconds=0, stale_seconds=60)
+        await cache.set('USDT', 'ARS', 'SELL', PRICES)
+        fetch, _ = counting_fetch(delay=10)
+        await cache.get_or_fetch('USDT', 'ARS', 'SELL', fetch)
+        assert cache._inflight
+        await cache.close()
+        assert cache._inflight == {}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
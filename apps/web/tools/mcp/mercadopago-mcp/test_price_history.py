@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the competitor price history store.
+
+Run with: pytest test_price_history.py -v
+"""
+
+import asyncio
+import math
+import os
+from array import array
+
+import pytest
+
+from p2p_price_history import (
+    HEADER, HistorySlice, PriceHistory, RingBuffer, Segment, book_dir, read_segment, write_segment,
+)
+
+KEY = 'USDT:ARS:SELL'
+T0 = 1_700_000_000.0
+
+
+def levels(*prices, available=100.0):
+    return [{'price': p, 'available': available} for p in prices]
+
+
+def fill(history, count, key=KEY, first=0):
+    """Snapshots first..first+count-1, 30s apart, best price 1000 + i."""
+    for i in range(first, first + count):
+        history.record(key, levels(1000.0 + i, 1001.0 + i), T0 + i * 30)
+
+
+# ==============================================================================
+# RING BUFFER TESTS
+# ==============================================================================
+
+class TestRingBuffer:
+    """Tests for RingBuffer class."""
+
+    def test_overwrites_oldest(self):
+        ring = RingBuffer(capacity=3, depth=2)
+        for i in range(5):
+            ring.append(T0 + i, [float(i), i + 0.5], [1.0, 2.0])
+        rows = ring.slice(0, len(ring))
+        assert list(rows.ts) == [T0 + 2, T0 + 3, T0 + 4]
+        assert list(rows.best) == [2.0, 3.0, 4.0]
+        assert list(rows.level(1)) == [2.5, 3.5, 4.5]
+
+    def test_range_across_wraparound(self):
+        ring = RingBuffer(capacity=4, depth=1)
+        for i in range(6):
+            ring.append(T0 + i, [float(i)], [1.0])
+        assert list(ring.range(T0 + 3, T0 + 4).ts) == [T0 + 3, T0 + 4]
+        assert list(ring.range(T0 + 4.5, T0 + 99).ts) == [T0 + 5]
+        assert len(ring.range(T0 + 10, T0 + 20)) == 0
+
+    def test_short_books_padded(self):
+        ring = RingBuffer(capacity=2, depth=3)
+        ring.append(T0, [10.0], [5.0])
+        _, prices, available = next(ring.slice(0, 1).rows())
+        assert prices[0] == 10.0 and math.isnan(prices[2])
+        assert available[0] == 5.0 and math.isnan(available[1])
+
+    def test_pending_overrun_reported(self):
+        ring = RingBuffer(capacity=2, depth=1)
+        assert ring.append(T0, [1.0], [1.0])
+        assert ring.append(T0 + 1, [2.0], [1.0])
+        assert not ring.append(T0 + 2, [3.0], [1.0])   # Unflushed row lost
+        assert list(ring.take_pending().ts) == [T0 + 1, T0 + 2]
+        assert ring.append(T0 + 3, [4.0], [1.0])        # Flushed row recycled
+        assert ring.pending == 1
+
+
+# ==============================================================================
+# SEGMENT TESTS
+# ==============================================================================
+
+class TestSegments:
+    """Tests for the on-disk segment format."""
+
+    def test_round_trip_and_partial_read(self, tmp_path):
+        rows = HistorySlice(
+            2,
+            array('d', [T0 + i for i in range(10)]),
+            array('d', [p for i in range(10) for p in (100.0 + i, 101.0 + i)]),
+            array('f', [1.5, 2.5] * 10),
+        )
+        segment, size = write_segment(str(tmp_path), rows)
+        assert size == HEADER.size + 10 * 8 + 10 * 2 * 8 + 10 * 2 * 4
+        assert Segment.from_path(segment.path) == segment
+
+        window = read_segment(segment.path, T0 + 3, T0 + 5)
+        assert list(window.ts) == [T0 + 3, T0 + 4, T0 + 5]
+        assert list(window.price) == [103.0, 104.0, 104.0, 105.0, 105.0, 106.0]
+        assert list(window.available) == [1.5, 2.5] * 3
+
+    def test_rejects_foreign_files(self, tmp_path):
+        path = tmp_path / '1-2.seg'
+        path.write_bytes(b'x' * HEADER.size)
+        with pytest.raises(ValueError):
+            read_segment(str(path))
+        assert Segment.from_path(str(tmp_path / 'notes.txt')) is None
+
+
+# ==============================================================================
+# STORE TESTS
+# ==============================================================================
+
+class TestPriceHistory:
+    """Tests for PriceHistory class."""
+
+    @pytest.mark.asyncio
+    async def test_query_merges_disk_and_memory(self, tmp_path):
+        history = PriceHistory(str(tmp_path), depth=2, capacity=4, segment_rows=2, retention_days=0)
+        fill(history, 3)
+        await history.flush()
+        fill(history, 4, first=3)
+        await history.flush()
+        fill(history, 3, first=7)         # The ring now holds rows 6..9
+
+        window = history.query(KEY)
+        assert list(window.ts) == [T0 + i * 30 for i in range(10)]
+        assert list(window.best) == [1000.0 + i for i in range(10)]
+
+        # Served only from disk, only from memory, and straddling both
+        assert list(history.query(KEY, T0 + 30, T0 + 60).best) == [1001.0, 1002.0]
+        assert list(history.query(KEY, T0 + 270, T0 + 270).best) == [1009.0]
+        assert list(history.query(KEY, T0 + 150, T0 + 210).best) == [1005.0, 1006.0, 1007.0]
+        assert history.stats['dropped'] == 0
+
+    @pytest.mark.asyncio
+    async def test_reload_after_restart(self, tmp_path):
+        history = PriceHistory(str(tmp_path), depth=2, capacity=8, retention_days=0)
+        fill(history, 5)
+        await history.start()
+        await history.stop()
+        assert history.stats['segments_written'] == 1
+
+        reopened = PriceHistory(str(tmp_path), depth=3, retention_days=0)
+        window = reopened.query(KEY, T0 + 60)
+        assert list(window.best) == [1002.0, 1003.0, 1004.0]
+        assert math.isnan(window.level(2)[0])   # Older segment had depth 2
+        assert reopened.keys == [KEY]
+
+    @pytest.mark.asyncio
+    async def test_flush_triggered_by_pending_rows(self, tmp_path):
+        history = PriceHistory(str(tmp_path), depth=1, capacity=4, segment_rows=2,
+                               flush_interval=3600, retention_days=0)
+        await history.start()
+        fill(history, 2)
+        for _ in range(50):
+            if history.stats['segments_written']:
+                break
+            await asyncio.sleep(0.01)
+        await history.stop()
+        assert history.stats['flushed_rows'] == 2
+
+    @pytest.mark.asyncio
+    async def test_retention_deletes_old_segments(self, tmp_path):
+        history = PriceHistory(str(tmp_path), depth=1, retention_days=1)
+        fill(history, 2)                    # 2023, long expired
+        fill(history, 1, key='USDT:ARS:BUY')
+        await history.flush()
+        assert history.stats['segments_written'] == 2
+        assert history.stats['segments_deleted'] == 2
+        assert os.listdir(book_dir(str(tmp_path), KEY)) == []
+
+    def test_memory_is_bounded(self, tmp_path):
+        history = PriceHistory(str(tmp_path), depth=2, capacity=10, segment_rows=5)
+        fill(history, 100)
+        buffer = history._buffers[KEY]
+        assert len(buffer) == 10 and len(buffer.ts) == 10
+        assert history.stats['recorded'] == 100
+        assert history.stats['dropped'] == 90   # No flush loop running
+
+    def test_out_of_order_timestamps_clamped(self, tmp_path):
+        history = PriceHistory(str(tmp_path), depth=1)
+        history.record(KEY, levels(10.0), T0 + 10)
+        history.record(KEY, levels(11.0), T0 + 5)
+        assert list(history.query(KEY).ts) == [T0 + 10, T0 + 10]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the order-book pricing engine (pure Python and NumPy backends).
+
+Run with: pytest test_pricing.py -v
+"""
+
+import math
+
+import pytest
+
+from p2p_pricing import BookArrays, PricingEngine, PricingParams, np
+
+BACKENDS = [False] + ([True] if np is not None else [])
+
+
+def level(price, available=1000.0, min_amount=1000.0, max_amount=100000.0):
+    return {'price': price, 'available': available, 'min': min_amount, 'max': max_amount}
+
+
+# Best price first; level 0 only takes huge orders, level 1 has almost no stock
+BOOK = [
+    level(990.0, min_amount=200000, max_amount=900000),
+    level(995.0, available=2),
+    level(1000.0),
+    level(1001.0),
+    level(1002.0),
+    level(1004.0),
+]
+
+
+def price(levels, use_numpy=False, **params):
+    engine = PricingEngine(use_numpy=use_numpy)
+    return engine.price(BookArrays.from_levels(levels), PricingParams(decimals=2, **params))
+
+
+# ==============================================================================
+# FILTER TESTS
+# ==============================================================================
+
+@pytest.mark.parametrize('use_numpy', BACKENDS)
+class TestFilters:
+    """Tests for PricingEngine limit and outlier filters."""
+
+    def test_unfiltered_top1(self, use_numpy):
+        assert price(BOOK, use_numpy, strategy='top1', margin=0.5) == 989.5
+
+    def test_levels_that_cannot_fill_are_skipped(self, use_numpy):
+        # 990 needs at least 200k; 995 can fill 2 * 995 = 1990 only
+        assert price(BOOK, use_numpy, strategy='top1', margin=0.5,
+                     min_amount=5000, max_amount=100000) == 999.5
+
+    def test_no_fillable_level(self, use_numpy):
+        engine = PricingEngine(use_numpy=use_numpy)
+        params = PricingParams(min_amount=10 ** 7)
+        assert engine.price(BookArrays.from_levels(BOOK), params) is None
+        assert engine.stats['no_fillable'] == 1
+
+    def test_outlier_dropped(self, use_numpy):
+        book = [level(800.0)] + [level(p) for p in (1000.0, 1001.0, 1001.5, 1002.0, 1003.0)]
+        assert price(book, use_numpy, strategy='undercut', undercut_step=0.01, outlier_z=None) == 799.99
+        assert price(book, use_numpy, strategy='undercut', undercut_step=0.01, outlier_z=3.5) == 999.99
+
+    def test_levels_without_limits(self, use_numpy):
+        assert price([{'price': 10.0}, {'price': 11.0}], use_numpy, strategy='vwap', margin=0) == 10.5
+
+
+# ==============================================================================
+# STRATEGY TESTS
+# ==============================================================================
+
+@pytest.mark.parametrize('use_numpy', BACKENDS)
+class TestStrategies:
+    """Tests for PricingEngine strategies."""
+
+    FILLABLE = dict(min_amount=5000, max_amount=100000, outlier_z=None)
+
+    def test_top3_avg(self, use_numpy):
+        assert price(BOOK, use_numpy, strategy='top3_avg', **self.FILLABLE) == 1001.0
+
+    def test_vwap(self, use_numpy):
+        book = [level(100.0, available=10), level(101.0, available=30), level(110.0)]
+        # Capacities 1000, 3030, 100000 -> only the first two levels
+        expected = (100.0 * 1000 + 101.0 * 3030) / 4030 - 0.5
+        assert price(book, use_numpy, strategy='vwap', margin=0.5, depth_levels=2,
+                     outlier_z=None) == round(expected, 2)
+
+    def test_depth(self, use_numpy):
+        # Each fillable level holds 100k of capacity
+        assert price(BOOK, use_numpy, strategy='depth', margin=0, depth_amount=250000,
+                     **self.FILLABLE) == 1002.0
+        assert price(BOOK, use_numpy, strategy='depth', margin=0, depth_amount=10 ** 9,
+                     **self.FILLABLE) == 1004.0
+
+    def test_percentile(self, use_numpy):
+        assert price(BOOK, use_numpy, strategy='percentile', margin=0, percentile=0,
+                     **self.FILLABLE) == 1000.0
+        assert price(BOOK, use_numpy, strategy='percentile', margin=0, percentile=50,
+                     **self.FILLABLE) == 1001.5
+
+    def test_clamped_to_price_range(self, use_numpy):
+        assert price(BOOK, use_numpy, strategy='top1', margin=0.5, min_price=995) == 995
+        assert price(BOOK, use_numpy, strategy='top1', margin=0.5, max_price=950) == 950
+
+    def test_unknown_strategy(self, use_numpy):
+        assert price(BOOK, use_numpy, strategy='fixed') is None
+
+
+@pytest.mark.skipif(np is None, reason="NumPy not installed")
+def test_backends_agree():
+    params = [PricingParams(strategy=s, min_amount=5000, max_amount=100000)
+              for s in ('top1', 'undercut', 'top3_avg', 'vwap', 'depth', 'percentile')]
+    book = BookArrays.from_levels(BOOK)
+    fast, slow = PricingEngine(use_numpy=True), PricingEngine(use_numpy=False)
+    for p in params:
+        assert math.isclose(fast.price(book, p), slow.price(book, p))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
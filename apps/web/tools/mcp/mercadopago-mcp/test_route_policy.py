@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the request routing policy.
+
+Run with: pytest test_route_policy.py -v
+"""
+
+import pytest
+
+from p2p_metrics import DaemonMetrics, MetricsRegistry
+from p2p_page_pool import PagePool
+from p2p_route_policy import RoutePolicy, SiteRules, TYPICAL_BYTES
+
+
+# ==============================================================================
+# FAKES
+# ==============================================================================
+
+class FakeRequest:
+    def __init__(self, url, resource_type):
+        self.url = url
+        self.resource_type = resource_type
+
+
+class FakeRoute:
+    def __init__(self):
+        self.result = None
+
+    async def abort(self, error_code=None):
+        self.result = 'abort'
+
+    async def continue_(self):
+        self.result = 'continue'
+
+
+class FakePage:
+    def __init__(self):
+        self.main_frame = object()
+        self.handler = None
+
+    def on(self, event, handler):
+        pass
+
+    async def route(self, pattern, handler):
+        self.handler = handler
+
+    def is_closed(self):
+        return False
+
+    async def close(self):
+        pass
+
+
+class FakeContext:
+    async def new_page(self):
+        return FakePage()
+
+
+async def send(page, url, resource_type):
+    route = FakeRoute()
+    await page.handler(route, FakeRequest(url, resource_type))
+    return route.result
+
+
+# ==============================================================================
+# RULE TESTS
+# ==============================================================================
+
+class TestSiteRules:
+    """Tests for SiteRules class."""
+
+    def test_blocks_types_and_urls(self):
+        rules = SiteRules(block_types=frozenset({'image'}), block_urls=('*hotjar.com/*',))
+        assert rules.decide('https://p2p.binance.com/logo.png', 'image') == 'type'
+        assert rules.decide('https://static.HOTJAR.com/c.js', 'script') == 'url'
+        assert rules.decide('https://p2p.binance.com/bapi/c2c/order', 'xhr') is None
+
+    def test_allow_list_wins(self):
+        rules = SiteRules(block_types=frozenset({'image'}), allow_urls=('*qr*',))
+        assert rules.decide('https://www.mercadopago.com.ar/qr/code.png', 'image') == 'allow'
+        assert rules.decide('https://www.mercadopago.com.ar/qr/api', 'xhr') is None
+
+
+# ==============================================================================
+# POLICY TESTS
+# ==============================================================================
+
+class TestRoutePolicy:
+    """Tests for RoutePolicy class."""
+
+    def test_site_defaults_and_overrides(self):
+        policy = RoutePolicy.from_config({
+            'block_urls': ['*ads.example/*'],
+            'sites': {'binance': {'block_types': ['image', 'stylesheet']},
+                      'mp': {'enabled': False}},
+        })
+        assert policy.rules('binance').block_types == {'image', 'stylesheet'}
+        assert policy.rules('binance').decide('https://ads.example/x.js', 'script') == 'url'
+        assert policy.rules('produbanco').block_types == frozenset()
+        assert policy.rules('produbanco').decide('https://www.google-analytics.com/g/collect', 'ping') == 'url'
+        # Site config is merged over the site's defaults
+        assert policy.rules('mp').enabled is False
+        assert '*qr*' in policy.rules('mp').allow_urls
+        assert policy.rules('unknown').block_types == {'image', 'media', 'font'}
+
+    def test_check_counts(self):
+        policy = RoutePolicy.from_config({})
+        assert policy.check('binance', 'https://bin.bnbstatic.com/a.woff2', 'font') == 'type'
+        assert policy.check('binance', 'https://www.googletagmanager.com/gtm.js', 'script') == 'url'
+        assert policy.check('mp', 'https://www.mercadopago.com.ar/qr.png', 'image') is None
+        assert policy.check('binance', 'https://p2p.binance.com/en', 'document') is None
+
+        assert policy.stats['requests'] == 4
+        assert policy.stats['blocked'] == 2
+        assert policy.stats['allow_listed'] == 1
+        assert policy.stats['blocked_bytes'] == TYPICAL_BYTES['font'] + TYPICAL_BYTES['script']
+        assert policy.blocked_by_site == {('binance', 'type'): 1, ('binance', 'url'): 1}
+
+    @pytest.mark.asyncio
+    async def test_installed_route_aborts(self):
+        policy = RoutePolicy.from_config({})
+        page = FakePage()
+        assert await policy.install(page, 'binance') is True
+        assert await send(page, 'https://p2p.binance.com/banner.jpg', 'image') == 'abort'
+        assert await send(page, 'https://p2p.binance.com/bapi/c2c/orders', 'fetch') == 'continue'
+
+    @pytest.mark.asyncio
+    async def test_disabled_site_not_routed(self):
+        policy = RoutePolicy.from_config({'enabled': False})
+        page = FakePage()
+        assert await policy.install(page, 'mp') is False
+        assert page.handler is None
+
+    @pytest.mark.asyncio
+    async def test_page_pool_sets_up_new_pages(self):
+        policy = RoutePolicy.from_config({})
+        pool = PagePool(FakeContext(), on_page=lambda site, page: policy.install(page, site))
+        async with pool.lease('mp') as page:
+            assert await send(page, 'https://www.mercadopago.com.ar/hero.webp', 'image') == 'abort'
+        pinned = await pool.pin('orders')
+        assert pinned.handler is not None
+        assert policy.stats['pages'] == 2
+
+    def test_metrics_export(self):
+        policy = RoutePolicy.from_config({})
+        policy.check('mp', 'https://http2.mlstatic.com/banner.png', 'image')
+        metrics = DaemonMetrics(MetricsRegistry())
+        metrics.collect_routes(policy.blocked_by_site, policy.bytes_by_site)
+        assert metrics.route_blocked.value(site='mp', reason='type') == 1
+        assert metrics.route_blocked_bytes.value(site='mp') == TYPICAL_BYTES['image']
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the adaptive polling scheduler.
+
+Run with: pytest test_scheduler.py -v
+"""
+
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from p2p_scheduler import (
+    AdaptiveInterval, HourOfWeekPriors, HOURS_PER_WEEK, ORDERS_DETECTED, PRICES_FETCHED,
+    hour_of_week, log_files,
+)
+
+# A Monday, so hour_of_week(MONDAY + h hours) == h
+MONDAY = datetime(2024, 1, 1)
+
+
+def at(hours: float, weeks: int = 0) -> str:
+    return (MONDAY + timedelta(weeks=weeks, hours=hours)).isoformat()
+
+
+def write_log(path, entries):
+    opener = gzip.open if str(path).endswith('.gz') else open
+    with opener(path, 'wt', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + '\n')
+
+
+# ==============================================================================
+# PRIORS TESTS
+# ==============================================================================
+
+class TestHourOfWeekPriors:
+    """Tests for HourOfWeekPriors class."""
+
+    def test_no_history_is_neutral(self):
+        priors = HourOfWeekPriors()
+        assert priors.relative == [1.0] * HOURS_PER_WEEK
+        assert priors.scale(MONDAY.timestamp()) == 1.0
+
+    def test_busy_slots_scale_down(self):
+        events = [0.0] * HOURS_PER_WEEK
+        hours = [4.0] * HOURS_PER_WEEK
+        events[20] = 40  # Monday 20:00, every week
+        priors = HourOfWeekPriors(events, hours)
+        busy = (MONDAY + timedelta(hours=20)).timestamp()
+        quiet = (MONDAY + timedelta(hours=4)).timestamp()
+        assert priors.scale(busy, 0.25, 4.0) == 0.25
+        assert priors.scale(quiet, 0.25, 4.0) > 1.0
+
+    def test_learn_orders_from_log(self, tmp_path):
+        path = tmp_path / 'daemon.json.log'
+        write_log(path, [
+            {'timestamp': at(20), 'message': ORDERS_DETECTED, 'orders': ['1', '2']},
+            {'timestamp': at(20.5), 'message': 'Starting transfer', 'order_id': '1'},
+            {'timestamp': at(21), 'message': ORDERS_DETECTED, 'orders': ['1', '2', '3']},
+            {'timestamp': at(4), 'message': 'No pending orders'},
+            {'timestamp': 'garbage'},
+        ])
+        priors = HourOfWeekPriors.learn([str(path)], kind='orders')
+        assert priors.events[20] == 2
+        assert priors.events[21] == 1
+        assert priors.hours[4] == priors.hours[20] == priors.hours[21] == 1
+        assert priors.relative[20] > priors.relative[21] > priors.relative[4]
+
+    def test_learn_price_moves(self, tmp_path):
+        path = tmp_path / 'daemon.json.log'
+        book = {'message': PRICES_FETCHED, 'asset': 'USDT', 'fiat': 'ARS', 'trade_type': 'BUY'}
+        write_log(path, [
+            {'timestamp': at(10), **book, 'top': 1000.0},
+            {'timestamp': at(10.2), **book, 'top': 1000.0},
+            {'timestamp': at(10.4), **book, 'top': 1001.0},
+            {'timestamp': at(11), **book, 'fiat': 'USD', 'top': 1.0},
+        ])
+        priors = HourOfWeekPriors.learn([str(path)], kind='prices')
+        assert priors.events[10] == 1
+        assert priors.events[11] == 0
+
+    def test_learn_reads_rotated_backups_since(self, tmp_path):
+        path = tmp_path / 'daemon.json.log'
+        write_log(path, [{'timestamp': at(9, weeks=4), 'message': ORDERS_DETECTED, 'orders': ['new']}])
+        write_log(str(path) + '.1.gz', [{'timestamp': at(9, weeks=3), 'order_id': 'a'}])
+        write_log(str(path) + '.2', [{'timestamp': at(9), 'order_id': 'old'}])
+
+        files = log_files(str(path))
+        assert files == [str(path) + '.2', str(path) + '.1.gz', str(path)]
+
+        since = (MONDAY + timedelta(weeks=2)).timestamp()
+        priors = HourOfWeekPriors.learn(files, kind='orders', since=since)
+        assert priors.events[9] == 2
+        assert priors.hours[9] == 2
+
+
+# ==============================================================================
+# ADAPTIVE INTERVAL TESTS
+# ==============================================================================
+
+class TestAdaptiveInterval:
+    """Tests for AdaptiveInterval class."""
+
+    def test_backoff_and_reset(self):
+        poller = AdaptiveInterval(30, floor=5, ceiling=100, backoff=2)
+        assert poller.next() == 30
+        poller.idle()
+        assert poller.next() == 60
+        poller.idle()
+        poller.idle()
+        assert poller.next() == 100
+        poller.activity()
+        assert poller.next() == 5
+        assert poller.stats['activity'] == 1
+        assert poller.stats['idle'] == 3
+        assert poller.stats['waited_seconds'] == 195
+
+    def test_priors_scale_within_bounds(self):
+        events = [0.0] * HOURS_PER_WEEK
+        events[20] = 100
+        priors = HourOfWeekPriors(events, [20.0] * HOURS_PER_WEEK)
+        clock = [(MONDAY + timedelta(hours=20)).timestamp()]
+        poller = AdaptiveInterval(30, floor=10, ceiling=120, priors=priors,
+                                  min_scale=0.5, max_scale=2.0, clock=lambda: clock[0])
+        assert poller.next() == 15        # Busy slot: 30 * 0.5
+
+        clock[0] = (MONDAY + timedelta(hours=4)).timestamp()
+        assert poller.next() == 60        # Quiet slot: 30 * 2
+
+        poller.activity()
+        assert poller.next() == 10        # Activity is not stretched by a quiet slot
+
+    def test_disabled_is_fixed(self):
+        poller = AdaptiveInterval.from_config(30, {'enabled': False, 'floor_seconds': 1})
+        poller.idle()
+        poller.activity()
+        assert poller.next() == 30
+
+    def test_config_defaults(self):
+        poller = AdaptiveInterval.from_config(60, {})
+        assert (poller.floor, poller.ceiling, poller.quiet_ceiling, poller.backoff) == (15, 60, 240, 1.5)
+
+    def test_idle_capped_at_base_outside_quiet_slots(self):
+        events = [0.0] * HOURS_PER_WEEK
+        events[20] = 100
+        priors = HourOfWeekPriors(events, [20.0] * HOURS_PER_WEEK)
+        clock = [(MONDAY + timedelta(hours=20)).timestamp()]
+        poller = AdaptiveInterval.from_config(30, {}, priors=priors, clock=lambda: clock[0])
+        for _ in range(10):
+            poller.idle()
+        assert poller.next() == 30         # Busy slot: never slower than the base interval
+
+        clock[0] = (MONDAY + timedelta(hours=4)).timestamp()
+        assert poller.next() == 120        # Quiet slot: backs off to quiet_ceiling
+
+
+        unlearned = AdaptiveInterval.from_config(30, {})
+        unlearned.idle()
+        assert unlearned.next() == 30      # No priors: the baseline interval
+
+    def test_hour_of_week(self):
+        assert hour_of_week(MONDAY.timestamp()) == 0
+        assert hour_of_week((MONDAY + timedelta(days=6, hours=23)).timestamp()) == 167
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
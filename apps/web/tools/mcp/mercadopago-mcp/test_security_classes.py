@@ -135,6 +135,92 @@ class TestTransferRateLimiter:
         assert len(results) == 10
         assert all(isinstance(r, tuple) for r in results)
 
+    @pytest.mark.asyncio
+    async def test_hour_window_evicts_from_left(self, rate_limiter):
+        """Only timestamps older than an hour are evicted."""
+        now = time.time()
+        rate_limiter._hour_window = [now - 3700, now - 3650, now - 10]
+        await rate_limiter.can_transfer(100.0)
+        assert list(rate_limiter._hour_window) == [now - 10]
+
+
+class TestTokenBucketRateLimiter:
+    """Tests for TransferRateLimiter in token_bucket mode."""
+
+    @pytest.mark.asyncio
+    async def test_burst_then_blocked(self):
+        """A full bucket allows `burst` transfers back to back."""
+        limiter = TransferRateLimiter(max_per_minute=1, max_per_hour=10,
+                                      max_daily_amount=1000.0, mode='token_bucket', burst=3)
+        for _ in range(3):
+            assert (await limiter.can_transfer(10.0))[0] is True
+            await limiter.record_transfer(10.0)
+
+        allowed, reason = await limiter.can_transfer(10.0)
+        assert allowed is False
+        assert "burst of 3" in reason
+
+    @pytest.mark.asyncio
+    async def test_tokens_refill(self):
+        """Tokens refill at max_per_minute per minute."""
+        limiter = TransferRateLimiter(max_per_minute=6, max_per_hour=100,
+                                      max_daily_amount=1000.0, mode='token_bucket', burst=1)
+        await limiter.record_transfer(10.0)
+        assert (await limiter.can_transfer(10.0))[0] is False
+
+        limiter._tokens_at -= 10  # 10 seconds at 6/min = 1 token
+        assert (await limiter.can_transfer(10.0))[0] is True
+
+    def test_unknown_mode_rejected(self):
+        with pytest.raises(ValueError):
+            TransferRateLimiter(mode='leaky')
+
+
+class TestPersistentRateLimiter:
+    """Tests for TransferRateLimiter with a state file."""
+
+    @pytest.mark.asyncio
+    async def test_daily_amount_survives_restart(self, tmp_path):
+        """A restart must not reset the daily limit."""
+        path = str(tmp_path / "rate_limit.json")
+        limiter = TransferRateLimiter(max_per_minute=5, max_per_hour=10,
+                                      max_daily_amount=1000.0, path=path)
+        await limiter.record_transfer(900.0)
+
+        restarted = TransferRateLimiter(max_per_minute=5, max_per_hour=10,
+                                        max_daily_amount=1000.0, path=path)
+        allowed, reason = await restarted.can_transfer(200.0)
+        assert allowed is False
+        assert "Daily limit" in reason
+
+    @pytest.mark.asyncio
+    async def test_windows_survive_restart(self, tmp_path):
+        """Recent transfers still count against the per-minute limit."""
+        path = str(tmp_path / "rate_limit.json")
+        limiter = TransferRateLimiter(max_per_minute=2, max_per_hour=10,
+                                      max_daily_amount=1000.0, path=path)
+        await limiter.record_transfer(10.0)
+        await limiter.record_transfer(10.0)
+
+        restarted = TransferRateLimiter(max_per_minute=2, max_per_hour=10,
+                                        max_daily_amount=1000.0, path=path)
+        assert (await restarted.can_transfer(10.0))[0] is False
+
+    @pytest.mark.asyncio
+    async def test_previous_day_not_restored(self, tmp_path):
+        """The daily amount from another day is ignored on load."""
+        path = tmp_path / "rate_limit.json"
+        path.write_text('{"daily_date": "2020-01-01", "daily_amount": 999, "transfers": []}')
+
+        limiter = TransferRateLimiter(max_daily_amount=1000.0, path=str(path))
+        assert (await limiter.can_transfer(500.0))[0] is True
+
+    def test_corrupt_file_ignored(self, tmp_path):
+        path = tmp_path / "rate_limit.json"
+        path.write_text("{not json")
+        limiter = TransferRateLimiter(path=str(path))
+        assert limiter._daily_amount == 0
+
 
 # ==============================================================================
 # IDEMPOTENCY STORE TESTS
@@ -225,6 +311,58 @@ class TestIdempotencyStore:
         assert results.count(True) == 1
         assert results.count(False) == 9
 
+    @pytest.mark.asyncio
+    async def test_heap_expiry_skips_reset_keys(self, idempotency_store):
+        """A key removed and set again must not be expired by its old heap entry."""
+        await idempotency_store.check_and_set("reused_key")
+        await idempotency_store.remove("reused_key")
+        await idempotency_store.check_and_set("reused_key")
+
+        idempotency_store._expire(time.time())
+        assert await idempotency_store.check_and_set("reused_key") is False
+
+
+class TestDurableIdempotencyStore:
+    """Tests for IdempotencyStore with a SQLite file."""
+
+    @pytest.mark.asyncio
+    async def test_keys_survive_restart(self, tmp_path):
+        """A key set before a crash should still block after restart."""
+        path = str(tmp_path / "idempotency.db")
+        store = IdempotencyStore(ttl_hours=24, path=path)
+        await store.check_and_set("in_flight_key")
+        store.close()
+
+        restarted = IdempotencyStore(ttl_hours=24, path=path)
+        assert await restarted.check_and_set("in_flight_key") is False
+        restarted.close()
+
+    @pytest.mark.asyncio
+    async def test_rollback_is_persisted(self, tmp_path):
+        """A removed key should be allowed again after restart."""
+        path = str(tmp_path / "idempotency.db")
+        store = IdempotencyStore(ttl_hours=24, path=path)
+        await store.check_and_set("rolled_back")
+        await store.remove("rolled_back")
+        store.close()
+
+        restarted = IdempotencyStore(ttl_hours=24, path=path)
+        assert await restarted.check_and_set("rolled_back") is True
+        restarted.close()
+
+    @pytest.mark.asyncio
+    async def test_expired_keys_not_restored(self, tmp_path):
+        """Keys older than the TTL are dropped when the file is loaded."""
+        path = str(tmp_path / "idempotency.db")
+        store = IdempotencyStore(ttl_hours=1, path=path)
+        await store.check_and_set("old_key")
+        store._db.execute("UPDATE idempotency_keys SET ts = ?", (time.time() - 2 * 3600,))
+        store.close()
+
+        restarted = IdempotencyStore(ttl_hours=1, path=path)
+        assert len(restarted) == 0
+        restarted.close()
+
 
 # ==============================================================================
 # ORDER PROCESSING LOCK TESTS
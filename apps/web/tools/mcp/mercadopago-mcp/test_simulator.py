@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the local P2P site simulator (HTTP level, no browser).
+
+Run with: pytest test_simulator.py -v
+"""
+
+import asyncio
+import re
+from contextlib import asynccontextmanager
+
+import aiohttp
+import pytest
+
+from p2p_ad_api import BinanceAdAPI
+from p2p_js_actions import BANK_PAYMENT_DETAILS, MP_PAYMENT_DETAILS
+from p2p_mp_activity import parse_activities
+from p2p_order_book import ADV_SEARCH_PATH, BookSpec, OrderBookFetcher
+from p2p_order_feed import parse_order_list
+from p2p_simulator import SESSION_COOKIES, P2PSimulator
+
+ORDER_LIST = '/binance/bapi/c2c/v2/private/c2c/order-match/order-list'
+
+
+class FakeContext:
+    """Browser context holding the simulator's session cookies."""
+
+    async def cookies(self, url=None):
+        return [{'name': name, 'value': value} for name, value in SESSION_COOKIES.items()]
+
+
+def visible_text(html):
+    """Page text before the scripts, tags stripped (what the regexes see)."""
+    return re.sub(r'<[^>]+>', '\n', html.split('<script>')[0])
+
+
+@asynccontextmanager
+async def running(**kwargs):
+    """Started simulator (no arrivals, fast counterparties) and a logged-in session."""
+    options = {'port': 0, 'rate_per_minute': 0, 'release_delay': 0.01, 'payment_delay': (0.01, 0.02)}
+    simulator = P2PSimulator(**{**options, **kwargs})
+    await simulator.start()
+    try:
+        async with aiohttp.ClientSession(base_url=simulator.url, cookies=SESSION_COOKIES) as session:
+            yield simulator, session
+    finally:
+        await simulator.stop()
+
+
+# ==============================================================================
+# BINANCE TESTS
+# ==============================================================================
+
+class TestBinance:
+    """Tests for the simulated Binance endpoints."""
+
+    @pytest.mark.asyncio
+    async def test_order_list_parses_like_binance(self):
+        async with running() as (sim, session):
+            buy = sim.create_order('BUY', amount=15000)
+            async with session.post(ORDER_LIST, json={'page': 1}) as response:
+                payload = await response.json()
+            detail_url = sim.endpoints()['binance'] + '/en/fiatOrderDetail?orderNo={order_number}'
+            orders = parse_order_list(payload, detail_url)
+            assert [(o.order_number, o.type, o.status, o.amount_fiat) for o in orders] == [
+                (buy.order_number, 'buy', 'to_pay', 15000.0)
+            ]
+            assert orders[0].href.startswith(sim.url)
+
+    @pytest.mark.asyncio
+    async def test_order_list_requires_session(self):
+        async with running() as (sim, _), aiohttp.ClientSession() as anonymous:
+            async with anonymous.post(sim.url + ORDER_LIST, json={}) as response:
+                assert parse_order_list(await response.json()) is None
+
+    @pytest.mark.asyncio
+    async def test_buy_order_flow(self):
+        async with running() as (sim, session):
+            order = sim.create_order('BUY', amount=20000)
+            async with session.get(f'/binance/en/fiatOrderDetail?orderNo={order.order_number}') as response:
+                text = visible_text(await response.text())
+            alias = re.search(MP_PAYMENT_DETAILS['alias'][0], text).group(1)
+            assert alias == order.destination
+
+            async with session.post('/mp/api/transfer', json={'destination': alias, 'amount': '20000'}) as response:
+                assert (await response.json())['id']
+            async with session.post(f'/binance/api/order/{order.order_number}/paid') as response:
+                assert (await response.json())['status'] is True
+
+            await asyncio.sleep(0.05)  # Seller releases
+            summary = sim.summary()
+            assert summary['latency']['buy']['count'] == 1
+            assert summary['pending'] == 0
+            assert summary['paid_without_transfer'] == summary['duplicate_transfers'] == 0
+
+    @pytest.mark.asyncio
+    async def test_bank_details_for_usd_orders(self):
+        async with running(fiat='USD') as (sim, session):
+            order = sim.create_order('BUY', amount=125.5)
+            async with session.get(f'/binance/en/fiatOrderDetail?orderNo={order.order_number}') as response:
+                text = visible_text(await response.text())
+            account = re.search(BANK_PAYMENT_DETAILS['account_number'][0], text, re.I).group(1)
+            assert account == order.destination
+
+    @pytest.mark.asyncio
+    async def test_release_before_payment_is_flagged(self):
+        async with running() as (sim, session):
+            order = sim.create_order('SELL', amount=30000)
+            assert sim.release(order.order_number) is True
+            assert sim.stats['released_unpaid'] == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_and_duplicate_transfers_flagged(self):
+        async with running() as (sim, session):
+            order = sim.create_order('BUY', amount=1000)
+            assert sim.transfer('nobody.at.all', 1000) is None
+            sim.transfer(order.destination, 1000)
+            sim.transfer(order.destination, 1000)
+            assert sim.stats['unknown_transfers'] == 1
+            assert sim.stats['duplicate_transfers'] == 1
+
+    @pytest.mark.asyncio
+    async def test_ad_api_against_simulator(self):
+        async with running() as (sim, session):
+            api = BinanceAdAPI(session, FakeContext(), base_url=sim.endpoints()['binance'])
+            assert await api.update_price('sell', 'USDT', 'ARS', 1301.5) is True
+            ad = next(a for a in sim.ads.values() if (a['tradeType'], a['fiatUnit']) == ('SELL', 'ARS'))
+            assert ad['price'] == 1301.5
+
+    @pytest.mark.asyncio
+    async def test_order_book_against_simulator(self):
+        async with running() as (sim, session):
+            fetcher = OrderBookFetcher(session, rows=10, url=sim.endpoints()['binance'] + ADV_SEARCH_PATH)
+            book = await fetcher.fetch_book(BookSpec('USDT', 'ARS', 'SELL'))
+            prices = [level['price'] for level in book.levels]
+            assert len(prices) == 10
+            assert prices == sorted(prices)
+
+
+# ==============================================================================
+# MERCADOPAGO TESTS
+# ==============================================================================
+
+class TestMercadoPago:
+    """Tests for the simulated MercadoPago endpoints."""
+
+    @pytest.mark.asyncio
+    async def test_buyer_payment_shows_in_activities(self):
+        async with running() as (sim, session):
+            order = sim.create_order('SELL', amount=45000)
+            await asyncio.sleep(0.05)  # Buyer pays
+            async with session.get('/mp/activities/api/list?page=1') as response:
+                movements = parse_activities(await response.json())
+            assert [(m.amount, m.incoming) for m in movements] == [(45000.0, True)]
+
+            assert sim.release(order.order_number) is True
+            assert sim.summary()['latency']['sell']['count'] == 1
+            assert sim.stats['released_unpaid'] == 0
+
+    @pytest.mark.asyncio
+    async def test_account_lookup(self):
+        async with running() as (sim, session):
+            order = sim.create_order('BUY')
+            async with session.get('/mp/api/accounts', params={'q': order.destination}) as response:
+                assert (await response.json()) == {'found': True, 'name': order.counterparty}
+            async with session.get('/mp/api/accounts', params={'q': 'x.y.z'}) as response:
+                assert (await response.json())['found'] is False
+
+
+# ==============================================================================
+# ARRIVAL TESTS
+# ==============================================================================
+
+class TestArrivals:
+    """Tests for the Poisson order generator."""
+
+    @pytest.mark.asyncio
+    async def test_orders_arrive_at_rate(self):
+        sim = P2PSimulator(port=0, rate_per_minute=6000, sell_ratio=1.0, seed=1)
+        await sim.start()
+        try:
+            await asyncio.sleep(0.3)
+        finally:
+            await sim.stop()
+        assert sim.stats['created'] > 5
+        assert all(o.trade_type == 'SELL' for o in sim.orders.values())
+
+    def test_unknown_fiat_rejected(self):
+        with pytest.raises(ValueError):
+            P2PSimulator(fiat='EUR')
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the journaled StateManager.
+
+Run with: pytest test_state_manager.py -v
+"""
+
+import json
+import os
+import pytest
+
+from p2p_state import StateManager
+
+
+# ==============================================================================
+# FIXTURES
+# ==============================================================================
+
+DEFAULTS = {
+    "processed_orders": set(),
+    "released_orders": set(),
+    "error_count": 0,
+}
+
+
+@pytest.fixture
+def state_path(tmp_path):
+    return str(tmp_path / "state.json")
+
+
+async def started(path, **kwargs) -> StateManager:
+    state = StateManager(path, flush_interval=3600, defaults=DEFAULTS, **kwargs)
+    await state.start()
+    return state
+
+
+def crash(state: StateManager):
+    """Simulate a crash: drop the flush task and file handle without saving."""
+    state._task.cancel()
+    state._close_journal()
+
+
+def journal_lines(state: StateManager):
+    with open(state.journal_path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# ==============================================================================
+# JOURNAL TESTS
+# ==============================================================================
+
+class TestJournal:
+    """Tests for journal mode."""
+
+    @pytest.mark.asyncio
+    async def test_durable_keys_written_immediately(self, state_path):
+        """Order sets are on disk as soon as add_to_set returns."""
+        state = await started(state_path)
+        state.add_to_set('processed_orders', 'A1')
+        assert journal_lines(state)[-1][1:] == ['a', 'processed_orders', 'A1']
+        crash(state)
+
+    @pytest.mark.asyncio
+    async def test_other_keys_buffered(self, state_path):
+        state = await started(state_path)
+        state.increment('error_count')
+        assert journal_lines(state) == []
+        state._flush_pending()
+        assert journal_lines(state)[-1][1:] == ['i', 'error_count', 1]
+        crash(state)
+
+    @pytest.mark.asyncio
+    async def test_crash_recovery_replays_journal(self, state_path):
+        """State after a crash is the snapshot plus the journal."""
+        state = await started(state_path)
+        state.add_to_set('processed_orders', 'A1')
+        state.increment('error_count', 2)
+        state.set('last_price_update', '2024-01-01T00:00:00')
+        state.add_to_set('released_orders', 'B1')  # Durable: flushes earlier records too
+        crash(state)
+
+        recovered = await started(state_path)
+        assert recovered.get('processed_orders') == {'A1'}
+        assert recovered.get('released_orders') == {'B1'}
+        assert recovered.get('error_count') == 2
+        assert recovered.get('last_price_update') == '2024-01-01T00:00:00'
+        crash(recovered)
+
+    @pytest.mark.asyncio
+    async def test_duplicate_add_not_journaled(self, state_path):
+        state = await started(state_path)
+        state.add_to_set('processed_orders', 'A1')
+        state.add_to_set('processed_orders', 'A1')
+        assert len(journal_lines(state)) == 1
+        crash(state)
+
+    @pytest.mark.asyncio
+    async def test_torn_record_skipped(self, state_path):
+        state = await started(state_path)
+        state.add_to_set('processed_orders', 'A1')
+        crash(state)
+        with open(state.journal_path, 'a') as f:
+            f.write('[2,"a","processed_')
+
+        recovered = await started(state_path)
+        assert recovered.get('processed_orders') == {'A1'}
+        crash(recovered)
+
+
+# ==============================================================================
+# COMPACTION TESTS
+# ==============================================================================
+
+class TestCompaction:
+    """Tests for snapshot compaction."""
+
+    @pytest.mark.asyncio
+    async def test_compact_truncates_journal(self, state_path):
+        state = await started(state_path)
+        state.add_to_set('processed_orders', 'A1')
+        state.compact()
+        assert os.path.getsize(state.journal_path) == 0
+
+        state.add_to_set('processed_orders', 'A2')
+        crash(state)
+
+        recovered = await started(state_path)
+        assert recovered.get('processed_orders') == {'A1', 'A2'}
+        crash(recovered)
+
+    @pytest.mark.asyncio
+    async def test_replay_skips_records_in_snapshot(self, state_path):
+        """A crash between snapshot and truncate must not double-apply increments."""
+        state = await started(state_path)
+        state.increment('error_count', 5)
+        state._flush_pending()
+        with open(state.journal_path) as f:
+            journal = f.read()
+        state.compact()
+        crash(state)
+        with open(state.journal_path, 'w') as f:
+            f.write(journal)  # Journal survived the crash
+
+        recovered = await started(state_path)
+        assert recovered.get('error_count') == 5
+        crash(recovered)
+
+    @pytest.mark.asyncio
+    async def test_should_compact_on_size(self, state_path):
+        state = await started(state_path, compact_bytes=50)
+        assert state._should_compact() is False
+        for i in range(5):
+            state.add_to_set('processed_orders', f'order_{i}')
+        assert state._should_compact() is True
+        crash(state)
+
+    @pytest.mark.asyncio
+    async def test_stop_leaves_snapshot_only(self, state_path):
+        state = await started(state_path)
+        state.add_to_set('processed_orders', 'A1')
+        await state.stop()
+
+        assert os.path.getsize(state.journal_path) == 0
+        with open(state_path) as f:
+            assert json.load(f)['processed_orders'] == ['A1']
+
+
+# ==============================================================================
+# SNAPSHOT MODE TESTS
+# ==============================================================================
+
+class TestSnapshotMode:
+    """journal=False keeps the whole-file behaviour."""
+
+    @pytest.mark.asyncio
+    async def test_roundtrip(self, state_path):
+        state = await started(state_path, journal=False)
+        state.add_to_set('processed_orders', 'A1')
+        await state.stop()
+        assert not os.path.exists(state.journal_path)
+
+        reloaded = await started(state_path, journal=False)
+        assert reloaded.get('processed_orders') == {'A1'}
+        await reloaded.stop()
+
+    @pytest.mark.asyncio
+    async def test_legacy_snapshot_loaded_in_journal_mode(self, state_path):
+        """Files written by the old StateManager load with sets restored."""
+        with open(state_path, 'w') as f:
+            json.dump({'processed_orders': ['X'], 'released_orders': [], 'error_count': 1}, f, indent=2)
+
+        state = await started(state_path)
+        assert state.get('processed_orders') == {'X'}
+        assert state.get('error_count') == 1
+        crash(state)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the multi-market supervisor and the shared browser/HTTP stack.
+
+Run with: pytest test_supervisor.py -v
+"""
+
+import json
+
+import pytest
+
+from p2p_core import SharedStack
+from p2p_daemon_ecuador import P2PDaemonEcuador
+from p2p_daemon_v3 import P2PDaemon
+from p2p_exchange_binance import BinanceExchange
+from p2p_metrics import REGISTRY
+from p2p_order_feed import P2POrder
+from p2p_supervisor import Supervisor, parse_markets
+
+
+# ==============================================================================
+# FAKES
+# ==============================================================================
+
+class FakeMarket:
+    """Stands in for a started daemon."""
+
+    FIAT = 'XXX'
+
+    def __init__(self, error: Exception = None):
+        self.error = error
+        self.ran = False
+        self.stopped = False
+        self.lines = []
+
+    def log(self, msg, level="INFO"):
+        self.lines.append((level, msg))
+
+    async def run(self):
+        self.ran = True
+        if self.error:
+            raise self.error
+
+    async def stop(self):
+        self.stopped = True
+        if self.error:
+            raise self.error
+
+
+class FakeFeed:
+    def __init__(self, orders):
+        self.orders = orders
+
+    async def refresh(self):
+        return self.orders
+
+
+def write_config(tmp_path, name: str, config: dict) -> str:
+    path = tmp_path / name
+    path.write_text(json.dumps(config))
+    return str(path)
+
+
+# ==============================================================================
+# SHARED STACK TESTS
+# ==============================================================================
+
+class TestSharedStack:
+    """Tests for SharedStack class."""
+
+    def test_initial_page_handed_out_once(self):
+        stack = SharedStack('/tmp/profile')
+        stack._initial_page = 'tab-0'
+        assert stack.take_initial_page() == 'tab-0'
+        assert stack.take_initial_page() is None
+
+
+# ==============================================================================
+# SUPERVISOR TESTS
+# ==============================================================================
+
+class TestSupervisor:
+    """Tests for Supervisor class."""
+
+    def test_builds_markets_on_one_stack(self, tmp_path):
+        ar = write_config(tmp_path, 'ar.json', {'browser_profile': '/tmp/shared', 'headless': True})
+        ec = write_config(tmp_path, 'ec.json', {})
+        supervisor = Supervisor(parse_markets([f'v3={ar}', f'ecuador={ec}']))
+
+        assert supervisor.stack.profile == '/tmp/shared'
+        assert supervisor.stack.headless is True
+        assert [type(d) for d in supervisor.daemons] == [P2PDaemon, P2PDaemonEcuador]
+        assert all(d.shared is supervisor.stack for d in supervisor.daemons)
+        # Only the first market reports into the process-wide registry
+        assert supervisor.daemons[0].metrics.registry is REGISTRY
+        assert supervisor.daemons[1].metrics.registry is not REGISTRY
+
+    def test_unknown_market_rejected(self):
+        with pytest.raises(ValueError):
+            parse_markets(['chile'])
+
+    @pytest.mark.asyncio
+    async def test_crashed_market_does_not_stop_others(self, tmp_path):
+        supervisor = Supervisor(parse_markets([f"v3={write_config(tmp_path, 'ar.json', {})}"]),
+                                log=lambda msg, level="INFO": None)
+        healthy, broken = FakeMarket(), FakeMarket(RuntimeError("boom"))
+        supervisor.daemons = [broken, healthy]
+
+        await supervisor.run()
+        assert healthy.ran and broken.ran
+        assert supervisor.stats['crashed'] == 1
+        assert broken.lines[0][0] == 'ERROR'
+
+        await supervisor.stop()
+        assert healthy.stopped and broken.stopped
+
+
+# ==============================================================================
+# ORDER FEED FIAT FILTER TESTS
+# ==============================================================================
+
+class TestFiatFilter:
+    """Tests for BinanceExchange order filtering by market fiat."""
+
+    @pytest.mark.asyncio
+    async def test_other_market_orders_skipped(self):
+        daemon = P2PDaemonEcuador('ec.json')
+        exchange = BinanceExchange(daemon)
+        exchange.order_feed = FakeFeed([
+            P2POrder('1', 'buy', 'to_pay', 100.0, fiat='USD'),
+            P2POrder('2', 'buy', 'to_pay', 50000.0, fiat='ARS'),
+            P2POrder('3', 'sell', 'paid', 20.0),
+        ])
+        orders = await exchange.fetch_orders()
+        assert [o['order_number'] for o in orders] == ['1', '3']
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Unit tests for per-order tracing and the latency report.
+
+Run with: pytest test_tracing.py -v
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from p2p_tracing import (Tracer, annotate, current_span, note_retry, percentile,
+                         read_spans, set_outcome, summarize)
+
+
+async def read_trace_file(tracer):
+    await tracer.stop()
+    with open(tracer.path) as f:
+        return [json.loads(line) for line in f]
+
+
+# ==============================================================================
+# TRACER TESTS
+# ==============================================================================
+
+class TestTracer:
+    """Tests for Tracer class."""
+
+    @pytest.mark.asyncio
+    async def test_nested_spans_written_as_json(self, tmp_path):
+        tracer = Tracer(str(tmp_path / 'traces.jsonl'))
+        await tracer.start()
+
+        with tracer.trace('2201', type='buy') as root:
+            with tracer.span('execute_mp_transfer') as span:
+                annotate(page='mp#2')
+                note_retry()
+                span.outcome = 'failed'
+            set_outcome('transfer_failed')
+
+        spans = {s['name']: s for s in await read_trace_file(tracer)}
+        transfer, order = spans['execute_mp_transfer'], spans['order']
+        assert transfer['parent_id'] == order['span_id'] == root.span_id
+        assert transfer['trace_id'] == order['trace_id']
+        assert transfer['order_id'] == '2201'
+        assert transfer['page'] == 'mp#2'
+        assert transfer['retries'] == 1
+        assert transfer['outcome'] == 'failed'
+        assert order['outcome'] == 'transfer_failed'
+        assert order['type'] == 'buy'
+
+    @pytest.mark.asyncio
+    async def test_exception_marks_error(self, tmp_path):
+        tracer = Tracer(str(tmp_path / 'traces.jsonl'))
+        await tracer.start()
+        with pytest.raises(RuntimeError):
+            with tracer.trace('1'):
+                with tracer.span('release_crypto'):
+                    raise RuntimeError('button not found')
+        spans = await read_trace_file(tracer)
+        assert all(s['outcome'] == 'error' for s in spans)
+        assert spans[0]['error'] == 'button not found'
+
+    @pytest.mark.asyncio
+    async def test_queued_span_from_detection_time(self, tmp_path):
+        tracer = Tracer(str(tmp_path / 'traces.jsonl'))
+        await tracer.start()
+        with tracer.trace('1', start=1_800_000_000.0):
+            pass
+        names = [s['name'] for s in await read_trace_file(tracer)]
+        assert names == ['queued', 'order']
+
+    @pytest.mark.asyncio
+    async def test_concurrent_orders_do_not_mix(self, tmp_path):
+        tracer = Tracer(str(tmp_path / 'traces.jsonl'))
+        await tracer.start()
+
+        async def process(order_id):
+            with tracer.trace(order_id):
+                await asyncio.sleep(0)
+                with tracer.span('step'):
+                    await asyncio.sleep(0)
+                    return current_span().order_id
+
+        assert await asyncio.gather(process('A'), process('B')) == ['A', 'B']
+        spans = await read_trace_file(tracer)
+        roots = {s['span_id']: s['order_id'] for s in spans if s['name'] == 'order'}
+        for span in spans:
+            if span['name'] == 'step':
+                assert roots[span['parent_id']] == span['order_id']
+
+    def test_outside_trace_nothing_is_recorded(self):
+        tracer = Tracer(None)
+        with tracer.span('release_crypto') as span:
+            annotate(page='binance#1')
+            span.outcome = 'ok'
+        assert current_span() is None
+        assert tracer.stats['spans'] == 0
+
+
+# ==============================================================================
+# REPORT TESTS
+# ==============================================================================
+
+class TestReport:
+    """Tests for read_spans, percentile and summarize."""
+
+    def test_percentile_nearest_rank(self):
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == 50
+        assert percentile(values, 95) == 95
+        assert percentile(values, 99) == 99
+        assert percentile([], 50) == 0
+
+    def test_summarize(self, tmp_path):
+        path = tmp_path / 'traces.jsonl'
+        lines = []
+        for i in range(10):
+            lines.append({'trace_id': f't{i}', 'span_id': i * 2, 'parent_id': None, 'order_id': str(i),
+                          'name': 'order', 'start': 100 + i, 'duration': 10 + i, 'outcome': 'processed'})
+            lines.append({'trace_id': f't{i}', 'span_id': i * 2 + 1, 'parent_id': i * 2, 'order_id': str(i),
+                          'name': 'execute_mp_transfer', 'start': 100 + i, 'duration': 8 + i, 'outcome': 'ok'})
+        path.write_text('\n'.join(json.dumps(line) for line in lines) + '\nnot json\n')
+
+        summary = summarize(read_spans([str(path)]), slowest=2)
+        stages = {row['stage']: row for row in summary['stages']}
+        assert stages['execute_mp_transfer']['count'] == 10
+        assert stages['execute_mp_transfer']['p50'] == 12
+        assert stages['execute_mp_transfer']['p99'] == 17
+        assert stages['order']['outcomes'] == {'processed': 10}
+        assert [s['order_id'] for s in summary['slowest']] == ['9', '8']
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the order worker pool and browser page pool.
+
+Run with: pytest test_worker_pool.py -v
+"""
+
+import asyncio
+import pytest
+
+from p2p_page_pool import PagePool
+from p2p_worker_pool import OrderWorkerPool
+from p2p_daemon_v3 import TransferRateLimiter
+
+
+# ==============================================================================
+# FAKES
+# ==============================================================================
+
+class FakePage:
+    def __init__(self, heap_bytes: int = 0):
+        self._closed = False
+        self.heap_bytes = heap_bytes
+        self.main_frame = object()
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def emit(self, event, arg):
+        for handler in self.handlers.get(event, []):
+            handler(arg)
+
+    def navigate(self):
+        self.emit('framenavigated', self.main_frame)
+
+    async def evaluate(self, script):
+        return self.heap_bytes
+
+    def is_closed(self):
+        return self._closed
+
+    async def close(self):
+        self._closed = True
+
+
+class FakeContext:
+    def __init__(self, delay: float = 0):
+        self.created = 0
+        self.delay = delay
+        self.pages = []
+
+    async def new_page(self):
+        await asyncio.sleep(self.delay)
+        self.created += 1
+        page = FakePage()
+        self.pages.append(page)
+        return page
+
+
+# ==============================================================================
+# ORDER WORKER POOL TESTS
+# ==============================================================================
+
+class TestOrderWorkerPool:
+    """Tests for OrderWorkerPool class."""
+
+    @pytest.mark.asyncio
+    async def test_processes_orders_concurrently(self):
+        """Slow orders should overlap instead of running one after another."""
+        running = 0
+        peak = 0
+
+        async def handler(order):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+
+        pool = OrderWorkerPool(handler, workers=3)
+        await pool.start()
+        for i in range(6):
+            pool.submit({'type': 'buy', 'order_number': str(i)})
+        await pool.join()
+        await pool.stop()
+
+        assert peak == 3
+        assert pool.stats['completed'] == 6
+
+    @pytest.mark.asyncio
+    async def test_duplicate_submission_ignored(self):
+        """An order already queued or in flight should not be queued again."""
+        release = asyncio.Event()
+
+        async def handler(order):
+            await release.wait()
+
+        pool = OrderWorkerPool(handler, workers=1)
+        await pool.start()
+        assert pool.submit({'type': 'sell', 'order_number': '1'}) is True
+        assert pool.submit({'type': 'sell', 'order_number': '1'}) is False
+        release.set()
+        await pool.join()
+        await pool.stop()
+
+        assert pool.stats['duplicates'] == 1
+        assert pool.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_handler_error_does_not_kill_worker(self):
+        """A failing order should not stop the worker from taking the next one."""
+        seen = []
+
+        async def handler(order):
+            seen.append(order['order_number'])
+            if order['order_number'] == 'bad':
+                raise RuntimeError("boom")
+
+        pool = OrderWorkerPool(handler, workers=1)
+        await pool.start()
+        pool.submit({'type': 'buy', 'order_number': 'bad'})
+        pool.submit({'type': 'buy', 'order_number': 'good'})
+        await pool.join()
+        await pool.stop()
+
+        assert seen == ['bad', 'good']
+        assert pool.stats['failed'] == 1
+
+
+# ==============================================================================
+# PAGE POOL TESTS
+# ==============================================================================
+
+class TestPagePool:
+    """Tests for PagePool class."""
+
+    @pytest.mark.asyncio
+    async def test_lease_is_exclusive_and_bounded(self):
+        """No more than max pages per site, each leased to one holder at a time."""
+        context = FakeContext()
+        pool = PagePool(context, max_pages={'mp': 2})
+        held = []
+
+        async def use():
+            async with pool.lease('mp') as page:
+                assert page not in held
+                held.append(page)
+                await asyncio.sleep(0.02)
+                held.remove(page)
+
+        await asyncio.gather(*[use() for _ in range(6)])
+        assert context.created == 2
+        assert pool.size('mp') == 2
+
+    @pytest.mark.asyncio
+    async def test_seeded_page_used_first(self):
+        context = FakeContext()
+        pool = PagePool(context, max_pages={'mp': 2})
+        seed = FakePage()
+        pool.add('mp', seed)
+
+        async with pool.lease('mp') as page:
+            assert page is seed
+        assert context.created == 0
+
+    @pytest.mark.asyncio
+    async def test_describe_counts_pinned_and_pooled(self):
+        pool = PagePool(FakeContext(), max_pages={'binance': 2, 'mp': 2})
+        await pool.pin('orders')
+        await pool.pin('price')
+        pool.add('mp', FakePage())
+        assert pool.describe() == "2 pinned (orders, price), pooled: binance 0/2, mp 1/2"
+
+    @pytest.mark.asyncio
+    async def test_lease_timeout_while_opening_releases_slot(self):
+        context = FakeContext(delay=0.2)
+        pool = PagePool(context, max_pages={'bank': 1})
+        with pytest.raises(asyncio.TimeoutError):
+            async with pool.lease('bank', timeout=0.02):
+                pass
+        assert pool.size('bank') == 0
+
+        context.delay = 0
+        async with pool.lease('bank', timeout=1) as page:
+            assert page is context.pages[-1]
+
+    @pytest.mark.asyncio
+    async def test_timeout_during_setup_closes_page(self):
+        context = FakeContext()
+
+        async def slow_setup(site, page):
+            await asyncio.sleep(1)
+
+        pool = PagePool(context, max_pages={'mp': 1}, on_page=slow_setup)
+        with pytest.raises(asyncio.TimeoutError):
+            async with pool.lease('mp', timeout=0.02):
+                pass
+        assert pool.size('mp') == 0
+        assert context.pages[0].is_closed()
+
+    @pytest.mark.asyncio
+    async def test_closed_page_replaced(self):
+        context = FakeContext()
+        pool = PagePool(context, max_pages={'binance': 1})
+
+        async with pool.lease('binance') as page:
+            await page.close()
+        async with pool.lease('binance') as page:
+            assert not page.is_closed()
+        assert context.created == 2
+
+    @pytest.mark.asyncio
+    async def test_crashed_page_replaced(self):
+        context = FakeContext()
+        pool = PagePool(context, max_pages={'mp': 1})
+
+        async with pool.lease('mp') as first:
+            first.emit('crash', first)
+        async with pool.lease('mp') as second:
+            assert second is not first
+        assert first.is_closed()
+
+    @pytest.mark.asyncio
+    async def test_recycle_after_max_navigations(self):
+        context = FakeContext()
+        pool = PagePool(context, max_pages={'binance': 1}, max_navigations=3)
+
+        async with pool.lease('binance') as first:
+            for _ in range(3):
+                first.navigate()
+        async with pool.lease('binance') as second:
+            assert second is not first
+        assert pool.counters['recycled'] == 1
+        assert pool.size('binance') == 1
+
+    @pytest.mark.asyncio
+    async def test_recycle_on_heap_growth(self):
+        context = FakeContext()
+        pool = PagePool(context, max_heap_mb=100, heap_check_interval=0)
+        page = FakePage(heap_bytes=150 * 1024 * 1024)
+        pool.add('mp', page)
+
+        async with pool.lease('mp') as leased:
+            assert leased is page
+        assert page.is_closed()
+        assert pool.counters['recycled'] == 1
+
+    @pytest.mark.asyncio
+    async def test_heal_replaces_closed_pinned_page(self):
+        context = FakeContext()
+        pool = PagePool(context)
+        replaced = []
+
+        async def on_replace(page):
+            replaced.append(page)
+
+        original = await pool.pin('orders', on_replace=on_replace)
+        await original.close()
+
+        assert await pool.heal() == 1
+        assert replaced == [pool.get_pinned('orders')]
+        assert pool.get_pinned('orders') is not original
+
+    @pytest.mark.asyncio
+    async def test_heal_skips_pinned_page_in_use(self):
+        context = FakeContext()
+        pool = PagePool(context, max_navigations=1)
+        page = await pool.pin('price')
+        page.navigate()
+
+        async with pool.pinned('price'):
+            assert await pool.heal() == 0
+        assert await pool.heal() == 1
+
+
+# ==============================================================================
+# RATE LIMITER RESERVATION TESTS
+# ==============================================================================
+
+class TestRateLimiterReservations:
+    """Concurrent workers must not overshoot limits between check and record."""
+
+    @pytest.mark.asyncio
+    async def test_reservations_count_against_limits(self):
+        limiter = TransferRateLimiter(max_per_minute=2, max_per_hour=10, max_daily_amount=1000)
+        results = await asyncio.gather(*[limiter.reserve(100.0) for _ in range(5)])
+        assert [allowed for allowed, _ in results].count(True) == 2
+
+    @pytest.mark.asyncio
+    async def test_cancel_frees_slot(self):
+        limiter = TransferRateLimiter(max_per_minute=1, max_per_hour=10, max_daily_amount=1000)
+        assert (await limiter.reserve(100.0))[0] is True
+        assert (await limiter.reserve(100.0))[0] is False
+        await limiter.cancel(100.0)
+        assert (await limiter.reserve(100.0))[0] is True
+
+    @pytest.mark.asyncio
+    async def test_commit_records_transfer(self):
+        limiter = TransferRateLimiter(max_per_minute=5, max_per_hour=10, max_daily_amount=1000)
+        await limiter.reserve(600.0)
+        await limiter.commit(600.0)
+        allowed, reason = await limiter.can_transfer(500.0)
+        assert allowed is False
+        assert "Daily limit" in reason
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])